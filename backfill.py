@@ -0,0 +1,388 @@
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+import json
+import os
+import sys
+
+from domainlist import DomainList, WILDCARD_PREFIX
+from parse import DATABASE, MONTHS, MyEncoder, WINDOW_SECONDS
+from querytypes import QueryTypes
+import snapshot
+from tail import CHUNK_SIZE, LogFollower
+from timeindex import ToEpoch
+
+RANGES_PER_PROCESS = 4
+SAMPLE_SIZE = 1 << 16
+
+
+def SplitRanges(fileName, start, numberOfRanges):
+	"""
+	Splits a logs file, from a given offset to its end, into byte ranges
+	that start and end on line boundaries.
+
+	Parameters
+	----------
+	fileName : str
+		A string representing a logs file name.
+	start : int
+		An integer representing the offset to start from.
+	numberOfRanges : int
+		An integer representing the number of ranges wanted.
+
+	Returns
+	-------
+	lst
+		A list of (start, end) tuples, in file order.
+	"""
+
+	size = os.path.getsize(fileName)
+	boundaries = [start]
+
+	with open(fileName, "rb") as fh:
+		for i in range(1, numberOfRanges):
+			fh.seek(start + (size - start) * i // numberOfRanges)
+			fh.readline()
+			boundary = fh.tell()
+			if boundary > boundaries[-1] and boundary < size:
+				boundaries.append(boundary)
+	boundaries.append(size)
+
+	return [(boundaries[i], boundaries[i + 1]) for i in range(len(boundaries) - 1)]
+
+
+def SampleMonths(fileName, start, end):
+	"""
+	Finds the months of the first and the last timestamped lines of a range.
+
+	Parameters
+	----------
+	fileName : str
+		A string representing a logs file name.
+	start : int
+		An integer representing the start of the range.
+	end : int
+		An integer representing the end of the range.
+
+	Returns
+	-------
+	tuple
+		The first and the last month numbers, or None for each that wasn't found.
+	"""
+
+	with open(fileName, "rb") as fh:
+		fh.seek(start)
+		head = fh.read(min(SAMPLE_SIZE, end - start)).split(b"\n")
+		fh.seek(max(start, end - SAMPLE_SIZE))
+		tail = fh.read(end - max(start, end - SAMPLE_SIZE)).split(b"\n")
+
+	months = []
+	for lines in (head, reversed(tail)):
+		month = None
+		for line in lines:
+			token = line[:3].decode("ascii", "replace")
+			if token in MONTHS:
+				month = MONTHS[token]
+				break
+		months.append(month)
+
+	return months[0], months[1]
+
+
+def ParseRange(fileName, start, end, year, month, approved, profiles, threshold):
+	"""
+	Parses the complete lines of a byte range of a logs file into the
+	query times of every domain, and counts the queried names under their
+	parent domains. Runs in a worker process.
+
+	Parameters
+	----------
+	fileName : str
+		A string representing a logs file name.
+	start : int
+		An integer representing the start of the range.
+	end : int
+		An integer representing the end of the range.
+	year : int
+		An integer representing the year of the first timestamp of the range, or None to infer it.
+	month : int
+		An integer representing the month of the first timestamp of the range, or None.
+	approved : lst
+		A list of the approved domains.
+	profiles : lst
+		A list of the (name, weight) tuples of the record types to parse, see querytypes.QueryTypes.
+	threshold : int
+		An integer representing the number of distinct children above which a parent domain is reported.
+
+	Returns
+	-------
+	tuple
+		A dictionary mapping domain names to arrays of query times in seconds since
+		the epoch, in file order, a dictionary mapping domain names to arrays of the
+		weights of the queries, the offset right after the last complete line, the
+		SubdomainCounter instance of the range, a list of (second, parent) tuples
+		of the parents that crossed its threshold and the counts of the record types.
+	"""
+
+	database = DATABASE()
+	database.approvedList = DomainList(approved)
+	database.queryTypes = QueryTypes(profiles)
+	database.SetSubdomainThreshold(threshold)
+	database.timestampDecoder.year = year
+	database.timestampDecoder.lastMonth = month
+	counter = database.subdomainCounter
+	times = {}
+	weights = {}
+	parents = []
+	offset = start
+	partial = b""
+
+	with open(fileName, "rb") as fh:
+		fh.seek(start)
+		while offset < end:
+			data = fh.read(min(CHUNK_SIZE, end - offset))
+			if not data:
+				break
+			offset += len(data)
+			data = partial + data
+			cut = data.rfind(b"\n")
+			if cut == -1:
+				partial = data
+				continue
+			partial = data[cut + 1:]
+			for log in database.ParseChunk(data[:cut]):
+				epochs = times.get(log.domain)
+				if epochs == None:
+					epochs = times[log.domain] = array('q')
+					weights[log.domain] = array('i')
+				second = ToEpoch(log.date)
+				epochs.append(second)
+				weights[log.domain].append(log.weight)
+				parent = counter.Add(log.name, second)
+				if parent != None:
+					parents.append((second, parent))
+
+	return times, weights, offset - len(partial), counter, parents, database.queryTypes.counts
+
+
+def FirstCrossing(epochs, detector, isSuspiciousDomain, weights = None):
+	"""
+	Finds the first query at which a RateDetector would report a domain,
+	given all its query times, without updating the detector.
+
+	Parameters
+	----------
+	epochs : array
+		An array of query times in seconds since the epoch, in file order.
+	detector : RateDetector
+		A RateDetector instance whose window and thresholds are used.
+	isSuspiciousDomain : bool
+		A boolean flag indicating whether the domain is considerd suspicious.
+	weights : array
+		An array of the weights of the queries, or None if every query counts as one(default is None).
+
+	Returns
+	-------
+	int
+		The time of the query crossing the threshold, or None.
+	"""
+
+	threshold = detector.suspiciousThreshold if isSuspiciousDomain else detector.benignThreshold
+	if weights == None:
+		weights = [1] * len(epochs)
+	if sum(weights) <= threshold:
+		return None
+
+	span = detector.window // detector.resolution
+	buckets = []
+	latest = None
+	left = 0
+	total = 0
+
+	for second, weight in zip(epochs, weights):
+		bucket = second // detector.resolution
+		if latest == None or bucket > latest:
+			latest = bucket
+		buckets.append(latest)
+		total += weight
+		while buckets[left] <= bucket - span:
+			total -= weights[left]
+			left += 1
+		if total > threshold:
+			return second
+
+	return None
+
+
+def MergePartials(database, partials):
+	"""
+	Merges the results of ParseRange, in file order, into an empty database.
+	The 10 minutes windows, counts and the rate detector are replayed per
+	domain over its query times, and domains crossing their threshold are
+	blocked in the order of the times they crossed it, every query counting
+	as the weight of its record type. The subdomain counters of the ranges
+	are merged, and the parents reported by any range are reported by the
+	database too(see DATABASE.ReportParent); a burst of distinct children
+	split between two ranges is only caught if one of them sees enough of
+	it. The database's retention is then checked once, at the time of the
+	newest query: the windows rolled up are the same as those of a
+	sequential parse, but a memory budget is only enforced at the end, so
+	the domains evicted may differ.
+
+	Parameters
+	----------
+	database : DATABASE
+		An empty DATABASE instance.
+	partials : lst
+		A list of the results of ParseRange, in file order.
+	"""
+
+	merged = {}
+	mergedWeights = {}
+	parents = []
+	for times, weights, end, counter, crossed, counts in partials:
+		for domain, epochs in times.items():
+			if domain in merged:
+				merged[domain].extend(epochs)
+				mergedWeights[domain].extend(weights[domain])
+			else:
+				merged[domain] = epochs
+				mergedWeights[domain] = weights[domain]
+		database.offsetInLogFile = end
+		database.subdomainCounter.Merge(counter)
+		parents.extend(crossed)
+		for name, count in counts.items():
+			database.queryTypes.counts[name] = database.queryTypes.counts.get(name, 0) + count
+
+	newest = max((max(epochs) for epochs in merged.values()), default = 0)
+	minutes = []
+	crossings = []
+	detector = database.rateDetector
+
+	for order, (domain, epochs) in enumerate(merged.items()):
+		isSuspiciousDomain = domain.startswith(WILDCARD_PREFIX)
+		starts = []
+		counts = []
+		perMinute = {}
+		for second in epochs:
+			if starts and second - starts[-1] < WINDOW_SECONDS:
+				counts[-1] += 1
+			else:
+				starts.append(second)
+				counts.append(1)
+			minute = second // 60
+			perMinute[minute] = perMinute.get(minute, 0) + 1
+
+		number = database.logs.TakeNumber()
+		database.logs.AddDomain(number, domain, isSuspiciousDomain)
+		for second, count in zip(starts, counts):
+			database.timeIndex.AddWindow(database.logs.Open(number, second, count), second)
+		database.logs.lastSeconds[number] = max(epochs)
+		database.AddDomain(number, domain)
+		database.countForDomains[domain] = len(epochs)
+		database.numberOfLogs += 1
+		for minute, count in perMinute.items():
+			minutes.append((minute, order, domain, count))
+
+		if database.approvedList.Matches(domain):
+			continue
+		weights = mergedWeights[domain]
+		crossing = FirstCrossing(epochs, detector, isSuspiciousDomain, weights)
+		if crossing != None:
+			crossings.append((crossing, order, domain))
+		tail = len(epochs)
+		while tail > 0 and epochs[tail - 1] > newest - detector.window:
+			tail -= 1
+		for second, weight in zip(epochs[tail:], weights[tail:]):
+			detector.Update(domain, second, isSuspiciousDomain, weight)
+
+	minutes.sort()
+	for minute, order, domain, count in minutes:
+		database.timeIndex.AddQuery(domain, minute * 60, count)
+		database.liveTopK.Add(domain, minute * 60, count)
+
+	for second, parent in parents:
+		if not database.approvedList.Matches(parent):
+			crossings.append((second, len(merged), parent))
+
+	crossings.sort()
+	for second, order, domain in crossings:
+		if order == len(merged):
+			database.ReportParent(domain, second)
+		else:
+			database.AddToBlockedList(domain)
+
+	if merged:
+		database.retention.Check(database, newest)
+
+
+def Backfill(database, fileName, processes = None):
+	"""
+	Parses a logs file from the database's offsetInLogFile attribute to its
+	end, splitting it into byte ranges parsed by a pool of processes.
+	A database that already holds logs is parsed sequentially instead, since
+	its windows would have to be continued line by line. The merged result
+	isn't journaled, so a journaled database is compacted right after it.
+
+	Parameters
+	----------
+	database : DATABASE
+		A DATABASE instance.
+	fileName : str
+		A string representing a logs file name.
+	processes : int
+		An integer representing the number of worker processes(default is the number of CPUs).
+	"""
+
+	processes = processes or os.cpu_count()
+
+	if database.logs or processes == 1:
+		follower = LogFollower(fileName, database.offsetInLogFile, useInotify = False)
+		database.ParseAvailable(follower)
+		follower.Close()
+		return
+
+	ranges = SplitRanges(fileName, database.offsetInLogFile, processes * RANGES_PER_PROCESS)
+	decoder = database.timestampDecoder
+	approved = database.approvedList.ToList()
+	profiles = database.queryTypes.Profiles()
+	threshold = database.subdomainThreshold
+	seeds = []
+
+	for start, end in ranges:
+		firstMonth, lastMonth = SampleMonths(fileName, start, end)
+		if firstMonth == None:
+			seeds.append((decoder.year, decoder.lastMonth))
+			continue
+		seeds.append((decoder.InferYear(firstMonth), firstMonth))
+		decoder.InferYear(lastMonth)
+
+	with ProcessPoolExecutor(processes) as executor:
+		futures = [executor.submit(ParseRange, fileName, start, end, year, month, approved, profiles, threshold) for (start, end), (year, month) in zip(ranges, seeds)]
+		partials = [future.result() for future in futures]
+
+	MergePartials(database, partials)
+
+	if database.journal != None and database.journal.compact != None:
+		database.journal.compact()
+
+
+def main():
+
+	if len(sys.argv) < 3:
+		print("usage: python backfill.py <logs file> <output json or snapshot> [processes]")
+		return
+
+	database = DATABASE()
+	Backfill(database, sys.argv[1], int(sys.argv[3]) if len(sys.argv) > 3 else None)
+	database.publisher.Stop()
+
+	if sys.argv[2].endswith(snapshot.SNAPSHOT_EXTENSION):
+		snapshot.Save(database, sys.argv[2], background = False)
+		return
+
+	with open(sys.argv[2], "w") as fh:
+		json.dump(database.__dict__, fh, cls = MyEncoder)
+
+
+if __name__ == "__main__":
+	main()
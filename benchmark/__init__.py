@@ -0,0 +1,11 @@
+"""
+Benchmarks for the parser module.
+
+Every benchmark module can be run on its own, e.g.:
+	python -m benchmark.timestamps
+
+benchmark.generator writes synthetic dnsmasq logs, and benchmark.runner
+times the main stages of the parser on them and writes JSON results:
+	python -m benchmark.runner 1M,10M results.json
+	python -m benchmark.runner compare old.json results.json
+"""
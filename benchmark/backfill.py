@@ -0,0 +1,147 @@
+"""
+Compares the parallel Backfill with a sequential parse of the same
+synthetic logs files, one of a few hours and one of 84 hours, whose
+windows older than 48 hours are rolled up: the resulting databases must
+be identical, and lines per second are reported for every number of
+processes. Exits with status 1 if they are not.
+"""
+
+from datetime import datetime, timedelta
+import os
+import random
+import sys
+import tempfile
+import time
+
+from backfill import Backfill
+from parse import DATABASE
+from tail import LogFollower
+
+
+LONG_HOURS = 84
+
+
+def WriteSyntheticLog(fileName, numberOfLines, seed = 1, spacing = 100):
+	"""
+	Writes a synthetic dnsmasq logs file, crossing a year boundary, with
+	benign queries, forwarded/reply noise and a tunnel burst.
+
+	Parameters
+	----------
+	fileName : str
+		A string representing the logs file name.
+	numberOfLines : int
+		An integer representing the number of lines to write.
+	seed : int
+		An integer used to seed the random generator(default is 1).
+	spacing : int
+		An integer representing the maximum number of milliseconds between two lines(default is 100).
+	"""
+
+	generator = random.Random(seed)
+	date = datetime(2021, 12, 31, 20, 0, 0)
+
+	with open(fileName, "w") as fh:
+		for i in range(numberOfLines):
+			date += timedelta(milliseconds = generator.randrange(spacing))
+			stamp = date.strftime("%b ") + ("%2d" % date.day) + date.strftime(" %H:%M:%S")
+			kind = generator.random()
+			if i % 1000 < 30:
+				name = "".join(generator.choice("abcdef0123456789") for j in range(40)) + ".tunnel.example.org"
+				fh.write("%s dnsmasq[1]: query[TXT] %s from 10.0.0.2\n" % (stamp, name))
+			elif kind < 0.5:
+				name = "host%d.example.com" % int(generator.paretovariate(1.2))
+				fh.write("%s dnsmasq[1]: query[A] %s from 10.0.0.1\n" % (stamp, name))
+			elif kind < 0.75:
+				fh.write("%s dnsmasq[1]: forwarded host1.example.com to 8.8.8.8\n" % stamp)
+			else:
+				fh.write("%s dnsmasq[1]: reply host1.example.com is 1.2.3.4\n" % stamp)
+
+
+def Summary(database):
+	"""
+	Summarizes the state of a database, for comparison.
+
+	Parameters
+	----------
+	database : DATABASE
+		A DATABASE instance.
+
+	Returns
+	-------
+	tuple
+		The comparable parts of the database.
+	"""
+
+	logs = {}
+	for domain, number in database.numbersOfDomains.items():
+		logs[domain] = [(log.date, log.count, log.isSuspiciousDomain) for log in database.logs[number]]
+
+	return (logs, database.countForDomains, sorted(database.GetBlockedList()), database.offsetInLogFile, database.liveTopK.counts)
+
+
+def Compare(fileName, numberOfLines):
+	"""
+	Parses a logs file sequentially and with Backfill, and prints the lines
+	per second and whether the databases are identical.
+
+	Parameters
+	----------
+	fileName : str
+		A string representing the logs file name.
+	numberOfLines : int
+		An integer representing the number of lines of the file.
+
+	Returns
+	-------
+	bool
+		True if every database was identical to the sequential one.
+	"""
+
+	sequential = DATABASE()
+	sequential.UpdateFileBlocked = lambda: None
+	start = time.perf_counter()
+	follower = LogFollower(fileName, useInotify = False)
+	sequential.ParseAvailable(follower)
+	follower.Close()
+	elapsed = time.perf_counter() - start
+	print("%10s %12s %10s %8s" % ("processes", "lines/s", "identical", "rollups"))
+	print("%10s %12.0f %10s %8d" % ("sequential", numberOfLines / elapsed, "-", sequential.retention.windowsRolledUp))
+	expected = Summary(sequential)
+	identical = True
+
+	for processes in sorted(set([2, 4, os.cpu_count() or 1])):
+		database = DATABASE()
+		database.UpdateFileBlocked = lambda: None
+		start = time.perf_counter()
+		Backfill(database, fileName, processes)
+		elapsed = time.perf_counter() - start
+		same = Summary(database) == expected
+		identical = identical and same
+		print("%10d %12.0f %10s %8d" % (processes, numberOfLines / elapsed, same, database.retention.windowsRolledUp))
+
+	return identical
+
+
+def main():
+
+	numberOfLines = int(sys.argv[1]) if len(sys.argv) > 1 else 400000
+	directory = tempfile.mkdtemp()
+
+	fileName = os.path.join(directory, "dnsmasq.log")
+	WriteSyntheticLog(fileName, numberOfLines)
+	print("a few hours:")
+	identical = Compare(fileName, numberOfLines)
+
+	fileName = os.path.join(directory, "dnsmasq.long.log")
+	WriteSyntheticLog(fileName, numberOfLines, spacing = 2 * LONG_HOURS * 3600 * 1000 // numberOfLines)
+	print("%d hours:" % LONG_HOURS)
+	identical = Compare(fileName, numberOfLines) and identical
+
+	if not identical:
+		print("the backfilled databases differ from the sequential parse")
+		sys.exit(1)
+
+
+if __name__ == "__main__":
+	main()
@@ -0,0 +1,112 @@
+"""
+Measures the SubdomainCounter: the cost of counting a query, the error of
+its distinct children estimates next to exact sets, the memory its
+sketches hold per parent(the registers alone, and everything traced once
+the public suffix cache is warm), the time Top takes over BUSY_PARENTS
+busy parents, the first time and once only a few of them got new
+children, and whether counters built over two halves of the queries
+merge into the same estimates as one counter built over all of them.
+"""
+
+import random
+import sys
+import time
+import tracemalloc
+
+from cardinality import HashName, HyperLogLog, ParentDomain, SubdomainCounter
+
+BUSY_PARENTS = 5000
+
+
+def Queries(numberOfQueries, seed = 1):
+	"""
+	Generates synthetic (second, name) queries: parents with a few stable
+	children, and a tunnel parent with a new random child every query.
+
+	Parameters
+	----------
+	numberOfQueries : int
+		An integer representing the number of queries to generate.
+	seed : int
+		An integer used to seed the random generator(default is 1).
+
+	Returns
+	-------
+	lst
+		A list of (second, name) tuples, in time order.
+	"""
+
+	generator = random.Random(seed)
+	queries = []
+
+	for i in range(numberOfQueries):
+		second = 1600000000 + i // 20
+		if generator.random() < 0.2:
+			name = "%012x.tunnel.example.org" % generator.getrandbits(48)
+		else:
+			name = "host%d.site%d.com" % (generator.randrange(20), int(generator.paretovariate(1.0)))
+		queries.append((second, name))
+
+	return queries
+
+
+def main():
+
+	numberOfQueries = int(sys.argv[1]) if len(sys.argv) > 1 else 300000
+	queries = Queries(numberOfQueries)
+
+	counter = SubdomainCounter()
+	start = time.perf_counter()
+	for second, name in queries:
+		counter.Add(name, second)
+	elapsed = time.perf_counter() - start
+	print("per query (us):          %.2f" % (elapsed / numberOfQueries * 1e6))
+
+	errors = []
+	for size in (10, 100, 1000, 10000, 100000):
+		generator = random.Random(size)
+		sketch = HyperLogLog()
+		for i in range(size):
+			sketch.Add(HashName("%x.example.org" % generator.getrandbits(64)))
+		errors.append(abs(sketch.Count() - size) / size)
+		print("distinct %-8d estimate %-8d error %.2f%%" % (size, sketch.Count(), errors[-1] * 100))
+
+	names = ["%d.parent%d.org" % (j, i) for i in range(1000) for j in range(500)]
+	for i in range(1000):
+		ParentDomain(names[i * 500])
+	tracemalloc.start()
+	parents = SubdomainCounter()
+	for name in names:
+		parents.Add(name, 1600000000)
+	traced = tracemalloc.get_traced_memory()[0]
+	tracemalloc.stop()
+	registers = sum(len(sketch.registers) if sketch.registers != None else 0 for buckets in parents.parents.values() for bucketNumber, sketch in buckets)
+	print("register bytes per busy parent: %d" % (registers / len(parents)))
+	print("traced bytes per busy parent:   %d" % (traced / len(parents)))
+
+	busy = SubdomainCounter()
+	for j in range(200):
+		for i in range(BUSY_PARENTS):
+			busy.Add("%d.busy%d.org" % (j, i), 1599999900 + j)
+	start = time.perf_counter()
+	busy.Top(10)
+	first = time.perf_counter() - start
+	for i in range(0, BUSY_PARENTS, 100):
+		busy.Add("new.busy%d.org" % i, 1600000100)
+	start = time.perf_counter()
+	busy.Top(10)
+	print("Top over %d busy parents (ms): %.1f first, %.1f after new children of %d" % (BUSY_PARENTS, first * 1000, (time.perf_counter() - start) * 1000, BUSY_PARENTS // 100))
+
+	half = len(queries) // 2
+	first = SubdomainCounter()
+	second = SubdomainCounter()
+	for when, name in queries[:half]:
+		first.Add(name, when)
+	for when, name in queries[half:]:
+		second.Add(name, when)
+	first.Merge(second)
+	print("same top 10 after merge: %s" % (first.Top(10) == counter.Top(10)))
+
+
+if __name__ == "__main__":
+	main()
@@ -0,0 +1,239 @@
+"""
+Writes deterministic synthetic dnsmasq logs: benign queries to a Zipf
+distributed mix of names, half of them followed by forwarded and reply
+(and optionally cached) noise lines, and dnscat style tunnel bursts of TXT, MX and CNAME queries to
+random hex labels, each burst under a new domain, from TUNNEL_CLIENT.
+The same seed always writes the
+same file.
+
+Usage:
+	python -m benchmark.generator <logs file> [lines] [seed]
+"""
+
+from bisect import bisect
+from datetime import datetime, timedelta
+from itertools import islice
+import random
+import sys
+
+BENIGN_NAMES = 20000
+ZIPF_EXPONENT = 1.1
+QUERIES_PER_SECOND = 200
+NOISE_RATIO = 0.5
+NOISE_LINES = 2
+TUNNEL_EVERY = 15 * 60
+TUNNEL_SECONDS = 120
+TUNNEL_QUERIES_PER_SECOND = 20
+START = datetime(2021, 12, 31, 20, 0, 0)
+TUNNEL_CLIENT = "10.0.0.66"
+
+SUFFIXES = ["com", "com", "com", "net", "org", "io", "de", "co.uk", "com.au", "github.io"]
+HOSTS = ["www", "api", "cdn", "img", "mail", "static", "login", "a.b", "edge.eu", "m"]
+BENIGN_TYPES = ["A", "A", "A", "AAAA", "AAAA", "MX", "TXT", "PTR", "SRV"]
+TUNNEL_TYPES = ["TXT", "TXT", "MX", "CNAME"]
+
+
+def ZipfWeights(size, exponent):
+	"""
+	Returns the cumulative weights of the ranks of a Zipf distribution.
+
+	Parameters
+	----------
+	size : int
+		An integer representing the number of ranks.
+	exponent : float
+		A float representing the exponent of the distribution.
+
+	Returns
+	-------
+	lst
+		A list of cumulative weights, one per rank.
+	"""
+
+	weights = []
+	total = 0.0
+
+	for rank in range(1, size + 1):
+		total += rank ** -exponent
+		weights.append(total)
+
+	return weights
+
+
+class TrafficGenerator:
+	"""
+	A class used to generate the lines of synthetic dnsmasq logs.
+
+	Attributes
+	----------
+	generator : Random
+		A Random instance, seeded, all the randomness comes from.
+	names : lst
+		A list of the benign names, most popular first.
+	weights : lst
+		A list of the cumulative Zipf weights of the names.
+	queriesPerSecond : float
+		A float representing the average rate of benign queries(default is QUERIES_PER_SECOND).
+	noiseRatio : float
+		A float representing the share of benign queries followed by forwarded and reply lines(default is NOISE_RATIO).
+	noiseLines : int
+		An integer representing the number of noise lines after a query, forwarded, reply and cached(default is NOISE_LINES).
+	tunnelEvery : int
+		An integer representing the number of seconds between the starts of tunnel bursts(default is TUNNEL_EVERY).
+	tunnelSeconds : int
+		An integer representing the length of a tunnel burst in seconds(default is TUNNEL_SECONDS).
+	tunnelQueriesPerSecond : float
+		A float representing the rate of tunnel queries during a burst(default is TUNNEL_QUERIES_PER_SECOND).
+	date : datetime
+		The time of the last line generated(default is START).
+
+	Methods
+	-------
+	Lines(numberOfLines)
+		Yields lines of logs.
+	"""
+
+	def __init__(self, seed = 1, benignNames = BENIGN_NAMES, zipfExponent = ZIPF_EXPONENT, queriesPerSecond = QUERIES_PER_SECOND, noiseRatio = NOISE_RATIO, noiseLines = NOISE_LINES,
+		tunnelEvery = TUNNEL_EVERY, tunnelSeconds = TUNNEL_SECONDS, tunnelQueriesPerSecond = TUNNEL_QUERIES_PER_SECOND, start = START):
+		"""
+		Parameters
+		----------
+		seed : int
+			An integer used to seed the random generator(default is 1).
+		benignNames : int
+			An integer representing the number of distinct benign names(default is BENIGN_NAMES).
+		zipfExponent : float
+			A float representing the exponent of the popularity of the benign names(default is ZIPF_EXPONENT).
+		queriesPerSecond : float
+			A float representing the average rate of benign queries(default is QUERIES_PER_SECOND).
+		noiseRatio : float
+			A float representing the share of benign queries followed by forwarded and reply lines(default is NOISE_RATIO).
+		noiseLines : int
+			An integer representing the number of noise lines after a query, 2 or 3(default is NOISE_LINES).
+		tunnelEvery : int
+			An integer representing the number of seconds between the starts of tunnel bursts(default is TUNNEL_EVERY).
+		tunnelSeconds : int
+			An integer representing the length of a tunnel burst in seconds(default is TUNNEL_SECONDS).
+		tunnelQueriesPerSecond : float
+			A float representing the rate of tunnel queries during a burst(default is TUNNEL_QUERIES_PER_SECOND).
+		start : datetime
+			The time of the first line(default is START, a few hours before a year boundary).
+		"""
+
+		self.generator = random.Random(seed)
+		self.names = ["%s.site%d.%s" % (self.generator.choice(HOSTS), rank // 3, self.generator.choice(SUFFIXES)) for rank in range(benignNames)]
+		self.weights = ZipfWeights(benignNames, zipfExponent)
+		self.queriesPerSecond = queriesPerSecond
+		self.noiseRatio = noiseRatio
+		self.noiseLines = noiseLines
+		self.tunnelEvery = tunnelEvery
+		self.tunnelSeconds = tunnelSeconds
+		self.tunnelQueriesPerSecond = tunnelQueriesPerSecond
+		self.date = start
+
+
+	def Lines(self, numberOfLines):
+		"""
+		Yields lines of logs, without their line feeds. Benign queries and
+		tunnel queries are interleaved as independent arrival processes.
+
+		Parameters
+		----------
+		numberOfLines : int
+			An integer representing the number of lines to generate.
+
+		Yields
+		------
+		str
+			A line of logs.
+		"""
+
+		generator = self.generator
+		start = self.date
+		elapsed = 0.0
+		nextTunnel = generator.uniform(0, self.tunnelEvery)
+		stampSecond = None
+		stamp = None
+		pid = 1000 + generator.randrange(9000)
+		written = 0
+		burst = 0
+
+		while written < numberOfLines:
+			inBurst = nextTunnel <= elapsed < nextTunnel + self.tunnelSeconds
+			rate = self.queriesPerSecond + (self.tunnelQueriesPerSecond if inBurst else 0)
+			elapsed += generator.expovariate(rate)
+			if inBurst and generator.random() < self.tunnelQueriesPerSecond / rate:
+				name = "%x.%x.tunnel%d.org" % (generator.getrandbits(128), generator.getrandbits(64), burst)
+				kind = generator.choice(TUNNEL_TYPES)
+				client = TUNNEL_CLIENT
+				noise = False
+			else:
+				name = self.names[bisect(self.weights, generator.random() * self.weights[-1])]
+				kind = generator.choice(BENIGN_TYPES)
+				client = "192.168.1.%d" % generator.randrange(2, 60)
+				noise = generator.random() < self.noiseRatio
+			if elapsed >= nextTunnel + self.tunnelSeconds:
+				nextTunnel += self.tunnelEvery
+				burst += 1
+
+			second = int(elapsed)
+			if second != stampSecond:
+				self.date = start + timedelta(seconds = second)
+				stamp = self.date.strftime("%b ") + ("%2d" % self.date.day) + self.date.strftime(" %H:%M:%S") + " dnsmasq[%d]: " % pid
+				stampSecond = second
+
+			yield stamp + "query[%s] %s from %s" % (kind, name, client)
+			written += 1
+			if noise and written + self.noiseLines - 1 < numberOfLines:
+				yield stamp + "forwarded %s to 8.8.8.8" % name
+				yield stamp + "reply %s is 93.184.%d.%d" % (name, generator.randrange(256), generator.randrange(256))
+				if self.noiseLines > 2:
+					yield stamp + "cached %s is 93.184.%d.%d" % (name, generator.randrange(256), generator.randrange(256))
+				written += self.noiseLines
+
+
+def WriteLog(fileName, numberOfLines, seed = 1, **options):
+	"""
+	Writes a synthetic dnsmasq logs file.
+
+	Parameters
+	----------
+	fileName : str
+		A string representing the logs file name.
+	numberOfLines : int
+		An integer representing the number of lines to write.
+	seed : int
+		An integer used to seed the random generator(default is 1).
+	options : dict
+		Other arguments of TrafficGenerator.
+
+	Returns
+	-------
+	datetime
+		The time of the last line written.
+	"""
+
+	traffic = TrafficGenerator(seed, **options)
+	lines = traffic.Lines(numberOfLines)
+
+	with open(fileName, "w") as fh:
+		while True:
+			block = list(islice(lines, 10000))
+			if not block:
+				break
+			fh.write("\n".join(block) + "\n")
+
+	return traffic.date
+
+
+def main():
+
+	if len(sys.argv) < 2:
+		print("usage: python -m benchmark.generator <logs file> [lines] [seed]")
+		return
+
+	WriteLog(sys.argv[1], int(sys.argv[2]) if len(sys.argv) > 2 else 1000000, int(sys.argv[3]) if len(sys.argv) > 3 else 1)
+
+
+if __name__ == "__main__":
+	main()
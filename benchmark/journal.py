@@ -0,0 +1,95 @@
+"""
+Measures the cost of journaling while parsing a synthetic logs file, and
+the time to resume from the snapshot and journal tail next to parsing the
+file again from offset 0. Exits with status 1 if the resumed database
+differs from the parsed one.
+"""
+
+from datetime import datetime
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+from parse import DATABASE
+import snapshot
+from tail import LogFollower
+
+from benchmark.backfill import WriteSyntheticLog
+from benchmark.snapshot import Windows
+
+
+def NewDatabase():
+	"""
+	Creates a database decoding the synthetic logs, and publishing nowhere.
+	"""
+
+	database = DATABASE()
+	database.timestampDecoder.referenceClock = lambda: datetime(2022, 1, 1)
+	database.publisher.hostsPath = os.devnull
+	database.publisher.reloadCommand = ["true"]
+	database.publisher.wildcardCommand = ["true"]
+
+	return database
+
+
+def ParseFile(database, fileName):
+	"""
+	Parses a logs file from the database's offsetInLogFile attribute and returns the seconds it took.
+	"""
+
+	start = time.perf_counter()
+	follower = LogFollower(fileName, database.offsetInLogFile, chunkSize = 1 << 16, useInotify = False)
+	database.ParseAvailable(follower)
+	follower.Close()
+
+	return time.perf_counter() - start
+
+
+def main():
+
+	numberOfLines = int(sys.argv[1]) if len(sys.argv) > 1 else 500000
+	directory = tempfile.mkdtemp()
+	fileName = os.path.join(directory, "dnsmasq.log")
+	journalDirectory = os.path.join(directory, "state")
+	WriteSyntheticLog(fileName, numberOfLines)
+
+	plain = NewDatabase()
+	plainTime = ParseFile(plain, fileName)
+	plain.publisher.Stop()
+
+	journaled = NewDatabase()
+	journal = snapshot.Resume(journaled, journalDirectory, compactBytes = 1 << 20)
+	journaledTime = ParseFile(journaled, fileName)
+	journaled.publisher.Stop()
+	if journal.compaction != None:
+		journal.compaction.join()
+	journal.Close()
+	stateSize = sum(os.path.getsize(os.path.join(journalDirectory, name)) for name in os.listdir(journalDirectory))
+
+	resumed = NewDatabase()
+	start = time.perf_counter()
+	snapshot.Resume(resumed, journalDirectory)
+	resumeTime = time.perf_counter() - start
+	resumed.publisher.Stop()
+	resumed.journal.Close()
+
+	print("lines:                   %d" % numberOfLines)
+	print("parse (s):               %.3f" % plainTime)
+	print("parse, journaled (s):    %.3f  (%d records, %d fsyncs)" % (journaledTime, journal.records, journal.syncs))
+	print("state on disk (MB):      %.1f" % (stateSize / 1e6))
+	print("resume (s):              %.3f  (offset %d)" % (resumeTime, resumed.offsetInLogFile))
+	same = (resumed.offsetInLogFile == plain.offsetInLogFile and resumed.countForDomains == plain.countForDomains
+		and Windows(resumed) == Windows(plain) and sorted(resumed.GetBlockedList()) == sorted(plain.GetBlockedList()))
+	print("same state:              %s" % same)
+
+	shutil.rmtree(directory)
+
+	if not same:
+		print("the resumed database differs from the parsed one")
+		sys.exit(1)
+
+
+if __name__ == "__main__":
+	main()
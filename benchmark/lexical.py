@@ -0,0 +1,103 @@
+"""
+Checks that the batch LexicalScorer, with and without NumPy, agrees with
+the per-name DATABASE.CountNumberOfUniqueCharacters and
+CountNumberOfDigitsInDomainName checks of ParseIntoLog, and compares the
+names per second of the three. Exits with status 1 if they disagree.
+"""
+
+import random
+import sys
+import time
+
+from lexical import FEATURES, LexicalScorer, numpy
+from parse import DATABASE
+
+
+def Names(numberOfNames, seed = 1):
+	"""
+	Generates synthetic queried names: benign hosts, tunnel-like random
+	labels of various lengths, digit heavy names and a few non ASCII ones.
+
+	Parameters
+	----------
+	numberOfNames : int
+		An integer representing the number of names to generate.
+	seed : int
+		An integer used to seed the random generator(default is 1).
+
+	Returns
+	-------
+	lst
+		A list of domain names.
+	"""
+
+	generator = random.Random(seed)
+	alphabet = "abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789-_"
+	names = ["", "a", "0123456789.com", "xn--bcher-kva.example", "bücher.example"]
+
+	while len(names) < numberOfNames:
+		kind = generator.random()
+		if kind < 0.6:
+			names.append("host%d.example%d.com" % (int(generator.paretovariate(1.0)), generator.randrange(50)))
+		elif kind < 0.9:
+			label = "".join(generator.choice(alphabet) for i in range(generator.randrange(1, 64)))
+			names.append(label + ".tunnel.example.org")
+		elif kind < 0.99:
+			names.append("%d.%d.in-addr.arpa" % (generator.getrandbits(32), generator.randrange(256)))
+		else:
+			names.append("café%d.example" % generator.randrange(100))
+
+	return names
+
+
+def MaxDifference(values, others):
+	"""
+	Returns the largest absolute difference between two lists of numbers.
+	"""
+
+	return max((abs(value - other) for value, other in zip(values, others)), default = 0)
+
+
+def main():
+
+	numberOfNames = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+	names = Names(numberOfNames)
+	database = DATABASE()
+	database.publisher.Stop()
+	scorers = [("python batch", LexicalScorer(useNumpy = False))]
+	if numpy != None:
+		scorers.append(("numpy batch", LexicalScorer(useNumpy = True)))
+	else:
+		print("NumPy is not installed, only the pure Python scorer is checked")
+
+	start = time.perf_counter()
+	expected = [len(name) > 52 or database.CountNumberOfUniqueCharacters(name) > 27 or database.CountNumberOfDigitsInDomainName(name) > 7 for name in names]
+	elapsed = time.perf_counter() - start
+	uniques = [database.CountNumberOfUniqueCharacters(name) for name in names]
+	digits = [database.CountNumberOfDigitsInDomainName(name) for name in names]
+	print("%-14s %12s %10s %10s" % ("", "names/s", "same", "features"))
+	print("%-14s %12.0f %10s %10s" % ("per name", numberOfNames / elapsed, "-", "-"))
+
+	reference = None
+	failed = False
+	for label, scorer in scorers:
+		start = time.perf_counter()
+		suspicious = scorer.Suspicious(names)
+		elapsed = time.perf_counter() - start
+		scores = scorer.Score(names)
+		same = suspicious == expected and scores["uniqueCharacters"] == uniques and scores["digits"] == digits
+		if reference == None:
+			reference = scores
+			agree = "-"
+		else:
+			agree = all(MaxDifference(scores[feature], reference[feature]) < 1e-9 for feature in FEATURES)
+		failed = failed or not same or agree == False
+		print("%-14s %12.0f %10s %10s" % (label, numberOfNames / elapsed, same, agree))
+
+	if failed:
+		print("the batch scorers don't match the per name checks")
+		sys.exit(1)
+
+
+if __name__ == "__main__":
+	main()
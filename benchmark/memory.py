@@ -0,0 +1,151 @@
+"""
+Compares the memory used to keep the 10 minutes windows of synthetic
+queries in a LogStore against the dictionary of lists of LOG instances
+(each with a __dict__, a datetime and its own copy of the domain name)
+that DATABASE used to keep.
+"""
+
+from datetime import timedelta
+import random
+import sys
+import time
+import tracemalloc
+
+from parse import LogStore, WINDOW_SECONDS
+from timeindex import EPOCH
+
+
+class LegacyLOG:
+	"""
+	A LOG instance the way it used to be, with a __dict__.
+	"""
+
+	def __init__(self, date, domain, isSuspiciousDomain = False, count = 1):
+
+		self.date = date
+		self.domain = domain
+		self.isSuspiciousDomain = isSuspiciousDomain
+		self.count = count
+
+
+def GenerateQueries(numberOfQueries, numberOfDomains = 200000, seed = 1):
+	"""
+	Generates synthetic queries: domain numbers drawn from a Zipf-like
+	distribution, one second apart on average.
+
+	Parameters
+	----------
+	numberOfQueries : int
+		An integer representing the number of queries.
+	numberOfDomains : int
+		An integer representing the number of distinct domains(default is 200000).
+	seed : int
+		An integer used to seed the random generator(default is 1).
+
+	Returns
+	-------
+	generator
+		A generator of (domain number, second) tuples.
+	"""
+
+	generator = random.Random(seed)
+
+	for i in range(numberOfQueries):
+		yield min(int(generator.paretovariate(0.8)), numberOfDomains) - 1, 1609459200 + i // 10
+
+
+def BuildLegacy(queries):
+	"""
+	Keeps the windows of the queries the way DATABASE used to.
+	"""
+
+	logs = {}
+	numbers = {}
+
+	for domainNumber, second in queries:
+		domain = "host%d.example.com" % domainNumber
+		number = numbers.get(domain)
+		if number == None:
+			number = numbers[domain] = len(numbers)
+			logs[number] = [LegacyLOG(EPOCH + timedelta(seconds = second), domain)]
+			continue
+		entry = logs[number]
+		date = EPOCH + timedelta(seconds = second)
+		if date - entry[0].date < timedelta(seconds = WINDOW_SECONDS):
+			entry[0].count += 1
+		else:
+			entry.insert(0, LegacyLOG(date, domain))
+
+	return logs, numbers
+
+
+def BuildStore(queries):
+	"""
+	Keeps the windows of the queries in a LogStore.
+	"""
+
+	store = LogStore()
+	numbers = {}
+
+	for domainNumber, second in queries:
+		domain = "host%d.example.com" % domainNumber
+		number = numbers.get(domain)
+		if number == None:
+			number = numbers[domain] = len(numbers)
+			store.AddDomain(number, domain)
+			store.Open(number, second)
+			continue
+		window = store.heads[number]
+		if second - store.starts[window] < WINDOW_SECONDS:
+			store.counts[window] += 1
+		else:
+			store.Open(number, second)
+
+	return store, numbers
+
+
+def Measure(build, numberOfQueries):
+	"""
+	Measures the memory kept by a build function.
+
+	Parameters
+	----------
+	build : function
+		BuildLegacy or BuildStore.
+	numberOfQueries : int
+		An integer representing the number of queries.
+
+	Returns
+	-------
+	tuple
+		The number of bytes kept, the seconds taken and the built result.
+	"""
+
+	tracemalloc.start()
+	start = time.perf_counter()
+	result = build(GenerateQueries(numberOfQueries))
+	elapsed = time.perf_counter() - start
+	size = tracemalloc.get_traced_memory()[0]
+	tracemalloc.stop()
+
+	return size, elapsed, result
+
+
+def main():
+
+	numberOfQueries = int(sys.argv[1]) if len(sys.argv) > 1 else 10000000
+
+	legacySize, legacyTime, (logs, numbers) = Measure(BuildLegacy, numberOfQueries)
+	windows = sum(len(entry) for entry in logs.values())
+	del logs, numbers
+	storeSize, storeTime, result = Measure(BuildStore, numberOfQueries)
+
+	print("queries:            %d" % numberOfQueries)
+	print("windows:            %d" % windows)
+	print("legacy (MB):        %.1f  (%.0f bytes/window)" % (legacySize / 1e6, legacySize / windows))
+	print("LogStore (MB):      %.1f  (%.0f bytes/window)" % (storeSize / 1e6, storeSize / windows))
+	print("reduction:          %.1fx" % (legacySize / storeSize))
+
+
+if __name__ == "__main__":
+	main()
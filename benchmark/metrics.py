@@ -0,0 +1,75 @@
+"""
+Measures the cost of the metrics: a synthetic logs file is parsed with
+ParseAvailable with metrics disabled and enabled, alternately, and the
+median CPU times of the runs are compared. The enabled run is then scraped over HTTP and
+the time a scrape takes is reported.
+"""
+
+import os
+import shutil
+import sys
+import tempfile
+import time
+import urllib.request
+
+import metrics
+
+from benchmark.generator import WriteLog
+from benchmark.journal import NewDatabase
+from benchmark.taillatency import Percentile
+from tail import LogFollower
+
+REPEATS = 7
+
+
+def ParseFile(database, fileName):
+	"""
+	Parses a whole logs file and returns the CPU seconds it took.
+	"""
+
+	start = time.process_time()
+	follower = LogFollower(fileName, chunkSize = 1 << 16, useInotify = False)
+	database.ParseAvailable(follower)
+	follower.Close()
+
+	return time.process_time() - start
+
+
+def main():
+
+	numberOfLines = int(sys.argv[1]) if len(sys.argv) > 1 else 300000
+	directory = tempfile.mkdtemp()
+	fileName = os.path.join(directory, "dnsmasq.log")
+	WriteLog(fileName, numberOfLines)
+
+	times = {False: [], True: []}
+	for repeat in range(REPEATS):
+		for enabled in (False, True):
+			database = NewDatabase()
+			if enabled:
+				database.EnableMetrics()
+			times[enabled].append(ParseFile(database, fileName))
+			database.publisher.Stop()
+
+	disabled = Percentile(times[False], 50)
+	enabled = Percentile(times[True], 50)
+	print("metrics disabled: %8.3f s %12.0f lines/s" % (disabled, numberOfLines / disabled))
+	print("metrics enabled:  %8.3f s %12.0f lines/s" % (enabled, numberOfLines / enabled))
+	print("overhead:         %7.2f%%" % (100.0 * (enabled - disabled) / disabled))
+
+	server = metrics.Serve(database.metrics, port = 0)
+	start = time.perf_counter()
+	with urllib.request.urlopen("http://127.0.0.1:%d/metrics" % server.server_address[1]) as response:
+		body = response.read().decode()
+	print("scrape:           %8.3f s %12d bytes" % (time.perf_counter() - start, len(body)))
+	server.shutdown()
+
+	for line in body.splitlines():
+		if not line.startswith("#") and "_bucket" not in line:
+			print("    " + line)
+
+	shutil.rmtree(directory)
+
+
+if __name__ == "__main__":
+	main()
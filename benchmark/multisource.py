@@ -0,0 +1,120 @@
+"""
+Follows several synthetic logs files at once, like several dnsmasq
+instances whose clocks are skewed by a few seconds, into one database
+through a SourceSet, with the reorder buffer and without it(a capacity of
+0 adds the logs in the order the chunks were read), and compares both
+with a database the logs of all the files were added to in time order:
+the 10 minutes windows of every domain, the query counts and the blocked
+lists. Reports the lines per second, the late and forced logs of the
+buffer, and the throughput, lag and rotations of every source.
+"""
+
+from datetime import timedelta
+import heapq
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+
+from multisource import REORDER_CAPACITY, SourceSet
+from pipeline import IngestPipeline
+from tail import LogFollower
+from timeindex import ToEpoch
+
+from benchmark.generator import START, WriteLog
+from benchmark.journal import NewDatabase
+
+SKEWS = (0, 3, -4)
+
+
+def Windows(database):
+	"""
+	Returns the (start, count) windows of every domain of a database.
+	"""
+
+	return {domain: [(log.date, log.count) for log in database.GetHistoryOfDomain(domain)] for domain in database.numbersOfDomains}
+
+
+def InTimeOrder(fileNames, dateToLook):
+	"""
+	Adds the logs of all the files to a database in time order.
+	"""
+
+	database = NewDatabase()
+	database.dateToLook = dateToLook
+	runs = []
+	for fileName in fileNames:
+		follower = LogFollower(fileName, useInotify = False)
+		logs = []
+		chunk = follower.ReadChunk()
+		while chunk:
+			logs.extend(database.ParseChunk(chunk))
+			chunk = follower.ReadChunk()
+		follower.Close()
+		runs.append(logs)
+	database.AddLogs(list(heapq.merge(*runs, key = lambda log: ToEpoch(log.date))))
+	database.publisher.Stop()
+
+	return database
+
+
+def Follow(fileNames, dateToLook, capacity):
+	"""
+	Follows the files with a SourceSet until all of their lines are read,
+	then terminates, and returns the seconds until the logs held were
+	added too, and the database.
+	"""
+
+	sizes = [os.path.getsize(fileName) for fileName in fileNames]
+	database = NewDatabase()
+	database.dateToLook = dateToLook
+	database.sources = SourceSet(fileNames, database.sourceOffsets, capacity)
+	database.pipeline = IngestPipeline(database, database.sources)
+	thread = threading.Thread(target = database.pipeline.Run, daemon = True)
+
+	start = time.perf_counter()
+	thread.start()
+	while any(source.follower.offset < size for source, size in zip(database.sources.sources, sizes)):
+		time.sleep(0.01)
+	database.Terminate()
+	thread.join()
+	seconds = time.perf_counter() - start
+	database.sources.Close()
+
+	return seconds, database
+
+
+def main():
+
+	numberOfLines = int(sys.argv[1]) if len(sys.argv) > 1 else 300000
+	directory = tempfile.mkdtemp()
+	fileNames = []
+	dateToLook = None
+	for source, skew in enumerate(SKEWS):
+		fileNames.append(os.path.join(directory, "dnsmasq%d.log" % source))
+		last = WriteLog(fileNames[-1], numberOfLines // len(SKEWS), seed = source + 1, start = START + timedelta(seconds = skew))
+		dateToLook = last if dateToLook == None else max(dateToLook, last)
+
+	truth = InTimeOrder(fileNames, dateToLook)
+	windows = Windows(truth)
+	print("%d files, clocks skewed by %s seconds" % (len(fileNames), ", ".join(str(skew) for skew in SKEWS)))
+	print("%-12s %10s %10s %8s %8s %16s %8s %8s" % ("reorder", "seconds", "lines/s", "late", "forced", "windows differ", "counts", "blocked"))
+
+	for label, capacity in (("buffer", REORDER_CAPACITY), ("none", 0)):
+		seconds, database = Follow(fileNames, dateToLook, capacity)
+		counters = database.GetSourceCounters()
+		merged = Windows(database)
+		differ = sum(1 for domain, domainWindows in windows.items() if merged.get(domain) != domainWindows)
+		print("%-12s %10.3f %10.0f %8d %8d %9d of %4d %8s %8s" % (label, seconds, numberOfLines / seconds, counters["reorder"]["late"], counters["reorder"]["forced"],
+			differ, len(windows), database.countForDomains == truth.countForDomains, set(database.GetBlockedList()) == set(truth.GetBlockedList())))
+		for source in counters["sources"]:
+			print("    %s: %d queries, %.0f queries/s, lag %s s, committed %d of %d bytes, %d rotations" % (os.path.basename(source["fileName"]), source["queries"],
+				source["queriesPerSecond"], source["lag"], source["committed"], source["offset"], source["rotations"]))
+
+	shutil.rmtree(directory)
+
+
+if __name__ == "__main__":
+	main()
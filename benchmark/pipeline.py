@@ -0,0 +1,98 @@
+"""
+Measures the ingest pipeline of DATABASE.Parse: the lines per second it
+follows a synthetic logs file at with a fast and a slow(1 second) dnsmasq
+reload, how long Terminate takes to stop it gracefully, and what a
+shedding policy drops when the queues are kept short.
+"""
+
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+
+from pipeline import BLOCK, DROP_NEWEST, IngestPipeline
+from tail import LogFollower
+
+from benchmark.generator import WriteLog
+from benchmark.journal import NewDatabase
+
+
+def Follow(fileName, reloadCommand):
+	"""
+	Follows a logs file with Parse until all of it is added, then terminates.
+
+	Returns
+	-------
+	tuple
+		The seconds until the whole file was added, the seconds Terminate took, and the database.
+	"""
+
+	size = os.path.getsize(fileName)
+	database = NewDatabase()
+	database.publisher.reloadCommand = reloadCommand
+	thread = threading.Thread(target = database.Parse, args = (fileName,), daemon = True)
+
+	start = time.perf_counter()
+	thread.start()
+	while database.offsetInLogFile < size:
+		time.sleep(0.01)
+	ingest = time.perf_counter() - start
+
+	start = time.perf_counter()
+	database.Terminate()
+	thread.join()
+
+	return ingest, time.perf_counter() - start, database
+
+
+def Shed(fileName, policy):
+	"""
+	Runs the pipeline over a logs file with queues of one batch and small
+	reads, stopping it once the file is read, and returns the pipeline.
+	"""
+
+	database = NewDatabase()
+	follower = LogFollower(fileName, chunkSize = 1 << 14, useInotify = False)
+	pipeline = IngestPipeline(database, follower, queueSize = 1, parsePolicy = policy, aggregatePolicy = policy)
+	size = os.path.getsize(fileName)
+
+	def StopWhenRead():
+		while follower.offset < size:
+			time.sleep(0.001)
+		pipeline.Stop()
+
+	threading.Thread(target = StopWhenRead, daemon = True).start()
+	pipeline.Run()
+	database.publisher.Stop()
+	follower.Close()
+
+	return pipeline, database
+
+
+def main():
+
+	numberOfLines = int(sys.argv[1]) if len(sys.argv) > 1 else 300000
+	directory = tempfile.mkdtemp()
+	fileName = os.path.join(directory, "dnsmasq.log")
+	WriteLog(fileName, numberOfLines)
+
+	print("%-14s %10s %12s %10s %10s %12s" % ("reload", "ingest (s)", "lines/s", "stop (s)", "reloads", "coalesced"))
+	for label, command in (("true", ["true"]), ("sleep 1", ["sleep", "1"])):
+		ingest, stop, database = Follow(fileName, command)
+		print("%-14s %10.3f %12.0f %10.3f %10d %12d" % (label, ingest, numberOfLines / ingest, stop, database.publisher.reloads, database.publisher.coalesced))
+
+	print()
+	print("%-14s %10s %10s %10s %14s" % ("policy", "batches", "dropped", "waits", "queries added"))
+	for policy in (BLOCK, DROP_NEWEST):
+		pipeline, database = Shed(fileName, policy)
+		counters = pipeline.Counters()
+		print("%-14s %10d %10d %10d %14d" % (policy, counters["parse"]["batches"], counters["parse"]["dropped"] + counters["aggregate"]["dropped"],
+			counters["parse"]["waits"] + counters["aggregate"]["waits"], sum(database.countForDomains.values())))
+
+	shutil.rmtree(directory)
+
+
+if __name__ == "__main__":
+	main()
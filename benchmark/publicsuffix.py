@@ -0,0 +1,72 @@
+"""
+Measures the registered domain lookup of the bundled public suffix list:
+the time to compile the list, names per second with every name missing
+from the cache and with a realistic, repetitive mix of names, and the
+number of aggregation keys the names fall into.
+"""
+
+import random
+import sys
+import time
+
+from publicsuffix import PublicSuffixList
+
+
+def Names(numberOfNames, seed = 1):
+	"""
+	Generates synthetic queried names under a few hundred organizations,
+	most of them repeated hosts, some of them unique tunnel-like labels.
+
+	Parameters
+	----------
+	numberOfNames : int
+		An integer representing the number of names to generate.
+	seed : int
+		An integer used to seed the random generator(default is 1).
+
+	Returns
+	-------
+	lst
+		A list of domain names.
+	"""
+
+	generator = random.Random(seed)
+	suffixes = ["com", "org", "net", "co.uk", "com.au", "github.io", "s3.amazonaws.com", "kawasaki.jp", "de"]
+	names = []
+
+	for i in range(numberOfNames):
+		organization = "org%d.%s" % (int(generator.paretovariate(1.0)) % 500, generator.choice(suffixes))
+		if generator.random() < 0.05:
+			names.append("%x.t.%s" % (generator.getrandbits(64), organization))
+		else:
+			names.append("%s.%s" % (generator.choice(["www", "api", "cdn.img", "a.b.c"]), organization))
+
+	return names
+
+
+def main():
+
+	numberOfNames = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+	names = Names(numberOfNames)
+
+	start = time.perf_counter()
+	suffixList = PublicSuffixList()
+	print("compile (ms):            %.1f" % ((time.perf_counter() - start) * 1000))
+
+	uncached = PublicSuffixList(cacheSize = 0)
+	uncached.root = suffixList.root
+	start = time.perf_counter()
+	for name in names:
+		uncached.RegisteredDomain(name)
+	print("uncached (names/s):      %.0f" % (numberOfNames / (time.perf_counter() - start)))
+
+	registeredDomain = suffixList.RegisteredDomain
+	start = time.perf_counter()
+	keys = [registeredDomain(name) for name in names]
+	print("cached (names/s):        %.0f" % (numberOfNames / (time.perf_counter() - start)))
+	print("distinct names:          %d" % len(set(names)))
+	print("registered domains:      %d" % len(set(keys)))
+
+
+if __name__ == "__main__":
+	main()
@@ -0,0 +1,63 @@
+"""
+Benchmarks the sliding-window RateDetector: update throughput and
+memory per tracked domain.
+"""
+
+import random
+import sys
+import time
+import tracemalloc
+
+from ratedetector import RateDetector
+
+
+def MeasureMemory(numberOfDomains, queriesPerDomain, spreadSeconds, seed = 1):
+	"""
+	Measures the memory used by a RateDetector tracking a number of domains.
+
+	Parameters
+	----------
+	numberOfDomains : int
+		An integer representing the number of domains tracked.
+	queriesPerDomain : int
+		An integer representing the number of queries of every domain.
+	spreadSeconds : int
+		An integer representing the number of seconds the queries are spread over.
+	seed : int
+		An integer used to seed the random generator(default is 1).
+
+	Returns
+	-------
+	tuple
+		The bytes per tracked domain and the updates per second.
+	"""
+
+	generator = random.Random(seed)
+	domains = ["host%d.example.com" % i for i in range(numberOfDomains)]
+	queries = sorted((generator.randrange(spreadSeconds), domain) for domain in domains for i in range(queriesPerDomain))
+
+	tracemalloc.start()
+	before = tracemalloc.get_traced_memory()[0]
+	detector = RateDetector()
+	start = time.perf_counter()
+	for second, domain in queries:
+		detector.Update(domain, second)
+	elapsed = time.perf_counter() - start
+	after = tracemalloc.get_traced_memory()[0]
+	tracemalloc.stop()
+
+	return (after - before) / max(len(detector), 1), len(queries) / elapsed
+
+
+def main():
+
+	numberOfDomains = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+
+	print("%10s %10s %14s %14s" % ("queries", "spread(s)", "bytes/domain", "updates/s"))
+	for queriesPerDomain, spreadSeconds in [(1, 600), (10, 600), (100, 600), (100, 60)]:
+		perDomain, rate = MeasureMemory(numberOfDomains, queriesPerDomain, spreadSeconds)
+		print("%10d %10d %14.0f %14.0f" % (queriesPerDomain, spreadSeconds, perDomain, rate))
+
+
+if __name__ == "__main__":
+	main()
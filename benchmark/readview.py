@@ -0,0 +1,130 @@
+"""
+Measures the ingest throughput of DATABASE.Parse following a synthetic
+logs file while a reader thread queries the database at 10 Hz like the
+GUI does(the top lists of the time span, the live window and the
+subdomains, the blocked list and the history of the top domain), reading
+the snapshots of the read view, or the live structures with the read view
+disabled, against no reader at all. Reports the reader latency, the age
+of the snapshots read and the reads that failed on a structure changed
+under them, for the fastest of REPEATS runs.
+"""
+
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+
+from benchmark.generator import WriteLog
+from benchmark.journal import NewDatabase
+
+QUERY_RATE = 10
+REPEATS = 2
+
+
+def Query(database):
+	"""
+	Queries the database once the way the GUI does.
+	"""
+
+	database.FindHighestKElements(10)
+	database.FindHighestKElements10Min(10)
+	database.FindHighestKSubdomains(10)
+	top = database.FindLiveHighestKElements(10)
+	database.GetBlockedList()
+	if top:
+		history = database.GetHistoryOfDomain(top[0][1])
+		if history != None:
+			list(history)
+
+
+def Follow(fileName, dateToLook, readers, readView):
+	"""
+	Follows a logs file with Parse until all of it is added, querying it
+	from a reader thread at QUERY_RATE if readers is True, then terminates.
+
+	Returns
+	-------
+	tuple
+		The seconds until the whole file was added, a list of the seconds every
+		query took, a list of the ages of the snapshots read, the number of failed
+		queries and the database.
+	"""
+
+	size = os.path.getsize(fileName)
+	database = NewDatabase()
+	database.dateToLook = dateToLook
+	if not readView:
+		database.readView = None
+	latencies = []
+	ages = []
+	failures = []
+	done = threading.Event()
+
+	def Read():
+		while not done.is_set():
+			start = time.perf_counter()
+			try:
+				Query(database)
+			except Exception as error:
+				failures.append(error)
+			latencies.append(time.perf_counter() - start)
+			if database.readView != None and database.readView.current != None:
+				ages.append(database.readView.current.Age())
+			done.wait(max(0.0, 1.0 / QUERY_RATE - (time.perf_counter() - start)))
+
+	thread = threading.Thread(target = database.Parse, args = (fileName,), daemon = True)
+	reader = threading.Thread(target = Read, daemon = True)
+
+	start = time.perf_counter()
+	thread.start()
+	if readers:
+		reader.start()
+	while database.offsetInLogFile < size:
+		time.sleep(0.01)
+	ingest = time.perf_counter() - start
+
+	done.set()
+	if readers:
+		reader.join()
+	database.Terminate()
+	thread.join()
+
+	return ingest, latencies, ages, failures, database
+
+
+def Percentile(values, fraction):
+
+	if not values:
+		return 0.0
+
+	values = sorted(values)
+
+	return values[min(len(values) - 1, int(fraction * len(values)))]
+
+
+def main():
+
+	numberOfLines = int(sys.argv[1]) if len(sys.argv) > 1 else 600000
+	directory = tempfile.mkdtemp()
+	fileName = os.path.join(directory, "dnsmasq.log")
+	dateToLook = WriteLog(fileName, numberOfLines)
+
+	print("%-22s %10s %10s %8s %12s %12s %10s %9s" % ("readers", "ingest (s)", "lines/s", "queries", "p50 (ms)", "p99 (ms)", "max age", "failures"))
+	for label, readers, readView in (("none", False, True), ("10 Hz, snapshots", True, True), ("10 Hz, live", True, False)):
+		ingest, latencies, ages, failures, database = min((Follow(fileName, dateToLook, readers, readView) for repeat in range(REPEATS)), key = lambda result: result[0])
+		print("%-22s %10.3f %10.0f %8d %12.2f %12.2f %10.3f %9d" % (label, ingest, numberOfLines / ingest, len(latencies),
+			Percentile(latencies, 0.5) * 1000, Percentile(latencies, 0.99) * 1000, max(ages, default = 0.0), len(failures)))
+		for error in failures[:3]:
+			print("    " + repr(error))
+		if readView:
+			counters = database.GetReadViewCounters()
+			print("    snapshots: %d published in %.3f s, reads: %d, waits: %d, stale: %d" % (counters["publishes"], counters["publishSeconds"],
+				counters["reads"], counters["waits"], counters["staleReads"]))
+
+	shutil.rmtree(directory)
+
+
+if __name__ == "__main__":
+	main()
@@ -0,0 +1,328 @@
+"""
+Measures how fast tunnels are blocked. A logs file is replayed into a
+file followed by the live Parse loop, N times faster than real time with
+its inter-arrival gaps preserved, while the blocked list is published
+through fake enforcement commands that only timestamp every call.
+
+The queries of the tunnel clients are grouped into tunnel sessions(one
+registered domain, no gap over SESSION_GAP seconds), and for every
+session the log time and the number of queries until its first block
+and until that block was enforced are reported as percentiles. The
+enforcement happens in real time(the publisher delay, the scripts), so
+the time from a block to its enforcement is added to the log time of the
+block unscaled. Benign names covered by the blocked list at the end are
+reported as false blocks.
+
+Usage:
+	python -m benchmark.replay [speed] [logs file] [tunnel clients]
+
+Without a logs file, an hour of synthetic logs is generated, whose
+tunnel client is benchmark.generator.TUNNEL_CLIENT. Tunnel clients are
+comma separated.
+"""
+
+from contextlib import redirect_stdout
+from datetime import datetime
+import io
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+
+from domainlist import DomainList, WILDCARD_PREFIX
+from parse import TimestampDecoder
+from publicsuffix import RegisteredDomain
+from publisher import BlocklistPublisher
+from timeindex import ToEpoch
+
+from benchmark.generator import TUNNEL_CLIENT, WriteLog
+from benchmark.journal import NewDatabase
+from benchmark.taillatency import Percentile
+
+SPEED = 60
+SESSION_GAP = 60
+SETTLE_SECONDS = 3
+
+# Appends the time of the call and its arguments to a file, in place of an enforcement script.
+FAKE_COMMAND = "import sys, time\nwith open(sys.argv[1], 'a') as fh: fh.write('%.6f %s\\n' % (time.time(), ' '.join(sys.argv[2:])))"
+
+
+def FakeCommand(callsFile, kind):
+	"""
+	Returns a command that records its calls in a file, in place of an enforcement script.
+
+	Parameters
+	----------
+	callsFile : str
+		A string representing the file name the calls are appended to.
+	kind : str
+		A string representing the kind of the command, recorded before its arguments.
+
+	Returns
+	-------
+	lst
+		A list representing the command.
+	"""
+
+	return [sys.executable, "-c", FAKE_COMMAND, callsFile, kind]
+
+
+def ReadQueries(fileName):
+	"""
+	Reads the lines of a logs file with their times.
+
+	Parameters
+	----------
+	fileName : str
+		A string representing a logs file name.
+
+	Returns
+	-------
+	lst
+		A list of (second, line, name, client) tuples, name and client being None for lines other than queries.
+	"""
+
+	decoder = TimestampDecoder(referenceClock = lambda: datetime(2022, 1, 1))
+	queries = []
+
+	with open(fileName, errors = "replace") as fh:
+		for line in fh:
+			tokens = line.split()
+			if len(tokens) < 5:
+				continue
+			second = ToEpoch(decoder.Decode(tokens[0], tokens[1], tokens[2]))
+			if tokens[4].startswith("query[") and len(tokens) >= 8:
+				queries.append((second, line, tokens[5], tokens[7]))
+			else:
+				queries.append((second, line, None, None))
+
+	return queries
+
+
+def Replay(queries, fileName, speed):
+	"""
+	Appends lines to a logs file at speed times their original pace.
+
+	Parameters
+	----------
+	queries : lst
+		A list of (second, line, name, client) tuples, see ReadQueries.
+	fileName : str
+		A string representing the logs file name.
+	speed : float
+		A float representing how many times faster than real time lines are written.
+
+	Returns
+	-------
+	lst
+		A list of the wall clock times(time.time()) every line was written at.
+	"""
+
+	written = []
+	first = queries[0][0]
+	start = time.time()
+
+	with open(fileName, "a") as fh:
+		index = 0
+		while index < len(queries):
+			second = queries[index][0]
+			delay = start + (second - first) / speed - time.time()
+			if delay > 0:
+				time.sleep(delay)
+			block = []
+			while index < len(queries) and queries[index][0] == second:
+				block.append(queries[index][1])
+				index += 1
+			fh.write("".join(block))
+			fh.flush()
+			now = time.time()
+			written.extend([now] * len(block))
+
+	return written
+
+
+def ReadCalls(callsFile):
+	"""
+	Reads the calls recorded by the fake enforcement commands.
+
+	Returns
+	-------
+	lst
+		A list of (time, kind, arguments) tuples, in call order.
+	"""
+
+	if not os.path.exists(callsFile):
+		return []
+
+	calls = []
+	with open(callsFile) as fh:
+		for line in fh:
+			tokens = line.split()
+			calls.append((float(tokens[0]), tokens[1], tokens[2:]))
+
+	return calls
+
+
+def EnforcedAt(entry, blockedAt, calls):
+	"""
+	Returns when a blocked list entry was enforced: the wildcard call of
+	its suffix, or the first reload after it was blocked for a host entry.
+	"""
+
+	if entry.startswith(WILDCARD_PREFIX):
+		suffix = entry[len(WILDCARD_PREFIX):]
+		times = [when for when, kind, arguments in calls if kind == "wildcard" and arguments == [suffix]]
+	else:
+		times = [when for when, kind, arguments in calls if kind == "reload" and when >= blockedAt]
+
+	return min(times) if times else None
+
+
+def Covers(entry, names):
+	"""
+	Checks whether a blocked list entry covers any of a set of names.
+	"""
+
+	if entry.startswith(WILDCARD_PREFIX):
+		suffix = entry[len(WILDCARD_PREFIX):]
+		return any(name == suffix or name.endswith("." + suffix) for name in names)
+
+	return entry in names
+
+
+def Sessions(queries, written, tunnelClients):
+	"""
+	Groups the queries of the tunnel clients into sessions.
+
+	Returns
+	-------
+	lst
+		A list of sessions, every session a list of (second, writtenAt, name) tuples.
+	"""
+
+	current = {}
+	sessions = []
+
+	for (second, line, name, client), writtenAt in zip(queries, written):
+		if name == None or client not in tunnelClients:
+			continue
+		key = RegisteredDomain(name)
+		session = current.get(key)
+		if session == None or second - session[-1][0] > SESSION_GAP:
+			session = current[key] = []
+			sessions.append(session)
+		session.append((second, writtenAt, name))
+
+	return sessions
+
+
+def Measure(session, blocks, calls, speed):
+	"""
+	Measures the log seconds and the queries of a session until its first block and its enforcement.
+
+	Returns
+	-------
+	tuple
+		The seconds and queries until the block, and until its enforcement, None for each that didn't happen.
+	"""
+
+	names = set(name for second, writtenAt, name in session)
+	start = session[0][1]
+	blockedAt = None
+	enforcedAt = None
+
+	for when, entry in blocks:
+		if Covers(entry, names):
+			blockedAt = when
+			enforcedAt = EnforcedAt(entry, when, calls)
+			break
+
+	if blockedAt == None:
+		return (None, None, None, None)
+
+	blockSeconds = max(0.0, (blockedAt - start) * speed)
+	results = [blockSeconds, sum(1 for second, writtenAt, name in session if writtenAt < blockedAt)]
+	if enforcedAt == None:
+		return tuple(results + [None, None])
+
+	enforceSeconds = blockSeconds + max(0.0, enforcedAt - blockedAt)
+	results.append(enforceSeconds)
+	results.append(sum(1 for second, writtenAt, name in session if writtenAt < blockedAt or second - session[0][0] < enforceSeconds))
+
+	return tuple(results)
+
+
+def PrintPercentiles(label, values):
+
+	if not values:
+		print("%-32s %s" % (label, "-"))
+		return
+
+	print("%-32s p50 %8.1f  p90 %8.1f  p99 %8.1f  max %8.1f" % (label, Percentile(values, 50), Percentile(values, 90), Percentile(values, 99), max(values)))
+
+
+def main():
+
+	speed = float(sys.argv[1]) if len(sys.argv) > 1 else SPEED
+	directory = tempfile.mkdtemp()
+	source = sys.argv[2] if len(sys.argv) > 2 else None
+	tunnelClients = set(sys.argv[3].split(",")) if len(sys.argv) > 3 else set([TUNNEL_CLIENT])
+
+	if source == None:
+		source = os.path.join(directory, "source.log")
+		WriteLog(source, 300000, queriesPerSecond = 60, tunnelEvery = 5 * 60)
+	queries = ReadQueries(source)
+
+	fileName = os.path.join(directory, "dnsmasq.log")
+	callsFile = os.path.join(directory, "calls")
+	open(fileName, "w").close()
+	database = NewDatabase()
+	database.publisher.Stop()
+	database.publisher = BlocklistPublisher(os.path.join(directory, "dnsmasq.hosts"), FakeCommand(callsFile, "reload"), FakeCommand(callsFile, "wildcard"))
+	blocks = []
+	addToBlocked = database.blockedList.Add
+
+	def RecordBlock(domain):
+		added = addToBlocked(domain)
+		if added:
+			blocks.append((time.time(), domain))
+		return added
+
+	database.blockedList.Add = RecordBlock
+	output = io.StringIO()
+	with redirect_stdout(output):
+		thread = threading.Thread(target = database.Parse, args = (fileName,), daemon = True)
+		thread.start()
+		time.sleep(0.2)
+		start = time.time()
+		written = Replay(queries, fileName, speed)
+		replayTime = time.time() - start
+		time.sleep(SETTLE_SECONDS)
+		database.Terminate()
+		thread.join(5)
+	calls = ReadCalls(callsFile)
+
+	sessions = Sessions(queries, written, tunnelClients)
+	measures = [Measure(session, blocks, calls, speed) for session in sessions]
+	benign = set(name for second, line, name, client in queries if name != None and client not in tunnelClients)
+	final = DomainList(entry for when, entry in blocks)
+	falseBlocks = [name for name in benign if final.Matches(name)]
+
+	print("lines replayed:                  %d in %.1f s (%.0fx real time)" % (len(queries), replayTime, (queries[-1][0] - queries[0][0]) / replayTime))
+	print("tunnel sessions:                 %d, %d blocked, %d enforced" % (len(sessions), sum(1 for measure in measures if measure[0] != None), sum(1 for measure in measures if measure[2] != None)))
+	PrintPercentiles("seconds to first block:", [measure[0] for measure in measures if measure[0] != None])
+	PrintPercentiles("queries leaked before block:", [measure[1] for measure in measures if measure[1] != None])
+	PrintPercentiles("seconds to enforcement:", [measure[2] for measure in measures if measure[2] != None])
+	PrintPercentiles("queries leaked before enforced:", [measure[3] for measure in measures if measure[3] != None])
+	print("enforcement calls:               %d reloads, %d wildcards" % (sum(1 for call in calls if call[1] == "reload"), sum(1 for call in calls if call[1] == "wildcard")))
+	print("false blocks:                    %d of %d benign names (%.2f%%)" % (len(falseBlocks), len(benign), 100.0 * len(falseBlocks) / max(1, len(benign))))
+	for name in sorted(falseBlocks)[:10]:
+		print("    " + name)
+
+	shutil.rmtree(directory)
+
+
+if __name__ == "__main__":
+	main()
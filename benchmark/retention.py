@@ -0,0 +1,93 @@
+"""
+Feeds days of synthetic queries, a third of them random tunnel-like
+subdomains, into databases with and without a memory budget, and compares
+the memory they hold, their retention counters and their top K answers.
+The traced memory includes the time index, whose tiers keep the counts of
+rolled up and evicted domains until they age out of their ring, which is
+what keeps the long span answers exact.
+"""
+
+from datetime import datetime, timedelta
+import random
+import sys
+import time
+import tracemalloc
+
+from parse import DATABASE, LOG
+from retention import LFU, LRU, Retention
+
+
+def FillDatabase(database, days, queriesPerMinute = 20, seed = 1):
+	"""
+	Fills a database with synthetic queries, 30% of them to unique subdomains.
+
+	Parameters
+	----------
+	database : DATABASE
+		A DATABASE instance to fill.
+	days : int
+		An integer representing the number of days of history to generate.
+	queriesPerMinute : int
+		An integer representing the number of queries per minute(default is 20).
+	seed : int
+		An integer used to seed the random generator(default is 1).
+
+	Returns
+	-------
+	datetime
+		The date of the last query generated.
+	"""
+
+	generator = random.Random(seed)
+	date = datetime(2021, 1, 1)
+
+	for minute in range(days * 24 * 60):
+		date = datetime(2021, 1, 1) + timedelta(minutes = minute)
+		for i in range(queriesPerMinute):
+			if generator.random() < 0.3:
+				domain = "%x.t%d.example.org" % (generator.getrandbits(48), generator.randrange(3))
+			else:
+				domain = "host%d.example.com" % int(generator.paretovariate(1.0))
+			database.AddToDatabase(LOG(date + timedelta(seconds = i), domain))
+
+	return date
+
+
+def main():
+
+	days = int(sys.argv[1]) if len(sys.argv) > 1 else 4
+	budget = int(sys.argv[2]) if len(sys.argv) > 2 else 4000000
+	configurations = [
+		("kept forever", Retention(rollupAge = None)),
+		("rollup only", Retention()),
+		("LRU budget", Retention(memoryBudget = budget, policy = LRU)),
+		("LFU budget", Retention(memoryBudget = budget, policy = LFU))
+	]
+	databases = []
+
+	print("%-14s %10s %10s %10s %9s %9s %9s" % ("", "traced MB", "estim. MB", "domains", "rolled", "evicted", "fill (s)"))
+	for name, retention in configurations:
+		database = DATABASE()
+		database.retention = retention
+		tracemalloc.start()
+		start = time.perf_counter()
+		date = FillDatabase(database, days)
+		elapsed = time.perf_counter() - start
+		traced = tracemalloc.get_traced_memory()[0]
+		tracemalloc.stop()
+		database.publisher.Stop()
+		database.dateToLook = date
+		counters = database.GetRetentionCounters()
+		print("%-14s %10.1f %10.1f %10d %9d %9d %9.2f" % (name, traced / 1e6, counters["estimatedBytes"] / 1e6, len(database.numbersOfDomains), counters["windowsRolledUp"], counters["domainsEvicted"], elapsed))
+		databases.append(database)
+
+	for span in (7, 9, 10):
+		answers = []
+		for database in databases:
+			database.chosenDateSpan = span
+			answers.append(database.FindHighestKElements(10))
+		print("same top 10 over %-8s %s" % (databases[0].GetSpanString() + ":", all(answer == answers[0] for answer in answers)))
+
+
+if __name__ == "__main__":
+	main()
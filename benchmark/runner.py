@@ -0,0 +1,298 @@
+"""
+Runs the throughput benchmarks of the parser on synthetic logs of several
+sizes(see benchmark.generator) and writes the results as JSON, so runs of
+different versions can be compared.
+
+Every size measures:
+	generate         writing the synthetic logs file
+	parse            ParseAvailable over the whole file, as Parse starts
+	backfill         Backfill over the whole file, with a pool of processes
+	tail             following the file while it grows, one block at a time
+	addToDatabase    AddToDatabase alone, over already parsed logs
+	findHighestK     FindHighestKElements over every time span
+	findHighestK10   FindHighestKElements10Min over every time span
+	findLiveHighestK FindLiveHighestKElements
+	snapshotSave     snapshot.Save of the parsed database
+	snapshotLoad     snapshot.Load of that snapshot
+	publish          the BlocklistPublisher writing a blocked list
+
+Usage:
+	python -m benchmark.runner [sizes] [results.json]
+	python -m benchmark.runner compare <old results.json> <new results.json>
+
+Sizes are comma separated, with k/M suffixes(default is 1M), e.g. 1M,10M,100M.
+"""
+
+from datetime import datetime
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+from backfill import Backfill
+from domainlist import DomainList, WILDCARD_PREFIX
+from parse import dates
+from publisher import BlocklistPublisher
+import snapshot
+from tail import LogFollower
+
+from benchmark.generator import WriteLog
+from benchmark.journal import NewDatabase
+
+ADD_SAMPLE = 1000000
+TAIL_BLOCK = 1 << 20
+QUERY_REPEATS = 3
+PUBLISHED_DOMAINS = 100000
+
+
+def ParseSize(text):
+	"""
+	Parses a number of lines such as 500k or 10M.
+	"""
+
+	multipliers = {"k": 1000, "K": 1000, "m": 1000000, "M": 1000000}
+
+	if text[-1] in multipliers:
+		return int(float(text[:-1]) * multipliers[text[-1]])
+
+	return int(text)
+
+
+def Timed(results, stage, lines, function, *arguments):
+	"""
+	Calls a function, records the seconds it took under a stage and returns its result.
+
+	Parameters
+	----------
+	results : lst
+		A list of the results, the new result is appended to it.
+	stage : str
+		A string representing the name of the stage.
+	lines : int
+		An integer representing the number of lines(or operations) the stage handled.
+	function : function
+		The function to call.
+	arguments : tuple
+		The arguments of the function.
+
+	Returns
+	-------
+	object
+		The result of the function.
+	"""
+
+	start = time.perf_counter()
+	value = function(*arguments)
+	seconds = time.perf_counter() - start
+	results.append({"stage": stage, "lines": lines, "seconds": round(seconds, 6), "perSecond": round(lines / seconds, 1) if seconds > 0 else None})
+	print("%-18s %12d %10.3f %14.0f" % (stage, lines, seconds, lines / seconds if seconds > 0 else 0))
+
+	return value
+
+
+def ParseFile(database, fileName):
+	"""
+	Parses a whole logs file with ParseAvailable.
+	"""
+
+	follower = LogFollower(fileName, chunkSize = 1 << 20, useInotify = False)
+	database.ParseAvailable(follower)
+	follower.Close()
+
+
+def FollowGrowingFile(database, fileName, directory):
+	"""
+	Copies a logs file into a new one block by block, parsing the new
+	lines after every block, as the live follow loop does.
+	"""
+
+	growing = os.path.join(directory, "growing.log")
+	open(growing, "w").close()
+	follower = LogFollower(growing, useInotify = False)
+
+	with open(fileName, "rb") as source, open(growing, "ab") as target:
+		while True:
+			block = source.read(TAIL_BLOCK)
+			if not block:
+				break
+			target.write(block)
+			target.flush()
+			database.ParseAvailable(follower)
+
+	follower.Close()
+	os.remove(growing)
+
+
+def AddAll(database, logs):
+	"""
+	Adds already parsed logs to a database.
+	"""
+
+	for log in logs:
+		database.AddToDatabase(log)
+
+
+def QueryAllSpans(database, method):
+	"""
+	Calls a top K method of a database for every time span, QUERY_REPEATS times.
+	"""
+
+	for repeat in range(QUERY_REPEATS):
+		for span in range(len(dates)):
+			database.chosenDateSpan = span
+			method(10)
+
+
+def Publish(directory, numberOfDomains):
+	"""
+	Publishes a blocked list of host entries and a few wildcard entries.
+	"""
+
+	publisher = BlocklistPublisher(os.path.join(directory, "dnsmasq.hosts"), ["true"], ["true"], delay = 0)
+	publisher.Stop()
+	blocked = DomainList("blocked%d.example.com" % i for i in range(numberOfDomains))
+	for i in range(10):
+		blocked.Add(WILDCARD_PREFIX + "tunnel%d.example.org" % i)
+	publisher.pending = blocked
+	publisher.Flush()
+
+
+def Run(numberOfLines, directory):
+	"""
+	Runs every stage on a synthetic logs file of a given size.
+
+	Parameters
+	----------
+	numberOfLines : int
+		An integer representing the number of lines of the logs file.
+	directory : str
+		A string representing a scratch directory.
+
+	Returns
+	-------
+	lst
+		A list of dictionaries, one per stage.
+	"""
+
+	results = []
+	fileName = os.path.join(directory, "dnsmasq.log")
+	lastDate = Timed(results, "generate", numberOfLines, WriteLog, fileName, numberOfLines)
+
+	database = NewDatabase()
+	Timed(results, "parse", numberOfLines, ParseFile, database, fileName)
+	database.publisher.Stop()
+
+	parallel = NewDatabase()
+	Timed(results, "backfill", numberOfLines, Backfill, parallel, fileName)
+	parallel.publisher.Stop()
+	del parallel
+
+	tailed = NewDatabase()
+	Timed(results, "tail", numberOfLines, FollowGrowingFile, tailed, fileName, directory)
+	tailed.publisher.Stop()
+	del tailed
+
+	sample = NewDatabase()
+	follower = LogFollower(fileName, useInotify = False)
+	logs = []
+	lines = follower.ReadLines()
+	while lines and len(logs) < ADD_SAMPLE:
+		logs.extend(sample.ParseLines(lines))
+		lines = follower.ReadLines()
+	follower.Close()
+	Timed(results, "addToDatabase", len(logs), AddAll, sample, logs)
+	sample.publisher.Stop()
+	del sample, logs
+
+	database.dateToLook = lastDate
+	queries = QUERY_REPEATS * len(dates)
+	Timed(results, "findHighestK", queries, QueryAllSpans, database, database.FindHighestKElements)
+	Timed(results, "findHighestK10", queries, QueryAllSpans, database, database.FindHighestKElements10Min)
+	Timed(results, "findLiveHighestK", queries, QueryAllSpans, database, database.FindLiveHighestKElements)
+
+	snapshotName = os.path.join(directory, "state" + snapshot.SNAPSHOT_EXTENSION)
+	Timed(results, "snapshotSave", numberOfLines, snapshot.Save, database, snapshotName, False)
+	del database
+	loaded = NewDatabase()
+	Timed(results, "snapshotLoad", numberOfLines, snapshot.Load, loaded, snapshotName)
+	loaded.publisher.Stop()
+	del loaded
+
+	Timed(results, "publish", PUBLISHED_DOMAINS, Publish, directory, PUBLISHED_DOMAINS)
+
+	for name in os.listdir(directory):
+		os.remove(os.path.join(directory, name))
+
+	return results
+
+
+def Revision():
+	"""
+	Returns the git revision of the working tree, or None if it isn't known.
+	"""
+
+	try:
+		output = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output = True, text = True, cwd = os.path.dirname(os.path.abspath(__file__)))
+	except OSError:
+		return None
+
+	return output.stdout.strip() or None
+
+
+def Compare(oldFileName, newFileName):
+	"""
+	Prints the seconds of every stage of two results files side by side.
+	"""
+
+	runs = []
+	for fileName in (oldFileName, newFileName):
+		with open(fileName) as fh:
+			data = json.load(fh)
+		runs.append({(result["stage"], result["lines"]): result["seconds"] for result in data["results"]})
+		print("%s: revision %s, %s" % (fileName, data["revision"], data["date"]))
+
+	print("%-18s %12s %10s %10s %8s" % ("stage", "lines", "old (s)", "new (s)", "speedup"))
+	for key, seconds in runs[0].items():
+		if key in runs[1]:
+			print("%-18s %12d %10.3f %10.3f %7.2fx" % (key[0], key[1], seconds, runs[1][key], seconds / runs[1][key] if runs[1][key] > 0 else 0))
+
+
+def main():
+
+	if len(sys.argv) > 1 and sys.argv[1] == "compare":
+		if len(sys.argv) < 4:
+			print("usage: python -m benchmark.runner compare <old results.json> <new results.json>")
+			return
+		Compare(sys.argv[2], sys.argv[3])
+		return
+
+	sizes = [ParseSize(size) for size in (sys.argv[1] if len(sys.argv) > 1 else "1M").split(",")]
+	outputName = sys.argv[2] if len(sys.argv) > 2 else "benchmark-results.json"
+	directory = tempfile.mkdtemp()
+	results = []
+
+	print("%-18s %12s %10s %14s" % ("stage", "lines", "seconds", "per second"))
+	try:
+		for size in sizes:
+			results.extend(Run(size, directory))
+	finally:
+		shutil.rmtree(directory)
+
+	with open(outputName, "w") as fh:
+		json.dump({
+			"revision": Revision(),
+			"date": datetime.now().isoformat(timespec = "seconds"),
+			"python": platform.python_version(),
+			"platform": platform.platform(),
+			"cpus": os.cpu_count(),
+			"results": results
+		}, fh, indent = 1)
+	print("results written to " + outputName)
+
+
+if __name__ == "__main__":
+	main()
@@ -0,0 +1,142 @@
+"""
+Compares parsing a logs file line by line(LogFollower.ReadLines and
+DATABASE.ParseLines) with parsing its bytes chunk by chunk(ReadChunk and
+DATABASE.ParseChunk), on synthetic logs where 75% of the lines are not
+queries, checks that both make the same logs, and reports the lines per
+second of reading and tokenizing alone(up to (date, name) queries), of
+the parsing into logs, and of ParseAvailable with AddToDatabase.
+"""
+
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+from scanner import ScanQueries
+from tail import LogFollower
+
+from benchmark.generator import WriteLog
+from benchmark.journal import NewDatabase
+
+REPEATS = 3
+
+
+def TokenizeByLines(database, fileName):
+
+	queries = []
+	follower = LogFollower(fileName, useInotify = False)
+	lines = follower.ReadLines()
+	while lines:
+		for line in lines:
+			query = database.ParseQuery(line)
+			if query != None:
+				queries.append(query)
+		lines = follower.ReadLines()
+	follower.Close()
+
+	return queries
+
+
+def TokenizeByChunks(database, fileName):
+
+	queries = []
+	decoder = database.timestampDecoder
+	follower = LogFollower(fileName, useInotify = False)
+	chunk = follower.ReadChunk()
+	while chunk:
+		for stamp, queryType, name in ScanQueries(chunk, database.queryTypes.types):
+			queries.append((decoder.DecodeStamp(stamp), name.decode("utf-8", "replace"), queryType))
+		chunk = follower.ReadChunk()
+	follower.Close()
+
+	return queries
+
+
+def ParseByLines(database, fileName):
+
+	logs = []
+	follower = LogFollower(fileName, useInotify = False)
+	lines = follower.ReadLines()
+	while lines:
+		logs.extend(database.ParseLines(lines))
+		lines = follower.ReadLines()
+	follower.Close()
+
+	return logs
+
+
+def ParseByChunks(database, fileName):
+
+	logs = []
+	follower = LogFollower(fileName, useInotify = False)
+	chunk = follower.ReadChunk()
+	while chunk:
+		logs.extend(database.ParseChunk(chunk))
+		chunk = follower.ReadChunk()
+	follower.Close()
+
+	return logs
+
+
+def AddByLines(database, fileName):
+
+	follower = LogFollower(fileName, useInotify = False)
+	lines = follower.ReadLines()
+	while lines:
+		database.AddLogs(database.ParseLines(lines))
+		lines = follower.ReadLines()
+	follower.Close()
+
+
+def AddByChunks(database, fileName):
+
+	follower = LogFollower(fileName, useInotify = False)
+	database.ParseAvailable(follower)
+	follower.Close()
+
+
+def Best(function, fileName):
+	"""
+	Returns the fewest seconds of REPEATS calls of a function on a new database, and its last result.
+	"""
+
+	best = None
+	for repeat in range(REPEATS):
+		database = NewDatabase()
+		start = time.perf_counter()
+		result = function(database, fileName)
+		seconds = time.perf_counter() - start
+		database.publisher.Stop()
+		best = seconds if best == None else min(best, seconds)
+
+	return best, result
+
+
+def main():
+
+	numberOfLines = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+	directory = tempfile.mkdtemp()
+	fileName = os.path.join(directory, "dnsmasq.log")
+	WriteLog(fileName, numberOfLines, noiseRatio = 1.0, noiseLines = 3)
+
+	linesTime, byLines = Best(TokenizeByLines, fileName)
+	chunksTime, byChunks = Best(TokenizeByChunks, fileName)
+	print("%-24s %12s %12s %8s" % ("", "by lines/s", "by chunks/s", "speedup"))
+	print("%-24s %12.0f %12.0f %7.2fx" % ("reading and tokenizing", numberOfLines / linesTime, numberOfLines / chunksTime, linesTime / chunksTime))
+
+	linesTime, byLines = Best(ParseByLines, fileName)
+	chunksTime, byChunks = Best(ParseByChunks, fileName)
+	same = [(log.date, log.domain, log.isSuspiciousDomain, log.name) for log in byLines] == [(log.date, log.domain, log.isSuspiciousDomain, log.name) for log in byChunks]
+	print("%-24s %12.0f %12.0f %7.2fx" % ("parsing", numberOfLines / linesTime, numberOfLines / chunksTime, linesTime / chunksTime))
+
+	linesTime, result = Best(AddByLines, fileName)
+	chunksTime, result = Best(AddByChunks, fileName)
+	print("%-24s %12.0f %12.0f %7.2fx" % ("parsing and adding", numberOfLines / linesTime, numberOfLines / chunksTime, linesTime / chunksTime))
+	print("queries: %d of %d lines, same logs: %s" % (len(byChunks), numberOfLines, same))
+
+	shutil.rmtree(directory)
+
+
+if __name__ == "__main__":
+	main()
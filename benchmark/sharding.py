@@ -0,0 +1,127 @@
+"""
+Compares adding a synthetic logs file in a single process(ParseAvailable)
+with ShardedDatabase routing it to 1, 2 and 4 worker processes, checks
+that the top lists of the time span and the blocked lists are the same,
+and reports the lines per second, those of the reader routing the lines
+alone, which is the ceiling of the sharded mode, and the lines, batches
+and waits for room of every shard. The speedup is bounded by the number
+of CPUs, printed first. Exits with status 1 if a sharded database answers
+differently from the single process.
+"""
+
+from datetime import datetime
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+
+from sharding import RouteChunk, ShardedDatabase
+from tail import LogFollower
+
+from benchmark.generator import WriteLog
+from benchmark.journal import NewDatabase
+
+SHARDS = (1, 2, 4)
+TOP_K = 20
+
+
+def SetClock(database):
+	"""
+	Makes the database of a worker decode the synthetic logs, like NewDatabase.
+	"""
+
+	database.timestampDecoder.referenceClock = lambda: datetime(2022, 1, 1)
+
+
+def Single(fileName, dateToLook):
+
+	database = NewDatabase()
+	database.dateToLook = dateToLook
+	start = time.perf_counter()
+	follower = LogFollower(fileName, useInotify = False)
+	database.ParseAvailable(follower)
+	follower.Close()
+	seconds = time.perf_counter() - start
+	top = database.FindHighestKElements(TOP_K)
+	database.publisher.Stop()
+
+	return seconds, top, set(database.GetBlockedList())
+
+
+def Route(fileName, shards):
+	"""
+	Returns the seconds the reader takes to read and route the query lines of a logs file.
+	"""
+
+	database = NewDatabase()
+	routes = {}
+	start = time.perf_counter()
+	follower = LogFollower(fileName, useInotify = False)
+	chunk = follower.ReadChunk()
+	while chunk:
+		RouteChunk(chunk, database.queryTypes.types, routes, shards)
+		chunk = follower.ReadChunk()
+	follower.Close()
+	database.publisher.Stop()
+
+	return time.perf_counter() - start
+
+
+def Sharded(fileName, dateToLook, shards):
+
+	size = os.path.getsize(fileName)
+	database = ShardedDatabase(shards, SetClock)
+	database.publisher.hostsPath = os.devnull
+	database.publisher.reloadCommand = ["true"]
+	database.publisher.wildcardCommand = ["true"]
+	database.dateToLook = dateToLook
+	thread = threading.Thread(target = database.Parse, args = (fileName,), daemon = True)
+
+	start = time.perf_counter()
+	thread.start()
+	while database.offsetInLogFile < size:
+		time.sleep(0.01)
+	database.shardPool.Synchronize()
+	seconds = time.perf_counter() - start
+
+	top = database.FindHighestKElements(TOP_K)
+	database.Terminate()
+	thread.join()
+
+	return seconds, top, set(database.GetBlockedList()), database.GetShardCounters()
+
+
+def main():
+
+	numberOfLines = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+	directory = tempfile.mkdtemp()
+	fileName = os.path.join(directory, "dnsmasq.log")
+	dateToLook = WriteLog(fileName, numberOfLines)
+	print("CPUs: %d" % os.cpu_count())
+
+	seconds, top, blocked = Single(fileName, dateToLook)
+	print("%-16s %10s %10s %12s %6s %8s" % ("mode", "seconds", "lines/s", "routing/s", "same", "blocked"))
+	print("%-16s %10.3f %10.0f %12s %6s %8d" % ("single process", seconds, numberOfLines / seconds, "", "", len(blocked)))
+
+	identical = True
+	for shards in SHARDS:
+		shardedSeconds, shardedTop, shardedBlocked, counters = Sharded(fileName, dateToLook, shards)
+		routing = Route(fileName, shards)
+		same = shardedTop == top and shardedBlocked == blocked
+		identical = identical and same
+		print("%-16s %10.3f %10.0f %12.0f %6s %8d" % ("%d shards" % shards, shardedSeconds, numberOfLines / shardedSeconds, numberOfLines / routing,
+			same, len(shardedBlocked)))
+		for shard, counter in enumerate(counters):
+			print("    shard %d: %d lines, %d batches, %d waits for room" % (shard, counter["lines"], counter["batches"], counter["waits"]))
+
+	shutil.rmtree(directory)
+
+	if not identical:
+		print("the sharded databases differ from the single process")
+		sys.exit(1)
+
+
+if __name__ == "__main__":
+	main()
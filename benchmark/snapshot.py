@@ -0,0 +1,109 @@
+"""
+Compares saving and restoring a database through the JSON round-trip
+(MyEncoder / MyConverter) and through a binary snapshot, and measures
+how long the parser is held up while a background snapshot is taken.
+Exits with status 1 if the restored snapshot differs from the database.
+"""
+
+import json
+import os
+import sys
+import tempfile
+import time
+
+from parse import DATABASE, MyEncoder
+import snapshot
+
+from benchmark.topk import FillDatabase
+
+
+def Timed(function, *args):
+	"""
+	Calls a function and returns the seconds it took, along with its result.
+	"""
+
+	start = time.perf_counter()
+	result = function(*args)
+
+	return time.perf_counter() - start, result
+
+
+def SaveJson(database, fileName):
+
+	with open(fileName, "w") as fh:
+		json.dump(database.__dict__, fh, cls = MyEncoder)
+
+
+def LoadJson(database, fileName):
+
+	with open(fileName) as fh:
+		database.MyConverter(json.load(fh))
+
+
+def Windows(database):
+	"""
+	Returns the (start, count, isSuspiciousDomain) windows of every domain of a database.
+	"""
+
+	return {domain: [(log.date, log.count, log.isSuspiciousDomain) for log in database.logs[number]] for domain, number in database.numbersOfDomains.items()}
+
+
+def Same(database, restored):
+	"""
+	Returns whether a restored database holds the same windows, counts,
+	lists and offset as a database.
+	"""
+
+	return (Windows(database) == Windows(restored) and database.countForDomains == restored.countForDomains
+		and database.numberOfLogs == restored.numberOfLogs and database.offsetInLogFile == restored.offsetInLogFile
+		and sorted(database.GetBlockedList()) == sorted(restored.GetBlockedList())
+		and sorted(database.approvedList.ToList()) == sorted(restored.approvedList.ToList()))
+
+
+def main():
+
+	days = int(sys.argv[1]) if len(sys.argv) > 1 else 7
+
+	database = DATABASE()
+	date = FillDatabase(database, days, queriesPerMinute = 60, numberOfDomains = 20000)
+	database.publisher.Stop()
+	database.dateToLook = date
+
+	directory = tempfile.mkdtemp()
+	jsonPath = os.path.join(directory, "database.json")
+	snapshotPath = os.path.join(directory, "database" + snapshot.SNAPSHOT_EXTENSION)
+
+	jsonSave, result = Timed(SaveJson, database, jsonPath)
+	restoredJson = DATABASE()
+	jsonLoad, result = Timed(LoadJson, restoredJson, jsonPath)
+
+	capture, thread = Timed(snapshot.Save, database, snapshotPath)
+	write, result = Timed(thread.join)
+	restoredSnapshot = DATABASE()
+	snapshotLoad, result = Timed(snapshot.Load, restoredSnapshot, snapshotPath)
+	restoredSnapshot.dateToLook = date
+	firstQuery, expected = Timed(restoredSnapshot.FindHighestKElements, 10)
+
+	print("windows:                 %d" % len(database.logs.starts))
+	print("JSON size (MB):          %.1f" % (os.path.getsize(jsonPath) / 1e6))
+	print("snapshot size (MB):      %.1f" % (os.path.getsize(snapshotPath) / 1e6))
+	print("JSON save (s):           %.3f" % jsonSave)
+	print("JSON load (s):           %.3f" % jsonLoad)
+	print("snapshot pause (s):      %.3f" % capture)
+	print("snapshot write (s):      %.3f  (background)" % write)
+	print("snapshot load (s):       %.3f" % snapshotLoad)
+	print("first query (s):         %.3f  (loads its buckets)" % firstQuery)
+	same = expected == database.FindHighestKElements(10) and Same(database, restoredSnapshot)
+	print("same top 10 and windows: %s" % same)
+
+	for fileName in (jsonPath, snapshotPath):
+		os.remove(fileName)
+	os.rmdir(directory)
+
+	if not same:
+		print("the restored snapshot differs from the database")
+		sys.exit(1)
+
+
+if __name__ == "__main__":
+	main()
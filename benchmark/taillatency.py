@@ -0,0 +1,90 @@
+"""
+Measures the latency from writing a line to the logs file until the
+following Parse loop adds it to the database, and checks that a rotation
+of the file in the middle of the run loses and repeats no lines.
+"""
+
+from datetime import datetime
+import os
+import sys
+import tempfile
+import threading
+import time
+
+from parse import DATABASE
+
+
+def Percentile(values, percent):
+	"""
+	Returns a percentile of a list of values.
+
+	Parameters
+	----------
+	values : lst
+		A list of numbers.
+	percent : float
+		A float between 0 and 100.
+
+	Returns
+	-------
+	float
+		The value at the given percentile.
+	"""
+
+	ordered = sorted(values)
+
+	return ordered[min(len(ordered) - 1, int(len(ordered) * percent / 100))]
+
+
+def main():
+
+	numberOfProbes = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+	directory = tempfile.mkdtemp()
+	fileName = os.path.join(directory, "dnsmasq.log")
+	open(fileName, "w").close()
+
+	database = DATABASE()
+	arrivals = {}
+	addToDatabase = database.AddToDatabase
+
+	def Record(log):
+		arrivals.setdefault(log.domain, []).append(time.perf_counter())
+		addToDatabase(log)
+
+	database.AddToDatabase = Record
+	thread = threading.Thread(target = database.Parse, args = (fileName,), daemon = True)
+	thread.start()
+	time.sleep(0.2)
+
+	writes = {}
+	logFile = open(fileName, "a")
+	for i in range(numberOfProbes):
+		if i == numberOfProbes // 2:
+			logFile.close()
+			os.rename(fileName, fileName + ".1")
+			logFile = open(fileName, "a")
+		domain = "probe%d.example.com" % i
+		line = datetime.now().strftime("%b %d %H:%M:%S") + " dnsmasq[1]: query[A] %s from 10.0.0.1\n" % domain
+		writes[domain] = time.perf_counter()
+		logFile.write(line)
+		logFile.flush()
+		time.sleep(0.005)
+	logFile.close()
+	time.sleep(0.5)
+	database.Terminate()
+
+	latencies = [(arrivals[domain][0] - written) * 1000 for domain, written in writes.items() if domain in arrivals]
+	missing = [domain for domain in writes if domain not in arrivals]
+	repeated = [domain for domain, times in arrivals.items() if len(times) > 1]
+
+	print("probes:     %d" % numberOfProbes)
+	print("missing:    %d" % len(missing))
+	print("repeated:   %d" % len(repeated))
+	if latencies:
+		print("p50 (ms):   %.2f" % Percentile(latencies, 50))
+		print("p99 (ms):   %.2f" % Percentile(latencies, 99))
+		print("max (ms):   %.2f" % max(latencies))
+
+
+if __name__ == "__main__":
+	main()
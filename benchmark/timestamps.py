@@ -0,0 +1,144 @@
+"""
+Benchmarks decoding of dnsmasq timestamps, comparing the original
+glue-and-strptime path against TimestampDecoder. The years inferred
+across New Year, with and without a gap in the logs, are checked
+first, and the benchmark exits with status 1 if any is wrong.
+"""
+
+from datetime import datetime, timedelta
+import sys
+import time
+
+from parse import FMT, TimestampDecoder
+
+
+def GenerateTimestampTokens(numberOfLines, linesPerSecond = 200):
+	"""
+	Generates the three timestamp tokens of synthetic log lines.
+
+	Parameters
+	----------
+	numberOfLines : int
+		An integer representing the number of lines to generate.
+	linesPerSecond : int
+		An integer representing how many consecutive lines share the same second(default is 200).
+
+	Returns
+	-------
+	lst
+		A list of (month, day, clock) tuples.
+	"""
+
+	start = datetime(2021, 12, 31, 23, 50, 0)
+	tokens = []
+
+	for i in range(numberOfLines):
+		date = start + timedelta(seconds = i // linesPerSecond)
+		tokens.append((date.strftime("%b"), str(date.day), date.strftime("%H:%M:%S")))
+
+	return tokens
+
+
+def LegacyDecode(tokensList):
+	"""
+	Decodes a timestamp the way the parser used to.
+
+	Parameters
+	----------
+	tokensList : tuple
+		A (month, day, clock) tuple.
+
+	Returns
+	-------
+	datetime
+		The decoded timestamp.
+	"""
+
+	if len(tokensList[1]) < 2:
+		date = tokensList[0] + " 0" + tokensList[1] + " " + tokensList[2]
+	else:
+		date = tokensList[0] + " " + tokensList[1] + " " + tokensList[2]
+
+	return datetime.strptime("2021 " + date, FMT)
+
+
+# Sequences of timestamps decoded in order with a reference clock in 2021, and the years expected for them.
+ROLLOVER_CASES = [
+	(["Dec 31 23:59:59", "Jan  1 00:00:00"], [2021, 2022]),
+	(["Nov 28 10:00:00", "Feb  3 09:00:00", "Feb  3 09:00:01"], [2021, 2022, 2022]),
+	(["Dec 31 23:59:59", "Jan  1 00:00:01", "Dec 31 23:59:58", "Jan  1 00:00:02"], [2021, 2022, 2021, 2022]),
+	(["Oct 31 23:59:59", "Sep 30 23:59:59", "Nov  1 00:00:00"], [2021, 2021, 2021]),
+	(["Mar  1 00:00:00", "Jun  1 00:00:00", "Jan  1 00:00:00"], [2021, 2021, 2022]),
+]
+
+
+def CheckRollover():
+	"""
+	Decodes every sequence of ROLLOVER_CASES with a new TimestampDecoder,
+	through DecodeString and DecodeStamp, and prints the wrong years.
+
+	Returns
+	-------
+	int
+		The number of timestamps whose year is wrong.
+	"""
+
+	mismatches = 0
+
+	for dates, years in ROLLOVER_CASES:
+		stringDecoder = TimestampDecoder(referenceClock = lambda: datetime(2021, 12, 31))
+		stampDecoder = TimestampDecoder(referenceClock = lambda: datetime(2021, 12, 31))
+		for date, year in zip(dates, years):
+			decoded = (stringDecoder.DecodeString(date).year, stampDecoder.DecodeStamp(date.encode() + b" dnsmasq[1]").year)
+			if decoded != (year, year):
+				print("wrong year for %s after %s: %s, expected %d" % (date, dates[:dates.index(date)], decoded, year))
+				mismatches += 1
+
+	return mismatches
+
+
+def Measure(function, tokens):
+	"""
+	Measures how many timestamps per second function decodes.
+
+	Parameters
+	----------
+	function : function
+		A function receiving a (month, day, clock) tuple.
+	tokens : lst
+		A list of (month, day, clock) tuples.
+
+	Returns
+	-------
+	float
+		The number of lines per second.
+	"""
+
+	start = time.perf_counter()
+	for tokensList in tokens:
+		function(tokensList)
+
+	return len(tokens) / (time.perf_counter() - start)
+
+
+def main():
+
+	numberOfLines = int(sys.argv[1]) if len(sys.argv) > 1 else 500000
+
+	if CheckRollover():
+		sys.exit(1)
+
+	tokens = GenerateTimestampTokens(numberOfLines)
+	decoder = TimestampDecoder(referenceClock = lambda: datetime(2021, 12, 31))
+
+	before = Measure(LegacyDecode, tokens)
+	after = Measure(lambda tokensList: decoder.Decode(*tokensList), tokens)
+
+	print("lines:          %d" % numberOfLines)
+	print("before (lines/s): %.0f" % before)
+	print("after  (lines/s): %.0f" % after)
+	print("speedup:        %.1fx" % (after / before))
+
+
+if __name__ == "__main__":
+	main()
@@ -0,0 +1,124 @@
+"""
+Benchmarks FindHighestKElements, FindHighestKElements10Min and
+FindLiveHighestKElements as history grows, next to the full scan of the logs they used to do.
+"""
+
+from datetime import datetime, timedelta
+import heapq
+import random
+import sys
+import time
+
+from parse import DATABASE, LOG
+
+
+def FillDatabase(database, days, queriesPerMinute = 20, numberOfDomains = 2000, seed = 1):
+	"""
+	Fills a database with synthetic benign queries.
+
+	Parameters
+	----------
+	database : DATABASE
+		A DATABASE instance to fill.
+	days : int
+		An integer representing the number of days of history to generate.
+	queriesPerMinute : int
+		An integer representing the number of queries per minute(default is 20).
+	numberOfDomains : int
+		An integer representing the number of distinct domains(default is 2000).
+	seed : int
+		An integer used to seed the random generator(default is 1).
+
+	Returns
+	-------
+	datetime
+		The date of the last query generated.
+	"""
+
+	generator = random.Random(seed)
+	date = datetime(2021, 1, 1)
+
+	for minute in range(days * 24 * 60):
+		date = datetime(2021, 1, 1) + timedelta(minutes = minute)
+		for i in range(queriesPerMinute):
+			domain = "host%d.example.com" % generator.randrange(numberOfDomains)
+			database.AddToDatabase(LOG(date + timedelta(seconds = i), domain))
+
+	return date
+
+
+def ScanHighestKElements(database, k):
+	"""
+	Finds the highest k domains by scanning every log, the way
+	FindHighestKElements used to.
+
+	Parameters
+	----------
+	database : DATABASE
+		A DATABASE instance.
+	k : int
+		An integer representing the number of highest elements to be found.
+
+	Returns
+	-------
+	lst
+		A list of (count, domain) tuples.
+	"""
+
+	heap = []
+
+	for loglist in database.logs.values():
+		count = 0
+		for log in loglist:
+			if abs(database.dateToLook - log.date) < database.GetSpanTime():
+				count += log.count
+		if count > 0:
+			heapq.heappush(heap, (count, loglist[0].domain))
+
+	return heapq.nlargest(k, heap)
+
+
+def MeasureQuery(function, repeat = 20):
+	"""
+	Measures the average latency of a query.
+
+	Parameters
+	----------
+	function : function
+		A function taking no parameters.
+	repeat : int
+		An integer representing the number of repetitions(default is 20).
+
+	Returns
+	-------
+	float
+		The average latency in milliseconds.
+	"""
+
+	start = time.perf_counter()
+	for i in range(repeat):
+		function()
+
+	return (time.perf_counter() - start) * 1000 / repeat
+
+
+def main():
+
+	maxDays = int(sys.argv[1]) if len(sys.argv) > 1 else 8
+
+	print("%6s %10s %12s %12s %12s %12s" % ("days", "windows", "scan(ms)", "index(ms)", "10min(ms)", "live(ms)"))
+	days = 1
+	while days <= maxDays:
+		database = DATABASE()
+		database.dateToLook = FillDatabase(database, days)
+		windows = sum(len(loglist) for loglist in database.logs.values())
+		scan = MeasureQuery(lambda: ScanHighestKElements(database, 10), 5)
+		index = MeasureQuery(lambda: database.FindHighestKElements(10))
+		tenMinutes = MeasureQuery(lambda: database.FindHighestKElements10Min(10))
+		live = MeasureQuery(lambda: database.FindLiveHighestKElements(10))
+		print("%6d %10d %12.2f %12.2f %12.2f %12.3f" % (days, windows, scan, index, tenMinutes, live))
+		days *= 2
+
+
+if __name__ == "__main__":
+	main()
@@ -0,0 +1,69 @@
+"""
+Parses the same synthetic logs file with and without the verdict cache,
+and reports lines per second of the parsing stage alone(DATABASE.ParseLines)
+and of the whole ParseAvailable, the hit rate of the cache and whether
+the resulting databases are identical.
+"""
+
+import os
+import sys
+import tempfile
+import time
+
+from lexical import LexicalScorer, numpy
+from parse import DATABASE
+from tail import LogFollower
+from verdictcache import VERDICT_CACHE_SIZE, VerdictCache
+
+from benchmark.backfill import Summary, WriteSyntheticLog
+
+
+def main():
+
+	numberOfLines = int(sys.argv[1]) if len(sys.argv) > 1 else 400000
+	fileName = os.path.join(tempfile.mkdtemp(), "dnsmasq.log")
+	WriteSyntheticLog(fileName, numberOfLines)
+	follower = LogFollower(fileName, useInotify = False)
+	batches = []
+	lines = follower.ReadLines()
+	while lines:
+		batches.append(lines)
+		lines = follower.ReadLines()
+	follower.Close()
+	summaries = []
+
+	configurations = [(False, size) for size in (0, 1024, VERDICT_CACHE_SIZE)]
+	if numpy != None:
+		configurations += [(True, size) for size in (0, 1024, VERDICT_CACHE_SIZE)]
+
+	print("%-6s %-12s %14s %14s %10s %10s" % ("numpy", "cache size", "parse lines/s", "total lines/s", "hit rate", "identical"))
+	for useNumpy, size in configurations:
+		database = DATABASE()
+		database.UpdateFileBlocked = lambda: None
+		database.lexicalScorer = LexicalScorer(useNumpy = useNumpy)
+		database.verdictCache = VerdictCache(size)
+		start = time.perf_counter()
+		for lines in batches:
+			database.ParseLines(lines)
+		parseTime = time.perf_counter() - start
+		counters = database.GetVerdictCounters()
+		database.publisher.Stop()
+
+		database = DATABASE()
+		database.UpdateFileBlocked = lambda: None
+		database.lexicalScorer = LexicalScorer(useNumpy = useNumpy)
+		database.verdictCache = VerdictCache(size)
+		start = time.perf_counter()
+		follower = LogFollower(fileName, useInotify = False)
+		database.ParseAvailable(follower)
+		follower.Close()
+		totalTime = time.perf_counter() - start
+		database.publisher.Stop()
+		summaries.append(Summary(database))
+		print("%-6s %-12d %14.0f %14.0f %9.1f%% %10s" % (useNumpy, size, numberOfLines / parseTime, numberOfLines / totalTime, counters["hitRate"] * 100, summaries[-1] == summaries[0]))
+
+	os.remove(fileName)
+
+
+if __name__ == "__main__":
+	main()
@@ -0,0 +1,488 @@
+from collections import deque
+import hashlib
+import math
+
+from publicsuffix import RegisteredDomain
+
+PRECISION = 10
+SPARSE_LIMIT = 16
+HASH_BITS = 64
+# The value 2 ** -rank of every register rank, summed by the estimate.
+POWERS = [2.0 ** -rank for rank in range(HASH_BITS + 1)]
+
+WINDOW_SECONDS = 10 * 60
+BUCKET_SECONDS = 5 * 60
+SUBDOMAIN_THRESHOLD = 200
+CHECK_SECONDS = 10
+
+
+def HashName(name):
+	"""
+	Hashes a name into 64 bits. Unlike hash(), the result is the same in
+	every process, so sketches built by different processes can be merged.
+
+	Parameters
+	----------
+	name : str
+		A string representing a domain name.
+
+	Returns
+	-------
+	int
+		An integer representing the hash.
+	"""
+
+	return int.from_bytes(hashlib.blake2b(name.encode("utf-8", "replace"), digest_size = 8).digest(), "little")
+
+
+def ParentDomain(name):
+	"""
+	Returns the parent a name's distinct children are counted under: its
+	registered domain, according to the public suffix list.
+
+	Parameters
+	----------
+	name : str
+		A string representing a domain name.
+
+	Returns
+	-------
+	str
+		A string representing the parent domain name.
+	"""
+
+	return RegisteredDomain(name)
+
+
+class HyperLogLog:
+	"""
+	A class used to estimate the number of distinct hashes added to it,
+	in 2 ** precision bytes. Small sets are kept exactly as a set of hashes
+	until they grow over SPARSE_LIMIT, then as one register per bucket of
+	hashes, holding the highest rank(leading zeros plus one) seen in it.
+	Two sketches of the same precision merge by taking the register maxima,
+	so sketches of shards or time buckets can be combined.
+
+	Attributes
+	----------
+	precision : int
+		An integer representing the number of hash bits choosing a register(default is PRECISION).
+	sparse : set
+		A set of the hashes added, or None once the registers are used.
+	registers : bytearray
+		A bytearray of 2 ** precision registers, or None while sparse.
+
+	Methods
+	-------
+	Add(hashed)
+		Adds a hash.
+	Merge(other)
+		Adds the hashes of another sketch.
+	Count()
+		Returns the estimated number of distinct hashes added.
+	"""
+
+	__slots__ = ("precision", "sparse", "registers")
+
+	def __init__(self, precision = PRECISION):
+		"""
+		Parameters
+		----------
+		precision : int
+			An integer representing the number of hash bits choosing a register(default is PRECISION).
+		"""
+
+		self.precision = precision
+		self.sparse = set()
+		self.registers = None
+
+
+	def Add(self, hashed):
+		"""
+		Adds a hash.
+
+		Parameters
+		----------
+		hashed : int
+			An integer representing a 64 bits hash.
+
+		Returns
+		-------
+		bool
+			True if the estimate may have changed.
+		"""
+
+		if self.sparse != None:
+			if hashed in self.sparse:
+				return False
+			self.sparse.add(hashed)
+			if len(self.sparse) > SPARSE_LIMIT:
+				self.Densify()
+			return True
+
+		bits = HASH_BITS - self.precision
+		index = hashed >> bits
+		rank = bits - (hashed & ((1 << bits) - 1)).bit_length() + 1
+
+		if rank > self.registers[index]:
+			self.registers[index] = rank
+			return True
+
+		return False
+
+
+	def Densify(self):
+		"""
+		Moves the sparse hashes into registers.
+		"""
+
+		hashes = self.sparse
+		self.sparse = None
+		self.registers = bytearray(1 << self.precision)
+		for hashed in hashes:
+			self.Add(hashed)
+
+
+	def Merge(self, other):
+		"""
+		Adds the hashes of another sketch of the same precision.
+
+		Parameters
+		----------
+		other : HyperLogLog
+			A HyperLogLog instance.
+		"""
+
+		if other.precision != self.precision:
+			raise ValueError("sketches of different precisions can't be merged")
+
+		if other.sparse != None:
+			for hashed in other.sparse:
+				self.Add(hashed)
+			return
+
+		if self.sparse != None:
+			if not self.sparse:
+				self.sparse = None
+				self.registers = bytearray(other.registers)
+				return
+			self.Densify()
+		self.registers = bytearray(map(max, self.registers, other.registers))
+
+
+	def Count(self):
+		"""
+		Returns the estimated number of distinct hashes added, exact while
+		the sketch is sparse, with a standard error of about 1.04 / sqrt(2 ** precision) after.
+
+		Returns
+		-------
+		int
+			An integer representing the estimate.
+		"""
+
+		if self.sparse != None:
+			return len(self.sparse)
+
+		m = len(self.registers)
+		alpha = 0.7213 / (1 + 1.079 / m)
+		estimate = alpha * m * m / sum(map(POWERS.__getitem__, self.registers))
+		zeros = self.registers.count(0)
+
+		if estimate <= 2.5 * m and zeros > 0:
+			estimate = m * math.log(m / zeros)
+
+		return int(round(estimate))
+
+
+class SubdomainCounter:
+	"""
+	A class used to estimate the number of distinct names queried under
+	every parent domain in a sliding time window. Every parent keeps one
+	HyperLogLog sketch per BUCKET_SECONDS bucket still overlapping the
+	window, so its memory is bounded by a few sketches of 2 ** precision
+	bytes, and the window is estimated by merging them(it may reach up to
+	one bucket further back than the window). Idle parents are swept once
+	per window.
+
+	Attributes
+	----------
+	window : int
+		An integer representing the length of the window in seconds(default is WINDOW_SECONDS).
+	bucketWidth : int
+		An integer representing the width of a bucket in seconds(default is BUCKET_SECONDS).
+	precision : int
+		An integer representing the precision of the sketches(default is PRECISION).
+	threshold : int
+		An integer representing the number of distinct children in the window above which
+		a parent is reported(default is SUBDOMAIN_THRESHOLD).
+	parents : dict
+		A dictionary mapping parent domain names to deques of (bucketNumber, HyperLogLog) tuples.
+	nextChecks : dict
+		A dictionary mapping parent domain names to the time their count may be checked again.
+	nextSweep : int
+		An integer representing the time of the next sweep of idle parents(default is None).
+	newest : int
+		An integer representing the time of the newest query counted(default is None).
+	estimates : dict
+		A dictionary mapping parent domain names to (bucketNumber, count) tuples, the last count
+		estimated for the window ending in that bucket, dropped when a sketch of the parent changes.
+
+	Methods
+	-------
+	Add(name, second)
+		Counts a queried name under its parent.
+	Count(parent, second)
+		Returns the estimated number of distinct children of a parent in the window.
+	Top(k, second)
+		Returns the k parents with the most distinct children in the window.
+	Above(second)
+		Returns the parents with more distinct children than the threshold in the window.
+	Merge(other)
+		Adds the sketches of another counter.
+	Sweep(second)
+		Forgets the parents with no queries in the window ending at second.
+	"""
+
+	def __init__(self, window = WINDOW_SECONDS, bucketWidth = BUCKET_SECONDS, precision = PRECISION, threshold = SUBDOMAIN_THRESHOLD):
+		"""
+		Parameters
+		----------
+		window : int
+			An integer representing the length of the window in seconds(default is WINDOW_SECONDS).
+		bucketWidth : int
+			An integer representing the width of a bucket in seconds(default is BUCKET_SECONDS).
+		precision : int
+			An integer representing the precision of the sketches(default is PRECISION).
+		threshold : int
+			An integer representing the number of distinct children above which a parent is reported(default is SUBDOMAIN_THRESHOLD).
+		"""
+
+		self.window = window
+		self.bucketWidth = bucketWidth
+		self.precision = precision
+		self.threshold = threshold
+		self.parents = {}
+		self.nextChecks = {}
+		self.nextSweep = None
+		self.newest = None
+		self.estimates = {}
+
+
+	def __len__(self):
+
+		return len(self.parents)
+
+
+	def Add(self, name, second):
+		"""
+		Counts a queried name under its parent. The count of the parent is
+		checked against the threshold when its sketch changed, at most once
+		every CHECK_SECONDS.
+
+		Parameters
+		----------
+		name : str
+			A string representing the queried name, before it was shortened.
+		second : int
+			An integer representing the time of the query in seconds since the epoch.
+
+		Returns
+		-------
+		str
+			The parent domain name if its count is above the threshold, otherwise None.
+		"""
+
+		parent = ParentDomain(name)
+		bucketNumber = second // self.bucketWidth
+		if self.newest == None or second > self.newest:
+			self.newest = second
+		buckets = self.parents.get(parent)
+
+		if buckets == None:
+			buckets = self.parents[parent] = deque()
+		if not buckets or buckets[-1][0] < bucketNumber:
+			buckets.append((bucketNumber, HyperLogLog(self.precision)))
+			while buckets[0][0] <= bucketNumber - self.Span():
+				buckets.popleft()
+			sketch = buckets[-1][1]
+		else:
+			sketch = self.Sketch(buckets, bucketNumber)
+
+		if self.nextSweep == None:
+			self.nextSweep = second + self.window
+		elif second >= self.nextSweep:
+			self.Sweep(second)
+
+		if sketch == None or not sketch.Add(HashName(name)):
+			return None
+		self.estimates.pop(parent, None)
+		if second < self.nextChecks.get(parent, second):
+			return None
+
+		self.nextChecks[parent] = second + CHECK_SECONDS
+		if self.Count(parent, second) > self.threshold:
+			return parent
+
+		return None
+
+
+	def Span(self):
+		"""
+		Returns the number of buckets overlapping the window.
+		"""
+
+		return -(-self.window // self.bucketWidth) + 1
+
+
+	def Sketch(self, buckets, bucketNumber):
+		"""
+		Returns the sketch of a bucket number among the buckets of a parent, or None if it was dropped.
+		"""
+
+		for number, sketch in reversed(buckets):
+			if number == bucketNumber:
+				return sketch
+			if number < bucketNumber:
+				break
+
+		return None
+
+
+	def Merged(self, parent, second):
+		"""
+		Returns a sketch merging the buckets of a parent overlapping the window ending at second.
+		"""
+
+		merged = HyperLogLog(self.precision)
+		oldest = second // self.bucketWidth - self.Span()
+
+		for bucketNumber, sketch in self.parents.get(parent, ()):
+			if bucketNumber > oldest:
+				merged.Merge(sketch)
+
+		return merged
+
+
+	def Count(self, parent, second = None):
+		"""
+		Returns the estimated number of distinct children of a parent in the
+		window ending at second. The estimate is kept until a sketch of the
+		parent changes or the window moves to another bucket, so asking for
+		the counts of all the parents again, e.g. by Top, only merges the
+		sketches of the parents queried with new children since.
+
+		Parameters
+		----------
+		parent : str
+			A string representing the parent domain name.
+		second : int
+			An integer representing the end of the window in seconds since the epoch(default is the newest query).
+
+		Returns
+		-------
+		int
+			An integer representing the estimate.
+		"""
+
+		if second == None:
+			second = self.newest if self.newest != None else 0
+
+		bucketNumber = second // self.bucketWidth
+		estimate = self.estimates.get(parent)
+		if estimate != None and estimate[0] == bucketNumber:
+			return estimate[1]
+
+		count = self.Merged(parent, second).Count()
+		if parent in self.parents:
+			self.estimates[parent] = (bucketNumber, count)
+
+		return count
+
+
+	def Top(self, k, second = None):
+		"""
+		Returns the k parents with the most distinct children in the window ending at second.
+
+		Parameters
+		----------
+		k : int
+			An integer representing the number of parents.
+		second : int
+			An integer representing the end of the window in seconds since the epoch(default is the newest query).
+
+		Returns
+		-------
+		lst
+			A list of (count, parent) tuples, highest first.
+		"""
+
+		counts = [(self.Count(parent, second), parent) for parent in self.parents]
+
+		return sorted((entry for entry in counts if entry[0] > 0), reverse = True)[:k]
+
+
+	def Above(self, second = None):
+		"""
+		Returns the parents with more distinct children than the threshold in the window ending at second.
+
+		Parameters
+		----------
+		second : int
+			An integer representing the end of the window in seconds since the epoch(default is the newest query).
+
+		Returns
+		-------
+		lst
+			A list of parent domain names.
+		"""
+
+		return [parent for parent in self.parents if self.Count(parent, second) > self.threshold]
+
+
+	def Merge(self, other):
+		"""
+		Adds the sketches of another counter with the same window, buckets and precision,
+		e.g. one built by another process over another part of the logs.
+
+		Parameters
+		----------
+		other : SubdomainCounter
+			A SubdomainCounter instance.
+		"""
+
+		for parent, others in other.parents.items():
+			merged = {}
+			for bucketNumber, sketch in list(self.parents.get(parent, ())) + list(others):
+				if bucketNumber in merged:
+					merged[bucketNumber].Merge(sketch)
+				else:
+					combined = HyperLogLog(self.precision)
+					combined.Merge(sketch)
+					merged[bucketNumber] = combined
+			newest = max(merged)
+			self.parents[parent] = deque(sorted(item for item in merged.items() if item[0] > newest - self.Span()))
+			self.estimates.pop(parent, None)
+
+		if other.newest != None and (self.newest == None or other.newest > self.newest):
+			self.newest = other.newest
+
+
+	def Sweep(self, second):
+		"""
+		Forgets the parents with no queries in the window ending at second.
+
+		Parameters
+		----------
+		second : int
+			An integer representing the end of the window in seconds since the epoch.
+		"""
+
+		oldest = second // self.bucketWidth - self.Span()
+
+		for parent in [parent for parent, buckets in self.parents.items() if buckets[-1][0] <= oldest]:
+			del self.parents[parent]
+			self.nextChecks.pop(parent, None)
+			self.estimates.pop(parent, None)
+
+		self.nextSweep = second + self.window
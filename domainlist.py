@@ -0,0 +1,254 @@
+import itertools
+
+WILDCARD_PREFIX = "<...>"
+
+# Versions are drawn from one counter, so no two lists or changes share one.
+VERSIONS = itertools.count()
+
+# Marks the node of a trie at which a suffix ends.
+END = None
+
+
+class SuffixTrie:
+	"""
+	A class used to match domain names against a set of suffixes.
+	Suffixes are stored label by label from the right, so matching a
+	domain name costs one dictionary lookup per label.
+
+	Attributes
+	----------
+	root : dict
+		A dictionary representing the root node, every node maps labels to child nodes.
+
+	Methods
+	-------
+	Add(suffix)
+		Inserts a suffix.
+	Remove(suffix)
+		Removes a suffix if present.
+	Matches(domain)
+		Checks whether a domain name equals or is under one of the suffixes.
+	"""
+
+	def __init__(self):
+
+		self.root = {}
+
+
+	def Add(self, suffix):
+		"""
+		Inserts a suffix.
+
+		Parameters
+		----------
+		suffix : str
+			A string representing a domain suffix, e.g. "example.com".
+		"""
+
+		node = self.root
+
+		for label in reversed(suffix.split(".")):
+			node = node.setdefault(label, {})
+		node[END] = True
+
+
+	def Remove(self, suffix):
+		"""
+		Removes a suffix if present, pruning the nodes left empty.
+
+		Parameters
+		----------
+		suffix : str
+			A string representing a domain suffix.
+		"""
+
+		path = [self.root]
+
+		for label in reversed(suffix.split(".")):
+			node = path[-1].get(label)
+			if node == None:
+				return
+			path.append(node)
+		path[-1].pop(END, None)
+
+		labels = list(reversed(suffix.split(".")))
+		for index in range(len(labels), 0, -1):
+			if path[index]:
+				break
+			del path[index - 1][labels[index - 1]]
+
+
+	def Matches(self, domain):
+		"""
+		Checks whether a domain name equals or is under one of the suffixes.
+
+		Parameters
+		----------
+		domain : str
+			A string representing a domain name.
+
+		Returns
+		-------
+		bool
+			True if one of the suffixes matches the domain name.
+		"""
+
+		node = self.root
+
+		for label in reversed(domain.split(".")):
+			node = node.get(label)
+			if node == None:
+				return False
+			if END in node:
+				return True
+
+		return False
+
+
+class DomainList:
+	"""
+	A class used to represent a list of domain names, such as the blocked
+	or the approved list. Names are kept in insertion order with O(1)
+	membership, and the wildcard entries(WILDCARD_PREFIX followed by a
+	suffix) are also kept in a SuffixTrie, so any domain name can be
+	matched against them.
+
+	Attributes
+	----------
+	entries : dict
+		A dictionary whose keys are the domain names, in insertion order.
+	wildcards : SuffixTrie
+		A SuffixTrie instance holding the suffixes of the wildcard entries.
+	version : int
+		An integer changed by every change of the list, unique among all lists.
+
+	Methods
+	-------
+	Add(domain)
+		Appends a domain name if not present.
+	Remove(domain)
+		Removes a domain name if present.
+	Matches(domain)
+		Checks whether a domain name is in the list or under one of its wildcard entries.
+	ToList()
+		Returns the domain names as a list, in insertion order.
+	"""
+
+	def __init__(self, domains = ()):
+		"""
+		Parameters
+		----------
+		domains : lst
+			A list of domain names to start with(default is empty).
+		"""
+
+		self.entries = {}
+		self.wildcards = SuffixTrie()
+		self.version = next(VERSIONS)
+
+		for domain in domains:
+			self.Add(domain)
+
+
+	def __contains__(self, domain):
+
+		return domain in self.entries
+
+
+	def __iter__(self):
+
+		return iter(self.entries)
+
+
+	def __len__(self):
+
+		return len(self.entries)
+
+
+	def Add(self, domain):
+		"""
+		Appends a domain name if not present.
+
+		Parameters
+		----------
+		domain : str
+			A string representing a domain name.
+
+		Returns
+		-------
+		bool
+			True if the domain name was added.
+		"""
+
+		if domain in self.entries:
+			return False
+
+		self.entries[domain] = True
+		if domain.startswith(WILDCARD_PREFIX):
+			self.wildcards.Add(domain[len(WILDCARD_PREFIX):])
+		self.version = next(VERSIONS)
+
+		return True
+
+
+	def Remove(self, domain):
+		"""
+		Removes a domain name if present.
+
+		Parameters
+		----------
+		domain : str
+			A string representing a domain name.
+
+		Returns
+		-------
+		bool
+			True if the domain name was removed.
+		"""
+
+		if domain not in self.entries:
+			return False
+
+		del self.entries[domain]
+		if domain.startswith(WILDCARD_PREFIX):
+			self.wildcards.Remove(domain[len(WILDCARD_PREFIX):])
+		self.version = next(VERSIONS)
+
+		return True
+
+
+	def Matches(self, domain):
+		"""
+		Checks whether a domain name is in the list or under one of its
+		wildcard entries. The domain name may be a wildcard entry itself.
+
+		Parameters
+		----------
+		domain : str
+			A string representing a domain name.
+
+		Returns
+		-------
+		bool
+			True if the domain name is covered by the list.
+		"""
+
+		if domain in self.entries:
+			return True
+		if domain.startswith(WILDCARD_PREFIX):
+			domain = domain[len(WILDCARD_PREFIX):]
+
+		return self.wildcards.Matches(domain)
+
+
+	def ToList(self):
+		"""
+		Returns the domain names as a list, in insertion order.
+
+		Returns
+		-------
+		lst
+			A list of domain names.
+		"""
+
+		return list(self.entries)
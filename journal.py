@@ -0,0 +1,545 @@
+from array import array
+import os
+import struct
+import sys
+import threading
+import time
+import zlib
+
+MAGIC = b"DNSJRNL\0"
+VERSION = 2
+
+# magic, version.
+HEADER = struct.Struct("<8sI")
+# length of the payload, crc32 of the payload, offset in the logs file after the batch.
+RECORD = struct.Struct("<IIq")
+# number of new domains, of query runs, of list changes and of sources, length of the
+# names table, of the queried names table and of the list changes table.
+COUNTS = struct.Struct("<IIIIIII")
+# number of new domains, of query runs and of list changes, length of the names table,
+# in the records of version 1.
+COUNTS_V1 = struct.Struct("<IIII")
+
+BLOCK = 1
+UNBLOCK = 2
+APPROVE = 3
+UNAPPROVE = 4
+
+FSYNC_INTERVAL = 1.0
+COMPACT_BYTES = 64 << 20
+
+SEGMENT_PREFIX = "journal."
+
+
+def ToBytes(values):
+	"""
+	Returns the bytes of an array in little endian order.
+
+	Parameters
+	----------
+	values : array
+		An array of integers.
+
+	Returns
+	-------
+	bytes
+		The content of the array.
+	"""
+
+	if sys.byteorder == "big":
+		values = array(values.typecode, values)
+		values.byteswap()
+
+	return values.tobytes()
+
+
+def FromBytes(typecode, data):
+	"""
+	Creates an array from bytes in little endian order.
+
+	Parameters
+	----------
+	typecode : str
+		A string representing the typecode of the array.
+	data : bytes
+		A bytes-like object holding the content of the array.
+
+	Returns
+	-------
+	array
+		An array of integers.
+	"""
+
+	values = array(typecode)
+	values.frombytes(data)
+	if sys.byteorder == "big":
+		values.byteswap()
+
+	return values
+
+
+def JoinStrings(strings):
+	"""
+	Encodes a list of strings into a string table, separated by NUL characters.
+	"""
+
+	return "\0".join(strings).encode("utf-8")
+
+
+def SplitStrings(data, count = None):
+	"""
+	Decodes a string table. The number of strings is only needed to tell an
+	empty table from a table holding a single empty string.
+	"""
+
+	if count == 0 or (count == None and len(data) == 0):
+		return []
+
+	return str(data, "utf-8").split("\0")
+
+
+def SegmentPath(directory, generation):
+	"""
+	Returns the path of the journal segment of a generation.
+	"""
+
+	return os.path.join(directory, SEGMENT_PREFIX + "%08d" % generation)
+
+
+def SegmentVersion(fileName):
+	"""
+	Returns the version of a journal segment, VERSION if it has no header yet.
+	"""
+
+	with open(fileName, "rb") as fh:
+		header = fh.read(HEADER.size)
+
+	if len(header) < HEADER.size:
+		return VERSION
+
+	return HEADER.unpack(header)[1]
+
+
+class Batch:
+	"""
+	A class used to represent the changes made to a database by one batch
+	of parsed lines, as read back from a journal.
+
+	Attributes
+	----------
+	offset : int
+		An integer representing the offset in the logs file right after the batch.
+	domains : lst
+		A list of (number, domain, isSuspiciousDomain) tuples of the domains first seen in the batch.
+	runs : lst
+		A list of (number, second, count, name, weight) tuples of the queries, in parsing order,
+		name being the queried name or None, and weight the weight of its record type.
+	changes : lst
+		A list of (position, change, domain) tuples of the changes made to the blocked and
+		approved lists, position being the number of runs made before the change.
+	sources : dict
+		A dictionary mapping the logs files followed at once to their committed offsets
+		right after the batch, empty if a single logs file is followed.
+	"""
+
+	__slots__ = ("offset", "domains", "runs", "changes", "sources")
+
+	def __init__(self, offset, domains, runs, changes, sources):
+
+		self.offset = offset
+		self.domains = domains
+		self.runs = runs
+		self.changes = changes
+		self.sources = sources
+
+
+def Encode(domains, runs, changes, sources):
+	"""
+	Encodes the changes of a batch into the payload of a journal record.
+
+	Parameters
+	----------
+	domains : lst
+		A list of (number, domain, isSuspiciousDomain) tuples.
+	runs : lst
+		A list of [number, second, count, name, weight] lists.
+	changes : lst
+		A list of (position, change, domain) tuples.
+	sources : dict
+		A dictionary mapping logs file names to their committed offsets.
+
+	Returns
+	-------
+	bytes
+		The payload.
+	"""
+
+	names = JoinStrings(domain for number, domain, isSuspiciousDomain in domains)
+	queried = JoinStrings("" if run[3] == None else run[3] for run in runs)
+	changed = JoinStrings(domain for position, change, domain in changes)
+
+	return b"".join((
+		COUNTS.pack(len(domains), len(runs), len(changes), len(sources), len(names), len(queried), len(changed)),
+		ToBytes(array('i', [number for number, domain, isSuspiciousDomain in domains])),
+		bytes(1 if isSuspiciousDomain else 0 for number, domain, isSuspiciousDomain in domains),
+		names,
+		ToBytes(array('i', [run[0] for run in runs])),
+		ToBytes(array('q', [run[1] for run in runs])),
+		ToBytes(array('i', [run[2] for run in runs])),
+		ToBytes(array('i', [run[4] for run in runs])),
+		queried,
+		ToBytes(array('i', [position for position, change, domain in changes])),
+		bytes(change for position, change, domain in changes),
+		changed,
+		ToBytes(array('q', sources.values())),
+		JoinStrings(sources)
+	))
+
+
+def Decode(payload, offset, version = VERSION):
+	"""
+	Decodes the payload of a journal record.
+
+	Parameters
+	----------
+	payload : bytes
+		The payload of the record.
+	offset : int
+		An integer representing the offset in the logs file stored with the record.
+	version : int
+		An integer representing the version of the journal segment(default is VERSION).
+
+	Returns
+	-------
+	Batch
+		A Batch instance.
+	"""
+
+	view = memoryview(payload)
+	if version < 2:
+		numberOfDomains, numberOfRuns, numberOfChanges, namesLength = COUNTS_V1.unpack_from(payload)
+		numberOfSources = 0
+		queriedLength = 0
+		changedLength = len(payload)
+		position = COUNTS_V1.size
+	else:
+		numberOfDomains, numberOfRuns, numberOfChanges, numberOfSources, namesLength, queriedLength, changedLength = COUNTS.unpack_from(payload)
+		position = COUNTS.size
+	numberOfWeights = numberOfRuns if version >= 2 else 0
+
+	sizes = [
+		('i', 4 * numberOfDomains),
+		(None, numberOfDomains),
+		(None, namesLength),
+		('i', 4 * numberOfRuns),
+		('q', 8 * numberOfRuns),
+		('i', 4 * numberOfRuns),
+		('i', 4 * numberOfWeights),
+		(None, queriedLength),
+		('i', 4 * numberOfChanges),
+		(None, numberOfChanges),
+		(None, changedLength),
+		('q', 8 * numberOfSources)
+	]
+	parts = []
+
+	for typecode, size in sizes:
+		part = view[position:position + size]
+		parts.append(FromBytes(typecode, part) if typecode != None else bytes(part))
+		position += size
+
+	numbers, flags, names, runNumbers, runSeconds, runCounts, runWeights, queried, positions, codes, changed, offsets = parts
+	domains = list(zip(numbers, SplitStrings(names, numberOfDomains), map(bool, flags)))
+	if version < 2:
+		runNames = [None] * numberOfRuns
+		runWeights = [1] * numberOfRuns
+	else:
+		runNames = [name or None for name in SplitStrings(queried, numberOfRuns)]
+	changes = list(zip(positions, codes, SplitStrings(changed, numberOfChanges)))
+	sources = dict(zip(SplitStrings(view[position:], numberOfSources), offsets))
+
+	return Batch(offset, domains, list(zip(runNumbers, runSeconds, runCounts, runNames, runWeights)), changes, sources)
+
+
+def ReadSegment(fileName):
+	"""
+	Reads the batches of a journal segment. Reading stops at the first
+	record that is incomplete or fails its checksum, which is where a
+	crash interrupted the last write.
+
+	Parameters
+	----------
+	fileName : str
+		A string representing the journal segment file name.
+
+	Returns
+	-------
+	tuple
+		A list of Batch instances, and the length of the valid part of the file.
+	"""
+
+	with open(fileName, "rb") as fh:
+		data = fh.read()
+
+	if len(data) < HEADER.size:
+		return [], 0
+
+	magic, version = HEADER.unpack_from(data)
+	if magic != MAGIC:
+		raise ValueError(fileName + " is not a journal file")
+	if version > VERSION:
+		raise ValueError(fileName + " was written by a newer version(%d)" % version)
+
+	batches = []
+	position = HEADER.size
+
+	while position + RECORD.size <= len(data):
+		length, checksum, offset = RECORD.unpack_from(data, position)
+		payload = data[position + RECORD.size:position + RECORD.size + length]
+		if len(payload) < length or zlib.crc32(payload) != checksum:
+			break
+		batches.append(Decode(payload, offset, version))
+		position += RECORD.size + length
+
+	return batches, position
+
+
+class Journal:
+	"""
+	A class used to write an append-only journal of the changes made to a
+	database. The changes are collected while a batch of lines is parsed
+	and written as one checksummed record when the batch is committed,
+	together with the offset in the logs file right after the batch, and the
+	committed offsets of the logs files when several are followed at once.
+	The records are fsynced at most every fsyncInterval seconds, and once
+	a segment grows over compactBytes the compact function is called to
+	fold it into a snapshot and start the next segment. Queries are only
+	recorded by the thread adding the logs, which commits them too, but
+	list changes are also recorded by other threads, e.g. the GUI, so the
+	list changes and the taking of the current batch are guarded by a lock.
+
+	Attributes
+	----------
+	directory : str
+		A string representing the directory of the journal segments.
+	generation : int
+		An integer representing the generation of the segment being written.
+	fsyncInterval : float
+		A float representing the maximal number of seconds between fsyncs, 0 fsyncs every batch(default is FSYNC_INTERVAL).
+	compactBytes : int
+		An integer representing the size of a segment triggering a compaction(default is COMPACT_BYTES).
+	compact : function
+		A function called with no arguments when the segment should be compacted(default is None).
+	compaction : Thread
+		The thread writing the snapshot of the last compaction, set by the compact function(default is None).
+	domains : lst
+		A list of the domains first seen in the current batch.
+	runs : lst
+		A list of the query runs of the current batch.
+	changes : lst
+		A list of the list changes of the current batch.
+	lock : Lock
+		A Lock instance guarding the changes attribute and the taking of the current batch.
+	offset : int
+		An integer representing the offset of the last batch committed.
+	sources : dict
+		A dictionary mapping logs file names to their offsets of the last batch committed.
+	size : int
+		An integer representing the size of the segment being written.
+	records : int
+		An integer representing the number of records written(default is 0).
+	syncs : int
+		An integer representing the number of fsyncs made(default is 0).
+
+	Methods
+	-------
+	AddDomain(number, domain, isSuspiciousDomain)
+		Records a domain first seen.
+	AddQuery(number, second, name, weight)
+		Records a query.
+	ChangeList(change, domain)
+		Records a change of the blocked or approved list.
+	Commit(offset, sources)
+		Writes the current batch as a record.
+	Rotate(generation)
+		Starts the segment of a new generation.
+	Sync()
+		Fsyncs the segment being written.
+	Close()
+		Fsyncs and closes the segment being written.
+	"""
+
+	def __init__(self, directory, generation = 0, offset = 0, fsyncInterval = FSYNC_INTERVAL, compactBytes = COMPACT_BYTES):
+		"""
+		Parameters
+		----------
+		directory : str
+			A string representing the directory of the journal segments.
+		generation : int
+			An integer representing the generation of the segment to append to(default is 0).
+		offset : int
+			An integer representing the offset of the last batch committed(default is 0).
+		fsyncInterval : float
+			A float representing the maximal number of seconds between fsyncs(default is FSYNC_INTERVAL).
+		compactBytes : int
+			An integer representing the size of a segment triggering a compaction(default is COMPACT_BYTES).
+		"""
+
+		self.directory = directory
+		self.fsyncInterval = fsyncInterval
+		self.compactBytes = compactBytes
+		self.compact = None
+		self.compaction = None
+		self.domains = []
+		self.runs = []
+		self.changes = []
+		self.lock = threading.Lock()
+		self.offset = offset
+		self.sources = {}
+		self.records = 0
+		self.syncs = 0
+		self.file = None
+		self.Rotate(generation)
+
+
+	def AddDomain(self, number, domain, isSuspiciousDomain = False):
+		"""
+		Records a domain first seen.
+
+		Parameters
+		----------
+		number : int
+			An integer representing the number of the domain.
+		domain : str
+			A string representing the domain name.
+		isSuspiciousDomain : bool
+			A boolean flag indicating whether the domain is considerd suspicious(default is False).
+		"""
+
+		self.domains.append((number, domain, isSuspiciousDomain))
+
+
+	def AddQuery(self, number, second, name = None, weight = 1):
+		"""
+		Records a query. Consecutive queries of the same name in the same
+		second, with the same weight, are recorded as one run.
+
+		Parameters
+		----------
+		number : int
+			An integer representing the number of the domain.
+		second : int
+			An integer representing the time of the query in seconds since the epoch.
+		name : str
+			A string representing the queried name, before it was shortened(default is None).
+		weight : int
+			An integer representing the weight of the record type of the query(default is 1).
+		"""
+
+		runs = self.runs
+
+		if runs and runs[-1][0] == number and runs[-1][1] == second and runs[-1][3] == name and runs[-1][4] == weight:
+			runs[-1][2] += 1
+		else:
+			runs.append([number, second, 1, name, weight])
+
+
+	def ChangeList(self, change, domain):
+		"""
+		Records a change of the blocked or approved list.
+
+		Parameters
+		----------
+		change : int
+			An integer representing the change, BLOCK, UNBLOCK, APPROVE or UNAPPROVE.
+		domain : str
+			A string representing the domain name.
+		"""
+
+		with self.lock:
+			self.changes.append((len(self.runs), change, domain))
+
+
+	def Commit(self, offset, sources = None):
+		"""
+		Writes the current batch as a record, unless it is empty.
+
+		Parameters
+		----------
+		offset : int
+			An integer representing the offset in the logs file right after the batch.
+		sources : dict
+			A dictionary mapping the logs files followed at once to their committed offsets(default is None).
+		"""
+
+		sources = {} if sources == None else dict(sources)
+
+		with self.lock:
+			domains, self.domains = self.domains, []
+			runs, self.runs = self.runs, []
+			changes, self.changes = self.changes, []
+
+		if not domains and not runs and not changes and offset == self.offset and sources == self.sources:
+			return
+
+		payload = Encode(domains, runs, changes, sources)
+		self.file.write(RECORD.pack(len(payload), zlib.crc32(payload), offset))
+		self.file.write(payload)
+		self.file.flush()
+		self.offset = offset
+		self.sources = sources
+		self.size += RECORD.size + len(payload)
+		self.records += 1
+
+		if time.monotonic() - self.lastSync >= self.fsyncInterval:
+			self.Sync()
+		if self.size >= self.compactBytes and self.compact != None:
+			self.compact()
+
+
+	def Rotate(self, generation):
+		"""
+		Starts the segment of a new generation, or appends to the segment
+		if it exists already.
+
+		Parameters
+		----------
+		generation : int
+			An integer representing the generation.
+		"""
+
+		if self.file != None:
+			self.Close()
+
+		self.generation = generation
+		self.file = open(SegmentPath(self.directory, generation), "ab")
+		self.size = self.file.tell()
+		if self.size == 0:
+			self.file.write(HEADER.pack(MAGIC, VERSION))
+			self.file.flush()
+			self.size = HEADER.size
+		self.lastSync = time.monotonic()
+
+
+	def Sync(self):
+		"""
+		Fsyncs the segment being written.
+		"""
+
+		os.fsync(self.file.fileno())
+		self.lastSync = time.monotonic()
+		self.syncs += 1
+
+
+	def Close(self):
+		"""
+		Fsyncs and closes the segment being written.
+		"""
+
+		if self.file == None:
+			return
+
+		self.file.flush()
+		self.Sync()
+		self.file.close()
+		self.file = None
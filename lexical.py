@@ -0,0 +1,261 @@
+from collections import Counter
+import math
+
+try:
+	import numpy
+except ImportError:
+	numpy = None
+
+MAX_NAME_LENGTH = 52
+MAX_UNIQUE_CHARACTERS = 27
+MAX_DIGITS = 7
+
+BATCH_SIZE = 4096
+
+FEATURES = ("length", "uniqueCharacters", "digits", "entropy", "letterRatio", "digitRatio", "otherRatio")
+
+DIGITS = frozenset("0123456789")
+LETTERS = frozenset("abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ")
+
+
+def ScoreName(name):
+	"""
+	Computes the lexical features of a domain name, one character at a time.
+
+	Parameters
+	----------
+	name : str
+		A string representing a domain name.
+
+	Returns
+	-------
+	tuple
+		The values of the features, in FEATURES order.
+	"""
+
+	length = len(name)
+	if length == 0:
+		return (0, 0, 0, 0.0, 0.0, 0.0, 0.0)
+
+	counts = Counter(name)
+	digits = sum(count for character, count in counts.items() if character in DIGITS)
+	letters = sum(count for character, count in counts.items() if character in LETTERS)
+	entropy = -sum(count / length * math.log2(count / length) for count in counts.values())
+
+	return (length, len(counts), digits, entropy, letters / length, digits / length, (length - letters - digits) / length)
+
+
+def ScoreBlockInPython(names):
+	"""
+	Computes the lexical features of a block of domain names with ScoreName.
+
+	Parameters
+	----------
+	names : lst
+		A list of domain names.
+
+	Returns
+	-------
+	dict
+		A dictionary mapping feature names to lists of values, one per name.
+	"""
+
+	columns = list(zip(*map(ScoreName, names))) if names else [()] * len(FEATURES)
+
+	return {feature: list(column) for feature, column in zip(FEATURES, columns)}
+
+
+def ScoreBlockWithNumpy(names, features = FEATURES):
+	"""
+	Computes the lexical features of a block of ASCII domain names with
+	NumPy. The names are joined into a single uint8 array, and a histogram
+	of the character codes of every name is taken with one bincount over
+	(name index, character code) pairs; all the features are computed from
+	that matrix, with a row per name and a column per character code.
+
+	Parameters
+	----------
+	names : lst
+		A list of ASCII domain names, with no NUL characters.
+	features : tuple
+		A tuple of the names of the features wanted(default is FEATURES).
+
+	Returns
+	-------
+	dict
+		A dictionary mapping feature names to lists of values, one per name.
+	"""
+
+	rows = len(names)
+	lengths = numpy.fromiter(map(len, names), numpy.int64, rows)
+	characters = numpy.frombuffer("".join(names).encode("ascii"), numpy.uint8)
+	codes = numpy.repeat(numpy.arange(rows, dtype = numpy.int64) * 128, lengths) + characters
+	histogram = numpy.bincount(codes, minlength = rows * 128).reshape(rows, 128)
+
+	digits = histogram[:, ord("0"):ord("9") + 1].sum(1)
+	letters = histogram[:, ord("A"):ord("Z") + 1].sum(1) + histogram[:, ord("a"):ord("z") + 1].sum(1)
+	divisor = numpy.maximum(lengths, 1)
+	scores = {}
+
+	if "length" in features:
+		scores["length"] = lengths.tolist()
+	if "uniqueCharacters" in features:
+		scores["uniqueCharacters"] = numpy.count_nonzero(histogram, 1).tolist()
+	if "digits" in features:
+		scores["digits"] = digits.tolist()
+	if "entropy" in features:
+		frequencies = histogram / divisor[:, None]
+		with numpy.errstate(divide = "ignore", invalid = "ignore"):
+			terms = numpy.where(histogram > 0, frequencies * numpy.log2(frequencies), 0.0)
+		scores["entropy"] = (-terms.sum(1) + 0.0).tolist()
+	if "letterRatio" in features:
+		scores["letterRatio"] = (letters / divisor).tolist()
+	if "digitRatio" in features:
+		scores["digitRatio"] = (digits / divisor).tolist()
+	if "otherRatio" in features:
+		scores["otherRatio"] = ((lengths - letters - digits) / divisor).tolist()
+
+	return scores
+
+
+class LexicalScorer:
+	"""
+	A class used to compute the lexical features of domain names in
+	batches: length, number of unique characters, number of digits,
+	Shannon entropy(bits per character) and the ratios of letters,
+	digits and other characters. Blocks of batchSize names are scored
+	together with NumPy when it is installed, names holding non ASCII
+	characters are scored one at a time, as they are without NumPy.
+
+	Attributes
+	----------
+	maxLength : int
+		An integer representing the length above which a name is suspicious(default is MAX_NAME_LENGTH).
+	maxUniqueCharacters : int
+		An integer representing the number of unique characters above which a name is suspicious(default is MAX_UNIQUE_CHARACTERS).
+	maxDigits : int
+		An integer representing the number of digits above which a name is suspicious(default is MAX_DIGITS).
+	batchSize : int
+		An integer representing the number of names scored together(default is BATCH_SIZE).
+	useNumpy : bool
+		A boolean flag indicating whether NumPy is used(default is True when it is installed).
+
+	Methods
+	-------
+	Score(names)
+		Computes the lexical features of domain names.
+	Suspicious(names)
+		Checks which domain names are suspicious.
+	IsSuspicious(name)
+		Checks whether a single domain name is suspicious.
+	"""
+
+	def __init__(self, maxLength = MAX_NAME_LENGTH, maxUniqueCharacters = MAX_UNIQUE_CHARACTERS, maxDigits = MAX_DIGITS, batchSize = BATCH_SIZE, useNumpy = None):
+		"""
+		Parameters
+		----------
+		maxLength : int
+			An integer representing the length above which a name is suspicious(default is MAX_NAME_LENGTH).
+		maxUniqueCharacters : int
+			An integer representing the number of unique characters above which a name is suspicious(default is MAX_UNIQUE_CHARACTERS).
+		maxDigits : int
+			An integer representing the number of digits above which a name is suspicious(default is MAX_DIGITS).
+		batchSize : int
+			An integer representing the number of names scored together(default is BATCH_SIZE).
+		useNumpy : bool
+			A boolean flag indicating whether NumPy is used, None to use it when it is installed(default is None).
+		"""
+
+		if useNumpy and numpy == None:
+			raise ValueError("NumPy is not installed")
+
+		self.maxLength = maxLength
+		self.maxUniqueCharacters = maxUniqueCharacters
+		self.maxDigits = maxDigits
+		self.batchSize = batchSize
+		self.useNumpy = numpy != None if useNumpy == None else useNumpy
+
+
+	def Score(self, names, features = FEATURES):
+		"""
+		Computes the lexical features of domain names.
+
+		Parameters
+		----------
+		names : lst
+			A list of domain names.
+		features : tuple
+			A tuple of the names of the features wanted, see FEATURES(default is FEATURES).
+
+		Returns
+		-------
+		dict
+			A dictionary mapping feature names to lists of values, one per name.
+		"""
+
+		scores = {feature: [] for feature in features}
+
+		for start in range(0, len(names), self.batchSize):
+			block = list(names[start:start + self.batchSize])
+			if not self.useNumpy:
+				columns = ScoreBlockInPython(block)
+			else:
+				joined = "".join(block)
+				special = []
+				if not joined.isascii() or "\0" in joined:
+					special = [index for index, name in enumerate(block) if not name.isascii() or "\0" in name]
+				for index in special:
+					block[index] = ""
+				columns = ScoreBlockWithNumpy(block, features)
+				for index in special:
+					for feature, value in zip(FEATURES, ScoreName(names[start + index])):
+						if feature in columns:
+							columns[feature][index] = value
+			for feature in features:
+				scores[feature].extend(columns[feature])
+
+		return scores
+
+
+	def Suspicious(self, names):
+		"""
+		Checks which domain names are suspicious: longer than maxLength,
+		or with more than maxUniqueCharacters unique characters or more
+		than maxDigits digits.
+
+		Parameters
+		----------
+		names : lst
+			A list of domain names.
+
+		Returns
+		-------
+		lst
+			A list of booleans, one per name.
+		"""
+
+		if not self.useNumpy:
+			return [self.IsSuspicious(name) for name in names]
+
+		scores = self.Score(names, ("length", "uniqueCharacters", "digits"))
+
+		return [length > self.maxLength or unique > self.maxUniqueCharacters or digits > self.maxDigits
+			for length, unique, digits in zip(scores["length"], scores["uniqueCharacters"], scores["digits"])]
+
+
+	def IsSuspicious(self, name):
+		"""
+		Checks whether a single domain name is suspicious, see Suspicious.
+
+		Parameters
+		----------
+		name : str
+			A string representing a domain name.
+
+		Returns
+		-------
+		bool
+			True if the name is suspicious.
+		"""
+
+		return len(name) > self.maxLength or len(set(name)) > self.maxUniqueCharacters or sum(map(name.count, "0123456789")) > self.maxDigits
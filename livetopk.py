@@ -0,0 +1,225 @@
+from collections import deque
+import heapq
+
+
+class LiveTopK:
+	"""
+	A class used to maintain the query counts of the live time window
+	in an indexed max-heap. Every query is an increase-key, and whole
+	buckets of counts are decreased as they slide out of the window, so
+	the highest k domains can be read from the top of the heap at any time.
+
+	Attributes
+	----------
+	span : int
+		An integer representing the length of the window in seconds.
+	bucketWidth : int
+		An integer representing the width of an expiry bucket in seconds.
+	buckets : deque
+		A deque of (bucketNumber, dict) tuples holding the counts of every bucket in the window.
+	counts : dict
+		A dictionary mapping domain names to their count in the window.
+	heap : lst
+		A list of domain names ordered as a max-heap by their count.
+	positions : dict
+		A dictionary mapping domain names to their index in the heap attribute.
+
+	Methods
+	-------
+	Add(domain, second, count)
+		Counts queries of a domain at a given time.
+	Expire(second)
+		Drops the buckets that slid out of the window ending at second.
+	Newest()
+		Returns the start of the newest bucket in seconds since the epoch.
+	Top(k)
+		Returns the k domains with the highest count in the window.
+	"""
+
+	def __init__(self, span, bucketWidth = 60):
+		"""
+		Parameters
+		----------
+		span : timedelta
+			A timedelta representing the length of the window.
+		bucketWidth : int
+			An integer representing the width of an expiry bucket in seconds(default is 60).
+		"""
+
+		self.span = int(span.total_seconds())
+		self.bucketWidth = bucketWidth
+		self.buckets = deque()
+		self.counts = {}
+		self.heap = []
+		self.positions = {}
+
+
+	def __len__(self):
+
+		return len(self.heap)
+
+
+	def Swap(self, i, j):
+		"""
+		Swaps two heap entries and updates their positions.
+		"""
+
+		heap = self.heap
+		heap[i], heap[j] = heap[j], heap[i]
+		self.positions[heap[i]] = i
+		self.positions[heap[j]] = j
+
+
+	def SiftUp(self, index):
+		"""
+		Moves a heap entry up until its parent has a higher count.
+		"""
+
+		heap = self.heap
+		counts = self.counts
+
+		while index > 0:
+			parent = (index - 1) >> 1
+			if counts[heap[parent]] >= counts[heap[index]]:
+				break
+			self.Swap(index, parent)
+			index = parent
+
+
+	def SiftDown(self, index):
+		"""
+		Moves a heap entry down until its children have lower counts.
+		"""
+
+		heap = self.heap
+		counts = self.counts
+		size = len(heap)
+
+		while True:
+			largest = index
+			for child in (2 * index + 1, 2 * index + 2):
+				if child < size and counts[heap[child]] > counts[heap[largest]]:
+					largest = child
+			if largest == index:
+				break
+			self.Swap(index, largest)
+			index = largest
+
+
+	def Remove(self, domain):
+		"""
+		Removes a domain from the heap.
+		"""
+
+		index = self.positions.pop(domain)
+		last = self.heap.pop()
+		del self.counts[domain]
+
+		if index < len(self.heap):
+			self.heap[index] = last
+			self.positions[last] = index
+			self.SiftDown(index)
+			self.SiftUp(index)
+
+
+	def Add(self, domain, second, count = 1):
+		"""
+		Counts queries of a domain at a given time. Queries older than
+		the newest bucket are counted in the newest bucket, and queries
+		that already slid out of the window are ignored.
+
+		Parameters
+		----------
+		domain : str
+			A string representing the domain name.
+		second : int
+			An integer representing the time of the queries in seconds since the epoch.
+		count : int
+			An integer representing the number of queries(default is 1).
+		"""
+
+		bucketNumber = second // self.bucketWidth
+
+		if not self.buckets or bucketNumber > self.buckets[-1][0]:
+			self.buckets.append((bucketNumber, {}))
+			self.Expire(second)
+		elif bucketNumber < (self.buckets[-1][0] * self.bucketWidth - self.span) // self.bucketWidth:
+			return
+
+		bucket = self.buckets[-1][1]
+		bucket[domain] = bucket.get(domain, 0) + count
+
+		if domain in self.positions:
+			self.counts[domain] += count
+			self.SiftUp(self.positions[domain])
+		else:
+			self.counts[domain] = count
+			self.positions[domain] = len(self.heap)
+			self.heap.append(domain)
+			self.SiftUp(len(self.heap) - 1)
+
+
+	def Expire(self, second):
+		"""
+		Drops the buckets that slid out of the window ending at second.
+
+		Parameters
+		----------
+		second : int
+			An integer representing the end of the window in seconds since the epoch.
+		"""
+
+		oldest = (second - self.span) // self.bucketWidth
+
+		while self.buckets and self.buckets[0][0] < oldest:
+			bucketNumber, bucket = self.buckets.popleft()
+			for domain, count in bucket.items():
+				self.counts[domain] -= count
+				if self.counts[domain] <= 0:
+					self.Remove(domain)
+				else:
+					self.SiftDown(self.positions[domain])
+
+
+	def Newest(self):
+		"""
+		Returns the start of the newest bucket in seconds since the epoch,
+		or None if the window is empty. Expiring at this second drops the
+		same buckets as expiring at the time of the newest query.
+		"""
+
+		if not self.buckets:
+			return None
+
+		return self.buckets[-1][0] * self.bucketWidth
+
+
+	def Top(self, k):
+		"""
+		Returns the k domains with the highest count in the window, by
+		walking the heap from its root in O(k log k).
+
+		Parameters
+		----------
+		k : int
+			An integer representing the number of highest elements to be found.
+
+		Returns
+		-------
+		lst
+			A list of (count, domain) tuples, highest first.
+		"""
+
+		output = []
+		heap = self.heap
+		counts = self.counts
+		candidates = [(-counts[heap[0]], 0)] if heap else []
+
+		while candidates and len(output) < k:
+			count, index = heapq.heappop(candidates)
+			output.append((-count, heap[index]))
+			for child in (2 * index + 1, 2 * index + 2):
+				if child < len(heap):
+					heapq.heappush(candidates, (-counts[heap[child]], child))
+
+		return output
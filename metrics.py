@@ -0,0 +1,368 @@
+from array import array
+from bisect import bisect_left
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import os
+import sys
+import threading
+
+PREFIX = "dnsdetector_"
+METRICS_PORT = 9153
+METRICS_INTERVAL = 15
+SIZE_SAMPLE = 64
+SIZE_DEPTH = 4
+
+# The upper bounds in seconds of the latency histograms, they are observed once per batch of lines.
+BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# The type, help text and label of every metric family, without PREFIX.
+FAMILIES = {
+	"lines_read_total": ("counter", "Lines read from the logs file.", None),
+	"lines_parsed_total": ("counter", "Query lines of a tracked type parsed into logs.", None),
+	"parse_failures_total": ("counter", "Lines or logs that failed, per reason.", "reason"),
+	"queries_total": ("counter", "Query lines read, per record type.", "type"),
+	"blocks_total": ("counter", "Entries added to the blocked list, per kind.", "kind"),
+	"subdomain_alerts_total": ("counter", "Parent domains reported for too many distinct children.", None),
+	"stage_seconds": ("histogram", "Seconds spent per batch of lines in every stage.", "stage"),
+	"tracked_domains": ("gauge", "Domains with logs in the database.", None),
+	"list_entries": ("gauge", "Entries of the blocked and approved lists.", "list"),
+	"verdict_cache": ("gauge", "Counters of the verdict cache.", "counter"),
+	"structure_bytes": ("gauge", "Estimated memory of every structure of the database, in bytes.", "structure"),
+	"pipeline_queue_depth": ("gauge", "Batches waiting in every queue of the ingest pipeline.", "queue"),
+	"pipeline_dropped_total": ("counter", "Batches shed by every queue of the ingest pipeline.", "queue"),
+	"pipeline_wait_seconds_total": ("counter", "Seconds the ingest pipeline waited for room in every queue.", "queue"),
+	"source_queries_total": ("counter", "Queries merged from every logs file followed.", "source"),
+	"source_rotations_total": ("counter", "Rotations and truncations of every logs file followed.", "source"),
+	"source_lag_seconds": ("gauge", "Seconds the latest query of every logs file is behind the latest of all of them.", "source"),
+	"source_backlog_bytes": ("gauge", "Bytes of every logs file not read yet.", "source"),
+	"reorder_buffer": ("gauge", "Counters of the buffer merging the logs files by time.", "counter"),
+}
+
+
+def EstimateSize(obj, depth = SIZE_DEPTH):
+	"""
+	Estimates the memory of an object and of what it references. Containers
+	are estimated from a sample of SIZE_SAMPLE of their items, so the cost
+	doesn't grow with their size, and objects shared by several containers
+	are counted in each of them.
+
+	Parameters
+	----------
+	obj : object
+		The object to estimate.
+	depth : int
+		An integer representing how many levels of references are followed(default is SIZE_DEPTH).
+
+	Returns
+	-------
+	int
+		An integer representing the estimated number of bytes.
+	"""
+
+	size = sys.getsizeof(obj)
+	if depth == 0 or isinstance(obj, (str, bytes, int, float, bool, array, type(None))):
+		return size
+
+	if isinstance(obj, dict):
+		items = list(obj.items()) if len(obj) <= SIZE_SAMPLE else [item for item, number in zip(obj.items(), range(SIZE_SAMPLE))]
+		children = [part for item in items for part in item]
+		count = 2 * len(obj)
+	elif isinstance(obj, (list, tuple, set, frozenset)):
+		children = list(obj) if len(obj) <= SIZE_SAMPLE else [item for item, number in zip(obj, range(SIZE_SAMPLE))]
+		count = len(obj)
+	else:
+		slots = [name for cls in type(obj).__mro__ for name in getattr(cls, "__slots__", ())]
+		children = [getattr(obj, name) for name in slots if hasattr(obj, name)]
+		if hasattr(obj, "__dict__"):
+			children.append(obj.__dict__)
+		count = len(children)
+
+	if not children:
+		return size
+
+	sampled = sum(EstimateSize(child, depth - 1) for child in children)
+
+	return size + sampled * count // len(children)
+
+
+class Metrics:
+	"""
+	A class used to collect the counters and latency histograms of the
+	parser and expose them in the Prometheus text format. Counters are
+	incremented and histograms observed once per batch of lines, so the
+	cost per line stays a few dictionary updates. Gauges are computed only
+	when the metrics are rendered, by the collectors added.
+
+	Attributes
+	----------
+	counters : dict
+		A dictionary mapping (family, label value) tuples to counts.
+	histograms : dict
+		A dictionary mapping (family, label value) tuples to [bucket counts, sum, count] lists.
+	collectors : lst
+		A list of functions returning (family, label value, value) tuples of gauges.
+
+	Methods
+	-------
+	Inc(family, label, amount)
+		Increments a counter.
+	CountTypes(types)
+		Counts the queries per type of a list of record types.
+	Observe(family, label, seconds)
+		Observes a latency in a histogram.
+	AddCollector(collector)
+		Adds a function computing gauges when the metrics are rendered.
+	Render()
+		Returns the metrics in the Prometheus text format.
+	"""
+
+	def __init__(self):
+
+		self.counters = {}
+		self.histograms = {}
+		self.collectors = []
+
+
+	def Inc(self, family, label = None, amount = 1):
+		"""
+		Increments a counter.
+
+		Parameters
+		----------
+		family : str
+			A string representing the name of the counter, without PREFIX.
+		label : str
+			A string representing the value of the label of the family(default is None).
+		amount : int
+			An integer representing the increment(default is 1).
+		"""
+
+		key = (family, label)
+		self.counters[key] = self.counters.get(key, 0) + amount
+
+
+	def CountTypes(self, types):
+		"""
+		Counts the queries per type of a list of record types.
+
+		Parameters
+		----------
+		types : lst
+			A list of the record types of query lines, as bytes, e.g. b"AAAA".
+		"""
+
+		for kind, count in Counter(types).items():
+			self.Inc("queries_total", kind.decode("ascii", "replace"), count)
+
+
+	def Observe(self, family, label, seconds):
+		"""
+		Observes a latency in a histogram.
+
+		Parameters
+		----------
+		family : str
+			A string representing the name of the histogram, without PREFIX.
+		label : str
+			A string representing the value of the label of the family.
+		seconds : float
+			A float representing the latency observed.
+		"""
+
+		histogram = self.histograms.get((family, label))
+		if histogram == None:
+			histogram = self.histograms[(family, label)] = [[0] * (len(BUCKETS) + 1), 0.0, 0]
+
+		histogram[0][bisect_left(BUCKETS, seconds)] += 1
+		histogram[1] += seconds
+		histogram[2] += 1
+
+
+	def AddCollector(self, collector):
+		"""
+		Adds a function computing gauges when the metrics are rendered.
+
+		Parameters
+		----------
+		collector : function
+			A function taking no arguments and returning an iterable of (family, label value, value) tuples.
+		"""
+
+		self.collectors.append(collector)
+
+
+	def Render(self):
+		"""
+		Returns the metrics in the Prometheus text format(version 0.0.4).
+		The buckets of every histogram are copied before they are written,
+		and its count is their sum, so a histogram observed meanwhile
+		isn't written half updated.
+
+		Returns
+		-------
+		str
+			A string representing the metrics.
+		"""
+
+		samples = {}
+
+		for (family, label), value in list(self.counters.items()):
+			samples.setdefault(family, []).append((label, value))
+		for collector in self.collectors:
+			try:
+				for family, label, value in collector():
+					samples.setdefault(family, []).append((label, value))
+			except Exception as error:
+				print("failed collecting metrics: " + str(error))
+		for (family, label), (counts, total, count) in list(self.histograms.items()):
+			counts = list(counts)
+			samples.setdefault(family, []).append((label, (counts, total, sum(counts))))
+
+		lines = []
+
+		for family in sorted(samples):
+			kind, text, labelName = FAMILIES.get(family, ("untyped", family, "label"))
+			name = PREFIX + family
+			lines.append("# HELP %s %s" % (name, text))
+			lines.append("# TYPE %s %s" % (name, kind))
+			for label, value in sorted(samples[family], key = lambda sample: str(sample[0])):
+				labels = "" if label == None else '%s="%s"' % (labelName, str(label).replace("\\", "\\\\").replace('"', '\\"'))
+				if kind == "histogram":
+					counts, total, count = value
+					cumulative = 0
+					for bound, bucketCount in zip(BUCKETS + ("+Inf",), counts):
+						cumulative += bucketCount
+						lines.append('%s_bucket{%s%sle="%s"} %d' % (name, labels, "," if labels else "", bound, cumulative))
+					lines.append("%s_sum%s %r" % (name, "{" + labels + "}" if labels else "", total))
+					lines.append("%s_count%s %d" % (name, "{" + labels + "}" if labels else "", count))
+				else:
+					lines.append("%s%s %s" % (name, "{" + labels + "}" if labels else "", value))
+
+		return "\n".join(lines) + "\n"
+
+
+class MetricsHandler(BaseHTTPRequestHandler):
+	"""
+	A class used to answer the requests of Prometheus with the metrics of its server.
+	"""
+
+	def do_GET(self):
+
+		if self.path.split("?")[0] not in ("/", "/metrics"):
+			self.send_error(404)
+			return
+
+		body = self.server.metrics.Render().encode()
+		self.send_response(200)
+		self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+		self.send_header("Content-Length", str(len(body)))
+		self.end_headers()
+		self.wfile.write(body)
+
+
+	def log_message(self, format, *args):
+
+		pass
+
+
+def Serve(metrics, port = METRICS_PORT, host = "127.0.0.1"):
+	"""
+	Serves metrics over HTTP on a daemon thread, at /metrics.
+
+	Parameters
+	----------
+	metrics : Metrics
+		The Metrics instance to serve.
+	port : int
+		An integer representing the port to listen on, 0 for any free port(default is METRICS_PORT).
+	host : str
+		A string representing the address to listen on(default is 127.0.0.1, local only).
+
+	Returns
+	-------
+	ThreadingHTTPServer
+		The server, shutdown() stops it.
+	"""
+
+	server = ThreadingHTTPServer((host, port), MetricsHandler)
+	server.daemon_threads = True
+	server.metrics = metrics
+	threading.Thread(target = server.serve_forever, daemon = True).start()
+
+	return server
+
+
+class MetricsFile:
+	"""
+	A class used to write metrics into a file periodically, for the textfile
+	collector of the node exporter. The file is replaced atomically.
+
+	Attributes
+	----------
+	metrics : Metrics
+		The Metrics instance written.
+	fileName : str
+		A string representing the file name, it should end with .prom.
+	interval : float
+		A float representing the number of seconds between writes(default is METRICS_INTERVAL).
+
+	Methods
+	-------
+	Write()
+		Writes the metrics once.
+	Stop()
+		Writes the metrics a last time and stops the writer thread.
+	"""
+
+	def __init__(self, metrics, fileName, interval = METRICS_INTERVAL):
+		"""
+		Parameters
+		----------
+		metrics : Metrics
+			The Metrics instance to write.
+		fileName : str
+			A string representing the file name.
+		interval : float
+			A float representing the number of seconds between writes(default is METRICS_INTERVAL).
+		"""
+
+		self.metrics = metrics
+		self.fileName = fileName
+		self.interval = interval
+		self.stopped = threading.Event()
+		self.thread = threading.Thread(target = self.Run, daemon = True)
+		self.thread.start()
+
+
+	def Run(self):
+		"""
+		The writer thread loop.
+		"""
+
+		while not self.stopped.wait(self.interval):
+			self.Write()
+
+
+	def Write(self):
+		"""
+		Writes the metrics once, through a temporary file renamed over the file.
+		"""
+
+		temporaryPath = self.fileName + ".tmp"
+
+		try:
+			with open(temporaryPath, "w") as fh:
+				fh.write(self.metrics.Render())
+			os.replace(temporaryPath, self.fileName)
+		except OSError as error:
+			print("failed writing metrics: " + str(error))
+
+
+	def Stop(self):
+		"""
+		Writes the metrics a last time and stops the writer thread.
+		"""
+
+		self.stopped.set()
+		self.thread.join()
+		self.Write()
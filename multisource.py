@@ -0,0 +1,515 @@
+from collections import deque
+import heapq
+from itertools import count
+import os
+import time
+
+from tail import LogFollower, WaitForAny
+from timeindex import ToEpoch
+
+REORDER_CAPACITY = 1 << 17
+MAX_SKEW = 10
+IDLE_SECONDS = 2.0
+
+# The position of the last batch of a pipeline, the buffer is drained.
+DRAIN = "drain"
+
+
+class LogSource:
+	"""
+	A class used to represent one of the logs files a SourceSet follows,
+	e.g. of one dnsmasq instance, and its progress.
+
+	Attributes
+	----------
+	fileName : str
+		A string representing the logs file name.
+	follower : LogFollower
+		A LogFollower instance of the logs file, which handles its rotation and truncation.
+	committed : int
+		An integer representing the offset up to which all the logs read were added to the database.
+	pending : deque
+		A deque of the (newest, offset) tuples of the chunks read but not all added yet, newest being
+		the time of their latest query in seconds since the epoch, or None if they hold no query.
+	inFlight : int
+		An integer representing the number of chunks read but not merged yet(default is 0).
+	caughtUp : bool
+		A boolean flag indicating whether the last read found no new lines(default is False).
+	newest : int
+		An integer representing the time of the latest query merged, in seconds since the epoch(default is None).
+	bytes : int
+		An integer representing the number of bytes read(default is 0).
+	queries : int
+		An integer representing the number of queries merged(default is 0).
+	started : float
+		A float representing the time.monotonic() time the source was opened at.
+	lastData : float
+		A float representing the time.monotonic() time lines were last read at.
+
+	Methods
+	-------
+	Counters(now, freshest)
+		Returns the counters of the source.
+	"""
+
+	def __init__(self, fileName, offset = 0, **options):
+		"""
+		Parameters
+		----------
+		fileName : str
+			A string representing the logs file name.
+		offset : int
+			An integer representing the file position to start from(default is 0).
+		options : dict
+			The other arguments of the LogFollower.
+		"""
+
+		self.fileName = fileName
+		self.follower = LogFollower(fileName, offset, **options)
+		self.committed = self.follower.offset
+		self.pending = deque()
+		self.inFlight = 0
+		self.caughtUp = False
+		self.newest = None
+		self.bytes = 0
+		self.queries = 0
+		self.started = time.monotonic()
+		self.lastData = self.started
+
+
+	def Counters(self, now, freshest):
+		"""
+		Returns the counters of the source.
+
+		Parameters
+		----------
+		now : float
+			A float representing the current time.monotonic() time.
+		freshest : int
+			An integer representing the time of the latest query merged from any source, or None.
+
+		Returns
+		-------
+		dict
+			A dictionary of the offsets read and committed, the rotations handled, the bytes
+			and queries, the queries per second since the source was opened, the seconds its
+			latest query is behind the latest of all sources(lag), the bytes not read yet
+			(backlog) and the seconds since lines were last read(idle).
+		"""
+
+		try:
+			backlog = max(0, os.stat(self.fileName).st_size - self.follower.offset)
+		except OSError:
+			backlog = None
+
+		return {"fileName": self.fileName, "offset": self.follower.offset, "committed": self.committed,
+			"rotations": self.follower.rotations, "bytes": self.bytes, "queries": self.queries,
+			"queriesPerSecond": self.queries / max(now - self.started, 1e-9),
+			"lag": None if self.newest == None or freshest == None else freshest - self.newest,
+			"backlog": backlog, "idle": now - self.lastData}
+
+
+class ReorderBuffer:
+	"""
+	A class used to merge the logs of several sources by the time of
+	their queries. Logs are held in a heap until released up to a
+	watermark, a time no source will go back before, so they are added
+	in time order. The buffer is bounded: once it holds more than
+	capacity logs, the oldest are released regardless of the watermark.
+	A log pushed older than logs already released is counted as late,
+	and released with the next ones.
+
+	Attributes
+	----------
+	capacity : int
+		An integer representing the number of logs held at most(default is REORDER_CAPACITY).
+	heap : lst
+		A heap of (second, sequence, log) tuples.
+	releasedThrough : int
+		An integer representing the time in seconds since the epoch up to which all logs were released(default is None).
+	late : int
+		An integer representing the number of logs pushed older than releasedThrough(default is 0).
+	forced : int
+		An integer representing the number of logs released because the buffer was full(default is 0).
+	maxDepth : int
+		An integer representing the largest number of logs held at once(default is 0).
+
+	Methods
+	-------
+	Push(seconds, logs)
+		Adds logs to the buffer.
+	Release(watermark)
+		Takes the logs up to the watermark out of the buffer, in time order.
+	Drain()
+		Takes all the logs out of the buffer, in time order.
+	Counters()
+		Returns the counters of the buffer.
+	"""
+
+	def __init__(self, capacity = REORDER_CAPACITY):
+		"""
+		Parameters
+		----------
+		capacity : int
+			An integer representing the number of logs held at most(default is REORDER_CAPACITY).
+		"""
+
+		self.capacity = capacity
+		self.heap = []
+		self.sequence = count()
+		self.releasedThrough = None
+		self.late = 0
+		self.forced = 0
+		self.maxDepth = 0
+
+
+	def __len__(self):
+
+		return len(self.heap)
+
+
+	def Push(self, seconds, logs):
+		"""
+		Adds logs to the buffer. Logs of the same second keep the order they were pushed in.
+
+		Parameters
+		----------
+		seconds : lst
+			A list of the times of the queries of the logs, in seconds since the epoch.
+		logs : lst
+			A list of LOG instances.
+		"""
+
+		heap = self.heap
+		sequence = self.sequence
+		releasedThrough = self.releasedThrough
+
+		for second, log in zip(seconds, logs):
+			if releasedThrough != None and second < releasedThrough:
+				self.late += 1
+			heapq.heappush(heap, (second, next(sequence), log))
+
+		self.maxDepth = max(self.maxDepth, len(heap))
+
+
+	def Release(self, watermark):
+		"""
+		Takes the logs up to the watermark out of the buffer, in time
+		order, and the oldest ones beyond the capacity.
+
+		Parameters
+		----------
+		watermark : int
+			An integer representing a time in seconds since the epoch, or None to release only beyond the capacity.
+
+		Returns
+		-------
+		lst
+			A list of LOG instances.
+		"""
+
+		heap = self.heap
+		released = []
+
+		if watermark != None:
+			while heap and heap[0][0] <= watermark:
+				released.append(heapq.heappop(heap)[2])
+			if self.releasedThrough == None or watermark > self.releasedThrough:
+				self.releasedThrough = watermark
+
+		while len(heap) > self.capacity:
+			second, sequence, log = heapq.heappop(heap)
+			released.append(log)
+			self.forced += 1
+			if self.releasedThrough == None or second - 1 > self.releasedThrough:
+				self.releasedThrough = second - 1
+
+		return released
+
+
+	def Drain(self):
+		"""
+		Takes all the logs out of the buffer, in time order.
+
+		Returns
+		-------
+		lst
+			A list of LOG instances.
+		"""
+
+		if not self.heap:
+			return []
+
+		return self.Release(max(second for second, sequence, log in self.heap))
+
+
+	def Counters(self):
+		"""
+		Returns the counters of the buffer.
+
+		Returns
+		-------
+		dict
+			A dictionary of the logs held, the largest number held, the late and forced logs.
+		"""
+
+		return {"depth": len(self.heap), "maxDepth": self.maxDepth, "late": self.late, "forced": self.forced}
+
+
+class SourceSet:
+	"""
+	A class used to follow several logs files at once, e.g. of several
+	dnsmasq instances feeding one detector, in place of the LogFollower
+	of an IngestPipeline. ReadChunk takes turns between the files that
+	have new lines, so a busy resolver doesn't starve the others, and
+	remembers which file the chunk came from(see the offset attribute).
+	Once parsed, the logs of every chunk go through Merge, which holds
+	them in a ReorderBuffer and releases them in time order, up to the
+	watermark: the latest query of the slowest source still feeding
+	lines. A source stops holding back the others once it has no new
+	lines and either none came for idleSeconds, or its latest query is
+	more than maxSkew seconds behind the freshest source. So the windows
+	of the database see the queries in time order as long as the clocks
+	of the resolvers are skewed by less than maxSkew seconds.
+
+	The offsets, rotations and counters are kept per source. A source's
+	committed offset only moves past a chunk once all of its logs were
+	released, so the offsets attribute, e.g. the sourceOffsets attribute
+	of the database, can be used to resume without losing logs held in
+	the buffer.
+
+	Attributes
+	----------
+	sources : lst
+		A list of the LogSource instances, in the order of the file names.
+	buffer : ReorderBuffer
+		The ReorderBuffer instance the logs are merged in.
+	offsets : dict
+		A dictionary mapping the file names to their committed offsets, updated in place.
+	maxSkew : int
+		An integer representing the seconds a caught up source may be behind the freshest one and still be waited for(default is MAX_SKEW).
+	idleSeconds : float
+		A float representing the seconds without new lines after which a caught up source isn't waited for(default is IDLE_SECONDS).
+	position : tuple
+		The (index of the source, offset) tuple of the last chunk read, or None if no source had new lines.
+
+	Methods
+	-------
+	ReadChunk()
+		Returns the bytes of the complete lines available in the next source with new lines.
+	Wait(timeout)
+		Blocks until one of the files may have changed, or timeout seconds passed.
+	Watermark()
+		Returns the time up to which the logs can be released.
+	Merge(logs, position)
+		Merges the logs of a chunk and returns those released.
+	Counters()
+		Returns the counters of every source and of the buffer.
+	Close()
+		Closes the files.
+	"""
+
+	def __init__(self, fileNames, offsets = None, capacity = REORDER_CAPACITY, maxSkew = MAX_SKEW, idleSeconds = IDLE_SECONDS, **options):
+		"""
+		Parameters
+		----------
+		fileNames : lst
+			A list of the logs file names.
+		offsets : dict
+			A dictionary mapping file names to the offsets to start from, it is updated
+			with the committed offsets(default is None).
+		capacity : int
+			An integer representing the number of logs held in the buffer at most(default is REORDER_CAPACITY).
+		maxSkew : int
+			An integer representing the seconds a caught up source may be behind and still be waited for(default is MAX_SKEW).
+		idleSeconds : float
+			A float representing the seconds without new lines after which a caught up source isn't waited for(default is IDLE_SECONDS).
+		options : dict
+			The other arguments of the LogFollower instances.
+		"""
+
+		self.offsets = {} if offsets == None else offsets
+		self.sources = []
+		for fileName in fileNames:
+			self.sources.append(LogSource(fileName, self.offsets.get(fileName, 0), **options))
+			self.offsets[fileName] = self.sources[-1].committed
+		self.buffer = ReorderBuffer(capacity)
+		self.maxSkew = maxSkew
+		self.idleSeconds = idleSeconds
+		self.position = None
+		self.next = 0
+
+
+	@property
+	def offset(self):
+
+		return self.position
+
+
+	@property
+	def rotations(self):
+
+		return sum(source.follower.rotations for source in self.sources)
+
+
+	def ReadChunk(self):
+		"""
+		Returns the bytes of the complete lines available in the next
+		source with new lines, taking turns between the sources, see
+		LogFollower.ReadChunk. The source and its offset are kept in the
+		position attribute.
+
+		Returns
+		-------
+		bytes
+			The bytes of the lines, or empty bytes if no source had new lines.
+		"""
+
+		sources = self.sources
+
+		for step in range(len(sources)):
+			index = (self.next + step) % len(sources)
+			source = sources[index]
+			chunk = source.follower.ReadChunk()
+			if chunk:
+				source.bytes += len(chunk)
+				source.inFlight += 1
+				source.caughtUp = False
+				source.lastData = time.monotonic()
+				self.next = index + 1
+				self.position = (index, source.follower.offset)
+				return chunk
+			source.caughtUp = True
+
+		self.position = None
+
+		return b""
+
+
+	def Wait(self, timeout):
+		"""
+		Blocks until one of the files may have changed, or timeout seconds passed.
+
+		Parameters
+		----------
+		timeout : float
+			A float representing the maximal number of seconds to block.
+		"""
+
+		WaitForAny([source.follower for source in self.sources], timeout)
+
+
+	def Watermark(self):
+		"""
+		Returns the time up to which the logs can be released: the latest
+		query of the slowest source still holding back the others, see
+		the class description.
+
+		Returns
+		-------
+		int
+			An integer representing the time in seconds since the epoch, or None if a source that
+			wasn't merged yet holds back the others.
+		"""
+
+		now = time.monotonic()
+		freshest = max((source.newest for source in self.sources if source.newest != None), default = None)
+		holding = []
+
+		for source in self.sources:
+			if source.inFlight > 0 or not source.caughtUp:
+				if source.newest == None:
+					return None
+				holding.append(source.newest)
+			elif source.newest != None and now - source.lastData < self.idleSeconds and source.newest >= freshest - self.maxSkew:
+				holding.append(source.newest)
+
+		return min(holding) if holding else freshest
+
+
+	def Merge(self, logs, position):
+		"""
+		Merges the logs of a chunk into the buffer, and returns the logs
+		released, in time order, and the committed offset of the first
+		source.
+
+		Parameters
+		----------
+		logs : lst
+			A list of the LOG instances of the chunk, or None if no source had new lines.
+		position : tuple
+			The position attribute when the chunk was read, or DRAIN to release all the logs.
+
+		Returns
+		-------
+		tuple
+			A list of LOG instances, or None if logs is None and none was released, and an
+			integer representing the committed offset of the first source.
+		"""
+
+		buffer = self.buffer
+
+		if position == DRAIN:
+			released = buffer.Drain()
+		else:
+			if position != None:
+				index, offset = position
+				source = self.sources[index]
+				source.inFlight -= 1
+				newest = None
+				if logs:
+					seconds = [ToEpoch(log.date) for log in logs]
+					newest = max(seconds)
+					buffer.Push(seconds, logs)
+					source.queries += len(logs)
+					if source.newest == None or newest > source.newest:
+						source.newest = newest
+				source.pending.append((newest, offset))
+			released = buffer.Release(self.Watermark())
+
+		self.Commit()
+		if not released and logs == None:
+			released = None
+
+		return released, self.sources[0].committed
+
+
+	def Commit(self):
+		"""
+		Moves the committed offset of every source past the chunks whose logs were all released.
+		"""
+
+		releasedThrough = self.buffer.releasedThrough
+		empty = len(self.buffer) == 0
+
+		for source in self.sources:
+			pending = source.pending
+			while pending and (pending[0][0] == None or empty or (releasedThrough != None and pending[0][0] <= releasedThrough)):
+				source.committed = pending.popleft()[1]
+			self.offsets[source.fileName] = source.committed
+
+
+	def Counters(self):
+		"""
+		Returns the counters of every source and of the buffer.
+
+		Returns
+		-------
+		dict
+			A dictionary mapping "sources" to a list of the counters of the sources, see
+			LogSource.Counters, and "reorder" to the counters of the buffer.
+		"""
+
+		now = time.monotonic()
+		freshest = max((source.newest for source in self.sources if source.newest != None), default = None)
+
+		return {"sources": [source.Counters(now, freshest) for source in self.sources], "reorder": self.buffer.Counters()}
+
+
+	def Close(self):
+		"""
+		Closes the files.
+		"""
+
+		for source in self.sources:
+			source.follower.Close()
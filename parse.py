@@ -1,9 +1,30 @@
+from array import array
 from datetime import datetime, timedelta
-import os
 import json
 import heapq
+from operator import itemgetter
+import threading
 import time
 
+from cardinality import SUBDOMAIN_THRESHOLD, SubdomainCounter
+from domainlist import DomainList, WILDCARD_PREFIX
+from journal import APPROVE, BLOCK, Journal, UNAPPROVE, UNBLOCK
+from lexical import LexicalScorer
+from publicsuffix import RegisteredDomain
+from livetopk import LiveTopK
+from metrics import EstimateSize, Metrics
+from multisource import SourceSet
+from pipeline import IngestPipeline
+from querytypes import QueryTypes
+from publisher import BlocklistPublisher
+from ratedetector import RateDetector
+from readview import ReadView
+from retention import Retention
+from scanner import ScanQueries
+from tail import LogFollower
+from timeindex import EPOCH, TimeBucketIndex, ToEpoch
+from verdictcache import VerdictCache
+
 dates = [
 	('2min', timedelta(minutes = 2)),
 	('10min', timedelta(minutes = 10)),
@@ -21,12 +42,32 @@ dates = [
 
 FMT = "%Y %b %d %H:%M:%S"
 
+WINDOW_SECONDS = 10 * 60
+
+# The reasons parse failures are counted under, by the type of the exception raised.
+FAILURE_REASONS = {IndexError: "tokenize", KeyError: "timestamp", ValueError: "timestamp"}
+
+# The number of logs AddLogs adds between checks whether a read snapshot is due.
+SNAPSHOT_SLICE = 4096
+
+# The structures of DATABASE whose memory is estimated by ComputeGauges.
+MEASURED_STRUCTURES = ("logs", "numbersOfDomains", "countForDomains", "heapCount", "heap10Span", "timeIndex", "liveTopK",
+	"rateDetector", "subdomainCounter", "verdictCache", "blockedList", "approvedList")
+
+# The months a timestamp may go back behind the latest one and still be a late line of the same year.
+MONTH_SKEW = 1
+
+MONTHS = {
+	'Jan': 1, 'Feb': 2, 'Mar': 3, 'Apr': 4, 'May': 5, 'Jun': 6,
+	'Jul': 7, 'Aug': 8, 'Sep': 9, 'Oct': 10, 'Nov': 11, 'Dec': 12
+}
+
 def GetShortenedVersionForSus(domain):
 	"""
-	Counts both XXXXX.a.com and YYYYYYY.a.com towards counts for
-	a.com. If the domain is suspicious, takes the ending xxx.yyy 
-	as it is and adds other subdomains to the string if they are
-	short enough.
+	Counts both XXXXX.a.com and YYYYYYY.b.a.com towards counts for
+	a.com. The suspicious domain is shortened to its registered domain,
+	the public suffix it is under plus one label(see publicsuffix), so
+	XXXXX.a.co.uk is counted towards a.co.uk.
 
 	Parameters
 	----------
@@ -39,20 +80,7 @@ def GetShortenedVersionForSus(domain):
 		A string representing the shortned domain.
 	"""
 
-	tokensList = domain.rsplit(".", 5)
-	strout = ""
-	num = 0
-	
-	for token in reversed(tokensList):
-		if num > 1 and len(token) > 10:
-			break
-		strout = "." + token + strout
-		num += 1
-
-	if strout.find(".") == 0:
-		strout = strout[1:]
-
-	return "<...>" + strout
+	return WILDCARD_PREFIX + RegisteredDomain(domain)
 
 
 class LOG:
@@ -69,9 +97,15 @@ class LOG:
 			A boolean flag indicating whether a log's domain is considerd suspicious(default is False).
 	count : int
 		An integer representing the number of queries for the corresponding domain(default is 1).
+	name : str
+		A string representing the queried name, before it was shortened(default is None).
+	weight : int
+		An integer representing how many queries the log counts as in the rate detector, by its record type(default is 1).
 	"""
 
-	def __init__(self, date, domain, isSuspiciousDomain = False, count = 1):
+	__slots__ = ("date", "domain", "isSuspiciousDomain", "count", "name", "weight")
+
+	def __init__(self, date, domain, isSuspiciousDomain = False, count = 1, name = None, weight = 1):
 		"""
 		Parameters
 		----------
@@ -83,792 +117,2562 @@ class LOG:
 			A boolean flag indicating whether a log's domain is considerd suspicious(default is False).
 		count : int
 			An integer representing the number of queries for the corresponding domain(default is 1).
+		name : str
+			A string representing the queried name, before it was shortened(default is None).
+		weight : int
+			An integer representing how many queries the log counts as in the rate detector(default is 1).
 		"""
 
 		self.date = date
 		self.domain = domain
 		self.isSuspiciousDomain = isSuspiciousDomain
 		self.count = count
+		self.name = name
+		self.weight = weight
 
 
 	def __str__(self):
 
-		domain = getShortendVersion(self.domain)
+		domain = self.domain
 
 		return domain + "\nTime of peak:\n" + self.date.strftime(FMT) + "\ncount(10min):\n" + str(self.count)
 
 
-class MyEncoder(json.JSONEncoder):
+class LogView(LOG):
 	"""
-	A class used to subclass JSONEncoder in order to implement a custom serialization.
+	A class used to view a window kept in a LogStore as a LOG instance.
+	The view holds no data of its own, reading and setting its attributes
+	goes through to the columns of the store.
 
-	Methods
-	-------
-	default(obj)
-		Serializes the object passed as a parameter. 
+	Attributes
+	----------
+	store : LogStore
+		The LogStore instance holding the window.
+	window : int
+		An integer representing the index of the window in the store.
 	"""
-	
-	def default(self, obj):
-		"""
-		Serializes the object passed as a parameter in a custom manner.
-		If the object is not an instance of classes LOG or datetime, it will be serialized
-		by JSONEncoder's default method. 
 
+	__slots__ = ("store", "window")
+
+	def __init__(self, store, window):
+		"""
 		Parameters
 		----------
-		obj : object
-			An object to be serialized.
-
-		Returns
-		-------
-		dictionary
-			The serialization of the given object.
+		store : LogStore
+			The LogStore instance holding the window.
+		window : int
+			An integer representing the index of the window in the store.
 		"""
 
-		if isinstance(obj, LOG): 
-			return { "date" : obj.date.strftime(FMT), "domain": obj.domain, "count": obj.count}
-		elif isinstance(obj, datetime): 
-			return { "date" : obj.strftime(FMT)}
-		return json.JSONEncoder.default(self, obj)
-		
+		self.store = store
+		self.window = window
 
-#class Object:        #####should be deleted?
-    #def toJSON(self):
-        #return json.dumps(self, default=lambda o: o.__dict__, 
-            #sort_keys=True, indent=4)
 
-		
-class DATABASE:
+	@property
+	def date(self):
+
+		return EPOCH + timedelta(seconds = self.store.starts[self.window])
+
+
+	@property
+	def domain(self):
+
+		return self.store.domains[self.store.owners[self.window]]
+
+
+	@property
+	def isSuspiciousDomain(self):
+
+		return bool(self.store.suspicious[self.store.owners[self.window]])
+
+
+	@property
+	def count(self):
+
+		return self.store.counts[self.window]
+
+
+	@count.setter
+	def count(self, count):
+
+		self.store.counts[self.window] = count
+
+
+class DomainWindows:
 	"""
-	A class used to represent the database of the logs being parsed.
+	A class used to view the windows of one domain in a LogStore as a list
+	of LOG instances, newest first, the way the logs attribute of DATABASE
+	used to hold them.
 
 	Attributes
 	----------
-	logs : dict
-		A dictionary used to store logs being parsed(default is empty dictionary).
-	numberOfLogs : int
-		An integer representing the number of logs in the database(default is 0).
-	numbersOfDomains : dict
-		A dictionary used to store domains of logs being parsed(default is empty dictionary).
-	countForDomains : dict
-		A dictionary used to store the number of queries per domain(default is empty dictionary).
-	heapCount : lst
-		An auxiliary list used to store domains and adequate number of queries in a heap(default is empty list).
-	heap10Span : lst
-		An auxiliary list used to store domains and adequate number of queries, of a 10 minutes 
-		time span in a heap(default is empty list).
-	offsetInLogFile : int 
-		An integer representing the current file position of the logs file(default is 0).
-	chosenDateSpan : int
-		An integer representing an index into dates structure(default is 2).
-	dateToLook : str
-		A string representing the date of the logs we are interested in.
-	blockedList : lst
-		A list of the domains considered suspicious(default is empty list).
-	blockedListTemp : lst
-		An auxiliary list of domains considered suspicious(default is empty list).
-	approvedList : lst
-		A list of domains approved by the user(default is empty list).
-	terminated : bool
-		A boolean indicating whether the parser is still active.
+	store : LogStore
+		The LogStore instance holding the windows.
+	number : int
+		An integer representing the number of the domain in the store.
 
 	Methods
 	-------
-	AddDomain(number, domain)
-		Inserts value number(passed as a parameter) at key domain(passed as a parameter) in numberOfDomains attribute.
-	ListToLogs(data)
-		Creates a list of logs from data passed as a parameter.
-	ConvertDataToLogs(data)
-		Fills in the logs attribute according to data passed as a parameter.
-	MyConverter(data)
-		An auxiliary method for the gui.py module.
-	CheckAndUpdateCounter(entry, log)
-		Checks whether the log is within a 10 minutes time span.
-	IncTimeSpan()
-		An auxiliary method fot the gui.py module.
-	DecTimeSpan()
-		An auxiliary method for the gui.py module.
-	SetMinTimeSpan()
-		An auxiliary method fot the gui.py module.
-	GetSpanString()
-		An auxiliary method for the gui.py module.
-	GetHistoryOfDomain(domain)
-		An auxiliary method for the gui.py module.
-	UpdateFileBlocked()
-		Automatically blocks suspicious domains. 
-	AddToApprovedList(domain)
-		An auxiliary method for the gui.py module.
-	AddToBlockedList(domain)
-		A method that inserts a domain into the blockedList attribute.
-	RemoveFromApprovedList(domain)
-		An auxiliary method for the gui.py module.
-	RemoveFromBlockedList(domain)
-		An auxiliary method for the gui.py module.
-	GetBlockedList()
-		A getter method for the blockedList attribute.
-	GetApprovedList()
-		A getter method for the approvedList attribute.
-	SetDateToLook(date)
-		A setter method for the dateToLook attribute.
-	GetDateToLook()
-		A getter method for the dateToLook attribute.
-	ResetDateToLook()
-		A method for resetting the dateToLook attribute.
-	GetSpanTime()
-		A method that retrieves a dates structure entry.
-	AddToDatabase(log)
-		A method that adds a log to the database.
-	FindHighestKElements(k)
-		A method that finds the highest given k elements in the heapCount attribute.
-	FindHighestKElements10Min(k)
-		A method that finds the highest given k elements in the heap10Span attribute.
-	CountNumberOfUniqueCharacters(domain)
-		A method that counts the number of unique characters in given domain name.
-	CountNumberOfDigitsInDomainName(domain)
-		A method that counts the number of digits in given domain name.
-	FetchEntryOfDomain(domain)
-		A method that fetches the corresponding logs attribute entry if present.
-	Terminate()
-		A method that sets the terminated attribute to True.
-	ParseIntoLog(date, domain)
-		A method that creates a LOG instance, given date and domain.
-	Parse(fileName)
-		A method that parses a logs file.
+	NewestStart()
+		Returns the start of the newest window in seconds since the epoch.
+	IncrementNewest()
+		Counts one more query in the newest window.
+	IncrementAt(second)
+		Counts one more query, older than the newest window, in the window it belongs to.
+	Open(second, count)
+		Opens a new window for the domain.
+	insert(index, log)
+		Opens a new window from a LOG instance, only index 0 is supported.
 	"""
 
-	def __init__(self):
-
-		self.logs = {}
-		self.numberOfLogs = 0
-		self.numbersOfDomains = {}
-		self.countForDomains = {}
-		self.heapCount = []
-		self.heap10Span = []
-		self.offsetInLogFile = 0
-		self.chosenDateSpan = 2
-		self.dateToLook = datetime.now()
-		self.blockedList = []
-		self.blockedListTemp = []
-		self.approvedList = []
-		self.terminated = False
-	
+	__slots__ = ("store", "number")
 
-	def AddDomain(self, number, domain):
+	def __init__(self, store, number):
 		"""
-		Inserts value number(passed as a parameter) at key domain(passed as a parameter) in numberOfDomains attribute.
-
 		Parameters
 		----------
+		store : LogStore
+			The LogStore instance holding the windows.
 		number : int
-			An integer representing the current number of domains.
-		domain : str
-			A string representing the name of the domain to be inserted.
+			An integer representing the number of the domain in the store.
 		"""
 
-		self.numbersOfDomains[domain] = number
+		self.store = store
+		self.number = number
 
-	
-	def ListToLogs(self, data):
-		"""
-		Creates a list of logs from data passed as a parameter.
 
-		Parameters
-		----------
-		data : lst
-			A list of logs strings.
+	def __len__(self):
 
-		Returns
-		-------
-		lst
-			A list of LOGs instances.
-		"""
+		return self.store.lengths[self.number]
 
-		lst = []
 
-		for mapString in data:
-			lst.append(LOG(datetime.strptime(mapString["date"], FMT), mapString["domain"], count = mapString["count"]))
+	def __iter__(self):
 
-		return lst
+		store = self.store
+		window = store.heads[self.number]
 
-		
-	def ConvertDataToLogs(self, data):
-		"""
-		Fills in the logs attribute according to data passed as a parameter.
+		while window != -1:
+			yield LogView(store, window)
+			window = store.previous[window]
 
-		Parameters
-		----------
-		data : lst
-			A list of strings representing logs that were parsed.
-		"""
 
-		for key, listOfLogString in data.items():
-			self.logs[int(key)] = self.ListToLogs(listOfLogString)
-			
-	
-	def MyConverter(self, data):
-		"""
-		An auxiliary method for the gui.py module, that converts data passed as a parameter
-		and fills the various attributes accordingly.
+	def __getitem__(self, index):
 
-		Parameters
-		----------
-		data : JSON str
-			A JSON string representing data parsed from the logs file.
-		"""
+		if index < 0:
+			index += len(self)
+		if index < 0 or index >= len(self):
+			raise IndexError("window index out of range")
 
-		if not data["logs"]:
-			self.offsetInLogFile = 0
-			return
+		window = self.store.heads[self.number]
+		for i in range(index):
+			window = self.store.previous[window]
 
-		self.ConvertDataToLogs(data["logs"])
-		self.numberOfLogs = data["numberOfLogs"]
-		self.numbersOfDomains = data["numbersOfDomains"]
-		self.countForDomains = data["countForDomains"]
-		self.offsetInLogFile = data["offsetInLogFile"]
-		self.chosenDateSpan = data["chosenDateSpan"]
-		self.blockedList = data["blockedList"]
-		self.approvedList = data["approvedList"]
-		
+		return LogView(self.store, window)
 
-	#def isSameDomain(self, domain1, domain2):   #####Ask whether it's been used.
-		##n2=domain2[:domain2.rfind('.')].rfind('.')
-		#suf1=domain1[domain1.rfind('.'):]
-		#suf2=domain2[domain2.rfind('.'):]
-		#if suf1 == suf2:
-			#if(domain1[n1:]==domain2[n2:]):
-				#return True
-		#return False
-		
-	#def getShortendDomain2Dots(self, domain):    #####Ask whether it's been used.
-		#n1=domain[:domain.rfind('.')].rfind('.')
-		#return domain[n1:]
 
-	
-	def CheckAndUpdateCounter(self, entry, log):
+	def NewestStart(self):
+		"""
+		Returns the start of the newest window in seconds since the epoch.
 		"""
-		Checks whether the log is within a 10 minutes time span, 
-		thus count(LOG attribute) should be updated.
 
-		Parameters
-		----------
-		entry : LOG
-			A LOG instance corresponding to the domain request being examined
-			(belongs to logs attribute).
-		log : LOG
-			A LOG instance representing the most recent log of a corresponding domain.
+		return self.store.starts[self.store.heads[self.number]]
+
+
+	def IncrementNewest(self):
+		"""
+		Counts one more query in the newest window.
 		"""
-		
-		if log.date - entry[0].date  < timedelta(minutes = 10):
-			entry[0].count += 1
-		if log.isSuspiciousDomain and log.date - entry[0].date  < timedelta(minutes = 10):
-			if entry[0].count > 20:
-				self.AddToBlockedList(log.domain)
-		elif log.date - entry[0].date  < timedelta(minutes = 10):
-				if(entry[0].count > 500):
-					self.AddToBlockedList(log.domain)
-		else :
-			entry.insert(0, log)
 
+		self.store.counts[self.store.heads[self.number]] += 1
 
-	def IncTimeSpan(self):
+
+	def IncrementAt(self, second):
 		"""
-		An auxiliary method fot the gui.py module, that increases
-		the time span to focus on.
+		Counts one more query, older than the newest window, in the newest
+		window starting at or before it, or in the oldest window if the
+		query is older than all of them.
 
-		Returns
-		-------
-		bool
-			A boolean respresenting whether the operation was successful.
+		Parameters
+		----------
+		second : int
+			An integer representing the time of the query in seconds since the epoch.
 		"""
 
-		output = False
+		store = self.store
+		window = store.heads[self.number]
 
-		if self.chosenDateSpan < len(dates) - 1:
-			self.chosenDateSpan += 1
-			output = True
+		while store.starts[window] > second and store.previous[window] != -1:
+			window = store.previous[window]
 
-		return output
+		store.counts[window] += 1
 
 
-	def DecTimeSpan(self):
+	def Open(self, second, count = 1):
 		"""
-		An auxiliary method for the gui.py module, that decreases 
-		the time span to focus on.
+		Opens a new window for the domain.
+
+		Parameters
+		----------
+		second : int
+			An integer representing the start of the window in seconds since the epoch.
+		count : int
+			An integer representing the number of queries in the window(default is 1).
 
 		Returns
 		-------
-		bool
-			A boolean respresenting whether the operation was successful.
+		int
+			An integer representing the index of the new window in the store.
 		"""
 
-		output = False
+		return self.store.Open(self.number, second, count)
+
+
+	def insert(self, index, log):
+		"""
+		Opens a new window from a LOG instance, only index 0 is supported.
+		"""
+
+		if index != 0:
+			raise IndexError("windows can only be inserted as the newest")
+		self.Open(ToEpoch(log.date), log.count)
+
+
+class LogStore:
+	"""
+	A class used to keep the windows of all the domains in flat columns.
+	Every window costs a start time, a count, its domain's number and links
+	to the previous and following windows of the same domain, about 24 bytes,
+	and every domain name is kept once. It can be used as the dictionary of
+	lists of LOG instances it replaces: store[number] is a DomainWindows view.
+	Freed windows and domain numbers are reused, smallest first, so the
+	columns don't grow once old windows and cold domains are let go.
+
+	Attributes
+	----------
+	starts : array
+		An array of the start times of the windows in seconds since the epoch.
+	counts : array
+		An array of the numbers of queries in the windows.
+	owners : array
+		An array of the numbers of the domains of the windows.
+	previous : array
+		An array of the indices of the previous window of the same domain, or -1.
+	following : array
+		An array of the indices of the following window of the same domain, or -1.
+	domains : lst
+		A list of the domain names by their number.
+	suspicious : bytearray
+		A bytearray of the isSuspiciousDomain flags of the domains by their number.
+	heads : array
+		An array of the indices of the newest window of every domain, or -1.
+	lengths : array
+		An array of the numbers of windows of every domain.
+	lastSeconds : array
+		An array of the times of the newest query of every domain in seconds since the epoch.
+	freeWindows : lst
+		A heap of the indices of the freed windows, whose owner is -1.
+	freeNumbers : lst
+		A heap of the numbers not held by any domain.
+	nameBytes : int
+		An integer representing the total length of the domain names kept.
+
+	Methods
+	-------
+	AddDomain(number, domain, isSuspiciousDomain)
+		Registers a domain under a number.
+	TakeNumber()
+		Returns the smallest number not held by any domain.
+	Open(number, second, count)
+		Opens a new window for a domain.
+	Free(window)
+		Removes a window from its domain.
+	RemoveDomain(number)
+		Removes a domain and all of its windows.
+	Reindex()
+		Rebuilds the free lists and the following links after the columns were loaded.
+	View(window)
+		Returns a LogView instance of a window.
+	"""
+
+	def __init__(self):
+
+		self.starts = array('q')
+		self.counts = array('i')
+		self.owners = array('i')
+		self.previous = array('i')
+		self.following = array('i')
+		self.domains = []
+		self.suspicious = bytearray()
+		self.heads = array('i')
+		self.lengths = array('i')
+		self.lastSeconds = array('q')
+		self.freeWindows = []
+		self.freeNumbers = []
+		self.nameBytes = 0
+
+
+	def __len__(self):
+
+		return sum(1 for domain in self.domains if domain != None)
+
+
+	def __contains__(self, number):
+
+		return 0 <= number < len(self.domains) and self.domains[number] != None
+
+
+	def __iter__(self):
+
+		return (number for number, domain in enumerate(self.domains) if domain != None)
+
+
+	def __getitem__(self, number):
+
+		if number not in self:
+			raise KeyError(number)
+
+		return DomainWindows(self, number)
+
+
+	def __setitem__(self, number, logs):
+
+		self.AddDomain(number, logs[0].domain, logs[0].isSuspiciousDomain)
+		for log in reversed(logs):
+			self.Open(number, ToEpoch(log.date), log.count)
+
+
+	def __bool__(self):
+
+		return len(self.starts) > 0
+
+
+	def keys(self):
+
+		return list(self)
+
+
+	def values(self):
+
+		return [DomainWindows(self, number) for number in self]
+
+
+	def items(self):
+
+		return [(number, DomainWindows(self, number)) for number in self]
+
+
+	def AddDomain(self, number, domain, isSuspiciousDomain = False):
+		"""
+		Registers a domain under a number.
+
+		Parameters
+		----------
+		number : int
+			An integer representing the number of the domain.
+		domain : str
+			A string representing the domain name.
+		isSuspiciousDomain : bool
+			A boolean flag indicating whether the domain is considerd suspicious(default is False).
+		"""
+
+		while len(self.domains) <= number:
+			self.domains.append(None)
+			self.suspicious.append(0)
+			self.heads.append(-1)
+			self.lengths.append(0)
+			self.lastSeconds.append(0)
+		if self.domains[number] != None:
+			self.nameBytes -= len(self.domains[number])
+		self.domains[number] = domain
+		self.suspicious[number] = 1 if isSuspiciousDomain else 0
+		self.lastSeconds[number] = 0
+		self.nameBytes += len(domain)
+
+
+	def TakeNumber(self):
+		"""
+		Returns the smallest number not held by any domain. The number
+		must be registered with AddDomain right away.
+
+		Returns
+		-------
+		int
+			An integer representing a free number.
+		"""
+
+		if self.freeNumbers:
+			return heapq.heappop(self.freeNumbers)
+
+		return len(self.domains)
+
+
+	def Open(self, number, second, count = 1):
+		"""
+		Opens a new window for a domain.
+
+		Parameters
+		----------
+		number : int
+			An integer representing the number of the domain.
+		second : int
+			An integer representing the start of the window in seconds since the epoch.
+		count : int
+			An integer representing the number of queries in the window(default is 1).
+
+		Returns
+		-------
+		int
+			An integer representing the index of the new window.
+		"""
+
+		previous = self.heads[number]
+
+		if self.freeWindows:
+			window = heapq.heappop(self.freeWindows)
+			self.starts[window] = second
+			self.counts[window] = count
+			self.owners[window] = number
+			self.previous[window] = previous
+			self.following[window] = -1
+		else:
+			window = len(self.starts)
+			self.starts.append(second)
+			self.counts.append(count)
+			self.owners.append(number)
+			self.previous.append(previous)
+			self.following.append(-1)
+
+		if previous != -1:
+			self.following[previous] = window
+		self.heads[number] = window
+		self.lengths[number] += 1
+		if second > self.lastSeconds[number]:
+			self.lastSeconds[number] = second
+
+		return window
+
+
+	def Free(self, window):
+		"""
+		Removes a window from its domain. Its start is kept until the
+		window is reused, so it can still be found in the time index.
+
+		Parameters
+		----------
+		window : int
+			An integer representing the index of the window.
+		"""
+
+		number = self.owners[window]
+		previous = self.previous[window]
+		following = self.following[window]
+
+		if following != -1:
+			self.previous[following] = previous
+		else:
+			self.heads[number] = previous
+		if previous != -1:
+			self.following[previous] = following
+
+		self.lengths[number] -= 1
+		self.owners[window] = -1
+		self.counts[window] = 0
+		self.previous[window] = -1
+		self.following[window] = -1
+		heapq.heappush(self.freeWindows, window)
+
+
+	def RemoveDomain(self, number):
+		"""
+		Removes a domain and all of its windows, and frees its number.
+
+		Parameters
+		----------
+		number : int
+			An integer representing the number of the domain.
+
+		Returns
+		-------
+		lst
+			A list of the indices of the windows freed.
+		"""
+
+		windows = []
+		window = self.heads[number]
+
+		while window != -1:
+			windows.append(window)
+			window = self.previous[window]
+		for window in windows:
+			self.Free(window)
+
+		self.nameBytes -= len(self.domains[number])
+		self.domains[number] = None
+		self.suspicious[number] = 0
+		heapq.heappush(self.freeNumbers, number)
+
+		return windows
+
+
+	def Reindex(self):
+		"""
+		Rebuilds the free lists, the following links and the nameBytes
+		attribute after the columns were loaded in bulk. The lastSeconds
+		attribute, if it wasn't loaded, is set to the start of the newest
+		window of every domain.
+		"""
+
+		self.freeWindows = [window for window, number in enumerate(self.owners) if number == -1]
+		self.freeNumbers = [number for number, domain in enumerate(self.domains) if domain == None]
+		self.nameBytes = sum(len(domain) for domain in self.domains if domain != None)
+
+		if len(self.lastSeconds) != len(self.domains):
+			self.lastSeconds = array('q', [self.starts[head] if head != -1 else 0 for head in self.heads])
+
+		if len(self.following) != len(self.starts):
+			self.following = array('i', [-1]) * len(self.starts)
+			for window, previous in enumerate(self.previous):
+				if previous != -1:
+					self.following[previous] = window
+
+
+	def View(self, window):
+		"""
+		Returns a LogView instance of a window.
+
+		Parameters
+		----------
+		window : int
+			An integer representing the index of the window.
+
+		Returns
+		-------
+		LogView
+			A view of the window.
+		"""
+
+		return LogView(self, window)
+
+
+class TimestampDecoder:
+	"""
+	A class used to decode the "Mon DD HH:MM:SS" timestamps of dnsmasq logs.
+	dnsmasq doesn't log the year, so it is inferred from a reference clock
+	and advanced whenever the month goes back by more than MONTH_SKEW
+	months, e.g. from December to January, or from November to February
+	across a gap in the logs.
+	Decoded timestamps are cached by their raw text, since many consecutive
+	lines share the same second.
+
+	Attributes
+	----------
+	referenceClock : function
+		A function returning the current datetime, used to infer the year(default is datetime.now).
+	cacheSize : int
+		An integer representing the maximal number of cached timestamps(default is 4096).
+	year : int
+		An integer representing the year of the most recent timestamp(default is None).
+	lastMonth : int
+		An integer representing the month of the most recent timestamp(default is None).
+	cache : dict
+		A dictionary used to store decoded timestamps by their raw text(default is empty dictionary).
+	stamps : dict
+		A dictionary used to store (month, datetime) tuples of timestamps by their raw bytes(default is empty dictionary).
+
+	Methods
+	-------
+	Decode(month, day, clock)
+		Decodes a timestamp given as its three log tokens.
+	DecodeString(date)
+		Decodes a timestamp given as a single "Mon DD HH:MM:SS" string.
+	DecodeStamp(stamp)
+		Decodes the timestamp at the start of the bytes of a line.
+	"""
+
+	def __init__(self, referenceClock = datetime.now, cacheSize = 4096):
+		"""
+		Parameters
+		----------
+		referenceClock : function
+			A function returning the current datetime, used to infer the year(default is datetime.now).
+		cacheSize : int
+			An integer representing the maximal number of cached timestamps(default is 4096).
+		"""
+
+		self.referenceClock = referenceClock
+		self.cacheSize = cacheSize
+		self.year = None
+		self.lastMonth = None
+		self.cache = {}
+		self.stamps = {}
+
+
+	def InferYear(self, month):
+		"""
+		A method that infers the year of a timestamp given its month. A
+		month at most MONTH_SKEW months behind the latest one is a late
+		line, e.g. December right after January is of the previous year,
+		and leaves the latest month as it is. A month further behind is
+		of the next year.
+
+		Parameters
+		----------
+		month : int
+			An integer representing the month of the timestamp.
+
+		Returns
+		-------
+		int
+			An integer representing the year of the timestamp.
+		"""
+
+		if self.year == None:
+			reference = self.referenceClock()
+			self.year = reference.year
+			if month > reference.month:
+				self.year -= 1
+		elif month != self.lastMonth:
+			if (self.lastMonth - month) % 12 <= MONTH_SKEW:
+				return self.year - 1 if month > self.lastMonth else self.year
+			if month < self.lastMonth:
+				self.year += 1
+				self.cache = {}
+				self.stamps = {}
+		self.lastMonth = month
+
+		return self.year
+
+
+	def Decode(self, month, day, clock):
+		"""
+		Decodes a timestamp given as its three log tokens.
+
+		Parameters
+		----------
+		month : str
+			A string representing the month, e.g. "Jan".
+		day : str
+			A string representing the day of the month, with or without a leading zero.
+		clock : str
+			A string representing the time of day, e.g. "13:04:59".
+
+		Returns
+		-------
+		datetime
+			A datetime instance corresponding to the given timestamp.
+		"""
+
+		key = month + day + clock
+		date = self.cache.get(key)
+
+		if date == None or (MONTHS[month] != self.lastMonth):
+			monthNumber = MONTHS[month]
+			year = self.InferYear(monthNumber)
+			if date == None or date.year != year:
+				date = datetime(year, monthNumber, int(day), int(clock[0:2]), int(clock[3:5]), int(clock[6:8]))
+				if len(self.cache) >= self.cacheSize:
+					self.cache = {}
+				self.cache[key] = date
+
+		return date
+
+
+	def DecodeString(self, date):
+		"""
+		Decodes a timestamp given as a single "Mon DD HH:MM:SS" string.
+
+		Parameters
+		----------
+		date : str
+			A string representing a date.
+
+		Returns
+		-------
+		datetime
+			A datetime instance corresponding to the given timestamp.
+		"""
+
+		month, day, clock = date.split()
+
+		return self.Decode(month, day, clock)
+
+
+	def DecodeStamp(self, stamp):
+		"""
+		Decodes the timestamp at the start of the bytes of a line, e.g.
+		b"Jan  1 00:00:00 dnsmasq[1234". The dates are cached by the first
+		15 bytes as well, so most lines skip decoding and splitting them.
+
+		Parameters
+		----------
+		stamp : bytes
+			The bytes of the start of a line.
+
+		Returns
+		-------
+		datetime
+			A datetime instance corresponding to the timestamp.
+		"""
+
+		key = stamp[:15]
+		entry = self.stamps.get(key)
+
+		if entry != None and entry[0] == self.lastMonth:
+			return entry[1]
+
+		tokens = stamp.decode("ascii").split(None, 3)[:3]
+		if len(tokens) < 3:
+			raise ValueError("no timestamp in " + repr(stamp))
+		date = self.Decode(tokens[0], tokens[1], tokens[2])
+		if len(self.stamps) >= self.cacheSize:
+			self.stamps = {}
+		self.stamps[key] = (MONTHS[tokens[0]], date)
+
+		return date
+
+
+class MyEncoder(json.JSONEncoder):
+	"""
+	A class used to subclass JSONEncoder in order to implement a custom serialization.
+
+	Methods
+	-------
+	default(obj)
+		Serializes the object passed as a parameter. 
+	"""
+	
+	def default(self, obj):
+		"""
+		Serializes the object passed as a parameter in a custom manner.
+		If the object is not an instance of classes LOG or datetime, it will be serialized
+		by JSONEncoder's default method. 
+
+		Parameters
+		----------
+		obj : object
+			An object to be serialized.
+
+		Returns
+		-------
+		dictionary
+			The serialization of the given object.
+		"""
+
+		if isinstance(obj, LOG): 
+			return { "date" : obj.date.strftime(FMT), "domain": obj.domain, "count": obj.count}
+		elif isinstance(obj, datetime): 
+			return { "date" : obj.strftime(FMT)}
+		elif isinstance(obj, DomainList):
+			return obj.ToList()
+		elif isinstance(obj, LogStore):
+			return dict(obj.items())
+		elif isinstance(obj, DomainWindows):
+			return list(obj)
+		elif isinstance(obj, (TimestampDecoder, TimeBucketIndex, LiveTopK, RateDetector, SubdomainCounter, LexicalScorer, VerdictCache, BlocklistPublisher, Journal, Retention, Metrics, IngestPipeline, QueryTypes, ReadView, SourceSet)):
+			return None
+		return json.JSONEncoder.default(self, obj)
+		
+
+#class Object:        #####should be deleted?
+    #def toJSON(self):
+        #return json.dumps(self, default=lambda o: o.__dict__, 
+            #sort_keys=True, indent=4)
+
+		
+class DATABASE:
+	"""
+	A class used to represent the database of the logs being parsed.
+
+	Attributes
+	----------
+	logs : LogStore
+		A LogStore instance used to store logs being parsed, it is used as a dictionary
+		of lists of LOG instances(default is empty).
+	numberOfLogs : int
+		An integer representing the number of logs in the database(default is 0).
+	numbersOfDomains : dict
+		A dictionary used to store domains of logs being parsed(default is empty dictionary).
+	countForDomains : dict
+		A dictionary used to store the number of queries per domain(default is empty dictionary).
+	heapCount : lst
+		An auxiliary list used to store domains and adequate number of queries in a heap(default is empty list).
+	heap10Span : lst
+		An auxiliary list used to store domains and adequate number of queries, of a 10 minutes 
+		time span in a heap(default is empty list).
+	offsetInLogFile : int 
+		An integer representing the current file position of the logs file(default is 0).
+	chosenDateSpan : int
+		An integer representing an index into dates structure(default is 2).
+	dateToLook : str
+		A string representing the date of the logs we are interested in.
+	blockedList : DomainList
+		A list of the domains considered suspicious(default is empty list).
+	approvedList : DomainList
+		A list of domains approved by the user(default is empty list).
+	terminated : bool
+		A boolean indicating whether the parser was terminated.
+	pipeline : IngestPipeline
+		An IngestPipeline instance following the logs file, see Parse(default is None).
+	timestampDecoder : TimestampDecoder
+		A TimestampDecoder instance used to decode the dates of the logs.
+	timeIndex : TimeBucketIndex
+		A TimeBucketIndex instance used to answer time span queries without scanning logs.
+	liveTopK : LiveTopK
+		A LiveTopK instance holding the query counts of the live window, of the default time span.
+	idleSecond : int
+		An integer representing the newest bucket of the liveTopK attribute when the idle expiry last saw it changing(default is None).
+	idleSince : float
+		A float representing the monotonic time at which the idleSecond attribute was set(default is None).
+	rateDetector : RateDetector
+		A RateDetector instance counting the queries of every domain in a sliding window.
+	subdomainCounter : SubdomainCounter
+		A SubdomainCounter instance estimating the distinct names queried under every parent domain in a sliding window.
+	subdomainThreshold : int
+		An integer representing the number of distinct children in the window above which a parent
+		domain is reported(default is SUBDOMAIN_THRESHOLD).
+	subdomainBlocking : bool
+		A boolean representing whether the parent domains reported are blocked as well, with
+		a wildcard entry, or only reported(default is False).
+	subdomainAlerts : dict
+		A dictionary mapping the parent domains reported to the time, in seconds since the epoch,
+		they first crossed the subdomainThreshold attribute(default is empty).
+	lexicalScorer : LexicalScorer
+		A LexicalScorer instance deciding in batches which domain names are suspicious.
+	verdictCache : VerdictCache
+		A VerdictCache instance remembering the verdicts of the most recently queried names.
+	publisher : BlocklistPublisher
+		A BlocklistPublisher instance enforcing the blocked list on dnsmasq.
+	journal : Journal
+		A Journal instance recording the changes made to the database, see snapshot.Resume(default is None).
+	retention : Retention
+		A Retention instance rolling up old windows and evicting cold domains.
+	metrics : Metrics
+		A Metrics instance counting the lines parsed and timing every stage, see EnableMetrics(default is None).
+	queryTypes : QueryTypes
+		A QueryTypes instance holding the record types parsed into logs, their weights and counts.
+	readView : ReadView
+		A ReadView instance the aggregates are published to while the pipeline attribute runs, so
+		readers on other threads don't read the live structures, or None to always read them.
+	sources : SourceSet
+		A SourceSet instance following several logs files, see Parse(default is None).
+	sourceOffsets : dict
+		A dictionary mapping the logs file names followed together to their committed offsets(default is empty dictionary).
+
+	Methods
+	-------
+	AddDomain(number, domain)
+		Inserts value number(passed as a parameter) at key domain(passed as a parameter) in numberOfDomains attribute.
+	ListToLogs(data)
+		Creates a list of logs from data passed as a parameter.
+	ConvertDataToLogs(data)
+		Fills in the logs attribute according to data passed as a parameter.
+	MyConverter(data)
+		An auxiliary method for the gui.py module.
+	RebuildTimeIndex()
+		Rebuilds the timeIndex attribute from the logs attribute.
+	CheckAndUpdateCounter(entry, log)
+		Updates the 10 minutes window of the domain shown in its history.
+	IncTimeSpan()
+		An auxiliary method fot the gui.py module.
+	DecTimeSpan()
+		An auxiliary method for the gui.py module.
+	SetMinTimeSpan()
+		An auxiliary method fot the gui.py module.
+	GetSpanString()
+		An auxiliary method for the gui.py module.
+	GetHistoryOfDomain(domain)
+		An auxiliary method for the gui.py module.
+	UpdateFileBlocked()
+		Automatically blocks suspicious domains. 
+	AddToApprovedList(domain)
+		An auxiliary method for the gui.py module.
+	AddToBlockedList(domain)
+		A method that inserts a domain into the blockedList attribute.
+	RemoveFromApprovedList(domain)
+		An auxiliary method for the gui.py module.
+	RemoveFromBlockedList(domain)
+		An auxiliary method for the gui.py module.
+	GetBlockedList()
+		A getter method for the blockedList attribute.
+	GetApprovedList()
+		A getter method for the approvedList attribute.
+	SetDateToLook(date)
+		A setter method for the dateToLook attribute.
+	GetDateToLook()
+		A getter method for the dateToLook attribute.
+	ResetDateToLook()
+		A method for resetting the dateToLook attribute.
+	GetSpanTime()
+		A method that retrieves a dates structure entry.
+	AddToDatabase(log)
+		A method that adds a log to the database.
+	FindHighestKElements(k)
+		A method that finds the highest given k elements in the heapCount attribute.
+	FindHighestKElements10Min(k)
+		A method that finds the highest given k elements in the heap10Span attribute.
+	FindLiveHighestKElements(k)
+		A method that finds the highest given k elements in the live window.
+	FindHighestKRegisteredDomains(k)
+		A method that finds the k registered domains with the most queries in the time span.
+	FindHighestKSubdomains(k)
+		A method that finds the k parent domains with the most distinct children in the live window.
+	GetDistinctChildren(domain)
+		A method that estimates the distinct children of a parent domain in the live window.
+	SetSubdomainThreshold(threshold, blocking)
+		A setter method for the subdomainThreshold and subdomainBlocking attributes.
+	GetSubdomainAlerts()
+		A getter method for the subdomainAlerts attribute.
+	GetRetentionCounters()
+		A getter method for the counters of the retention attribute.
+	GetVerdictCounters()
+		A getter method for the counters of the verdictCache attribute.
+	GetQueryTypeCounters()
+		A getter method for the number of queries parsed per record type.
+	GetReadViewCounters()
+		A getter method for the counters of the readView attribute.
+	GetSourceCounters()
+		A getter method for the counters of the sources attribute.
+	CountNumberOfUniqueCharacters(domain)
+		A method that counts the number of unique characters in given domain name.
+	CountNumberOfDigitsInDomainName(domain)
+		A method that counts the number of digits in given domain name.
+	FetchEntryOfDomain(domain)
+		A method that fetches the corresponding logs attribute entry if present.
+	CommitJournal()
+		A method that commits the changes made since the last call into the journal attribute.
+	Terminate()
+		A method that sets the terminated attribute to True and stops the pipeline attribute.
+	GetPipelineCounters()
+		A getter method for the counters of the pipeline attribute.
+	EnableMetrics(metrics)
+		A method that starts counting and timing the parsing into a Metrics instance.
+	CollectMetrics()
+		A method that computes the gauges of the metrics attribute on the aggregator.
+	ComputeGauges()
+		A method that computes the gauges of the metrics attribute.
+	SpanKey()
+		A method that returns the time span the span aggregates are computed for.
+	SpanCounts()
+		A method that returns the query counts of every domain in the time span.
+	SpanWindows()
+		A method that yields the 10 minutes windows in the time span.
+	TopSpanWindows(k)
+		A method that finds the k 10 minutes windows with the highest counts in the time span.
+	ReadSnapshot(aggregate, key)
+		A method that returns the snapshot of the readView attribute a reader should query, if any.
+	PublishSnapshot()
+		A method that publishes a new snapshot of the aggregates into the readView attribute, if one is due.
+	VerdictState()
+		A method that returns the state the verdicts of the verdictCache attribute depend on.
+	Verdict(domain, isSuspiciousDomain)
+		A method that decides whether a queried name is suspicious, and the domain it is counted under.
+	ParseIntoLog(date, domain, isSuspiciousDomain)
+		A method that creates a LOG instance, given date and domain.
+	ParseQuery(line)
+		A method that parses a line of the logs file into a date and a queried name.
+	ParseLine(line)
+		A method that parses a line of the logs file into a LOG instance.
+	ParseLines(lines)
+		A method that parses a batch of lines of the logs file into LOG instances.
+	ParseChunk(chunk)
+		A method that parses the bytes of a batch of lines of the logs file into LOG instances.
+	QueriesToLogs(queries)
+		A method that creates the LOG instances of a batch of queries.
+	ParseAvailable(follower)
+		A method that parses all the complete lines currently in a logs file.
+	AddLogs(logs)
+		A method that adds a batch of logs to the database.
+	ExpireLiveWindow()
+		A method that expires the old queries of the liveTopK attribute.
+	ReadChunk(follower)
+		A method that reads the bytes of the complete lines added to a logs file since the last call.
+	ReadLines(follower)
+		A method that reads the complete lines added to a logs file since the last call.
+	Parse(fileName)
+		A method that parses a logs file, or several logs files at once.
+	"""
+
+	def __init__(self):
+
+		self.logs = LogStore()
+		self.numberOfLogs = 0
+		self.numbersOfDomains = {}
+		self.countForDomains = {}
+		self.heapCount = []
+		self.heap10Span = []
+		self.offsetInLogFile = 0
+		self.chosenDateSpan = 2
+		self.dateToLook = datetime.now()
+		self.blockedList = DomainList()
+		self.approvedList = DomainList()
+		self.terminated = False
+		self.pipeline = None
+		self.timestampDecoder = TimestampDecoder()
+		self.timeIndex = TimeBucketIndex()
+		self.liveTopK = LiveTopK(self.GetSpanTime())
+		self.idleSecond = None
+		self.idleSince = None
+		self.rateDetector = RateDetector()
+		self.subdomainCounter = SubdomainCounter()
+		self.subdomainThreshold = SUBDOMAIN_THRESHOLD
+		self.subdomainBlocking = False
+		self.subdomainAlerts = {}
+		self.lexicalScorer = LexicalScorer()
+		self.verdictCache = VerdictCache()
+		self.publisher = BlocklistPublisher()
+		self.journal = None
+		self.retention = Retention()
+		self.metrics = None
+		self.queryTypes = QueryTypes()
+		self.readView = ReadView()
+		self.sources = None
+		self.sourceOffsets = {}
+	
+
+	def AddDomain(self, number, domain):
+		"""
+		Inserts value number(passed as a parameter) at key domain(passed as a parameter) in numberOfDomains attribute.
+
+		Parameters
+		----------
+		number : int
+			An integer representing the current number of domains.
+		domain : str
+			A string representing the name of the domain to be inserted.
+		"""
+
+		self.numbersOfDomains[domain] = number
+
+	
+	def ListToLogs(self, data):
+		"""
+		Creates a list of logs from data passed as a parameter.
+
+		Parameters
+		----------
+		data : lst
+			A list of logs strings.
+
+		Returns
+		-------
+		lst
+			A list of LOGs instances.
+		"""
+
+		lst = []
+
+		for mapString in data:
+			lst.append(LOG(datetime.strptime(mapString["date"], FMT), mapString["domain"], count = mapString["count"]))
+
+		return lst
+
+		
+	def ConvertDataToLogs(self, data):
+		"""
+		Fills in the logs attribute according to data passed as a parameter.
+
+		Parameters
+		----------
+		data : lst
+			A list of strings representing logs that were parsed.
+		"""
+
+		for key, listOfLogString in data.items():
+			self.logs[int(key)] = self.ListToLogs(listOfLogString)
+			
+	
+	def MyConverter(self, data):
+		"""
+		An auxiliary method for the gui.py module, that converts data passed as a parameter
+		and fills the various attributes accordingly.
+
+		Parameters
+		----------
+		data : JSON str
+			A JSON string representing data parsed from the logs file.
+		"""
+
+		if not data["logs"]:
+			self.offsetInLogFile = 0
+			return
+
+		self.ConvertDataToLogs(data["logs"])
+		self.logs.Reindex()
+		self.numberOfLogs = data["numberOfLogs"]
+		self.numbersOfDomains = data["numbersOfDomains"]
+		self.countForDomains = data["countForDomains"]
+		self.offsetInLogFile = data["offsetInLogFile"]
+		self.sourceOffsets = data.get("sourceOffsets", {})
+		self.chosenDateSpan = data["chosenDateSpan"]
+		self.blockedList = DomainList(data["blockedList"])
+		self.approvedList = DomainList(data["approvedList"])
+		self.subdomainAlerts = data.get("subdomainAlerts", {})
+		self.RebuildTimeIndex()
+
+
+	def RebuildTimeIndex(self):
+		"""
+		Rebuilds the timeIndex attribute from the logs attribute.
+		Restored logs only carry the count of their 10 minutes window,
+		so all of its queries are counted at the start of the window.
+		"""
+
+		self.timeIndex = TimeBucketIndex()
+
+		store = self.logs
+
+		for window in range(len(store.starts)):
+			if store.owners[window] == -1:
+				continue
+			self.timeIndex.AddWindow(window, store.starts[window])
+			self.timeIndex.AddQuery(store.domains[store.owners[window]], store.starts[window], store.counts[window])
+		
+
+	#def isSameDomain(self, domain1, domain2):   #####Ask whether it's been used.
+		##n2=domain2[:domain2.rfind('.')].rfind('.')
+		#suf1=domain1[domain1.rfind('.'):]
+		#suf2=domain2[domain2.rfind('.'):]
+		#if suf1 == suf2:
+			#if(domain1[n1:]==domain2[n2:]):
+				#return True
+		#return False
+		
+	#def getShortendDomain2Dots(self, domain):    #####Ask whether it's been used.
+		#n1=domain[:domain.rfind('.')].rfind('.')
+		#return domain[n1:]
+
+	
+	def CheckAndUpdateCounter(self, entry, log):
+		"""
+		Checks whether the log is within the current 10 minutes window
+		of the domain, thus count(LOG attribute) should be updated, or
+		opens a new window. A log older than the current window, which
+		may come from a logs file whose clock is behind, is counted in
+		the window it falls in. These windows only make up the history of
+		the domain, blocking is decided by the rateDetector attribute
+		on a sliding window.
+
+		Parameters
+		----------
+		entry : DomainWindows
+			The windows of the domain request being examined
+			(belongs to logs attribute).
+		log : LOG
+			A LOG instance representing the most recent log of a corresponding domain,
+			or a log older than it, merged late from another logs file(see multisource.SourceSet).
+		"""
+		
+		second = ToEpoch(log.date)
+		newest = entry.NewestStart()
+
+		if second < newest:
+			entry.IncrementAt(second)
+		elif second - newest < WINDOW_SECONDS:
+			entry.IncrementNewest()
+		else :
+			self.timeIndex.AddWindow(entry.Open(second), second)
+
+
+	def IncTimeSpan(self):
+		"""
+		An auxiliary method fot the gui.py module, that increases
+		the time span to focus on.
+
+		Returns
+		-------
+		bool
+			A boolean respresenting whether the operation was successful.
+		"""
+
+		output = False
+
+		if self.chosenDateSpan < len(dates) - 1:
+			self.chosenDateSpan += 1
+			output = True
+
+		return output
+
+
+	def DecTimeSpan(self):
+		"""
+		An auxiliary method for the gui.py module, that decreases 
+		the time span to focus on.
+
+		Returns
+		-------
+		bool
+			A boolean respresenting whether the operation was successful.
+		"""
+
+		output = False
 
 		if self.chosenDateSpan > 0:
 			self.chosenDateSpan -= 1
 			output = True
 
-		return output
+		return output
+
+	
+	def SetMinTimeSpan(self):
+		"""
+		An auxiliary method fot the gui.py module, that resets 
+		the chosenDateSpan attribute.
+		"""
+		self.chosenDateSpan = 0
+
+
+	def GetSpanString(self):
+		"""
+		An auxiliary method for the gui.py module, that returns 
+		a string representation of a dates structure entry.
+
+		Returns
+		-------
+		str
+			A string representing a time span.
+		"""
+
+		return dates[self.chosenDateSpan][0]
+
+
+	def GetHistoryOfDomain(self, domain):
+		"""
+		An auxiliary method for the gui.py module, that returns 
+		an adequate logs attribute entry.
+
+		Parameters
+		----------
+		domain : str
+			A string representing a domain name.
+
+		Returns
+		-------
+		LOG
+			A LOG instance corresponding to given domain name.
+		"""
+
+		snapshot = self.ReadSnapshot(("history", domain))
+		if snapshot != None and not snapshot.Holds(("history", domain)):
+			return self.pipeline.Call(self.GetHistoryOfDomain, domain)
+		if snapshot != None:
+			history = snapshot.Get(("history", domain))
+			return None if history == None else list(history)
+
+		return self.FetchEntryOfDomain(domain)
+
+	
+	def UpdateFileBlocked(self):
+		"""
+		Automatically blocks suspicious domains. The blocked list is handed
+		to the publisher attribute, which rewrites the dnsmasq hosts file and
+		reloads dnsmasq on its own thread, once per batch of changes.
+		"""
+
+		self.publisher.Publish(self.blockedList)
+
+
+	def AddToApprovedList(self, domain):
+		"""
+		An auxiliary method for the gui.py module, that inserts 
+		a domain into the approvedList attribute.
+
+		Parameters
+		----------
+		domain : str
+			A string representing a domain name to be added to
+			the approvedList attribute.
+		"""
+
+		if domain not in self.blockedList:
+			if self.approvedList.Add(domain) and self.journal != None:
+				self.journal.ChangeList(APPROVE, domain)
+
+
+	def AddToBlockedList(self, domain):
+		"""
+		A method that inserts a domain into the blockedList attribute,
+		unless it is approved or under an approved wildcard entry.
+
+		Parameters
+		----------
+		domain : str
+			A string representing a domain name to be added to
+			the blockedList attribute.
+		"""
+
+		if not self.approvedList.Matches(domain): 
+			if self.blockedList.Add(domain):
+				if self.journal != None:
+					self.journal.ChangeList(BLOCK, domain)
+				if self.metrics != None:
+					self.metrics.Inc("blocks_total", "wildcard" if domain.startswith(WILDCARD_PREFIX) else "host")
+				self.UpdateFileBlocked()
+				
+
+	def RemoveFromApprovedList(self, domain):
+		"""
+		An auxiliary method for the gui.py module, that removes 
+		a domain from the approvedList attribute if present.
+
+		Parameters
+		----------
+		domain : str
+			A string representing a domain name to be removed
+			from the approvedList attribute.
+		"""
+
+		if self.approvedList.Remove(domain) and self.journal != None:
+			self.journal.ChangeList(UNAPPROVE, domain)
+
+
+	def RemoveFromBlockedList(self, domain):
+		"""
+		An auxiliary method for the gui.py module, that removes 
+		a domain from the blockedList attribute if present.
+
+		Parameters
+		----------
+		domain : str
+			A string representing a domain name to be removed
+			from the blockedList attribute.
+		"""
+
+		if self.blockedList.Remove(domain):
+			if self.journal != None:
+				self.journal.ChangeList(UNBLOCK, domain)
+			self.UpdateFileBlocked()
+
+
+	def GetBlockedList(self):
+		"""
+		A getter method for the blockedList attribute.
+
+		Returns
+		-------
+		lst
+			A list of domain names(strings) representing the
+			blockedList attribute, in insertion order.
+		"""
+
+		snapshot = self.ReadSnapshot("blocked")
+		if snapshot != None and not snapshot.Holds("blocked"):
+			return self.pipeline.Call(self.GetBlockedList)
+		if snapshot != None:
+			return list(snapshot.Get("blocked"))
+
+		return self.blockedList.ToList()
+
+
+	def GetApprovedList(self):
+		"""
+		A getter method for the approvedList attribute.
+
+		Returns
+		-------
+		lst
+			A list of domain names(strings) representing the
+			approvedList attribute, in insertion order.
+		"""
+
+		snapshot = self.ReadSnapshot("approved")
+		if snapshot != None and not snapshot.Holds("approved"):
+			return self.pipeline.Call(self.GetApprovedList)
+		if snapshot != None:
+			return list(snapshot.Get("approved"))
+
+		return self.approvedList.ToList()
+
+		
+	def SetDateToLook(self, date):
+		"""
+		A setter method for the dateToLook attribute.
+
+		Parameters
+		----------
+		date : str
+			A string representing a date to be set.
+		"""
+
+		date = datetime.strptime(date, FMT)
+		self.dateToLook = date
+
+
+	def GetDateToLook(self):
+		"""
+		A getter method for the dateToLook attribute.
+
+		Returns
+		-------
+		str
+			A string representing the dateToLook attribute.
+		"""
+
+		return self.dateToLook
+
+
+	def ResetDateToLook(self):
+		"""
+		A method for resetting the dateToLook attribute.
+		"""
+
+		self.dateToLook = datetime.now()
+
+
+	def GetSpanTime(self):
+		"""
+		A method that retrieves a dates structure entry.
+
+		Returns
+		-------
+		str
+			A string representing a date.
+		"""
+
+		return dates[self.chosenDateSpan][1]
+
+
+	def AddToDatabase(self, log):
+		"""
+		A method that adds a log to the database, and blocks its
+		domain once the queries in the sliding window cross the threshold.
+		The queried name is counted under its parent domain as well, and
+		the parent is blocked as a wildcard once it has too many distinct
+		children in the window.
+
+		Parameters
+		----------
+		log : LOG
+			A LOG instance representing a log that was parsed
+			from the logs file.
+		"""
+
+		number = self.numbersOfDomains.get(log.domain)
+		second = ToEpoch(log.date)
+		
+		if number == None:
+			shortendDomain = log.domain
+			number = self.logs.TakeNumber()
+			self.logs.AddDomain(number, shortendDomain, log.isSuspiciousDomain)
+			self.timeIndex.AddWindow(self.logs.Open(number, second), second)
+			self.AddDomain(number, shortendDomain)
+			self.countForDomains[shortendDomain] = 1
+			self.numberOfLogs += 1
+			if self.journal != None:
+				self.journal.AddDomain(number, shortendDomain, log.isSuspiciousDomain)
+		else:
+			shortendDomain = self.logs.domains[number]
+			self.CheckAndUpdateCounter(DomainWindows(self.logs, number), log)
+			self.countForDomains[shortendDomain] += 1
+			if second > self.logs.lastSeconds[number]:
+				self.logs.lastSeconds[number] = second
+
+		if self.journal != None:
+			self.journal.AddQuery(number, second, log.name, log.weight)
+
+		self.timeIndex.AddQuery(shortendDomain, second)
+		self.liveTopK.Add(shortendDomain, second)
+		self.retention.Check(self, second)
+
+		if log.name != None:
+			parent = self.subdomainCounter.Add(log.name, second)
+			if parent != None and not self.approvedList.Matches(parent):
+				self.ReportParent(parent, second)
+
+		if self.approvedList.Matches(shortendDomain):
+			return
+
+		if self.rateDetector.Update(shortendDomain, second, log.isSuspiciousDomain, log.weight):
+			self.AddToBlockedList(shortendDomain)
+
+
+	def FindHighestKElements(self, k):
+		"""
+		A method that finds the highest given k elements in 
+		the heapCount attribute.
+
+		Parameters
+		----------
+		k : int
+			An integer representing the number of highest
+			elements to be found.
+
+		Returns
+		-------
+		lst
+			A list representing the given k highest elements, at most
+			readView.topK of them while the logs file is followed.
+		"""
+
+		key = self.SpanKey()
+		snapshot = self.ReadSnapshot("span", key)
+		if snapshot != None and not snapshot.Holds("span", key):
+			return self.pipeline.Call(self.FindHighestKElements, k)
+		if snapshot != None:
+			self.heapCount = list(snapshot.Get("span"))
+			heapq.heapify(self.heapCount)
+			return list(snapshot.Get("span")[:k])
+
+		self.heapCount = [(count, domain) for domain, count in self.SpanCounts().items() if count > 0]
+		heapq.heapify(self.heapCount)
+
+		return heapq.nlargest(k, self.heapCount)
+
+
+	def FindHighestKElements10Min(self, k):
+		"""
+		A method that finds the highest given k elements in 
+		the heap10Span attribute.
+
+		Parameters
+		----------
+		k : int
+			An integer representing the number of highest
+			elements to be found.
+
+		Returns
+		-------
+		lst
+			A list representing the given k highest elements, at most
+			readView.topK of them while the logs file is followed.
+		"""
+
+		key = self.SpanKey()
+		snapshot = self.ReadSnapshot("span10", key)
+		if snapshot != None and not snapshot.Holds("span10", key):
+			return self.pipeline.Call(self.FindHighestKElements10Min, k)
+		if snapshot != None:
+			self.heap10Span = list(snapshot.Get("span10"))
+			heapq.heapify(self.heap10Span)
+			return list(snapshot.Get("span10")[:k])
+
+		self.heap10Span = list(self.SpanWindows())
+		heapq.heapify(self.heap10Span)
+					
+		return heapq.nlargest(k, self.heap10Span)
+
+
+	def FindLiveHighestKElements(self, k):
+		"""
+		A method that finds the highest given k elements in the live
+		window, i.e. the default time span ending at the most recent log.
+		The counts are maintained as logs are added, so this is O(k).
+
+		Parameters
+		----------
+		k : int
+			An integer representing the number of highest
+			elements to be found.
+
+		Returns
+		-------
+		lst
+			A list of (count, domain) tuples, highest first, at most
+			readView.topK of them while the logs file is followed.
+		"""
+
+		snapshot = self.ReadSnapshot("live")
+		if snapshot != None and not snapshot.Holds("live"):
+			return self.pipeline.Call(self.FindLiveHighestKElements, k)
+		if snapshot != None:
+			return list(snapshot.Get("live")[:k])
+
+		return self.liveTopK.Top(k)
+
+
+	def FindHighestKRegisteredDomains(self, k):
+		"""
+		A method that finds the k registered domains(organizations, e.g.
+		example.co.uk for both a.b.example.co.uk and x.example.co.uk) with
+		the most queries in the chosen time span around dateToLook.
+
+		Parameters
+		----------
+		k : int
+			An integer representing the number of highest
+			elements to be found.
+
+		Returns
+		-------
+		lst
+			A list of (count, registered domain) tuples, highest first, at
+			most readView.topK of them while the logs file is followed.
+		"""
+
+		key = self.SpanKey()
+		snapshot = self.ReadSnapshot("registered", key)
+		if snapshot != None and not snapshot.Holds("registered", key):
+			return self.pipeline.Call(self.FindHighestKRegisteredDomains, k)
+		if snapshot != None:
+			return list(snapshot.Get("registered")[:k])
+
+		totals = {}
+
+		for domain, count in self.SpanCounts().items():
+			if domain.startswith(WILDCARD_PREFIX):
+				domain = domain[len(WILDCARD_PREFIX):]
+			domain = RegisteredDomain(domain)
+			totals[domain] = totals.get(domain, 0) + count
+
+		return heapq.nlargest(k, ((count, domain) for domain, count in totals.items() if count > 0))
+
+
+	def FindHighestKSubdomains(self, k):
+		"""
+		A method that finds the k parent domains with the most distinct
+		children(queried names under them) in the live window, ending at
+		the most recent log. The counts are estimates, see SubdomainCounter.
+
+		Parameters
+		----------
+		k : int
+			An integer representing the number of highest
+			elements to be found.
+
+		Returns
+		-------
+		lst
+			A list of (count, parent) tuples, highest first, at most
+			readView.topK of them while the logs file is followed.
+		"""
+
+		snapshot = self.ReadSnapshot("subdomains")
+		if snapshot != None and not snapshot.Holds("subdomains"):
+			return self.pipeline.Call(self.FindHighestKSubdomains, k)
+		if snapshot != None:
+			return list(snapshot.Get("subdomains")[:k])
+
+		return self.subdomainCounter.Top(k)
+
+
+	def GetDistinctChildren(self, domain):
+		"""
+		A method that estimates the number of distinct children of a
+		parent domain in the live window, ending at the most recent log.
+
+		Parameters
+		----------
+		domain : str
+			A string representing a parent domain name, with or without the wildcard prefix.
+
+		Returns
+		-------
+		int
+			An integer representing the estimate.
+		"""
+
+		if domain.startswith(WILDCARD_PREFIX):
+			domain = domain[len(WILDCARD_PREFIX):]
+
+		return self.subdomainCounter.Count(domain)
+
+
+	def SetSubdomainThreshold(self, threshold, blocking = False):
+		"""
+		A setter method for the subdomainThreshold and subdomainBlocking
+		attributes. A parent domain with more distinct children in the
+		window than the threshold is reported, see GetSubdomainAlerts, and
+		blocked with a wildcard entry only if blocking is set.
+
+		Parameters
+		----------
+		threshold : int
+			An integer representing the number of distinct children above which a parent domain is reported.
+		blocking : bool
+			A boolean representing whether the parent domains reported are blocked as well(default is False).
+		"""
+
+		self.subdomainThreshold = threshold
+		self.subdomainBlocking = blocking
+		self.subdomainCounter.threshold = threshold
+
+
+	def GetSubdomainAlerts(self):
+		"""
+		A getter method for the subdomainAlerts attribute.
+
+		Returns
+		-------
+		lst
+			A list of (second, parent) tuples of the parent domains reported, oldest first.
+		"""
+
+		return sorted((second, parent) for parent, second in self.subdomainAlerts.items())
+
+
+	def ReportParent(self, parent, second):
+		"""
+		Reports a parent domain whose distinct children crossed the
+		subdomainThreshold attribute, and blocks it with a wildcard entry
+		if the subdomainBlocking attribute is set.
+
+		Parameters
+		----------
+		parent : str
+			A string representing the parent domain name.
+		second : int
+			An integer representing the time of the crossing in seconds since the epoch.
+		"""
+
+		if parent not in self.subdomainAlerts:
+			self.subdomainAlerts[parent] = second
+			if self.metrics != None:
+				self.metrics.Inc("subdomain_alerts_total")
+		if self.subdomainBlocking:
+			self.AddToBlockedList(WILDCARD_PREFIX + parent)
+
+
+	def GetRetentionCounters(self):
+		"""
+		A getter method for the counters of the retention attribute,
+		along with the estimated size of the history, to size its budget.
+
+		Returns
+		-------
+		dict
+			A dictionary mapping counter names to their values.
+		"""
+
+		counters = self.retention.Counters()
+		counters["estimatedBytes"] = self.retention.EstimateBytes(self)
+
+		return counters
+
+
+	def GetVerdictCounters(self):
+		"""
+		A getter method for the counters of the verdictCache attribute.
+
+		Returns
+		-------
+		dict
+			A dictionary mapping counter names(hits, misses, hitRate, evictions, invalidations, size) to their values.
+		"""
+
+		return self.verdictCache.Counters()
+
+
+	def GetQueryTypeCounters(self):
+		"""
+		A getter method for the number of queries parsed per record type.
+
+		Returns
+		-------
+		dict
+			A dictionary mapping record types, e.g. "TXT", to the number of their queries parsed.
+		"""
+
+		return dict(self.queryTypes.counts)
+
+
+	def GetReadViewCounters(self):
+		"""
+		A getter method for the counters of the readView attribute.
+
+		Returns
+		-------
+		dict
+			A dictionary mapping counter names(publishes, publishSeconds, reads, waits, staleReads, age)
+			to their values, empty if there is no readView attribute.
+		"""
+
+		if self.readView == None:
+			return {}
+
+		return self.readView.Counters()
+
+
+	def GetSourceCounters(self):
+		"""
+		A getter method for the counters of the sources attribute.
+
+		Returns
+		-------
+		dict
+			A dictionary mapping "sources" to a list of the counters of every logs file(offsets, rotations,
+			queries per second, lag, backlog) and "reorder" to the counters of the reorder buffer, empty
+			if there is no sources attribute, see multisource.SourceSet.Counters.
+		"""
+
+		if self.sources == None:
+			return {}
+
+		return self.sources.Counters()
+
+
+	def CountNumberOfUniqueCharacters(self, domain):
+		"""
+		A method that counts the number of unique characters 
+		in given domain name.
+
+		Parameters
+		----------
+		domain : str
+			A string representing a domain name.
+
+		Returns
+		-------
+		int
+			An integer representing the number of unique characters
+			in given domain name.
+		"""
+
+		differentCharacters = {}
+
+		for character in domain:
+			if not character in differentCharacters:
+				differentCharacters[character] = 1
+
+		return len(differentCharacters)
+
+
+	def CountNumberOfDigitsInDomainName(self, domain):
+		"""
+		A method that counts the number of digits in given domain name.
+
+		Parameters
+		----------
+		domain : str
+			A string representing a domain name.
+
+		Returns
+		-------
+		int 
+			An integer representing the number of digits in given
+			domain name.
+		"""
+
+		numberOfDigits = 0
+
+		for character in domain:
+			if character >= '0' and character <= '9':
+				numberOfDigits += 1
+
+		return numberOfDigits
 
 	
-	def SetMinTimeSpan(self):
+	def FetchEntryOfDomain(self, domain):
 		"""
-		An auxiliary method fot the gui.py module, that resets 
-		the chosenDateSpan attribute.
+		A method that fetches the corresponding logs attribute entry 
+		if present.
+
+		Parameters
+		----------
+		domain : str
+			A string representing a domain name.
+
+		Returns
+		-------
+		LOG
+			A corresponding LOG instance if present, otherwise None
+			is returned.
 		"""
-		self.chosenDateSpan = 0
 
+		output = None
 
-	def GetSpanString(self):
+		if domain in self.numbersOfDomains:
+			output = self.logs[self.numbersOfDomains[domain]]
+			
+		return output
+
+
+	def CommitJournal(self):
 		"""
-		An auxiliary method for the gui.py module, that returns 
-		a string representation of a dates structure entry.
+		A method that commits the changes made since the last call into
+		the journal attribute, if any, along with the offsetInLogFile and
+		sourceOffsets attributes.
+		"""
+
+		if self.journal != None:
+			self.journal.Commit(self.offsetInLogFile, self.sourceOffsets if self.sources != None else None)
+
+
+	def Terminate(self):
+		"""
+		A method that sets the terminated attribute to True, stops the
+		pipeline attribute once the lines already read are added, and
+		publishes the pending changes of the blocked list. If the pipeline
+		doesn't stop in time, its enforcer may still be publishing, and
+		the publisher waits for it before writing the hosts file.
+		"""
+		
+		self.terminated = True
+		if self.pipeline != None:
+			self.pipeline.Stop()
+		self.publisher.Stop()
+
+
+	def GetPipelineCounters(self):
+		"""
+		A getter method for the counters of the pipeline attribute.
+
+		Returns
+		-------
+		dict
+			A dictionary of the counters of the queues between the stages,
+			empty if the logs file isn't being followed.
+		"""
+
+		if self.pipeline == None:
+			return {}
+
+		return self.pipeline.Counters()
+
+
+	def EnableMetrics(self, metrics = None):
+		"""
+		A method that starts counting the lines read, parsed and failed,
+		the queries per type and the blocks, and timing every stage of
+		the parsing per batch of lines, into a Metrics instance. Until it
+		is called the metrics attribute is None and nothing is counted.
+		See metrics.Serve and metrics.MetricsFile for exposing them.
+
+		Parameters
+		----------
+		metrics : Metrics
+			A Metrics instance, or None for a new one(default is None).
+
+		Returns
+		-------
+		Metrics
+			The Metrics instance the metrics are counted into.
+		"""
+
+		if metrics == None:
+			metrics = Metrics()
+
+		self.metrics = metrics
+		self.publisher.metrics = metrics
+		metrics.AddCollector(self.CollectMetrics)
+
+		return metrics
+
+
+	def CollectMetrics(self):
+		"""
+		A method that computes the gauges of the metrics attribute, see
+		ComputeGauges. They are collected from the thread serving or
+		writing the metrics while the pipeline attribute adds lines to
+		the database, so they are computed on its aggregator between two
+		batches, where the dictionaries they walk don't change.
+
+		Returns
+		-------
+		lst
+			A list of (family, label value, value) tuples.
+		"""
+
+		if self.pipeline != None:
+			return self.pipeline.Call(self.ComputeGauges)
+
+		return self.ComputeGauges()
+
+
+	def ComputeGauges(self):
+		"""
+		A method that computes the gauges of the metrics attribute: the
+		tracked domains, the sizes of the lists, the counters of the
+		verdictCache attribute, the estimated memory of every structure,
+		the queues of the pipeline attribute and the progress of every
+		logs file of the sources attribute.
 
 		Returns
 		-------
-		str
-			A string representing a time span.
+		lst
+			A list of (family, label value, value) tuples.
+		"""
+
+		gauges = [("tracked_domains", None, len(self.numbersOfDomains)),
+			("list_entries", "blocked", len(self.blockedList)),
+			("list_entries", "approved", len(self.approvedList))]
+
+		for counter, value in self.verdictCache.Counters().items():
+			gauges.append(("verdict_cache", counter, value))
+		for structure in MEASURED_STRUCTURES:
+			gauges.append(("structure_bytes", structure, EstimateSize(getattr(self, structure))))
+		for queue, counters in self.GetPipelineCounters().items():
+			if queue != "publisher":
+				gauges.append(("pipeline_queue_depth", queue, counters["depth"]))
+				gauges.append(("pipeline_dropped_total", queue, counters["dropped"]))
+				gauges.append(("pipeline_wait_seconds_total", queue, counters["waitSeconds"]))
+		counters = self.GetSourceCounters()
+		for source in counters.get("sources", ()):
+			gauges.append(("source_queries_total", source["fileName"], source["queries"]))
+			gauges.append(("source_rotations_total", source["fileName"], source["rotations"]))
+			if source["lag"] != None:
+				gauges.append(("source_lag_seconds", source["fileName"], source["lag"]))
+			if source["backlog"] != None:
+				gauges.append(("source_backlog_bytes", source["fileName"], source["backlog"]))
+		if counters:
+			for counter, value in counters["reorder"].items():
+				gauges.append(("reorder_buffer", counter, value))
+
+		return gauges
+
+
+	def SpanKey(self):
+		"""
+		A method that returns the time span the span aggregates are
+		computed for: the dateToLook and chosenDateSpan attributes.
+
+		Returns
+		-------
+		tuple
+			A (dateToLook, chosenDateSpan) tuple.
 		"""
 
-		return dates[self.chosenDateSpan][0]
+		return (self.dateToLook, self.chosenDateSpan)
 
 
-	def GetHistoryOfDomain(self, domain):
+	def SpanCounts(self):
 		"""
-		An auxiliary method for the gui.py module, that returns 
-		an adequate logs attribute entry.
-
-		Parameters
-		----------
-		domain : str
-			A string representing a domain name.
+		A method that returns the query counts of every domain in the
+		chosen time span around the dateToLook attribute.
 
 		Returns
 		-------
-		LOG
-			A LOG instance corresponding to given domain name.
+		dict
+			A dictionary mapping domain names to their counts.
 		"""
 
-		return self.FetchEntryOfDomain(domain)
+		span = self.GetSpanTime()
 
-	
-	def UpdateFileBlocked(self):
+		return self.timeIndex.CountsInRange(ToEpoch(self.dateToLook - span), ToEpoch(self.dateToLook + span))
+
+
+	def SpanWindows(self):
 		"""
-		Automatically blocks suspicious domains. 
+		A method that yields the 10 minutes windows in the chosen time
+		span around the dateToLook attribute.
+
+		Yields
+		------
+		tuple
+			A (count, str(log), log) tuple of every window, log being a LOG instance.
 		"""
 
-		blockedDomainList = ""
+		span = self.GetSpanTime()
 
-		for domain in self.blockedListTemp:
-			if domain.find("<...>") != -1:
-				domain = domain[5:]
-				os.system('sudo /home/os212/pygui/updateBlock.sh %s' %domain)
-			else:
-				blockedDomainList += "5.145.145.0 " + domain + ".\n"
-		with open('/home/os212/pygui/dnsmasq.hosts', 'w') as hostsFile:
-			hostsFile.write(blockedDomainList)
-			hostsFile.close()
-		os.system('sudo /home/os212/pygui/reloadConf.sh')
+		for window in self.timeIndex.WindowsInRange(ToEpoch(self.dateToLook - span), ToEpoch(self.dateToLook + span)):
+			log = self.logs.View(window)
+			if abs(self.dateToLook - log.date) < span:
+				yield (log.count, str(log), log)
 
 
-	def AddToApprovedList(self, domain):
+	def TopSpanWindows(self, k):
 		"""
-		An auxiliary method for the gui.py module, that inserts 
-		a domain into the approvedList attribute.
+		A method that finds the k 10 minutes windows with the highest
+		counts in the chosen time span, like SpanWindows, formatting only
+		the windows that may make it into the result.
 
 		Parameters
 		----------
-		domain : str
-			A string representing a domain name to be added to
-			the approvedList attribute.
+		k : int
+			An integer representing the number of windows to be found.
+
+		Returns
+		-------
+		lst
+			A list of (count, str(log), log) tuples, highest first.
 		"""
 
-		if domain not in self.blockedList:
-			if domain not in self.approvedList:
-				self.approvedList.append(domain)
+		store = self.logs
+		span = self.GetSpanTime()
+		seconds = span.total_seconds()
+		center = (self.dateToLook - EPOCH).total_seconds()
+		windows = [window for window in self.timeIndex.WindowsInRange(ToEpoch(self.dateToLook - span), ToEpoch(self.dateToLook + span))
+			if abs(center - store.starts[window]) < seconds]
+		if windows == []:
+			return []
 
+		cut = heapq.nlargest(k, (store.counts[window] for window in windows))[-1]
+		candidates = (store.View(window) for window in windows if store.counts[window] >= cut)
 
-	def AddToBlockedList(self, domain):
+		return heapq.nlargest(k, ((log.count, str(log), log) for log in candidates))
+
+
+	def ReadSnapshot(self, aggregate = None, key = None):
 		"""
-		A method that inserts a domain into the blockedList attribute.
+		A method that returns the snapshot of the readView attribute a
+		reader should query, while the pipeline attribute follows the logs
+		file and the caller isn't the thread adding the logs. Otherwise
+		the caller reads the live structures, and None is returned. If no
+		snapshot holding the aggregate came within the staleness bound,
+		the latest one is returned, so callers check that it holds the
+		aggregate for their key, and otherwise compute the answer on the
+		thread adding the logs with pipeline.Call.
 
 		Parameters
 		----------
-		domain : str
-			A string representing a domain name to be added to
-			the blockedList attribute.
+		aggregate : str or tuple
+			The name of the aggregate the reader needs, see ReadView.Read(default is None).
+		key : object
+			The parameters the aggregate should have been computed for(default is None).
+
+		Returns
+		-------
+		ReadSnapshot
+			A ReadSnapshot instance, or None.
 		"""
 
-		if domain not in self.approvedList: 
-			if domain not in self.blockedList:
-				self.blockedList.append(domain)
-				self.blockedListTemp.append(domain)
-				self.UpdateFileBlocked()
-				
+		view = self.readView
+		pipeline = self.pipeline
 
-	def RemoveFromApprovedList(self, domain):
-		"""
-		An auxiliary method for the gui.py module, that removes 
-		a domain from the approvedList attribute if present.
+		if view == None or pipeline == None or pipeline.finished.is_set() or threading.current_thread() in (view.writer, pipeline.aggregator):
+			return None
 
-		Parameters
-		----------
-		domain : str
-			A string representing a domain name to be removed
-			from the approvedList attribute.
+		return view.Read(aggregate, key)
+
+
+	def PublishSnapshot(self):
+		"""
+		A method that publishes a new snapshot of the aggregates the
+		readers query into the readView attribute, if one is due and the
+		pipeline attribute follows the logs file. Called by the thread
+		adding the logs, between batches. The top lists are copied, and so
+		are the windows of the histories, so the snapshot shares nothing
+		with the live structures.
 		"""
 
-		if domain in self.approvedList:
-			self.approvedList.remove(domain)
+		view = self.readView
+		if view == None or self.pipeline == None or not view.Due():
+			return
 
+		start = time.perf_counter()
+		view.writer = threading.current_thread()
+		topK = view.topK
+		wanted, watched = view.Wanted()
+		key = self.SpanKey()
+		aggregates = {}
 
-	def RemoveFromBlockedList(self, domain):
-		"""
-		An auxiliary method for the gui.py module, that removes 
-		a domain from the blockedList attribute if present.
+		aggregates["blocked"] = view.Entry("blocked", None, lambda: tuple(self.blockedList.ToList()))
+		aggregates["approved"] = view.Entry("approved", None, lambda: tuple(self.approvedList.ToList()))
+		aggregates["live"] = view.Entry("live", None, lambda: tuple(self.liveTopK.Top(topK)))
+		if "subdomains" in wanted:
+			aggregates["subdomains"] = view.Entry("subdomains", None, lambda: tuple(self.subdomainCounter.Top(topK)))
+		if "span" in wanted:
+			aggregates["span"] = view.Entry("span", key, lambda: tuple(heapq.nlargest(topK, ((count, domain) for domain, count in self.SpanCounts().items() if count > 0))))
+		if "registered" in wanted:
+			aggregates["registered"] = view.Entry("registered", key, lambda: tuple(self.FindHighestKRegisteredDomains(topK)))
+		if "span10" in wanted:
+			aggregates["span10"] = view.Entry("span10", key, lambda: tuple((count, text, LOG(log.date, log.domain, log.isSuspiciousDomain, log.count)) for count, text, log in self.TopSpanWindows(topK)))
 
-		Parameters
-		----------
-		domain : str
-			A string representing a domain name to be removed
-			from the blockedList attribute.
-		"""
+		for domain in watched:
+			entry = self.FetchEntryOfDomain(domain)
+			history = None if entry == None else tuple(LOG(log.date, log.domain, log.isSuspiciousDomain, log.count) for log in entry)
+			aggregates[("history", domain)] = (None, history, time.monotonic())
 
-		if domain in self.blockedList:
-			self.blockedList.remove(domain)
-			self.UpdateFileBlocked()
+		view.Publish(aggregates, self.offsetInLogFile, time.perf_counter() - start)
 
 
-	def GetBlockedList(self):
+	def VerdictState(self):
 		"""
-		A getter method for the blockedList attribute.
+		A method that returns the state the verdicts of the verdictCache
+		attribute depend on: the lexical thresholds and the versions of
+		the blocked and approved lists.
 
 		Returns
 		-------
-		lst
-			A list of domain names(strings) representing the
-			blockedList attribute.
+		tuple
+			A tuple representing the state.
 		"""
 
-		return self.blockedList
+		scorer = self.lexicalScorer
 
+		return (scorer.maxLength, scorer.maxUniqueCharacters, scorer.maxDigits, self.approvedList.version, self.blockedList.version)
 
-	def GetApprovedList(self):
+
+	def Verdict(self, domain, isSuspiciousDomain = None):
 		"""
-		A getter method for the approvedList attribute.
+		A method that decides whether a queried name is suspicious, and
+		the domain its queries are counted under: the name itself, or its
+		shortened version if it is suspicious. Approved names are never
+		suspicious. The verdict is remembered by the verdictCache attribute.
+
+		Parameters
+		----------
+		domain : str
+			A string representing a domain name.
+		isSuspiciousDomain : bool
+			A boolean flag indicating whether the domain name was already found suspicious
+			by the lexicalScorer attribute, or None to check it here(default is None).
 
 		Returns
 		-------
-		lst
-			A list of domain names(strings) representing the
-			approvedList attribute.
+		tuple
+			An (isSuspiciousDomain, domain) tuple.
 		"""
 
-		return self.approvedList
+		if self.approvedList.Matches(domain):
+			verdict = (False, domain)
+		else:
+			if isSuspiciousDomain == None:
+				scorer = self.lexicalScorer
+				isSuspiciousDomain = len(domain) > scorer.maxLength or self.CountNumberOfUniqueCharacters(domain) > scorer.maxUniqueCharacters or self.CountNumberOfDigitsInDomainName(domain) > scorer.maxDigits
+			verdict = (isSuspiciousDomain, GetShortenedVersionForSus(domain) if isSuspiciousDomain else domain)
+
+		self.verdictCache.Put(domain, verdict)
 
-		
-	def SetDateToLook(self, date):
+		return verdict
+
+
+	def ParseIntoLog(self, date, domain, isSuspiciousDomain = None):
 		"""
-		A setter method for the dateToLook attribute.
+		A method that creates a LOG instance, given date and domain.
+		The method checks whether the domain name is considered
+		suspicious as well, and if so sets the isSuspiciousDomain
+		attribute(LOG) to True. Verdicts are looked up in the
+		verdictCache attribute first.
 
 		Parameters
 		----------
-		date : str
-			A string representing a date to be set.
+		date : str or datetime
+			A string representing a date, or an already decoded datetime instance.
+		domain : str
+			A string representing a domain name.
+		isSuspiciousDomain : bool
+			A boolean flag indicating whether the domain name was already found suspicious
+			by the lexicalScorer attribute, or None to check it here(default is None).
+
+		Returns
+		-------
+		LOG
+			A LOG instance corresponding to the given parameters.
 		"""
 
-		date = datetime.strptime(date, FMT)
-		self.dateToLook = date
+		if isinstance(date, str):
+			date = self.timestampDecoder.DecodeString(date)
 
+		self.verdictCache.Validate(self.VerdictState())
+		verdict = self.verdictCache.Get(domain)
+		if verdict == None:
+			verdict = self.Verdict(domain, isSuspiciousDomain)
 
-	def GetDateToLook(self):
+		return LOG(date, verdict[1], verdict[0], name = domain)
+
+
+	def ParseQuery(self, line):
 		"""
-		A getter method for the dateToLook attribute.
+		A method that parses a line of the logs file into a date, a queried
+		name and its record type, with the same scanner as ParseChunk.
+
+		Parameters
+		----------
+		line : str
+			A string representing a line of the logs file.
 
 		Returns
 		-------
-		str
-			A string representing the dateToLook attribute.
+		tuple
+			A (datetime, name, QueryType) tuple if the line is a query of a type of the
+			queryTypes attribute, otherwise None.
 		"""
 
-		return self.dateToLook
+		queries = ScanQueries(line.encode("utf-8", "replace"), self.queryTypes.types)
 
+		if queries == []:
+			return None
 
-	def ResetDateToLook(self):
-		"""
-		A method for resetting the dateToLook attribute.
-		"""
+		stamp, queryType, name = queries[0]
 
-		self.dateToLook = datetime.now()
+		return self.timestampDecoder.DecodeStamp(stamp), name.decode("utf-8", "replace"), queryType
 
 
-	def GetSpanTime(self):
+	def ParseLine(self, line):
 		"""
-		A method that retrieves a dates structure entry.
+		A method that parses a line of the logs file into a LOG instance.
+
+		Parameters
+		----------
+		line : str
+			A string representing a line of the logs file.
 
 		Returns
 		-------
-		str
-			A string representing a date.
+		LOG
+			A LOG instance if the line is a query of a type of the queryTypes attribute, otherwise None.
 		"""
 
-		return dates[self.chosenDateSpan][1]
+		logs = self.ParseLines([line])
 
+		if logs != []:
+			return logs[0]
 
-	def AddToDatabase(self, log):
+		return None
+
+
+	def ParseLines(self, lines):
 		"""
-		A method that adds a log to the database.
+		A method that parses a batch of lines of the logs file into LOG
+		instances. The lines are joined and parsed by ParseChunk, so lines
+		read as strings and as bytes go through the same handler.
 
 		Parameters
 		----------
-		log : LOG
-			A LOG instance representing a log that was parsed
-			from the logs file.
+		lines : lst
+			A list of strings representing lines of the logs file.
+
+		Returns
+		-------
+		lst
+			A list of LOG instances of the queries of a type of the queryTypes attribute, in file order.
 		"""
 
-		shortendDomain = log.domain
-		entry = self.FetchEntryOfDomain(shortendDomain)
-		
-		if entry == None:
-			self.logs[self.numberOfLogs] = [log]
-			self.AddDomain(self.numberOfLogs, shortendDomain)
-			self.countForDomains[shortendDomain] = 1
-			self.numberOfLogs += 1
-		else:
-			self.CheckAndUpdateCounter(entry, log)
-			self.countForDomains[shortendDomain] += 1
+		return self.ParseChunk("\n".join(lines).encode("utf-8", "replace"))
 
 
-	def FindHighestKElements(self, k):
+	def ParseChunk(self, chunk):
 		"""
-		A method that finds the highest given k elements in 
-		the heapCount attribute.
+		A method that parses the bytes of a batch of lines of the logs file
+		into LOG instances. The record type of every query line is looked up
+		in the dispatch table of the queryTypes attribute, lines of other
+		types are skipped without being decoded(see scanner.ScanQueries),
+		and only the timestamp and the queried name of the others are. The
+		queries are counted per type, and every log carries the weight of
+		its type.
 
 		Parameters
 		----------
-		k : int
-			An integer representing the number of highest
-			elements to be found.
+		chunk : bytes
+			The bytes of complete lines of the logs file.
 
 		Returns
 		-------
 		lst
-			A list representing the given k highest elements.
+			A list of LOG instances of the queries of a type of the queryTypes attribute, in file order.
 		"""
 
-		self.heapCount = []
+		metrics = self.metrics
+		if metrics != None:
+			start = time.perf_counter()
+			seen = []
+		else:
+			seen = None
 
-		for loglist in self.logs.values():
-			count = 0
-			domain = loglist[0].domain
-			for log in loglist:
-				if abs(self.dateToLook - log.date) < self.GetSpanTime():
-					count += log.count
-			if count > 0:
-				heapq.heappush(self.heapCount, (count, domain))
+		decoder = self.timestampDecoder
+		queries = []
 
-		return heapq.nlargest(k, self.heapCount)
+		for stamp, queryType, name in ScanQueries(chunk, self.queryTypes.types, seen):
+			try:
+				queries.append((decoder.DecodeStamp(stamp), name.decode("utf-8", "replace"), queryType))
+			except Exception as error:
+				print("failed: " + stamp.decode("utf-8", "replace") + "]: query[" + queryType.name + "] " + name.decode("utf-8", "replace"))
+				if metrics != None:
+					metrics.Inc("parse_failures_total", FAILURE_REASONS.get(type(error), type(error).__name__))
 
+		if metrics != None:
+			tokenized = time.perf_counter()
+			metrics.Observe("stage_seconds", "tokenize", tokenized - start)
+			metrics.Inc("lines_parsed_total", amount = len(queries))
+			metrics.CountTypes(seen)
 
-	def FindHighestKElements10Min(self, k):
+		self.queryTypes.Count(map(itemgetter(2), queries))
+		logs = self.QueriesToLogs(queries)
+
+		if metrics != None:
+			metrics.Observe("stage_seconds", "parseIntoLog", time.perf_counter() - tokenized)
+
+		return logs
+
+
+	def QueriesToLogs(self, queries):
 		"""
-		A method that finds the highest given k elements in 
-		the heap10Span attribute.
+		A method that creates the LOG instances of a batch of queries. The
+		queried names missing from the verdictCache attribute are checked by
+		the lexicalScorer attribute at once, which is cheaper than one at a
+		time, and names repeated in the batch are decided once.
 
 		Parameters
 		----------
-		k : int
-			An integer representing the number of highest
-			elements to be found.
+		queries : lst
+			A list of (datetime, name, QueryType) tuples.
 
 		Returns
 		-------
 		lst
-			A list representing the given k highest elements.
+			A list of LOG instances, in the order of the queries.
 		"""
 
-		self.heap10Span = []
-		
-		for loglist in self.logs.values():
-			for log in loglist:
-				if abs(self.dateToLook - log.date) < self.GetSpanTime():
-					heapq.heappush(self.heap10Span, (log.count, str(log), log))
-					
-		return heapq.nlargest(k, self.heap10Span)
+		cache = self.verdictCache
+		cache.Validate(self.VerdictState())
+		verdicts = [cache.Get(query[1]) for query in queries]
+		missing = list(dict.fromkeys(query[1] for query, verdict in zip(queries, verdicts) if verdict == None))
+		decided = dict(zip(missing, map(self.Verdict, missing, self.lexicalScorer.Suspicious(missing))))
+		logs = []
 
+		for (date, name, queryType), verdict in zip(queries, verdicts):
+			if verdict == None:
+				verdict = decided[name]
+			logs.append(LOG(date, verdict[1], verdict[0], name = name, weight = queryType.weight))
 
-	def CountNumberOfUniqueCharacters(self, domain):
+		return logs
+
+
+	def ParseAvailable(self, follower):
 		"""
-		A method that counts the number of unique characters 
-		in given domain name.
+		A method that parses all the complete lines currently in a logs file.
 
 		Parameters
 		----------
-		domain : str
-			A string representing a domain name.
-
-		Returns
-		-------
-		int
-			An integer representing the number of unique characters
-			in given domain name.
+		follower : LogFollower
+			A LogFollower instance of the logs file, positioned at offsetInLogFile attribute.
 		"""
 
-		differentCharacters = {}
-
-		for character in domain:
-			if not character in differentCharacters:
-				differentCharacters[character] = 1
+		chunk = self.ReadChunk(follower)
 
-		return len(differentCharacters)
+		while chunk:
+			self.AddLogs(self.ParseChunk(chunk))
+			self.offsetInLogFile = follower.offset
+			self.CommitJournal()
+			chunk = self.ReadChunk(follower)
 
 
-	def CountNumberOfDigitsInDomainName(self, domain):
+	def AddLogs(self, logs):
 		"""
-		A method that counts the number of digits in given domain name.
+		A method that adds a batch of logs to the database. Logs that fail
+		to be added are reported and skipped. A read snapshot is published
+		whenever one is due, every SNAPSHOT_SLICE logs at most, so readers
+		don't wait for a large batch to be added.
 
 		Parameters
 		----------
-		domain : str
-			A string representing a domain name.
+		logs : lst
+			A list of LOG instances, in file order.
+		"""
 
-		Returns
-		-------
-		int 
-			An integer representing the number of digits in given
-			domain name.
+		metrics = self.metrics
+		if metrics != None:
+			start = time.perf_counter()
+
+		for first in range(0, len(logs), SNAPSHOT_SLICE):
+			for log in logs[first:first + SNAPSHOT_SLICE]:
+				try:
+					self.AddToDatabase(log)
+				except:
+					print("failed: " + log.name)
+					if metrics != None:
+						metrics.Inc("parse_failures_total", "addToDatabase")
+			self.PublishSnapshot()
+
+		if metrics != None:
+			metrics.Observe("stage_seconds", "addToDatabase", time.perf_counter() - start)
+
+
+	def ExpireLiveWindow(self):
+		"""
+		A method that expires the queries older than the live window from
+		the liveTopK attribute, while no new lines arrive. The window ends
+		at the time of the newest log plus the wall clock time passed since
+		that log was added, so a backfill, replay or resume of old logs keeps
+		its live view instead of expiring it against the current date.
 		"""
 
-		numberOfDigits = 0
+		newest = self.liveTopK.Newest()
+		if newest == None:
+			return
 
-		for character in domain:
-			if character >= '0' and character <= '9':
-				numberOfDigits += 1
+		if newest != self.idleSecond:
+			self.idleSecond = newest
+			self.idleSince = time.monotonic()
 
-		return numberOfDigits
+		self.liveTopK.Expire(newest + int(time.monotonic() - self.idleSince))
 
-	
-	def FetchEntryOfDomain(self, domain):
+
+	def ReadChunk(self, follower):
 		"""
-		A method that fetches the corresponding logs attribute entry 
-		if present.
+		A method that reads the bytes of the complete lines added to a logs
+		file since the last call, counting and timing the read in the
+		metrics attribute.
 
 		Parameters
 		----------
-		domain : str
-			A string representing a domain name.
+		follower : LogFollower
+			A LogFollower instance of the logs file.
 
 		Returns
 		-------
-		LOG
-			A corresponding LOG instance if present, otherwise None
-			is returned.
+		bytes
+			The bytes of the lines read.
 		"""
 
-		output = None
-
-		if domain in self.numbersOfDomains:
-			output = self.logs[self.numbersOfDomains[domain]]
-			
-		return output
+		if self.metrics == None:
+			return follower.ReadChunk()
 
+		start = time.perf_counter()
+		chunk = follower.ReadChunk()
+		if chunk:
+			self.metrics.Observe("stage_seconds", "read", time.perf_counter() - start)
+			self.metrics.Inc("lines_read_total", amount = chunk.count(b"\n") + 1)
 
-	def Terminate(self):
-		"""
-		A method that sets the terminated attribute to True.
-		"""
-		
-		self.terminated = True
+		return chunk
 
 
-	def ParseIntoLog(self, date, domain):
+	def ReadLines(self, follower):
 		"""
-		A method that creates a LOG instance, given date and domain.
-		The method checks whether the domain name is considered
-		suspicious as well, and if so sets the isSuspiciousDomain
-		attribute(LOG) to True.
+		A method that reads the complete lines added to a logs file since
+		the last call, counting and timing the read in the metrics attribute.
 
 		Parameters
 		----------
-		date : str
-			A string representing a date.
-		domain : str
-			A string representing a domain name.
+		follower : LogFollower
+			A LogFollower instance of the logs file.
 
 		Returns
 		-------
-		LOG
-			A LOG instance corresponding to the given parameters.
+		lst
+			A list of strings representing the lines read.
 		"""
 
-		date = datetime.strptime("2021 " + date, FMT)
-		log = LOG(date, domain)
-		
-		if len(domain) > 52 or self.CountNumberOfUniqueCharacters(domain) > 27 or self.CountNumberOfDigitsInDomainName(domain) > 7:
-			log = LOG(date, GetShortenedVersionForSus(domain))
-			log.isSuspiciousDomain = True
-			
-		return log
+		if self.metrics == None:
+			return follower.ReadLines()
+
+		start = time.perf_counter()
+		lines = follower.ReadLines()
+		if lines:
+			self.metrics.Observe("stage_seconds", "read", time.perf_counter() - start)
+			self.metrics.Inc("lines_read_total", amount = len(lines))
+
+		return lines
 
 
 	def Parse(self, fileName):
 		"""
-		A method that parses a logs file.
+		A method that parses a logs file, then keeps following it until
+		the Terminate method is called. New lines are waited for with
+		inotify where available, and rotation or truncation of the file is
+		followed(see tail.LogFollower). Reading, parsing, adding the logs
+		and enforcing the blocked list run as the stages of an
+		IngestPipeline, so a slow dnsmasq reload doesn't hold back parsing.
+
+		Given several logs files, e.g. of several dnsmasq instances, they
+		are followed at once by a SourceSet kept in the sources attribute,
+		each from its offset in the sourceOffsets attribute, and their logs
+		are merged by time before they are added(see multisource.SourceSet).
+		The offsetInLogFile attribute then follows the first file.
 
 		Parameters
 		----------
-		fileName : str
-			A string representing a logs file name.
+		fileName : str or lst
+			A string representing a logs file name, or a list of logs file names.
 		"""
 
-		with open(fileName, "r") as fh:
-			if self.offsetInLogFile != 0:
-				fh.seek(self.offsetInLogFile)
-			for line in fh:
-				tokensList = line.split(None, 4)
-				try:
-					if len(tokensList[1]) < 2: 
-						date = tokensList[0] + " 0" + tokensList[1] + " " + tokensList[2]
-					else:
-						date = tokensList[0] + " " + tokensList[1] + " " + tokensList[2]
-					content = tokensList[4].split(" ")
-					if content[0] == 'query[A]' or content[0] == 'query[AAAA]' or content[0] == 'query[TXT]' or content[0] == 'query[MX]':
-						log = self.ParseIntoLog(date, content[1])
-						self.AddToDatabase(log)
-				except:
-					if tokensList != []:
-						print("failed: " + line)
-				
-			self.offsetInLogFile = fh.tell()
-			
-			while True:
-				if not self.terminated:
-					try:
-						self.offsetInLogFile = fh.tell()
-						line = fh.readline()
-						if not line:
-							time.sleep(1)
-							fh.seek(self.offsetInLogFile)
-						else:
-							print(line) 
-							tokensList = line.split(None, 4)
-							try:
-								if len(tokensList[1]) < 2: 
-									date = tokensList[0] + " 0" + tokensList[1] + " " + tokensList[2]
-								else:
-									date = tokensList[0] + " " + tokensList[1] + " " + tokensList[2]
-								content = tokensList[4].split(" ")
-								if content[0] == 'query[A]' or content[0] == 'query[AAAA]' or content[0] == 'query[TXT]':
-									log = self.ParseIntoLog(date, content[1])
-									self.AddToDatabase(log)
-							except:
-								print("failed parsing line: " + line)
-				
-					except:
-						print("problem reading file in thread")
-						exit(1)
-				else:
-					print("Thread Exiting")
-					exit(0)
+		if isinstance(fileName, str):
+			follower = LogFollower(fileName, self.offsetInLogFile)
+			self.sources = None
+		else:
+			self.sourceOffsets.setdefault(fileName[0], self.offsetInLogFile)
+			follower = self.sources = SourceSet(fileName, self.sourceOffsets)
+		self.pipeline = IngestPipeline(self, follower)
+		if self.terminated:
+			self.pipeline.Stop(0)
+
+		try:
+			self.pipeline.Run()
+		finally:
+			follower.Close()
+			self.CommitJournal()
+			if self.journal != None:
+				self.journal.Close()
+			print("Thread Exiting")
 
 			
 def main():
@@ -879,9 +2683,21 @@ def main():
 		if command != "":
 			if command == "parse":
 				database.Parse("dnsmasq.log")
+			if command.startswith("parse "):
+				database.Parse(command.split()[1:])
+			if command == "sources":
+				for source in database.GetSourceCounters().get("sources", ()):
+					print(source)
+			if command == "subdomains":
+				for second, parent in database.GetSubdomainAlerts():
+					print(EPOCH + timedelta(seconds = second), parent)
+			if command.startswith("subdomains "):
+				words = command.split()
+				database.SetSubdomainThreshold(int(words[1]), words[2:] == ["block"])
 			if command == "show":
 				print(database.FindHighestKElements(2))
 				print(database.FindHighestKElements10Min(2))
+				print(database.FindLiveHighestKElements(2))
 			if command == "print data":
 				database.printAllLogs()
 	
@@ -0,0 +1,519 @@
+import asyncio
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+import queue
+import threading
+import time
+
+from multisource import DRAIN
+
+QUEUE_SIZE = 8
+IDLE_WAIT = 0.2
+STOP_TIMEOUT = 10
+
+# The policies of a full StageQueue.
+BLOCK = "block"
+DROP_NEWEST = "dropNewest"
+DROP_OLDEST = "dropOldest"
+
+# Marks the end of the batches, it is never dropped.
+END = None
+
+
+class StageQueue:
+	"""
+	A class used to connect two stages of an IngestPipeline with a bounded
+	asyncio queue of batches. When the queue is full, the BLOCK policy
+	waits until the next stage takes a batch, which in turn holds back the
+	stage before it(backpressure), while DROP_NEWEST sheds the batch being
+	put and DROP_OLDEST the oldest batch queued.
+
+	Attributes
+	----------
+	name : str
+		A string representing the name of the queue, used in the counters.
+	policy : str
+		A string representing the policy of a full queue(default is BLOCK).
+	queue : asyncio.Queue
+		The queue of batches.
+	batches : int
+		An integer representing the number of batches put(default is 0).
+	dropped : int
+		An integer representing the number of batches shed(default is 0).
+	waits : int
+		An integer representing the number of puts that waited for room(default is 0).
+	waitSeconds : float
+		A float representing the seconds spent waiting for room(default is 0.0).
+	maxDepth : int
+		An integer representing the largest number of batches queued at once(default is 0).
+
+	Methods
+	-------
+	Put(batch)
+		Puts a batch into the queue, according to the policy.
+	PutEnd()
+		Puts END into the queue, waiting for room whatever the policy.
+	Get()
+		Takes the next batch out of the queue.
+	Counters()
+		Returns the counters of the queue.
+	"""
+
+	def __init__(self, name, size = QUEUE_SIZE, policy = BLOCK):
+		"""
+		Parameters
+		----------
+		name : str
+			A string representing the name of the queue.
+		size : int
+			An integer representing the maximal number of batches queued(default is QUEUE_SIZE).
+		policy : str
+			A string representing the policy of a full queue, BLOCK, DROP_NEWEST or DROP_OLDEST(default is BLOCK).
+		"""
+
+		if policy not in (BLOCK, DROP_NEWEST, DROP_OLDEST):
+			raise ValueError("unknown queue policy: " + str(policy))
+
+		self.name = name
+		self.policy = policy
+		self.queue = asyncio.Queue(size)
+		self.batches = 0
+		self.dropped = 0
+		self.waits = 0
+		self.waitSeconds = 0.0
+		self.maxDepth = 0
+
+
+	async def Put(self, batch):
+		"""
+		Puts a batch into the queue, according to the policy.
+
+		Parameters
+		----------
+		batch : object
+			The batch to put.
+		"""
+
+		queue = self.queue
+		self.batches += 1
+
+		if queue.full():
+			if self.policy == DROP_NEWEST:
+				self.dropped += 1
+				return
+			if self.policy == DROP_OLDEST:
+				queue.get_nowait()
+				self.dropped += 1
+			else:
+				start = time.perf_counter()
+				await queue.put(batch)
+				self.waits += 1
+				self.waitSeconds += time.perf_counter() - start
+				self.maxDepth = max(self.maxDepth, queue.qsize())
+				return
+
+		queue.put_nowait(batch)
+		self.maxDepth = max(self.maxDepth, queue.qsize())
+
+
+	async def PutEnd(self):
+		"""
+		Puts END into the queue, waiting for room whatever the policy.
+		"""
+
+		await self.queue.put(END)
+
+
+	async def Get(self):
+		"""
+		Takes the next batch out of the queue, waiting for one.
+
+		Returns
+		-------
+		object
+			The batch, or END.
+		"""
+
+		return await self.queue.get()
+
+
+	def Counters(self):
+		"""
+		Returns the counters of the queue.
+
+		Returns
+		-------
+		dict
+			A dictionary of the counters and the current depth of the queue.
+		"""
+
+		return {"depth": self.queue.qsize(), "batches": self.batches, "dropped": self.dropped, "waits": self.waits,
+			"waitSeconds": self.waitSeconds, "maxDepth": self.maxDepth}
+
+
+class IngestPipeline:
+	"""
+	A class used to follow a logs file into a database in four stages,
+	connected by bounded StageQueue instances:
+
+		reader      reads chunks of complete lines(database.ReadChunk)
+		parser      parses them into logs(database.ParseChunk)
+		aggregator  adds the logs to the database(database.AddLogs), commits the journal
+		            and publishes the read snapshots(database.PublishSnapshot)
+		enforcer    publishes the blocked list(database.publisher.Flush)
+
+	The stages run on an asyncio event loop, and the blocking or CPU heavy
+	work of every stage runs in an executor of its own, a single thread by
+	default, so batches stay in file order and a slow dnsmasq reload only
+	holds back the enforcer. The enforcer publishes the latest blocked
+	list once per publisher delay, so the blocks made in the meantime are
+	coalesced. Stop ends the pipeline gracefully: the reader stops, the
+	batches already read are parsed and added, the journal is committed
+	and the blocked list is published a last time. Other threads reading
+	more of the database than a read snapshot holds, e.g. to save it, can
+	run a function on the aggregator between two batches with Call.
+
+	The follower may be a SourceSet following several logs files, the
+	sources attribute of the database, in which case the logs of every
+	batch are merged by time(see multisource.SourceSet.Merge) before
+	they are added, and the logs still held are added once the other
+	batches are.
+
+	Attributes
+	----------
+	database : DATABASE
+		The DATABASE instance the logs are added to.
+	follower : LogFollower
+		A LogFollower instance of the logs file, or a SourceSet instance of several logs files.
+	parseQueue : StageQueue
+		The queue of batches of lines, from the reader to the parser.
+	aggregateQueue : StageQueue
+		The queue of batches of logs, from the parser to the aggregator.
+	executors : dict
+		A dictionary mapping stage names to the executors their work runs in.
+	idleWait : float
+		A float representing the seconds the reader waits for new lines at most, before it checks whether to stop(default is IDLE_WAIT).
+	requests : SimpleQueue
+		A queue of the (function, args, future) tuples of the calls waiting for the aggregator.
+	aggregator : Thread
+		The thread the last batch was added on(default is None).
+
+	Methods
+	-------
+	Run()
+		Runs the pipeline on the calling thread until it is stopped.
+	Call(function, *args)
+		Calls a function on the aggregator between two batches, and returns its result.
+	Stop(timeout)
+		Asks the pipeline to stop, from any thread, and waits for it to finish.
+	Counters()
+		Returns the counters of the queues and stages.
+	"""
+
+	def __init__(self, database, follower, queueSize = QUEUE_SIZE, parsePolicy = BLOCK, aggregatePolicy = BLOCK, executors = None, idleWait = IDLE_WAIT):
+		"""
+		Parameters
+		----------
+		database : DATABASE
+			The DATABASE instance the logs are added to.
+		follower : LogFollower
+			A LogFollower instance of the logs file, positioned at the offsetInLogFile attribute of the database,
+			or the SourceSet instance of the sources attribute of the database.
+		queueSize : int
+			An integer representing the maximal number of batches in every queue(default is QUEUE_SIZE).
+		parsePolicy : str
+			A string representing the policy of the full queue of lines(default is BLOCK).
+		aggregatePolicy : str
+			A string representing the policy of the full queue of logs(default is BLOCK).
+		executors : dict
+			A dictionary mapping some of the stage names(reader, parser, aggregator, enforcer) to the executors
+			their work runs in, the others run in a thread of their own(default is None).
+		idleWait : float
+			A float representing the seconds the reader waits for new lines at most(default is IDLE_WAIT).
+		"""
+
+		self.database = database
+		self.follower = follower
+		self.queueSize = queueSize
+		self.parsePolicy = parsePolicy
+		self.aggregatePolicy = aggregatePolicy
+		self.executors = dict(executors or {})
+		self.ownedExecutors = []
+		for stage in ("reader", "parser", "aggregator", "enforcer"):
+			if stage not in self.executors:
+				self.executors[stage] = ThreadPoolExecutor(1, thread_name_prefix = stage)
+				self.ownedExecutors.append(self.executors[stage])
+		self.idleWait = idleWait
+		self.requests = queue.SimpleQueue()
+		self.aggregator = None
+		self.parseQueue = None
+		self.aggregateQueue = None
+		self.loop = None
+		self.thread = None
+		self.stopping = None
+		self.finishing = None
+		self.publish = None
+		self.stopRequested = False
+		self.finished = threading.Event()
+
+
+	def Run(self):
+		"""
+		Runs the pipeline on the calling thread until it is stopped, or
+		until a stage fails, which is reported and stops the others.
+		"""
+
+		self.thread = threading.current_thread()
+
+		try:
+			asyncio.run(self.RunStages())
+		finally:
+			for executor in self.ownedExecutors:
+				executor.shutdown()
+			self.finished.set()
+
+
+	async def RunStages(self):
+		"""
+		Starts the stages and waits for them to finish.
+		"""
+
+		self.stopping = asyncio.Event()
+		self.finishing = asyncio.Event()
+		self.publish = asyncio.Event()
+		self.parseQueue = StageQueue("parse", self.queueSize, self.parsePolicy)
+		self.aggregateQueue = StageQueue("aggregate", self.queueSize, self.aggregatePolicy)
+		self.loop = asyncio.get_running_loop()
+		if self.stopRequested:
+			self.stopping.set()
+
+		publisher = self.database.publisher
+		publisher.notify = lambda: self.loop.call_soon_threadsafe(self.publish.set)
+		if publisher.pending != None:
+			self.publish.set()
+
+		ingest = [asyncio.create_task(stage()) for stage in (self.Read, self.Parse, self.Aggregate)]
+		enforcer = asyncio.create_task(self.Enforce())
+
+		try:
+			done, pending = await asyncio.wait(ingest, return_when = asyncio.FIRST_EXCEPTION)
+			for task in done:
+				if task.exception() != None:
+					print("pipeline stage failed: " + repr(task.exception()))
+			for task in pending:
+				task.cancel()
+		finally:
+			self.stopping.set()
+			self.finishing.set()
+			self.publish.set()
+			await enforcer
+			publisher.notify = None
+
+
+	async def Read(self):
+		"""
+		The reader stage: puts batches of new lines into the parse queue,
+		and an empty batch whenever it waited for lines in vain.
+		"""
+
+		loop = self.loop
+		executor = self.executors["reader"]
+
+		while not self.stopping.is_set():
+			chunk = await loop.run_in_executor(executor, self.database.ReadChunk, self.follower)
+			await self.parseQueue.Put((chunk, self.follower.offset))
+			if not chunk:
+				await loop.run_in_executor(executor, self.follower.Wait, self.idleWait)
+
+		await self.parseQueue.PutEnd()
+
+
+	async def Parse(self):
+		"""
+		The parser stage: parses the batches of lines into batches of logs.
+		"""
+
+		loop = self.loop
+		executor = self.executors["parser"]
+
+		while True:
+			batch = await self.parseQueue.Get()
+			if batch is END:
+				break
+			chunk, offset = batch
+			logs = await loop.run_in_executor(executor, self.database.ParseChunk, chunk) if chunk else None
+			await self.aggregateQueue.Put((logs, offset))
+
+		await self.aggregateQueue.PutEnd()
+
+
+	async def Aggregate(self):
+		"""
+		The aggregator stage: adds the batches of logs to the database, in
+		file order, and commits the journal after each.
+		"""
+
+		loop = self.loop
+		executor = self.executors["aggregator"]
+
+		while True:
+			batch = await self.aggregateQueue.Get()
+			if batch is END:
+				break
+			await loop.run_in_executor(executor, self.AddBatch, *batch)
+
+		if self.database.sources != None:
+			await loop.run_in_executor(executor, self.AddBatch, [], DRAIN)
+
+
+	def AddBatch(self, logs, offset):
+		"""
+		Adds a batch of logs to the database, or expires the live window if
+		the reader found no lines, then records the offset the batch ends at
+		and publishes a read snapshot if one is due. With several sources,
+		the logs released by the merge are added instead, and the offset
+		recorded is the committed offset of the first source.
+		"""
+
+		database = self.database
+		self.aggregator = threading.current_thread()
+
+		if database.sources != None:
+			logs, offset = database.sources.Merge(logs, offset)
+
+		if logs == None:
+			database.ExpireLiveWindow()
+		else:
+			database.AddLogs(logs)
+		database.offsetInLogFile = offset
+		database.CommitJournal()
+		database.PublishSnapshot()
+		self.RunRequests()
+
+
+	def RunRequests(self):
+		"""
+		Runs the calls waiting for the aggregator, see Call.
+		"""
+
+		while True:
+			try:
+				function, args, future = self.requests.get_nowait()
+			except queue.Empty:
+				return
+			if not future.set_running_or_notify_cancel():
+				continue
+			try:
+				future.set_result(function(*args))
+			except Exception as e:
+				future.set_exception(e)
+
+
+	def Call(self, function, *args):
+		"""
+		Calls a function on the aggregator between two batches, so it sees
+		the database as it is between them, and waits for its result. The
+		reader puts an empty batch whenever it waited for lines, so a call
+		waits for idleWait seconds at most once the batches queued are
+		added. Once the pipeline finished, or if it wasn't started, the
+		function is called on the calling thread.
+
+		Parameters
+		----------
+		function : function
+			The function to call.
+		*args
+			The arguments to call the function with.
+
+		Returns
+		-------
+		object
+			The result of the function.
+		"""
+
+		if self.thread == None or self.finished.is_set() or threading.current_thread() is self.aggregator:
+			return function(*args)
+
+		future = Future()
+		self.requests.put((function, args, future))
+
+		while not wait([future], self.idleWait).done:
+			if self.finished.is_set() and future.cancel():
+				return function(*args)
+
+		return future.result()
+
+
+	async def Enforce(self):
+		"""
+		The enforcer stage: publishes the latest blocked list after every
+		change, once the publisher delay has passed, and a last time once
+		the other stages finished. A failed publication is retried after
+		the publisher's retry delay, and left pending for the publisher's
+		Stop once the other stages finished.
+		"""
+
+		publisher = self.database.publisher
+
+		while True:
+			await self.publish.wait()
+			if not self.finishing.is_set():
+				try:
+					await asyncio.wait_for(self.finishing.wait(), publisher.RetryDelay())
+				except asyncio.TimeoutError:
+					pass
+			self.publish.clear()
+			await self.loop.run_in_executor(self.executors["enforcer"], publisher.Flush)
+			if self.finishing.is_set() and (publisher.pending == None or publisher.failures > 0):
+				break
+			if publisher.failures > 0:
+				self.publish.set()
+
+
+	def Stop(self, timeout = STOP_TIMEOUT):
+		"""
+		Asks the pipeline to stop, from any thread, and waits for it to
+		finish its batches.
+
+		Parameters
+		----------
+		timeout : float
+			A float representing the seconds to wait at most(default is STOP_TIMEOUT).
+
+		Returns
+		-------
+		bool
+			True if the pipeline finished, False if it is still running.
+		"""
+
+		self.stopRequested = True
+		loop = self.loop
+		if loop != None:
+			try:
+				loop.call_soon_threadsafe(self.stopping.set)
+			except RuntimeError:
+				pass
+
+		if threading.current_thread() is self.thread:
+			return False
+
+		return self.finished.wait(timeout)
+
+
+	def Counters(self):
+		"""
+		Returns the counters of the queues and stages.
+
+		Returns
+		-------
+		dict
+			A dictionary mapping queue names to their counters, and the publisher
+			counters to the number of blocked lists published and coalesced.
+		"""
+
+		publisher = self.database.publisher
+		counters = {"publisher": {"batches": publisher.batches, "reloads": publisher.reloads, "coalesced": publisher.coalesced}}
+		for queue in (self.parseQueue, self.aggregateQueue):
+			if queue != None:
+				counters[queue.name] = queue.Counters()
+
+		return counters
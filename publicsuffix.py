@@ -0,0 +1,255 @@
+import os
+
+PUBLIC_SUFFIX_LIST = os.path.join(os.path.dirname(os.path.abspath(__file__)), "public_suffix_list.dat")
+PRIVATE_MARKER = "// ===BEGIN PRIVATE DOMAINS==="
+
+CACHE_SIZE = 1 << 17
+
+# Marks the node of the trie at which a rule ends, holding the kind of the rule.
+END = None
+WILDCARD = "*"
+
+RULE = 1
+EXCEPTION = 2
+
+
+def ReadRules(fileName, includePrivate = True):
+	"""
+	Reads the rules of a public suffix list file. Rules with non ASCII
+	labels are read in both their Unicode and their IDNA(punycode) forms,
+	since names appear in the logs in the latter.
+
+	Parameters
+	----------
+	fileName : str
+		A string representing the public suffix list file name.
+	includePrivate : bool
+		A boolean flag indicating whether the private domains section is read(default is True).
+
+	Returns
+	-------
+	lst
+		A list of rules, e.g. "co.uk", "*.ck" or "!www.ck".
+	"""
+
+	rules = []
+
+	with open(fileName, encoding = "utf-8") as fh:
+		for line in fh:
+			if line.startswith(PRIVATE_MARKER) and not includePrivate:
+				break
+			tokens = line.split()
+			if not tokens or tokens[0].startswith("//"):
+				continue
+			rule = tokens[0].lower()
+			rules.append(rule)
+			if not rule.isascii():
+				prefix = "!" if rule.startswith("!") else ""
+				try:
+					rules.append(prefix + rule[len(prefix):].encode("idna").decode("ascii"))
+				except UnicodeError:
+					pass
+
+	return rules
+
+
+class PublicSuffixList:
+	"""
+	A class used to find the registered domain(eTLD+1) of domain names,
+	the public suffix they are under plus one label, e.g. example.co.uk
+	for a.b.example.co.uk. The rules of the public suffix list are compiled
+	into a trie of dictionaries keyed by labels from the right, so a lookup
+	costs one dictionary access per label, and results are kept in a cache
+	that is emptied once it holds cacheSize names.
+
+	Attributes
+	----------
+	root : dict
+		A dictionary representing the root node, every node maps labels to child nodes.
+	cacheSize : int
+		An integer representing the number of names the cache holds before it is emptied(default is CACHE_SIZE).
+	cache : dict
+		A dictionary mapping names to their registered domains.
+
+	Methods
+	-------
+	Add(rule)
+		Compiles a rule into the trie.
+	SuffixLength(labels)
+		Returns the number of labels of the public suffix of a name.
+	RegisteredDomain(name)
+		Returns the registered domain of a name.
+	PublicSuffix(name)
+		Returns the public suffix of a name.
+	"""
+
+	def __init__(self, fileName = PUBLIC_SUFFIX_LIST, includePrivate = True, cacheSize = CACHE_SIZE):
+		"""
+		Parameters
+		----------
+		fileName : str
+			A string representing the public suffix list file name, or None for an empty list(default is PUBLIC_SUFFIX_LIST).
+		includePrivate : bool
+			A boolean flag indicating whether the private domains(e.g. github.io) are public suffixes(default is True).
+		cacheSize : int
+			An integer representing the number of names the cache holds before it is emptied(default is CACHE_SIZE).
+		"""
+
+		self.root = {}
+		self.cacheSize = cacheSize
+		self.cache = {}
+
+		if fileName != None:
+			for rule in ReadRules(fileName, includePrivate):
+				self.Add(rule)
+
+
+	def Add(self, rule):
+		"""
+		Compiles a rule into the trie: "*" labels match any label, and
+		rules starting with "!" are exceptions to a wildcard rule.
+
+		Parameters
+		----------
+		rule : str
+			A string representing a rule of the public suffix list.
+		"""
+
+		kind = RULE
+		if rule.startswith("!"):
+			kind = EXCEPTION
+			rule = rule[1:]
+
+		node = self.root
+		for label in reversed(rule.split(".")):
+			node = node.setdefault(label, {})
+		node[END] = kind
+		self.cache.clear()
+
+
+	def SuffixLength(self, labels):
+		"""
+		Returns the number of labels of the public suffix of a name: the
+		longest matching rule, or the rule of the exception matching, or
+		the last label if no rule matches.
+
+		Parameters
+		----------
+		labels : lst
+			A list of the labels of a name.
+
+		Returns
+		-------
+		int
+			An integer representing the number of labels.
+		"""
+
+		node = self.root
+		length = 1
+		depth = 0
+
+		for label in reversed(labels):
+			child = node.get(label)
+			if child == None:
+				child = node.get(WILDCARD)
+				if child == None:
+					break
+			depth += 1
+			kind = child.get(END)
+			if kind == EXCEPTION:
+				return depth - 1
+			if kind == RULE:
+				length = depth
+			node = child
+
+		return length
+
+
+	def RegisteredDomain(self, name):
+		"""
+		Returns the registered domain of a name, in lower case. A name that
+		is a public suffix itself is returned as it is.
+
+		Parameters
+		----------
+		name : str
+			A string representing a domain name.
+
+		Returns
+		-------
+		str
+			A string representing the registered domain.
+		"""
+
+		domain = self.cache.get(name)
+		if domain != None:
+			return domain
+
+		labels = name.rstrip(".").lower().split(".")
+		length = self.SuffixLength(labels)
+		domain = ".".join(labels[-length - 1:]) if len(labels) > length else ".".join(labels)
+
+		if len(self.cache) >= self.cacheSize:
+			self.cache.clear()
+		self.cache[name] = domain
+
+		return domain
+
+
+	def PublicSuffix(self, name):
+		"""
+		Returns the public suffix of a name, in lower case.
+
+		Parameters
+		----------
+		name : str
+			A string representing a domain name.
+
+		Returns
+		-------
+		str
+			A string representing the public suffix.
+		"""
+
+		labels = name.rstrip(".").lower().split(".")
+
+		return ".".join(labels[-self.SuffixLength(labels):])
+
+
+DEFAULT_LIST = None
+
+
+def DefaultList():
+	"""
+	Returns the PublicSuffixList of the bundled public suffix list, loading it on first use.
+
+	Returns
+	-------
+	PublicSuffixList
+		The shared PublicSuffixList instance.
+	"""
+
+	global DEFAULT_LIST
+
+	if DEFAULT_LIST == None:
+		DEFAULT_LIST = PublicSuffixList()
+
+	return DEFAULT_LIST
+
+
+def RegisteredDomain(name):
+	"""
+	Returns the registered domain of a name, according to the bundled public suffix list.
+
+	Parameters
+	----------
+	name : str
+		A string representing a domain name.
+
+	Returns
+	-------
+	str
+		A string representing the registered domain.
+	"""
+
+	return DefaultList().RegisteredDomain(name)
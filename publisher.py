@@ -0,0 +1,267 @@
+import os
+import subprocess
+import threading
+import time
+
+from domainlist import WILDCARD_PREFIX
+
+HOSTS_PATH = '/home/os212/pygui/dnsmasq.hosts'
+RELOAD_COMMAND = ['sudo', '/home/os212/pygui/reloadConf.sh']
+WILDCARD_COMMAND = ['sudo', '/home/os212/pygui/updateBlock.sh']
+BLOCK_ADDRESS = "5.145.145.0"
+RETRY_DELAY = 0.5
+MAX_RETRY_DELAY = 30.0
+
+
+class BlocklistPublisher:
+	"""
+	A class used to enforce the blocked list on dnsmasq off the parser thread.
+	Changes are collected for a short delay, then the hosts file is replaced
+	atomically, dnsmasq is reloaded once for the whole batch, and the wildcard
+	script is only called for suffixes that weren't published before. A
+	suffix whose wildcard entry left the list is forgotten, so the script
+	is called again if it is blocked again. A publication that failed is
+	kept and retried, after a delay doubling with every failure in a row.
+	Once stopped, blocked lists are published right away on the caller's thread.
+
+	Attributes
+	----------
+	hostsPath : str
+		A string representing the path of the dnsmasq hosts file(default is HOSTS_PATH).
+	reloadCommand : lst
+		A list representing the command reloading dnsmasq(default is RELOAD_COMMAND).
+	wildcardCommand : lst
+		A list representing the command blocking a suffix, the suffix is appended to it(default is WILDCARD_COMMAND).
+	delay : float
+		A float representing the number of seconds changes are collected for before publishing(default is 0.5).
+	pending : lst
+		A list of the domains to be published next, or None if there is nothing to publish.
+	failures : int
+		An integer representing the number of publications that failed in a row(default is 0).
+	publishedSuffixes : set
+		A set of the suffixes already passed to the wildcard script.
+	publishedHosts : str
+		A string representing the content of the hosts file last written(default is None).
+	batches : int
+		An integer representing the number of batches published(default is 0).
+	reloads : int
+		An integer representing the number of times dnsmasq was reloaded(default is 0).
+	coalesced : int
+		An integer representing the number of blocked lists replaced by a newer one before they were published(default is 0).
+	notify : function
+		A function called when a blocked list is scheduled, in place of starting the worker thread,
+		for callers publishing on their own, see pipeline.IngestPipeline(default is None).
+	metrics : Metrics
+		A Metrics instance the seconds every batch took to publish are observed into, under the enforce stage(default is None).
+	lock : Lock
+		A Lock instance guarding the pending attribute.
+	publishing : Lock
+		A Lock instance held for a whole publication, so the threads flushing, e.g. the worker
+		thread, the enforcer of a pipeline and a stopping parser, write the hosts file one at a time.
+	stopping : Event
+		An Event instance set by Stop, waking the worker thread from its delay.
+
+	Methods
+	-------
+	Publish(blockedList)
+		Schedules the publication of a blocked list.
+	Flush()
+		Publishes the pending blocked list, if any, on the calling thread.
+	RetryDelay()
+		Returns the seconds to wait before publishing the pending blocked list.
+	Stop()
+		Publishes the pending blocked list and stops the worker thread.
+	"""
+
+	def __init__(self, hostsPath = HOSTS_PATH, reloadCommand = RELOAD_COMMAND, wildcardCommand = WILDCARD_COMMAND, delay = 0.5):
+		"""
+		Parameters
+		----------
+		hostsPath : str
+			A string representing the path of the dnsmasq hosts file(default is HOSTS_PATH).
+		reloadCommand : lst
+			A list representing the command reloading dnsmasq(default is RELOAD_COMMAND).
+		wildcardCommand : lst
+			A list representing the command blocking a suffix(default is WILDCARD_COMMAND).
+		delay : float
+			A float representing the number of seconds changes are collected for(default is 0.5).
+		"""
+
+		self.hostsPath = hostsPath
+		self.reloadCommand = reloadCommand
+		self.wildcardCommand = wildcardCommand
+		self.delay = delay
+		self.pending = None
+		self.failures = 0
+		self.publishedSuffixes = set()
+		self.publishedHosts = None
+		self.batches = 0
+		self.reloads = 0
+		self.coalesced = 0
+		self.notify = None
+		self.metrics = None
+		self.lock = threading.Lock()
+		self.publishing = threading.Lock()
+		self.changed = threading.Event()
+		self.stopping = threading.Event()
+		self.stopped = False
+		self.thread = None
+
+
+	def Publish(self, blockedList):
+		"""
+		Schedules the publication of a blocked list. Only the most recent
+		list scheduled during the delay is published. Once the publisher
+		is stopped, the list is published right away.
+
+		Parameters
+		----------
+		blockedList : lst
+			A list of domain names, wildcard entries start with WILDCARD_PREFIX.
+		"""
+
+		with self.lock:
+			if self.pending != None:
+				self.coalesced += 1
+			self.pending = list(blockedList)
+			notify = self.notify
+			if notify != None:
+				notify()
+				return
+			if not self.stopped and self.thread == None:
+				self.thread = threading.Thread(target = self.Run, daemon = True)
+				self.thread.start()
+		if self.stopped:
+			self.Flush()
+			return
+		self.changed.set()
+
+
+	def Run(self):
+		"""
+		The worker thread loop.
+		"""
+
+		while not self.stopped:
+			self.changed.wait()
+			if self.stopped:
+				break
+			self.stopping.wait(self.RetryDelay())
+			self.changed.clear()
+			self.Flush()
+			if self.failures > 0:
+				self.changed.set()
+
+
+	def Flush(self):
+		"""
+		Publishes the pending blocked list, if any, on the calling thread.
+		A publication in progress on another thread is waited for first.
+		Failures are reported and counted, and the list is kept pending
+		unless a newer one was scheduled meanwhile, see RetryDelay.
+		"""
+
+		with self.publishing:
+			with self.lock:
+				blockedList = self.pending
+				self.pending = None
+
+			if blockedList == None:
+				return
+
+			start = time.perf_counter()
+			failed = True
+			try:
+				hosts = ""
+				suffixes = set()
+				newSuffixes = []
+
+				for domain in blockedList:
+					if domain.startswith(WILDCARD_PREFIX):
+						suffix = domain[len(WILDCARD_PREFIX):]
+						suffixes.add(suffix)
+						if suffix not in self.publishedSuffixes:
+							newSuffixes.append(suffix)
+					else:
+						hosts += BLOCK_ADDRESS + " " + domain + ".\n"
+				self.publishedSuffixes &= suffixes
+
+				if hosts == self.publishedHosts and not newSuffixes:
+					self.failures = 0
+					return
+
+				if hosts != self.publishedHosts:
+					self.WriteHosts(hosts)
+				for suffix in newSuffixes:
+					subprocess.call(self.wildcardCommand + [suffix])
+					self.publishedSuffixes.add(suffix)
+				subprocess.call(self.reloadCommand)
+				self.reloads += 1
+				failed = False
+			except OSError as error:
+				print("failed publishing blocked list: " + str(error))
+			except Exception as error:
+				print("failed publishing blocked list: " + repr(error))
+
+			if failed:
+				with self.lock:
+					if self.pending == None:
+						self.pending = blockedList
+				self.failures += 1
+			else:
+				self.failures = 0
+			self.batches += 1
+			if self.metrics != None:
+				self.metrics.Observe("stage_seconds", "enforce", time.perf_counter() - start)
+
+
+	def RetryDelay(self):
+		"""
+		Returns the seconds to wait before publishing the pending blocked
+		list: the delay, or after failed publications RETRY_DELAY doubled
+		for every failure in a row, up to MAX_RETRY_DELAY.
+
+		Returns
+		-------
+		float
+			A float representing the seconds.
+		"""
+
+		if self.failures == 0:
+			return self.delay
+
+		return min(MAX_RETRY_DELAY, max(self.delay, RETRY_DELAY) * 2 ** (self.failures - 1))
+
+
+	def WriteHosts(self, hosts):
+		"""
+		Replaces the hosts file atomically, by writing a temporary file
+		next to it and renaming it over the hosts file.
+
+		Parameters
+		----------
+		hosts : str
+			A string representing the content of the hosts file.
+		"""
+
+		temporaryPath = self.hostsPath + ".tmp"
+
+		with open(temporaryPath, 'w') as hostsFile:
+			hostsFile.write(hosts)
+			hostsFile.flush()
+			os.fsync(hostsFile.fileno())
+		os.replace(temporaryPath, self.hostsPath)
+		self.publishedHosts = hosts
+
+
+	def Stop(self):
+		"""
+		Publishes the pending blocked list and stops the worker thread.
+		"""
+
+		self.stopped = True
+		self.stopping.set()
+		self.changed.set()
+		if self.thread != None:
+			self.thread.join()
+		self.Flush()
@@ -0,0 +1,142 @@
+from collections import Counter
+
+# The record types parsed into logs by default, with their weights. Tunnels
+# favour the types whose answers carry the most data, so a query of these
+# types counts more against the thresholds of its domain.
+DEFAULT_PROFILES = (
+	("A", 1),
+	("AAAA", 1),
+	("MX", 2),
+	("CNAME", 2),
+	("TXT", 3),
+	("NULL", 4),
+)
+
+
+class QueryType:
+	"""
+	A class used to represent a record type parsed into logs, and its profile.
+
+	Attributes
+	----------
+	name : str
+		A string representing the record type, e.g. "TXT".
+	weight : int
+		An integer representing how many queries one query of the type counts as, against the
+		suspicious and benign thresholds of the rate detector(default is 1).
+	"""
+
+	__slots__ = ("name", "weight")
+
+	def __init__(self, name, weight = 1):
+		"""
+		Parameters
+		----------
+		name : str
+			A string representing the record type.
+		weight : int
+			An integer representing how many queries one query of the type counts as(default is 1).
+		"""
+
+		self.name = name
+		self.weight = weight
+
+
+class QueryTypes:
+	"""
+	A class used to hold the dispatch table of the record types parsed into
+	logs. The table is keyed by the record type as it appears in the logs,
+	in bytes, so the scanner finds the profile of a query line with a single
+	dictionary lookup, whatever the number of types, and lines of other
+	types are skipped by the same lookup. The queries of every type are
+	counted per batch.
+
+	Attributes
+	----------
+	types : dict
+		A dictionary mapping record types in bytes, e.g. b"TXT", to QueryType instances.
+	counts : dict
+		A dictionary mapping record types to the number of queries of the type parsed.
+
+	Methods
+	-------
+	Add(name, weight)
+		Adds a record type to the table, or changes its weight.
+	Remove(name)
+		Removes a record type from the table.
+	Count(queryTypes)
+		Counts a batch of parsed queries per type.
+	Profiles()
+		Returns the (name, weight) tuples of the table.
+	"""
+
+	def __init__(self, profiles = DEFAULT_PROFILES):
+		"""
+		Parameters
+		----------
+		profiles : tuple
+			A tuple of (name, weight) tuples of the record types to parse(default is DEFAULT_PROFILES).
+		"""
+
+		self.types = {}
+		self.counts = {}
+
+		for name, weight in profiles:
+			self.Add(name, weight)
+
+
+	def Add(self, name, weight = 1):
+		"""
+		Adds a record type to the table, or changes its weight.
+
+		Parameters
+		----------
+		name : str
+			A string representing the record type.
+		weight : int
+			An integer representing how many queries one query of the type counts as(default is 1).
+		"""
+
+		self.types[name.encode("ascii")] = QueryType(name, weight)
+		self.counts.setdefault(name, 0)
+
+
+	def Remove(self, name):
+		"""
+		Removes a record type from the table, its count is kept.
+
+		Parameters
+		----------
+		name : str
+			A string representing the record type.
+		"""
+
+		self.types.pop(name.encode("ascii"), None)
+
+
+	def Count(self, queryTypes):
+		"""
+		Counts a batch of parsed queries per type.
+
+		Parameters
+		----------
+		queryTypes : iterable
+			An iterable of the QueryType instances of the queries.
+		"""
+
+		counts = self.counts
+		for queryType, count in Counter(queryTypes).items():
+			counts[queryType.name] = counts.get(queryType.name, 0) + count
+
+
+	def Profiles(self):
+		"""
+		Returns the (name, weight) tuples of the table, e.g. to rebuild it in another process.
+
+		Returns
+		-------
+		lst
+			A list of (name, weight) tuples.
+		"""
+
+		return [(queryType.name, queryType.weight) for queryType in self.types.values()]
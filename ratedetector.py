@@ -0,0 +1,167 @@
+from collections import deque
+
+WINDOW_SECONDS = 10 * 60
+SUSPICIOUS_THRESHOLD = 20
+BENIGN_THRESHOLD = 500
+
+# A bucket is stored as a single int: its number shifted left by COUNT_BITS, plus its count.
+COUNT_BITS = 20
+COUNT_MASK = (1 << COUNT_BITS) - 1
+
+
+class RateDetector:
+	"""
+	A class used to count the queries of every domain in a sliding time
+	window. Every domain keeps a deque of buckets, each packed into a
+	single int, and a running total, so an update is O(1) amortized and
+	the count is exact at any moment, regardless of where a burst starts.
+	A query counts as its weight, so record types favoured by tunnels
+	reach the thresholds sooner(see querytypes.QueryTypes).
+
+	Attributes
+	----------
+	window : int
+		An integer representing the length of the window in seconds(default is WINDOW_SECONDS).
+	suspiciousThreshold : int
+		An integer representing the number of queries in the window above which
+		a suspicious domain is blocked(default is SUSPICIOUS_THRESHOLD).
+	benignThreshold : int
+		An integer representing the number of queries in the window above which
+		any other domain is blocked(default is BENIGN_THRESHOLD).
+	resolution : int
+		An integer representing the width of a bucket in seconds(default is 1).
+	buckets : dict
+		A dictionary mapping domain names to deques of packed buckets.
+	totals : dict
+		A dictionary mapping domain names to their weighted count in the window.
+	nextSweep : int
+		An integer representing the time of the next sweep of idle domains(default is None).
+
+	Methods
+	-------
+	Update(domain, second, isSuspiciousDomain, weight)
+		Counts a query and checks the domain against its threshold.
+	Count(domain, second)
+		Returns the weighted number of queries of a domain in the window ending at second.
+	Sweep(second)
+		Forgets the domains with no queries in the window ending at second.
+	"""
+
+	def __init__(self, window = WINDOW_SECONDS, suspiciousThreshold = SUSPICIOUS_THRESHOLD, benignThreshold = BENIGN_THRESHOLD, resolution = 1):
+		"""
+		Parameters
+		----------
+		window : int
+			An integer representing the length of the window in seconds(default is WINDOW_SECONDS).
+		suspiciousThreshold : int
+			An integer representing the threshold of suspicious domains(default is SUSPICIOUS_THRESHOLD).
+		benignThreshold : int
+			An integer representing the threshold of other domains(default is BENIGN_THRESHOLD).
+		resolution : int
+			An integer representing the width of a bucket in seconds(default is 1).
+		"""
+
+		self.window = window
+		self.suspiciousThreshold = suspiciousThreshold
+		self.benignThreshold = benignThreshold
+		self.resolution = resolution
+		self.buckets = {}
+		self.totals = {}
+		self.nextSweep = None
+
+
+	def __len__(self):
+
+		return len(self.buckets)
+
+
+	def Update(self, domain, second, isSuspiciousDomain = False, weight = 1):
+		"""
+		Counts a query and checks the domain against its threshold.
+
+		Parameters
+		----------
+		domain : str
+			A string representing the domain name.
+		second : int
+			An integer representing the time of the query in seconds since the epoch.
+		isSuspiciousDomain : bool
+			A boolean flag indicating whether the domain is considerd suspicious(default is False).
+		weight : int
+			An integer representing how many queries the query counts as(default is 1).
+
+		Returns
+		-------
+		bool
+			True if the weighted count of the domain in the window is above its threshold.
+		"""
+
+		bucket = (second // self.resolution) << COUNT_BITS
+		oldest = bucket - ((self.window // self.resolution) << COUNT_BITS) + COUNT_MASK
+		buckets = self.buckets.get(domain)
+
+		if buckets == None:
+			buckets = self.buckets[domain] = deque()
+			total = 0
+		else:
+			total = self.totals[domain]
+			while buckets and buckets[0] <= oldest:
+				total -= buckets.popleft() & COUNT_MASK
+
+		if buckets and buckets[-1] >= bucket:
+			buckets[-1] += weight
+		else:
+			buckets.append(bucket + weight)
+		total += weight
+		self.totals[domain] = total
+
+		if self.nextSweep == None:
+			self.nextSweep = second + self.window
+		elif second >= self.nextSweep:
+			self.Sweep(second)
+
+		if isSuspiciousDomain:
+			return total > self.suspiciousThreshold
+
+		return total > self.benignThreshold
+
+
+	def Count(self, domain, second):
+		"""
+		Returns the weighted number of queries of a domain in the window ending at second.
+
+		Parameters
+		----------
+		domain : str
+			A string representing the domain name.
+		second : int
+			An integer representing the end of the window in seconds since the epoch.
+
+		Returns
+		-------
+		int
+			An integer representing the weighted number of queries in the window.
+		"""
+
+		oldest = second // self.resolution - self.window // self.resolution
+
+		return sum(bucket & COUNT_MASK for bucket in self.buckets.get(domain, ()) if bucket >> COUNT_BITS > oldest)
+
+
+	def Sweep(self, second):
+		"""
+		Forgets the domains with no queries in the window ending at second.
+
+		Parameters
+		----------
+		second : int
+			An integer representing the end of the window in seconds since the epoch.
+		"""
+
+		oldest = second // self.resolution - self.window // self.resolution
+
+		for domain in [domain for domain, buckets in self.buckets.items() if buckets[-1] >> COUNT_BITS <= oldest]:
+			del self.buckets[domain]
+			del self.totals[domain]
+
+		self.nextSweep = second + self.window
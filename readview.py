@@ -0,0 +1,390 @@
+from collections import deque, OrderedDict
+import threading
+import time
+
+SNAPSHOT_INTERVAL = 0.25
+REFRESH_INTERVAL = 1.0
+MAX_STALENESS = 2.0
+TOP_K = 100
+WATCHED_DOMAINS = 64
+
+# The aggregates computed only while readers ask for them, every REFRESH_INTERVAL
+# at most since they are costly, and dropped from the snapshots once no reader
+# asked for them for WANTED_SECONDS.
+ON_DEMAND = ("span", "span10", "registered", "subdomains")
+WANTED_SECONDS = 5.0
+
+
+class ReadSnapshot:
+	"""
+	A class used to represent the aggregates of a database at one moment,
+	published by the ingest thread for readers on other threads. A
+	snapshot is never changed once published, readers may keep it as long
+	as they like.
+
+	Attributes
+	----------
+	generation : int
+		An integer representing the number of snapshots published before this one.
+	published : float
+		A float representing the time.monotonic() time the snapshot was published at.
+	offset : int
+		An integer representing the offset in the logs file the snapshot was taken at.
+	aggregates : dict
+		A dictionary mapping aggregate names, or ("history", domain) tuples, to (key, value, built) tuples,
+		key being the parameters the value was computed for, e.g. the time span, or None, and built the
+		time.monotonic() time it was computed at.
+
+	Methods
+	-------
+	Age(aggregate)
+		Returns the seconds since the snapshot, or one of its aggregates, was built.
+	Holds(aggregate, key)
+		Checks whether the snapshot holds an aggregate, computed for a given key.
+	Get(aggregate)
+		Returns the value of an aggregate.
+	"""
+
+	__slots__ = ("generation", "published", "offset", "aggregates")
+
+	def __init__(self, generation, offset, aggregates):
+		"""
+		Parameters
+		----------
+		generation : int
+			An integer representing the number of snapshots published before this one.
+		offset : int
+			An integer representing the offset in the logs file the snapshot was taken at.
+		aggregates : dict
+			A dictionary mapping aggregate names to (key, value, built) tuples.
+		"""
+
+		self.generation = generation
+		self.published = time.monotonic()
+		self.offset = offset
+		self.aggregates = aggregates
+
+
+	def Age(self, aggregate = None):
+		"""
+		Returns the seconds since the snapshot was published, or since one
+		of its aggregates was computed, which may be carried over from an
+		older snapshot.
+
+		Parameters
+		----------
+		aggregate : str or tuple
+			The name of an aggregate held, or None(default is None).
+
+		Returns
+		-------
+		float
+			A float representing the age in seconds.
+		"""
+
+		if aggregate == None:
+			return time.monotonic() - self.published
+
+		return time.monotonic() - self.aggregates[aggregate][2]
+
+
+	def Holds(self, aggregate, key = None):
+		"""
+		Checks whether the snapshot holds an aggregate, computed for a given key.
+
+		Parameters
+		----------
+		aggregate : str or tuple
+			The name of the aggregate.
+		key : object
+			The parameters the aggregate should have been computed for(default is None).
+
+		Returns
+		-------
+		bool
+			True if the snapshot holds the aggregate for the key.
+		"""
+
+		entry = self.aggregates.get(aggregate)
+
+		return entry != None and entry[0] == key
+
+
+	def Get(self, aggregate):
+		"""
+		Returns the value of an aggregate.
+
+		Parameters
+		----------
+		aggregate : str or tuple
+			The name of the aggregate.
+
+		Returns
+		-------
+		object
+			The value of the aggregate, or None if the snapshot doesn't hold it.
+		"""
+
+		entry = self.aggregates.get(aggregate)
+
+		return None if entry == None else entry[1]
+
+
+class ReadView:
+	"""
+	A class used to hand the aggregates of a database from the ingest
+	thread to reader threads, e.g. the GUI, without locking the live
+	structures. The ingest thread builds a new ReadSnapshot every interval
+	between batches of logs, and publishes it by replacing the current
+	attribute, a single reference assignment, so readers never see a
+	snapshot half built and the ingest thread never waits for a reader.
+
+	Readers get a bounded staleness: Read returns a snapshot published at
+	most maxStaleness seconds ago, waiting for the next one if the current
+	one is older, or for the first one holding an aggregate a reader asked
+	for. Only readers wait, on a condition the ingest thread notifies
+	after publishing. If no snapshot comes within maxStaleness, e.g. the
+	ingest thread stopped, the latest one is returned and counted as a
+	stale read.
+
+	Aggregates that are costly to compute(ON_DEMAND) are only built while
+	readers ask for them, and every refreshInterval at most, in between
+	they are carried over to the new snapshots as they are, so the bound
+	holds as long as refreshInterval and interval add up to less than
+	maxStaleness. The histories of the domains readers asked for lately
+	(up to watchedDomains of them) are built into every snapshot.
+
+	Attributes
+	----------
+	interval : float
+		A float representing the seconds between snapshots(default is SNAPSHOT_INTERVAL).
+	refreshInterval : float
+		A float representing the seconds between two computations of an ON_DEMAND aggregate(default is REFRESH_INTERVAL).
+	maxStaleness : float
+		A float representing the age in seconds of the oldest snapshot returned by Read(default is MAX_STALENESS).
+	topK : int
+		An integer representing the number of elements of the top lists in the snapshots(default is TOP_K).
+	watchedDomains : int
+		An integer representing the number of domains whose histories are kept in the snapshots(default is WATCHED_DOMAINS).
+	current : ReadSnapshot
+		The latest snapshot published(default is None).
+	wanted : dict
+		A dictionary mapping the ON_DEMAND aggregates to the time.monotonic() time a reader last asked for them.
+	requests : deque
+		A deque of the domains whose histories readers asked for, since the last snapshot.
+	watched : OrderedDict
+		An OrderedDict of the domains whose histories are kept, least recently asked for first.
+	writer : threading.Thread
+		The thread building the snapshots(default is None).
+	publishes : int
+		An integer representing the number of snapshots published(default is 0).
+	publishSeconds : float
+		A float representing the seconds spent building snapshots(default is 0.0).
+	reads : int
+		An integer representing the number of calls to Read(default is 0).
+	waits : int
+		An integer representing the number of reads that waited for a snapshot(default is 0).
+	staleReads : int
+		An integer representing the number of reads that got a snapshot older than maxStaleness(default is 0).
+
+	Methods
+	-------
+	Due()
+		Checks whether a new snapshot should be published.
+	Wanted()
+		Returns the ON_DEMAND aggregates readers asked for lately, and the watched domains.
+	Entry(aggregate, key, build)
+		Returns the entry of an aggregate for the next snapshot.
+	Publish(aggregates, offset, seconds)
+		Publishes a new snapshot and wakes the waiting readers.
+	Read(aggregate, key)
+		Returns a snapshot within the staleness bound, holding an aggregate.
+	Counters()
+		Returns the counters of the view.
+	"""
+
+	def __init__(self, interval = SNAPSHOT_INTERVAL, refreshInterval = REFRESH_INTERVAL, maxStaleness = MAX_STALENESS, topK = TOP_K, watchedDomains = WATCHED_DOMAINS):
+		"""
+		Parameters
+		----------
+		interval : float
+			A float representing the seconds between snapshots(default is SNAPSHOT_INTERVAL).
+		refreshInterval : float
+			A float representing the seconds between two computations of an ON_DEMAND aggregate(default is REFRESH_INTERVAL).
+		maxStaleness : float
+			A float representing the age in seconds of the oldest snapshot returned by Read(default is MAX_STALENESS).
+		topK : int
+			An integer representing the number of elements of the top lists in the snapshots(default is TOP_K).
+		watchedDomains : int
+			An integer representing the number of domains whose histories are kept(default is WATCHED_DOMAINS).
+		"""
+
+		self.interval = interval
+		self.refreshInterval = refreshInterval
+		self.maxStaleness = maxStaleness
+		self.topK = topK
+		self.watchedDomains = watchedDomains
+		self.current = None
+		self.wanted = dict.fromkeys(ON_DEMAND, None)
+		self.requests = deque()
+		self.watched = OrderedDict()
+		self.writer = None
+		self.nextPublish = 0.0
+		self.condition = threading.Condition()
+		self.publishes = 0
+		self.publishSeconds = 0.0
+		self.reads = 0
+		self.waits = 0
+		self.staleReads = 0
+
+
+	def Due(self):
+		"""
+		Checks whether a new snapshot should be published: once the
+		interval has passed, or as soon as a reader asked for a history.
+
+		Returns
+		-------
+		bool
+			True if a snapshot should be published.
+		"""
+
+		return time.monotonic() >= self.nextPublish or len(self.requests) > 0
+
+
+	def Wanted(self):
+		"""
+		Returns the ON_DEMAND aggregates readers asked for lately, and the
+		domains whose histories should be in the next snapshot. Called by
+		the ingest thread only.
+
+		Returns
+		-------
+		tuple
+			A list of aggregate names and a list of domains.
+		"""
+
+		now = time.monotonic()
+		aggregates = [aggregate for aggregate, asked in list(self.wanted.items()) if asked != None and now - asked < WANTED_SECONDS]
+
+		watched = self.watched
+		while self.requests:
+			domain = self.requests.popleft()
+			watched[domain] = True
+			watched.move_to_end(domain)
+		while len(watched) > self.watchedDomains:
+			watched.popitem(last = False)
+
+		return aggregates, list(watched)
+
+
+	def Entry(self, aggregate, key, build):
+		"""
+		Returns the entry of an aggregate for the next snapshot: the entry
+		of the current snapshot if it was computed for the same key less
+		than refreshInterval ago and the aggregate is ON_DEMAND, otherwise
+		a new one. Called by the ingest thread only.
+
+		Parameters
+		----------
+		aggregate : str or tuple
+			The name of the aggregate.
+		key : object
+			The parameters the aggregate is computed for, or None.
+		build : function
+			A function computing the value of the aggregate, which must not be changed afterwards.
+
+		Returns
+		-------
+		tuple
+			A (key, value, built) tuple.
+		"""
+
+		snapshot = self.current
+		if aggregate in self.wanted and snapshot != None and snapshot.Holds(aggregate, key) and snapshot.Age(aggregate) < self.refreshInterval:
+			return snapshot.aggregates[aggregate]
+
+		return (key, build(), time.monotonic())
+
+
+	def Publish(self, aggregates, offset, seconds):
+		"""
+		Publishes a new snapshot and wakes the readers waiting for one.
+
+		Parameters
+		----------
+		aggregates : dict
+			A dictionary mapping aggregate names to (key, value, built) tuples, see Entry.
+		offset : int
+			An integer representing the offset in the logs file the snapshot was taken at.
+		seconds : float
+			A float representing the seconds the snapshot took to build.
+		"""
+
+		self.current = ReadSnapshot(self.publishes, offset, aggregates)
+		self.publishes += 1
+		self.publishSeconds += seconds
+		self.nextPublish = time.monotonic() + self.interval
+
+		with self.condition:
+			self.condition.notify_all()
+
+
+	def Read(self, aggregate = None, key = None):
+		"""
+		Returns a snapshot holding an aggregate computed for a given key
+		at most maxStaleness seconds ago, waiting for the next snapshot if
+		needed. Asking for an aggregate keeps it in the
+		snapshots, see Wanted.
+
+		Parameters
+		----------
+		aggregate : str or tuple
+			The name of an aggregate, ("history", domain) for the history of a domain, or None(default is None).
+		key : object
+			The parameters the aggregate should have been computed for(default is None).
+
+		Returns
+		-------
+		ReadSnapshot
+			The snapshot, or the latest one if none came within maxStaleness, or None if none was published.
+		"""
+
+		self.reads += 1
+
+		if aggregate in self.wanted:
+			self.wanted[aggregate] = time.monotonic()
+		elif isinstance(aggregate, tuple) and (self.current == None or not self.current.Holds(aggregate, key)):
+			self.requests.append(aggregate[1])
+
+		def Fresh():
+			snapshot = self.current
+			if snapshot == None:
+				return False
+			if aggregate == None:
+				return snapshot.Age() <= self.maxStaleness
+			return snapshot.Holds(aggregate, key) and snapshot.Age(aggregate) <= self.maxStaleness
+
+		if not Fresh():
+			self.waits += 1
+			with self.condition:
+				if not self.condition.wait_for(Fresh, self.maxStaleness):
+					self.staleReads += 1
+
+		return self.current
+
+
+	def Counters(self):
+		"""
+		Returns the counters of the view.
+
+		Returns
+		-------
+		dict
+			A dictionary mapping counter names to their values, and the age of the current snapshot.
+		"""
+
+		snapshot = self.current
+
+		return {"publishes": self.publishes, "publishSeconds": self.publishSeconds, "reads": self.reads, "waits": self.waits,
+			"staleReads": self.staleReads, "age": None if snapshot == None else snapshot.Age()}
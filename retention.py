@@ -0,0 +1,319 @@
+ROLLUP_AGE = 48 * 60 * 60
+ROLLUP_WIDTH = 60 * 60
+PROTECT_SECONDS = 10 * 60
+RETRY_SECONDS = 60
+LOW_WATER = 0.9
+
+LRU = "lru"
+LFU = "lfu"
+
+# Estimated bytes held by a window: its LogStore columns and its index in the time index.
+WINDOW_BYTES = 32
+# Estimated bytes held by a domain besides its name: its LogStore slots, its str
+# header and its entries in the numbersOfDomains and countForDomains dictionaries.
+DOMAIN_BYTES = 200
+# Estimated bytes held by a (domain, count) entry of a time index bucket.
+INDEX_ENTRY_BYTES = 100
+# Estimated bytes held by a domain in the live top K: its count, heap slot and bucket entries.
+LIVE_DOMAIN_BYTES = 300
+# Estimated bytes held by a domain in the rate detector: its deque of buckets and total.
+RATE_DOMAIN_BYTES = 700
+# Estimated bytes held by a parent in the subdomain counter: its deque of sketches, mostly sparse.
+PARENT_BYTES = 1200
+
+
+class Retention:
+	"""
+	A class used to bound the history kept by a database. Windows older
+	than rollupAge are rolled up into the peak window of their domain in
+	every rollupWidth bucket, which then counts all the queries of the
+	bucket: the history of a domain and the 10 minutes top K show a rolled
+	up bucket at the time of its peak window with the sum of its counts, so
+	the counts of a domain still add up to its total. Once the estimated
+	size of the history goes over memoryBudget, the coldest domains are
+	evicted, least recently(LRU, by the time of their newest query) or
+	least frequently(LFU) queried first, until it is back under lowWater
+	times the budget. Domains in the blocked or approved lists and domains
+	queried in the last protectSeconds are never evicted.
+
+	The estimated size counts the windows and domains of the history, the
+	entries of the time index tiers, and the domains of the live top K,
+	the rate detector and the subdomain counter. The time index keeps the
+	counts of rolled up and evicted domains in its tiers until they age
+	out of their ring, so top K answers over long spans stay exact; an
+	eviction only frees the windows, the name and the rate detector
+	buckets of a domain, and a budget smaller than the time index alone
+	leaves only the protected domains in the history. The live top K and the subdomain counter aren't
+	evicted from, they forget idle domains by themselves within their
+	window.
+
+	Attributes
+	----------
+	rollupAge : int
+		An integer representing the age in seconds above which windows are rolled up, or None(default is ROLLUP_AGE).
+	rollupWidth : int
+		An integer representing the width in seconds of a rolled up bucket(default is ROLLUP_WIDTH).
+	memoryBudget : int
+		An integer representing the estimated number of bytes the history may hold, or None(default is None).
+	policy : str
+		A string representing the eviction policy, LRU or LFU(default is LRU).
+	lowWater : float
+		A float representing the fraction of the budget an eviction brings the history down to(default is LOW_WATER).
+	protectSeconds : int
+		An integer representing the number of seconds a queried domain is protected from eviction(default is PROTECT_SECONDS).
+	rolledUntil : int
+		An integer representing the time up to which windows were rolled up(default is None).
+	nextRollup : int
+		An integer representing the time of the next rollup(default is None).
+	nextEviction : int
+		An integer representing the time before which no eviction is retried(default is None).
+	rollups : int
+		An integer representing the number of rollups made(default is 0).
+	windowsRolledUp : int
+		An integer representing the number of windows folded into a peak window(default is 0).
+	evictions : int
+		An integer representing the number of evictions made(default is 0).
+	domainsEvicted : int
+		An integer representing the number of domains evicted(default is 0).
+	windowsEvicted : int
+		An integer representing the number of windows evicted with their domain(default is 0).
+	bytesEvicted : int
+		An integer representing the estimated number of bytes evicted(default is 0).
+
+	Methods
+	-------
+	EstimateBytes(database)
+		Returns the estimated number of bytes held by the history.
+	Check(database, second)
+		Rolls up and evicts, if due, after a query.
+	RollUp(database, second)
+		Rolls up the windows older than rollupAge.
+	Evict(database, second)
+		Evicts the coldest domains until the history is under lowWater times the budget.
+	Counters()
+		Returns the counters of the rollups and evictions.
+	"""
+
+	def __init__(self, rollupAge = ROLLUP_AGE, rollupWidth = ROLLUP_WIDTH, memoryBudget = None, policy = LRU, lowWater = LOW_WATER, protectSeconds = PROTECT_SECONDS):
+		"""
+		Parameters
+		----------
+		rollupAge : int
+			An integer representing the age in seconds above which windows are rolled up, or None(default is ROLLUP_AGE).
+		rollupWidth : int
+			An integer representing the width in seconds of a rolled up bucket(default is ROLLUP_WIDTH).
+		memoryBudget : int
+			An integer representing the estimated number of bytes the history may hold, or None(default is None).
+		policy : str
+			A string representing the eviction policy, LRU or LFU(default is LRU).
+		lowWater : float
+			A float representing the fraction of the budget an eviction brings the history down to(default is LOW_WATER).
+		protectSeconds : int
+			An integer representing the number of seconds a queried domain is protected from eviction(default is PROTECT_SECONDS).
+		"""
+
+		if policy not in (LRU, LFU):
+			raise ValueError("unknown eviction policy: " + str(policy))
+
+		self.rollupAge = rollupAge
+		self.rollupWidth = rollupWidth
+		self.memoryBudget = memoryBudget
+		self.policy = policy
+		self.lowWater = lowWater
+		self.protectSeconds = protectSeconds
+		self.rolledUntil = None
+		self.nextRollup = None
+		self.nextEviction = None
+		self.rollups = 0
+		self.windowsRolledUp = 0
+		self.evictions = 0
+		self.domainsEvicted = 0
+		self.windowsEvicted = 0
+		self.bytesEvicted = 0
+
+
+	def EstimateBytes(self, database):
+		"""
+		Returns the estimated number of bytes held by the history: the
+		windows and domains of the logs attribute, the entries of the time
+		index and the domains of the live top K, the rate detector and
+		the subdomain counter.
+
+		Parameters
+		----------
+		database : DATABASE
+			A DATABASE instance.
+
+		Returns
+		-------
+		int
+			An integer representing the estimated number of bytes.
+		"""
+
+		store = database.logs
+		windows = len(store.starts) - len(store.freeWindows)
+		domains = len(store.domains) - len(store.freeNumbers)
+
+		return (windows * WINDOW_BYTES + domains * DOMAIN_BYTES + store.nameBytes
+			+ database.timeIndex.Entries() * INDEX_ENTRY_BYTES
+			+ len(database.liveTopK.counts) * LIVE_DOMAIN_BYTES
+			+ len(database.rateDetector.buckets) * RATE_DOMAIN_BYTES
+			+ len(database.subdomainCounter.parents) * PARENT_BYTES)
+
+
+	def Check(self, database, second):
+		"""
+		Rolls up and evicts, if due, after a query. Rollups are made once
+		per rollupWidth of log time, evictions once the budget is exceeded.
+
+		Parameters
+		----------
+		database : DATABASE
+			A DATABASE instance.
+		second : int
+			An integer representing the time of the query in seconds since the epoch.
+		"""
+
+		if self.rollupAge != None and (self.nextRollup == None or second >= self.nextRollup):
+			self.RollUp(database, second)
+			self.nextRollup = (second // self.rollupWidth + 1) * self.rollupWidth
+
+		if self.memoryBudget != None and (self.nextEviction == None or second >= self.nextEviction):
+			if self.EstimateBytes(database) > self.memoryBudget:
+				self.Evict(database, second)
+
+
+	def RollUp(self, database, second):
+		"""
+		Rolls up the windows older than rollupAge: in every rollupWidth
+		bucket, only the window with the highest count of every domain is
+		kept, and the counts of the other windows are added to it.
+
+		Parameters
+		----------
+		database : DATABASE
+			A DATABASE instance.
+		second : int
+			An integer representing the current time in seconds since the epoch.
+		"""
+
+		cutoff = (second - self.rollupAge) // self.rollupWidth * self.rollupWidth
+		store = database.logs
+
+		if self.rolledUntil == None:
+			windows = range(len(store.starts))
+			start = None
+		elif cutoff > self.rolledUntil:
+			windows = database.timeIndex.WindowsInRange(self.rolledUntil, cutoff)
+			start = self.rolledUntil
+		else:
+			return
+
+		kept = {}
+		sums = {}
+		freed = []
+
+		for window in windows:
+			number = store.owners[window]
+			windowStart = store.starts[window]
+			if number == -1 or windowStart >= cutoff or (start != None and windowStart < start):
+				continue
+			key = (number, windowStart // self.rollupWidth)
+			sums[key] = sums.get(key, 0) + store.counts[window]
+			peak = kept.get(key)
+			if peak == None:
+				kept[key] = window
+			elif (store.counts[window], -windowStart) > (store.counts[peak], -store.starts[peak]):
+				kept[key] = window
+				freed.append(peak)
+			else:
+				freed.append(window)
+
+		for key, window in kept.items():
+			store.counts[window] = sums[key]
+		for window in freed:
+			store.Free(window)
+		database.timeIndex.RemoveWindows(freed, store.starts)
+
+		self.rolledUntil = cutoff
+		self.rollups += 1
+		self.windowsRolledUp += len(freed)
+
+
+	def Evict(self, database, second):
+		"""
+		Evicts the coldest domains until the history is under lowWater
+		times the budget, with their windows and their rate detector
+		buckets. Their counts are kept in the time index. If that isn't
+		possible, evictions are not retried for RETRY_SECONDS.
+
+		Parameters
+		----------
+		database : DATABASE
+			A DATABASE instance.
+		second : int
+			An integer representing the current time in seconds since the epoch.
+		"""
+
+		store = database.logs
+		protectedSince = second - self.protectSeconds
+		candidates = []
+
+		for number, domain in enumerate(store.domains):
+			if domain == None or domain in database.blockedList or domain in database.approvedList:
+				continue
+			last = store.lastSeconds[number]
+			if last >= protectedSince:
+				continue
+			if self.policy == LRU:
+				candidates.append((last, number))
+			else:
+				candidates.append((database.countForDomains.get(domain, 0), last, number))
+		candidates.sort()
+
+		target = int(self.memoryBudget * self.lowWater)
+		excess = self.EstimateBytes(database) - target
+		freed = []
+
+		for candidate in candidates:
+			if excess <= 0:
+				break
+			number = candidate[-1]
+			domain = store.domains[number]
+			windows = store.RemoveDomain(number)
+			freed.extend(windows)
+			del database.numbersOfDomains[domain]
+			database.countForDomains.pop(domain, None)
+			size = len(windows) * WINDOW_BYTES + DOMAIN_BYTES + len(domain)
+			if database.rateDetector.buckets.pop(domain, None) != None:
+				size += RATE_DOMAIN_BYTES
+			database.rateDetector.totals.pop(domain, None)
+			database.numberOfLogs -= 1
+			excess -= size
+			self.bytesEvicted += size
+			self.domainsEvicted += 1
+			self.windowsEvicted += len(windows)
+
+		database.timeIndex.RemoveWindows(freed, store.starts)
+		self.evictions += 1
+		self.nextEviction = second + RETRY_SECONDS if excess > 0 else None
+
+
+	def Counters(self):
+		"""
+		Returns the counters of the rollups and evictions.
+
+		Returns
+		-------
+		dict
+			A dictionary mapping counter names to their values.
+		"""
+
+		return {
+			"rollups": self.rollups,
+			"windowsRolledUp": self.windowsRolledUp,
+			"evictions": self.evictions,
+			"domainsEvicted": self.domainsEvicted,
+			"windowsEvicted": self.windowsEvicted,
+			"bytesEvicted": self.bytesEvicted
+		}
@@ -0,0 +1,48 @@
+import re
+
+# Matches the end of the "dnsmasq[pid]" tag of query lines, then the record type and the queried name.
+QUERY = re.compile(rb"\]: query\[([^\]\n]*)\] ([^ \n]*)")
+
+
+def ScanQueries(chunk, types, seen = None):
+	"""
+	Finds the query lines of a chunk of a logs file without decoding or
+	splitting it into lines. The chunk is searched for the "]: query["
+	marker that ends the "dnsmasq[pid]" tag of query lines, so forwarded,
+	reply, cached and config lines are skipped by the regular expression
+	engine without being looked at, and only the fields of the query
+	lines are sliced. The record type of every query line is looked up in
+	a dispatch table, once, so the cost per line doesn't grow with the
+	number of types.
+
+	Parameters
+	----------
+	chunk : bytes
+		The bytes of complete lines of a logs file.
+	types : dict
+		A dictionary mapping the record types to return the queries of, as bytes, to their
+		QueryType instances(see querytypes.QueryTypes).
+	seen : lst
+		A list the record type of every query line is appended to, or None(default is None).
+
+	Returns
+	-------
+	lst
+		A list of (stamp, QueryType, name) tuples, in file order, stamp being the start
+		of the line up to the marker, e.g. b"Jan  1 00:00:00 dnsmasq[1234", and name bytes.
+	"""
+
+	queries = []
+	rfind = chunk.rfind
+	lookup = types.get
+
+	for match in QUERY.finditer(chunk):
+		kind, name = match.groups()
+		if seen != None:
+			seen.append(kind)
+		queryType = lookup(kind)
+		if queryType != None:
+			position = match.start()
+			queries.append((chunk[rfind(b"\n", 0, position) + 1:position], queryType, name))
+
+	return queries
@@ -0,0 +1,1290 @@
+from itertools import chain, count
+import heapq
+import json
+import multiprocessing
+from multiprocessing import shared_memory
+import os
+import queue
+import struct
+import threading
+import time
+import zlib
+
+from domainlist import DomainList, WILDCARD_PREFIX
+from parse import DATABASE, DomainWindows, LOG, LogStore, MyEncoder
+from publicsuffix import RegisteredDomain
+from querytypes import QueryTypes
+from scanner import QUERY
+from tail import LogFollower
+from timeindex import TimeBucketIndex
+
+RING_SIZE = 1 << 22
+BATCH_SIZE = 1 << 16
+IDLE_WAIT = 0.2
+POLL_INTERVAL = 0.05
+FULL_WAIT = 0.001
+QUERY_TIMEOUT = 10
+STOP_TIMEOUT = 30
+ROUTES_SIZE = 1 << 16
+
+# The head(written by the producer) and the tail(written by the consumer) of a
+# ShardRing are kept on separate cache lines, before the records.
+HEAD_OFFSET = 0
+TAIL_OFFSET = 64
+HEADER_SIZE = 128
+
+# Marks the end of the records before the end of the ring, the next record is at its start.
+WRAP = 0xFFFFFFFF
+
+
+def ShardOf(domain, shards):
+	"""
+	Returns the shard of a queried name or domain: the hash of its
+	registered domain, so a name, the domain its queries are counted under
+	(the name itself, or its shortened wildcard version if it is
+	suspicious) and the parent its distinct children are counted under all
+	belong to the same shard.
+
+	Parameters
+	----------
+	domain : str
+		A string representing a queried name or a domain, with or without the wildcard prefix.
+	shards : int
+		An integer representing the number of shards.
+
+	Returns
+	-------
+	int
+		An integer representing the shard number.
+	"""
+
+	if domain.startswith(WILDCARD_PREFIX):
+		domain = domain[len(WILDCARD_PREFIX):]
+
+	return zlib.crc32(RegisteredDomain(domain).encode("utf-8", "replace")) % shards
+
+
+def RouteChunk(chunk, types, routes, shards):
+	"""
+	Splits the query lines of a chunk of a logs file by shard, without
+	decoding them, like scanner.ScanQueries. Lines other than queries of
+	the types are dropped. The shards of the names are remembered in
+	routes, which is cleared once it holds ROUTES_SIZE names.
+
+	Parameters
+	----------
+	chunk : bytes
+		The bytes of complete lines of a logs file.
+	types : dict
+		A dictionary whose keys are the record types to route, as bytes, see querytypes.QueryTypes.
+	routes : dict
+		A dictionary mapping queried names, as bytes, to their shards.
+	shards : int
+		An integer representing the number of shards.
+
+	Returns
+	-------
+	lst
+		A list of lists of lines, as bytes, one list per shard, in file order.
+	"""
+
+	batches = [[] for shard in range(shards)]
+	rfind = chunk.rfind
+	find = chunk.find
+
+	for match in QUERY.finditer(chunk):
+		kind, name = match.groups()
+		if kind not in types:
+			continue
+		shard = routes.get(name)
+		if shard == None:
+			if len(routes) >= ROUTES_SIZE:
+				routes.clear()
+			shard = routes[name] = ShardOf(name.decode("utf-8", "replace"), shards)
+		end = find(b"\n", match.end())
+		batches[shard].append(chunk[rfind(b"\n", 0, match.start()) + 1:end if end != -1 else len(chunk)])
+
+	return batches
+
+
+class ShardRing:
+	"""
+	A class used to hand batches of lines from the reader to one shard
+	worker through a ring buffer in shared memory, so a batch is copied
+	once into the ring and once out of it, instead of being pickled and
+	sent through a pipe. There is a single producer and a single
+	consumer: the producer only writes the head and the consumer only the
+	tail. Every record is its length(4 bytes) followed by the batch. A
+	semaphore counts the records, so the consumer sleeps while the ring
+	is empty, and the producer waits for room while it is full, which
+	holds back the reader(backpressure), as long as the consumer is alive.
+
+	Attributes
+	----------
+	size : int
+		An integer representing the number of bytes of records the ring holds(default is RING_SIZE).
+	memory : SharedMemory
+		The shared memory of the ring.
+	items : Semaphore
+		A semaphore counting the records in the ring.
+	owner : bool
+		A boolean flag indicating whether the ring was created by this process, which unlinks it.
+	batches : int
+		An integer representing the number of batches put(default is 0).
+	bytes : int
+		An integer representing the number of bytes of batches put(default is 0).
+	waits : int
+		An integer representing the number of times the producer waited for room(default is 0).
+
+	Methods
+	-------
+	Put(batch, alive, timeout)
+		Puts a batch into the ring, waiting for room.
+	Get(timeout)
+		Takes the next batch out of the ring.
+	Close()
+		Detaches from the shared memory, and unlinks it if this process created it.
+	"""
+
+	def __init__(self, context, size = RING_SIZE):
+		"""
+		Parameters
+		----------
+		context : multiprocessing context
+			The context of the worker processes, used to create the semaphore.
+		size : int
+			An integer representing the number of bytes of records the ring holds(default is RING_SIZE).
+		"""
+
+		self.size = size
+		self.memory = shared_memory.SharedMemory(create = True, size = HEADER_SIZE + size)
+		self.memory.buf[:HEADER_SIZE] = bytes(HEADER_SIZE)
+		self.items = context.Semaphore(0)
+		self.owner = True
+		self.batches = 0
+		self.bytes = 0
+		self.waits = 0
+
+
+	def __getstate__(self):
+
+		return (self.memory.name, self.size, self.items)
+
+
+	def __setstate__(self, state):
+
+		name, self.size, self.items = state
+		# The worker only attaches to the ring, the reader process, whose
+		# resource tracker the spawned workers share, unlinks it.
+		self.memory = shared_memory.SharedMemory(name = name)
+		self.owner = False
+		self.batches = 0
+		self.bytes = 0
+		self.waits = 0
+
+
+	def Put(self, batch, alive = None, timeout = None):
+		"""
+		Puts a batch into the ring, waiting for room while the consumer is
+		alive, and for timeout seconds at most.
+
+		Parameters
+		----------
+		batch : bytes
+			The batch, an empty one marks the end of the batches.
+		alive : function
+			A function returning whether the consumer is alive, e.g. Process.is_alive, or None(default is None).
+		timeout : float
+			A float representing the seconds to wait for room at most, or None to wait as long as the
+			consumer is alive(default is None).
+
+		Returns
+		-------
+		bool
+			True if the batch was put, False if the consumer died or there was no room in time.
+		"""
+
+		buffer = self.memory.buf
+		size = self.size
+		needed = 4 + len(batch)
+		if needed > size // 2:
+			raise ValueError("batch too large for the ring: " + str(len(batch)))
+
+		deadline = None if timeout == None else time.monotonic() + timeout
+
+		while True:
+			head = struct.unpack_from("<Q", buffer, HEAD_OFFSET)[0]
+			tail = struct.unpack_from("<Q", buffer, TAIL_OFFSET)[0]
+			position = head % size
+			padding = size - position if size - position < needed else 0
+			if size - (head - tail) >= padding + needed:
+				break
+			if (alive != None and not alive()) or (deadline != None and time.monotonic() >= deadline):
+				return False
+			self.waits += 1
+			time.sleep(FULL_WAIT)
+
+		if padding:
+			if padding >= 4:
+				struct.pack_into("<I", buffer, HEADER_SIZE + position, WRAP)
+			head += padding
+			position = 0
+
+		struct.pack_into("<I", buffer, HEADER_SIZE + position, len(batch))
+		buffer[HEADER_SIZE + position + 4:HEADER_SIZE + position + needed] = batch
+		struct.pack_into("<Q", buffer, HEAD_OFFSET, head + needed)
+		self.items.release()
+		self.batches += 1
+		self.bytes += len(batch)
+
+		return True
+
+
+	def Get(self, timeout = None):
+		"""
+		Takes the next batch out of the ring, waiting for one.
+
+		Parameters
+		----------
+		timeout : float
+			A float representing the seconds to wait at most, or None to wait until a batch comes(default is None).
+
+		Returns
+		-------
+		bytes
+			The batch, or None if none came in time.
+		"""
+
+		if not self.items.acquire(timeout = timeout):
+			return None
+
+		buffer = self.memory.buf
+		size = self.size
+		tail = struct.unpack_from("<Q", buffer, TAIL_OFFSET)[0]
+		position = tail % size
+
+		if size - position < 4 or struct.unpack_from("<I", buffer, HEADER_SIZE + position)[0] == WRAP:
+			tail += size - position
+			position = 0
+
+		length = struct.unpack_from("<I", buffer, HEADER_SIZE + position)[0]
+		batch = bytes(buffer[HEADER_SIZE + position + 4:HEADER_SIZE + position + 4 + length])
+		struct.pack_into("<Q", buffer, TAIL_OFFSET, tail + 4 + length)
+
+		return batch
+
+
+	def Close(self):
+		"""
+		Detaches from the shared memory, and unlinks it if this process created it.
+		"""
+
+		self.memory.close()
+		if self.owner:
+			self.memory.unlink()
+
+
+class BlockForwarder:
+	"""
+	A class used in place of the BlocklistPublisher of a shard worker's
+	database: instead of enforcing the blocked list, it forwards the
+	domains the shard blocked to the reader process, whose database holds
+	the single BlocklistPublisher.
+
+	Attributes
+	----------
+	shard : int
+		An integer representing the shard number.
+	results : Queue
+		The queue of messages to the reader process.
+	sent : set
+		A set of the domains forwarded.
+	pending : lst
+		Always None, as in BlocklistPublisher there is nothing left to publish.
+	batches : int
+		An integer representing the number of times domains were forwarded(default is 0).
+
+	Methods
+	-------
+	Publish(blockedList)
+		Forwards the domains of the blocked list not forwarded yet.
+	Forget(domain)
+		Lets a domain be forwarded again, once it was unblocked.
+	Flush()
+		Does nothing, the domains are forwarded by Publish.
+	Stop()
+		Does nothing, the domains are forwarded by Publish.
+	"""
+
+	def __init__(self, shard, results):
+		"""
+		Parameters
+		----------
+		shard : int
+			An integer representing the shard number.
+		results : Queue
+			The queue of messages to the reader process.
+		"""
+
+		self.shard = shard
+		self.results = results
+		self.sent = set()
+		self.pending = None
+		self.batches = 0
+		self.reloads = 0
+		self.coalesced = 0
+		self.notify = None
+		self.metrics = None
+
+
+	def Publish(self, blockedList):
+		"""
+		Forwards the domains of the blocked list not forwarded yet.
+
+		Parameters
+		----------
+		blockedList : DomainList
+			The blocked list of the shard.
+		"""
+
+		domains = [domain for domain in blockedList if domain not in self.sent]
+
+		if domains:
+			self.sent.update(domains)
+			self.results.put(("block", self.shard, domains))
+			self.batches += 1
+
+
+	def Forget(self, domain):
+		"""
+		Lets a domain be forwarded again, once it was unblocked.
+
+		Parameters
+		----------
+		domain : str
+			A string representing the domain name.
+		"""
+
+		self.sent.discard(domain)
+
+
+	def Flush(self):
+
+		pass
+
+
+	def Stop(self):
+
+		pass
+
+
+def Detach(value):
+	"""
+	Copies the LOG instances of a query result that view the windows of a
+	shard's database into plain LOG instances, so the result can be sent
+	to the reader process.
+
+	Parameters
+	----------
+	value : object
+		The result of a query.
+
+	Returns
+	-------
+	object
+		The result, with plain LOG instances and lists in place of DomainWindows.
+	"""
+
+	if isinstance(value, LOG):
+		return LOG(value.date, value.domain, value.isSuspiciousDomain, value.count)
+	if isinstance(value, (list, tuple, DomainWindows)):
+		items = [Detach(item) for item in value]
+		return tuple(items) if isinstance(value, tuple) else items
+
+	return value
+
+
+def ExportState(database):
+	"""
+	Returns the windows and counts of a database as a JSON string, in the
+	form the MyConverter method reads them.
+
+	Parameters
+	----------
+	database : DATABASE
+		A DATABASE instance.
+
+	Returns
+	-------
+	str
+		A JSON string of the logs, numberOfLogs, numbersOfDomains, countForDomains and subdomainAlerts attributes.
+	"""
+
+	return json.dumps({"logs": database.logs, "numberOfLogs": database.numberOfLogs, "numbersOfDomains": database.numbersOfDomains,
+		"countForDomains": database.countForDomains, "subdomainAlerts": database.subdomainAlerts}, cls = MyEncoder)
+
+
+def MergeStates(states):
+	"""
+	Merges the exported states of databases holding distinct domains, e.g.
+	those of the shards, into one, numbering the domains anew.
+
+	Parameters
+	----------
+	states : lst
+		A list of JSON strings returned by ExportState.
+
+	Returns
+	-------
+	dict
+		A dictionary of the logs, numberOfLogs, numbersOfDomains, countForDomains and subdomainAlerts of all the states.
+	"""
+
+	merged = {"logs": {}, "numberOfLogs": 0, "numbersOfDomains": {}, "countForDomains": {}, "subdomainAlerts": {}}
+
+	for state in states:
+		state = json.loads(state)
+		for domain, number in state["numbersOfDomains"].items():
+			merged["logs"][str(len(merged["numbersOfDomains"]))] = state["logs"][str(number)]
+			merged["numbersOfDomains"][domain] = len(merged["numbersOfDomains"])
+			merged["countForDomains"][domain] = state["countForDomains"][domain]
+		merged["numberOfLogs"] += state["numberOfLogs"]
+		merged["subdomainAlerts"].update(state["subdomainAlerts"])
+
+	return merged
+
+
+def SplitState(database, shards):
+	"""
+	Splits the windows and counts of a database, e.g. restored from JSON,
+	between the shards of their domains.
+
+	Parameters
+	----------
+	database : DATABASE
+		A DATABASE instance.
+	shards : int
+		An integer representing the number of shards.
+
+	Returns
+	-------
+	lst
+		A list of JSON strings in the form ExportState returns, one per shard.
+	"""
+
+	state = json.loads(ExportState(database))
+	parts = [{"logs": {}, "numberOfLogs": 0, "numbersOfDomains": {}, "countForDomains": {}, "subdomainAlerts": {}} for shard in range(shards)]
+
+	for domain, number in state["numbersOfDomains"].items():
+		part = parts[ShardOf(domain, shards)]
+		part["logs"][str(number)] = state["logs"][str(number)]
+		part["numbersOfDomains"][domain] = number
+		part["countForDomains"][domain] = state["countForDomains"][domain]
+		part["numberOfLogs"] += 1
+	for parent, second in state["subdomainAlerts"].items():
+		parts[ShardOf(parent, shards)]["subdomainAlerts"][parent] = second
+
+	return [json.dumps(part) for part in parts]
+
+
+def LoadState(database, state):
+	"""
+	Fills an empty database with the windows and counts of a state, the
+	other attributes are left as they are.
+
+	Parameters
+	----------
+	database : DATABASE
+		An empty DATABASE instance.
+	state : dict
+		A dictionary returned by MergeStates, or a JSON string returned by ExportState.
+	"""
+
+	if isinstance(state, str):
+		state = json.loads(state)
+	if not state["logs"]:
+		return
+
+	database.MyConverter(dict(state, offsetInLogFile = database.offsetInLogFile, sourceOffsets = database.sourceOffsets,
+		chosenDateSpan = database.chosenDateSpan, blockedList = database.blockedList.ToList(), approvedList = database.approvedList.ToList()))
+
+
+def RunShard(shard, ring, control, results, profiles, approved, subdomains, setup, state):
+	"""
+	The loop of a shard worker process: adds the batches of lines of its
+	ring to a database of its own, answers the queries of the reader
+	process between batches, and forwards the domains it blocks, until
+	it takes the empty batch marking the end. It starts from the windows
+	and counts of its domains restored by the reader process, if any, and
+	sends its own back to the reader process at the end.
+
+	Parameters
+	----------
+	shard : int
+		An integer representing the shard number.
+	ring : ShardRing
+		The ring the batches of the shard are taken from.
+	control : Queue
+		The queue of the queries and list changes from the reader process.
+	results : Queue
+		The queue of messages to the reader process.
+	profiles : lst
+		A list of the (name, weight) tuples of the record types, see querytypes.QueryTypes.
+	approved : lst
+		A list of the approved domains.
+	subdomains : tuple
+		The subdomainThreshold and subdomainBlocking attributes of the reader process's database.
+	setup : function
+		A function called with the database of the shard before the first batch, or None.
+	state : str
+		A JSON string of the windows and counts of the domains of the shard, see SplitState.
+	"""
+
+	database = DATABASE()
+	database.readView = None
+	database.queryTypes = QueryTypes(profiles)
+	database.approvedList = DomainList(approved)
+	database.SetSubdomainThreshold(*subdomains)
+	database.publisher = BlockForwarder(shard, results)
+	LoadState(database, state)
+	if setup != None:
+		setup(database)
+
+	taken = 0
+
+	try:
+		while True:
+			batch = ring.Get(POLL_INTERVAL)
+			if batch == b"":
+				results.put(("state", shard, ExportState(database)))
+				break
+			if batch == None:
+				database.ExpireLiveWindow()
+			else:
+				database.AddLogs(database.ParseChunk(batch))
+				taken += 1
+			while True:
+				try:
+					message = control.get_nowait()
+				except queue.Empty:
+					break
+				HandleMessage(database, shard, message, results, taken)
+	finally:
+		ring.Close()
+		results.put(("stopped", shard, None))
+
+
+def HandleMessage(database, shard, message, results, taken):
+	"""
+	Handles a message from the reader process in a shard worker.
+
+	Parameters
+	----------
+	database : DATABASE
+		The database of the shard.
+	shard : int
+		An integer representing the shard number.
+	message : tuple
+		A ("query", requestId, method, args, dateToLook, chosenDateSpan) tuple, an ("export", requestId)
+		tuple, a ("subdomains", threshold, blocking) tuple, or an (action, domain) tuple, action being
+		approve, unapprove or unblock.
+	results : Queue
+		The queue of messages to the reader process.
+	taken : int
+		An integer representing the number of batches the shard added so far, sent with the answers.
+	"""
+
+	if message[0] == "query":
+		requestId, method, args, database.dateToLook, database.chosenDateSpan = message[1:]
+		try:
+			value = Detach(getattr(database, method)(*args))
+		except Exception as error:
+			print("shard " + str(shard) + " failed to answer " + method + ": " + repr(error))
+			value = None
+		results.put(("answer", shard, (requestId, value, taken)))
+	elif message[0] == "export":
+		results.put(("answer", shard, (message[1], ExportState(database), taken)))
+	elif message[0] == "subdomains":
+		database.SetSubdomainThreshold(*message[1:])
+	elif message[0] == "approve":
+		database.approvedList.Add(message[1])
+	elif message[0] == "unapprove":
+		database.approvedList.Remove(message[1])
+	elif message[0] == "unblock":
+		database.blockedList.Remove(message[1])
+		database.publisher.Forget(message[1])
+
+
+class ShardPool:
+	"""
+	A class used to run the shard worker processes of a ShardedDatabase
+	and talk to them: it routes batches of lines into their rings,
+	broadcasts list changes, scatters queries and gathers the answers,
+	and hands the domains they block to the database on a collector
+	thread. A worker that died is reported, and the lines routed to it
+	are dropped instead of holding back the reader forever.
+
+	Attributes
+	----------
+	shards : int
+		An integer representing the number of worker processes.
+	ringSize : int
+		An integer representing the size of the ring of every worker(default is RING_SIZE).
+	rings : lst
+		A list of the ShardRing instances of the workers.
+	controls : lst
+		A list of the queues of messages to the workers.
+	results : Queue
+		The queue of messages from the workers.
+	processes : lst
+		A list of the worker processes.
+	routes : dict
+		A dictionary mapping queried names, as bytes, to their shards.
+	lines : lst
+		A list of the number of lines routed to every shard.
+	taken : lst
+		A list of the number of batches every shard had added, as of its latest answer.
+	answers : dict
+		A dictionary mapping the ids of the queries waiting for answers to [answers, expected, Event] lists.
+	states : dict
+		A dictionary mapping shard numbers to the states the workers sent back when they stopped, see ExportState.
+	dead : set
+		A set of the shard numbers of the workers found dead.
+
+	Methods
+	-------
+	Start(database, setup)
+		Starts the worker processes and the collector thread.
+	Route(chunk, types)
+		Routes the query lines of a chunk to the rings of their shards.
+	Put(shard, batch, timeout)
+		Puts a batch into the ring of a worker, unless the worker died.
+	Broadcast(message)
+		Sends a message to every worker.
+	Gather(method, args, dateToLook, chosenDateSpan, shards)
+		Asks workers to call a method of their database, and returns their answers.
+	Export()
+		Asks every worker for the windows and counts of its database.
+	Ask(message, shards)
+		Sends a message to workers and returns their answers.
+	Synchronize(timeout)
+		Waits until every worker added the batches routed to it.
+	Stop(timeout)
+		Ends the batches, waits for the workers to add them and exit, and frees the rings.
+	Counters()
+		Returns the counters of every shard.
+	"""
+
+	def __init__(self, shards, ringSize = RING_SIZE):
+		"""
+		Parameters
+		----------
+		shards : int
+			An integer representing the number of worker processes.
+		ringSize : int
+			An integer representing the size of the ring of every worker(default is RING_SIZE).
+		"""
+
+		self.shards = shards
+		self.ringSize = ringSize
+		self.context = multiprocessing.get_context("spawn")
+		self.rings = []
+		self.controls = []
+		self.results = None
+		self.processes = []
+		self.collector = None
+		self.database = None
+		self.routes = {}
+		self.lines = [0] * shards
+		self.taken = [0] * shards
+		self.answers = {}
+		self.states = {}
+		self.dead = set()
+		self.requestIds = count()
+		self.lock = threading.Lock()
+
+
+	def Start(self, database, setup = None):
+		"""
+		Starts the worker processes and the collector thread. The windows
+		and counts the database holds, e.g. restored from JSON, are split
+		between the workers of their domains.
+
+		Parameters
+		----------
+		database : ShardedDatabase
+			The database the blocked domains are added to.
+		setup : function
+			A function called with the database of every worker before its first batch, it
+			must be defined at the top level of a module(default is None).
+		"""
+
+		self.database = database
+		self.results = self.context.Queue()
+		profiles = database.queryTypes.Profiles()
+		approved = database.approvedList.ToList()
+		subdomains = (database.subdomainThreshold, database.subdomainBlocking)
+		states = SplitState(database, self.shards)
+		self.states = {}
+		self.dead = set()
+
+		for shard in range(self.shards):
+			ring = ShardRing(self.context, self.ringSize)
+			control = self.context.Queue()
+			process = self.context.Process(target = RunShard, args = (shard, ring, control, self.results, profiles, approved, subdomains, setup, states[shard]), daemon = True)
+			process.start()
+			self.rings.append(ring)
+			self.controls.append(control)
+			self.processes.append(process)
+
+		self.collector = threading.Thread(target = self.Collect, daemon = True)
+		self.collector.start()
+
+
+	def Collect(self):
+		"""
+		The collector thread loop: adds the domains blocked by the workers
+		to the database, and hands the answers to the waiting queries.
+		"""
+
+		stopped = set()
+
+		while len(stopped) < self.shards:
+			kind, shard, value = self.results.get()
+			if kind == "block":
+				for domain in value:
+					self.database.AddToBlockedList(domain)
+			elif kind == "answer":
+				requestId, answer, taken = value
+				self.taken[shard] = max(self.taken[shard], taken)
+				with self.lock:
+					waiting = self.answers.get(requestId)
+					if waiting != None:
+						waiting[0][shard] = answer
+						if len(waiting[0]) == waiting[1]:
+							waiting[2].set()
+			elif kind == "state":
+				self.states[shard] = value
+			elif kind == "stopped":
+				stopped.add(shard)
+
+
+	def Route(self, chunk, types):
+		"""
+		Routes the query lines of a chunk to the rings of their shards, in
+		batches of BATCH_SIZE bytes at most.
+
+		Parameters
+		----------
+		chunk : bytes
+			The bytes of complete lines of a logs file.
+		types : dict
+			A dictionary whose keys are the record types to route, as bytes.
+		"""
+
+		for shard, lines in enumerate(RouteChunk(chunk, types, self.routes, self.shards)):
+			if not lines:
+				continue
+			self.lines[shard] += len(lines)
+			batch = []
+			batchSize = 0
+			for line in lines:
+				if batchSize + len(line) >= BATCH_SIZE and batch:
+					self.Put(shard, b"\n".join(batch))
+					batch = []
+					batchSize = 0
+				batch.append(line)
+				batchSize += len(line) + 1
+			self.Put(shard, b"\n".join(batch))
+
+
+	def Put(self, shard, batch, timeout = None):
+		"""
+		Puts a batch into the ring of a worker, unless the worker died,
+		which is reported once.
+
+		Parameters
+		----------
+		shard : int
+			An integer representing the shard number.
+		batch : bytes
+			The batch.
+		timeout : float
+			A float representing the seconds to wait for room at most, or None(default is None).
+
+		Returns
+		-------
+		bool
+			True if the batch was put.
+		"""
+
+		process = self.processes[shard]
+
+		if shard in self.dead:
+			return False
+		if self.rings[shard].Put(batch, process.is_alive, timeout):
+			return True
+		if not process.is_alive():
+			self.dead.add(shard)
+			print("shard worker died: " + process.name + ", exit code " + str(process.exitcode))
+
+		return False
+
+
+	def Broadcast(self, message):
+		"""
+		Sends a message to every worker, see HandleMessage.
+
+		Parameters
+		----------
+		message : tuple
+			The message.
+		"""
+
+		for control in self.controls:
+			control.put(message)
+
+
+	def Gather(self, method, args, dateToLook, chosenDateSpan, shards = None):
+		"""
+		Asks workers to call a method of their database, between two
+		batches, and returns their answers. Workers that don't answer
+		within QUERY_TIMEOUT are reported and left out.
+
+		Parameters
+		----------
+		method : str
+			A string representing the name of the method.
+		args : tuple
+			The arguments of the method.
+		dateToLook : datetime
+			The dateToLook attribute the workers query with.
+		chosenDateSpan : int
+			The chosenDateSpan attribute the workers query with.
+		shards : lst
+			A list of the shard numbers to ask, or None for all of them(default is None).
+
+		Returns
+		-------
+		lst
+			A list of the answers, in shard order.
+		"""
+
+		return self.Ask(("query", method, args, dateToLook, chosenDateSpan), shards)
+
+
+	def Export(self):
+		"""
+		Asks every worker, between two batches, for the windows and counts
+		of its database.
+
+		Returns
+		-------
+		lst
+			A list of JSON strings returned by ExportState, in shard order, or None if a worker didn't answer.
+		"""
+
+		answers = self.Ask(("export",), range(self.shards))
+
+		return answers if len(answers) == self.shards else None
+
+
+	def Ask(self, message, shards = None):
+		"""
+		Sends a message, with the id of the request after its kind, to
+		workers and returns their answers. Workers that don't answer
+		within QUERY_TIMEOUT are reported and left out.
+
+		Parameters
+		----------
+		message : tuple
+			The message, its kind first.
+		shards : lst
+			A list of the shard numbers to ask, or None for all of them(default is None).
+
+		Returns
+		-------
+		lst
+			A list of the answers, in shard order.
+		"""
+
+		if shards == None:
+			shards = range(self.shards)
+		if not self.processes:
+			return []
+
+		requestId = next(self.requestIds)
+		waiting = [{}, len(shards), threading.Event()]
+		with self.lock:
+			self.answers[requestId] = waiting
+
+		for shard in shards:
+			self.controls[shard].put((message[0], requestId) + message[1:])
+
+		if not waiting[2].wait(QUERY_TIMEOUT):
+			print("shard query timed out: " + str(message[1] if len(message) > 1 else message[0]))
+		with self.lock:
+			del self.answers[requestId]
+
+		return [waiting[0][shard] for shard in shards if waiting[0].get(shard) != None]
+
+
+	def Synchronize(self, timeout = STOP_TIMEOUT):
+		"""
+		Waits until every worker added the batches routed to it so far, by
+		asking for their record type counters until their answers say so.
+
+		Parameters
+		----------
+		timeout : float
+			A float representing the seconds to wait at most(default is STOP_TIMEOUT).
+
+		Returns
+		-------
+		bool
+			True if every worker added its batches in time.
+		"""
+
+		deadline = time.monotonic() + timeout
+
+		while time.monotonic() < deadline:
+			self.Gather("GetQueryTypeCounters", (), self.database.dateToLook, self.database.chosenDateSpan)
+			if all(taken >= ring.batches for taken, ring in zip(self.taken, self.rings)):
+				return True
+			time.sleep(POLL_INTERVAL)
+
+		return False
+
+
+	def Stop(self, timeout = STOP_TIMEOUT):
+		"""
+		Ends the batches, waits for the workers to add them, send their
+		states back and exit, for the collector to add the domains they
+		blocked, and frees the rings.
+
+		Parameters
+		----------
+		timeout : float
+			A float representing the seconds to wait for every worker at most(default is STOP_TIMEOUT).
+		"""
+
+		for shard in range(len(self.rings)):
+			self.Put(shard, b"", timeout)
+		for shard, process in enumerate(self.processes):
+			process.join(timeout)
+			if process.is_alive():
+				print("shard worker did not stop: " + process.name)
+				process.terminate()
+				process.join(timeout)
+			if process.exitcode != 0:
+				# A worker that was killed never said it stopped.
+				self.results.put(("stopped", shard, None))
+		if self.collector != None:
+			self.collector.join(timeout)
+		for ring in self.rings:
+			ring.Close()
+
+		self.processes = []
+
+
+	def Counters(self):
+		"""
+		Returns the counters of every shard.
+
+		Returns
+		-------
+		lst
+			A list of dictionaries of the lines routed, the batches and bytes put into
+			the ring, the batches added as of the latest answer and the times the reader
+			waited for room, one per shard.
+		"""
+
+		return [{"lines": lines, "batches": ring.batches, "bytes": ring.bytes, "taken": taken, "waits": ring.waits}
+			for lines, taken, ring in zip(self.lines, self.taken, self.rings)]
+
+
+class ShardedDatabase(DATABASE):
+	"""
+	A class used to represent a database whose live aggregation is sharded
+	across worker processes, for logs more than one core can parse. The
+	calling process is the reader: it follows the logs file, finds the
+	query lines and routes each to a worker by the hash of its registered
+	domain(see ShardOf), in batches handed over through shared memory
+	(see ShardRing). Every worker owns the logs, counts, windows and
+	detectors of its domains, and since all the names under a registered
+	domain go to the same worker, its counts and blocks are the same as a
+	single database's. The top lists and histories are answered by asking
+	the workers(scatter) and merging their answers(gather), and the
+	domains the workers block are added to the blocked list of this
+	database, whose publisher is the single enforcer.
+
+	The live windows of a worker end at its own most recent query, and
+	the journal, snapshots and read view aren't supported in this mode.
+	The database is saved to JSON with ShardedEncoder, which gathers the
+	windows and counts of the workers, and once the workers stopped they
+	are held by this database again, so it can be saved with MyEncoder as
+	well. The windows and counts it holds when Parse is called, e.g.
+	restored from JSON, are handed to the workers.
+
+	Attributes
+	----------
+	shardPool : ShardPool
+		The ShardPool instance running the workers.
+	setup : function
+		A function called with the database of every worker before its first batch, or None(default is None).
+	routing : Lock
+		A Lock instance held while a chunk is routed and the offsetInLogFile attribute updated.
+
+	Methods
+	-------
+	Parse(fileName)
+		Follows a logs file and routes its query lines to the workers.
+	Terminate()
+		Stops following the logs file once the workers added the lines read.
+	GetShardCounters()
+		A getter method for the counters of the shardPool attribute.
+	GatherState()
+		Returns the windows and counts of all the workers, with the offset they were added up to.
+	"""
+
+	def __init__(self, shards = None, setup = None):
+		"""
+		Parameters
+		----------
+		shards : int
+			An integer representing the number of worker processes(default is the number of CPUs).
+		setup : function
+			A function called with the database of every worker before its first batch, it must
+			be defined at the top level of a module(default is None).
+		"""
+
+		DATABASE.__init__(self)
+		self.readView = None
+		self.shardPool = ShardPool(shards or os.cpu_count())
+		self.setup = setup
+		self.stopped = threading.Event()
+		self.routing = threading.Lock()
+
+
+	def Parse(self, fileName):
+		"""
+		Starts the workers with the windows and counts of this database,
+		then follows a logs file and routes its query lines to them until
+		the Terminate method is called, and takes back the windows and
+		counts the workers hold once they stopped.
+
+		Parameters
+		----------
+		fileName : str
+			A string representing a logs file name.
+		"""
+
+		follower = LogFollower(fileName, self.offsetInLogFile)
+		self.stopped.clear()
+		self.shardPool.Start(self, self.setup)
+		self.ClearState()
+
+		try:
+			while not self.terminated:
+				chunk = self.ReadChunk(follower)
+				if chunk:
+					with self.routing:
+						self.shardPool.Route(chunk, self.queryTypes.types)
+						self.offsetInLogFile = follower.offset
+				else:
+					follower.Wait(IDLE_WAIT)
+		finally:
+			self.shardPool.Stop()
+			follower.Close()
+			states = self.shardPool.states
+			if len(states) < self.shardPool.shards:
+				print("shard workers lost their counts: " + ", ".join(str(shard) for shard in range(self.shardPool.shards) if shard not in states))
+			LoadState(self, MergeStates(states[shard] for shard in sorted(states)))
+			self.stopped.set()
+			print("Thread Exiting")
+
+
+	def ClearState(self):
+		"""
+		Empties the windows and counts of this database, once they were handed to the workers.
+		"""
+
+		self.logs = LogStore()
+		self.numberOfLogs = 0
+		self.numbersOfDomains = {}
+		self.countForDomains = {}
+		self.subdomainAlerts = {}
+		self.timeIndex = TimeBucketIndex()
+
+
+	def GatherState(self):
+		"""
+		Returns the windows and counts of all the workers, and the offset in
+		the logs file they were added up to: routing is held up until every
+		worker added the lines routed to it and sent its windows and counts.
+		If the workers aren't running, those of this database are returned.
+
+		Returns
+		-------
+		tuple
+			A dictionary returned by MergeStates and an integer representing the offset,
+			or None and the offset if a worker didn't answer.
+		"""
+
+		with self.routing:
+			if not self.shardPool.processes:
+				return MergeStates([ExportState(self)]), self.offsetInLogFile
+			if not self.shardPool.Synchronize():
+				return None, self.offsetInLogFile
+			states = self.shardPool.Export()
+			return (None if states == None else MergeStates(states)), self.offsetInLogFile
+
+
+	def Terminate(self):
+		"""
+		Stops following the logs file once the workers added the lines
+		read and the domains they blocked, then publishes the pending
+		changes of the blocked list.
+		"""
+
+		self.terminated = True
+		self.stopped.wait(STOP_TIMEOUT)
+		self.publisher.Stop()
+
+
+	def GetShardCounters(self):
+		"""
+		A getter method for the counters of the shardPool attribute.
+
+		Returns
+		-------
+		lst
+			A list of dictionaries of counters, one per shard.
+		"""
+
+		return self.shardPool.Counters()
+
+
+	def Gather(self, method, args, shards = None):
+		"""
+		Asks the workers to call a method of their database with the time
+		span of this one, and returns their answers.
+		"""
+
+		return self.shardPool.Gather(method, args, self.dateToLook, self.chosenDateSpan, shards)
+
+
+	def FindHighestKElements(self, k):
+
+		self.heapCount = list(chain.from_iterable(self.Gather("FindHighestKElements", (k,))))
+		heapq.heapify(self.heapCount)
+
+		return heapq.nlargest(k, self.heapCount)
+
+
+	def FindHighestKElements10Min(self, k):
+
+		self.heap10Span = list(chain.from_iterable(self.Gather("FindHighestKElements10Min", (k,))))
+		heapq.heapify(self.heap10Span)
+
+		return heapq.nlargest(k, self.heap10Span)
+
+
+	def FindLiveHighestKElements(self, k):
+
+		return heapq.nlargest(k, chain.from_iterable(self.Gather("FindLiveHighestKElements", (k,))))
+
+
+	def FindHighestKRegisteredDomains(self, k):
+
+		return heapq.nlargest(k, chain.from_iterable(self.Gather("FindHighestKRegisteredDomains", (k,))))
+
+
+	def FindHighestKSubdomains(self, k):
+
+		return heapq.nlargest(k, chain.from_iterable(self.Gather("FindHighestKSubdomains", (k,))))
+
+
+	def GetDistinctChildren(self, domain):
+
+		answers = self.Gather("GetDistinctChildren", (domain,), [ShardOf(domain, self.shardPool.shards)])
+
+		return answers[0] if answers else 0
+
+
+	def GetHistoryOfDomain(self, domain):
+
+		answers = self.Gather("GetHistoryOfDomain", (domain,), [ShardOf(domain, self.shardPool.shards)])
+
+		return answers[0] if answers else None
+
+
+	def AddToApprovedList(self, domain):
+
+		DATABASE.AddToApprovedList(self, domain)
+		if domain in self.approvedList:
+			self.shardPool.Broadcast(("approve", domain))
+
+
+	def RemoveFromApprovedList(self, domain):
+
+		DATABASE.RemoveFromApprovedList(self, domain)
+		self.shardPool.Broadcast(("unapprove", domain))
+
+
+	def RemoveFromBlockedList(self, domain):
+
+		DATABASE.RemoveFromBlockedList(self, domain)
+		self.shardPool.Broadcast(("unblock", domain))
+
+
+	def SetSubdomainThreshold(self, threshold, blocking = False):
+
+		DATABASE.SetSubdomainThreshold(self, threshold, blocking)
+		self.shardPool.Broadcast(("subdomains", threshold, blocking))
+
+
+	def GetSubdomainAlerts(self):
+
+		if not self.shardPool.processes:
+			return DATABASE.GetSubdomainAlerts(self)
+
+		return sorted(chain.from_iterable(self.Gather("GetSubdomainAlerts", ())))
+
+
+class ShardedEncoder(MyEncoder):
+	"""
+	A class used to subclass MyEncoder, to serialize a ShardedDatabase:
+	the windows and counts are gathered from the workers(see
+	ShardedDatabase.GatherState) in place of those of the database, with
+	the offset they were added up to, and the ShardPool isn't serialized.
+	If a worker doesn't answer, nothing is written and ValueError is
+	raised, since a file without its counts would skip their lines.
+
+	Methods
+	-------
+	iterencode(obj)
+		Encodes the attributes of a ShardedDatabase with the state gathered from the workers.
+	default(obj)
+		Serializes the object passed as a parameter.
+	"""
+
+	def iterencode(self, obj, _one_shot = False):
+
+		if isinstance(obj, dict) and isinstance(obj.get("shardPool"), ShardPool):
+			obj = dict(obj, routing = None, setup = None)
+			if obj["shardPool"].database != None:
+				state, offset = obj["shardPool"].database.GatherState()
+				if state == None:
+					raise ValueError("the shard workers didn't send their counts, the database was not saved")
+				obj.update(state, offsetInLogFile = offset)
+
+		return MyEncoder.iterencode(self, obj, _one_shot)
+
+
+	def default(self, obj):
+
+		if isinstance(obj, (ShardPool, threading.Event)):
+			return None
+
+		return MyEncoder.default(self, obj)
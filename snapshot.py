@@ -0,0 +1,542 @@
+from array import array
+from datetime import timedelta
+from functools import partial
+import json
+import mmap
+import os
+import struct
+import sys
+import threading
+
+from domainlist import DomainList
+from journal import APPROVE, BLOCK, COMPACT_BYTES, FSYNC_INTERVAL, SEGMENT_PREFIX, UNAPPROVE, UNBLOCK, VERSION as JOURNAL_VERSION
+from journal import FromBytes, JoinStrings, Journal, ReadSegment, SegmentPath, SegmentVersion, SplitStrings, ToBytes
+from parse import DATABASE, LOG, LogStore, MyEncoder
+from timeindex import EPOCH, TimeBucketIndex
+
+MAGIC = b"DNSSNAP\0"
+VERSION = 2
+
+# magic, version, numberOfLogs, offsetInLogFile, chosenDateSpan, number of sections.
+HEADER = struct.Struct("<8sIqqiI")
+# section id, offset in the file, length in bytes.
+SECTION = struct.Struct("<Iqq")
+
+DOMAINS = 1
+FLAGS = 2
+DOMAIN_COUNTS = 3
+STARTS = 4
+COUNTS = 5
+OWNERS = 6
+PREVIOUS = 7
+HEADS = 8
+LENGTHS = 9
+BLOCKED = 10
+APPROVED = 11
+BUCKET_DIRECTORY = 12
+BUCKETS = 13
+FOLLOWING = 14
+SOURCE_NAMES = 15
+SOURCE_OFFSETS = 16
+ALERT_NAMES = 17
+ALERT_SECONDS = 18
+LAST_SECONDS = 19
+
+PRESENT = 1
+SUSPICIOUS = 2
+
+SNAPSHOT_EXTENSION = ".snap"
+SNAPSHOT_PREFIX = "snapshot."
+
+# The DATABASE methods replaying every kind of list change of a journal.
+LIST_CHANGES = {
+	BLOCK: "AddToBlockedList",
+	UNBLOCK: "RemoveFromBlockedList",
+	APPROVE: "AddToApprovedList",
+	UNAPPROVE: "RemoveFromApprovedList"
+}
+
+
+def Capture(database):
+	"""
+	Copies the state of a database needed by a snapshot. Only flat copies of
+	arrays, lists and dictionaries are made, so the parser is only held up for
+	as long as the copies take, and the snapshot can be written from the copy
+	while the parser keeps going.
+
+	Parameters
+	----------
+	database : DATABASE
+		A DATABASE instance.
+
+	Returns
+	-------
+	dict
+		A dictionary holding the copied state.
+	"""
+
+	store = database.logs
+
+	return {
+		"numberOfLogs": database.numberOfLogs,
+		"offsetInLogFile": database.offsetInLogFile,
+		"sourceOffsets": dict(database.sourceOffsets),
+		"chosenDateSpan": database.chosenDateSpan,
+		"domains": list(store.domains),
+		"suspicious": bytes(store.suspicious),
+		"countForDomains": dict(database.countForDomains),
+		"starts": store.starts[:],
+		"counts": store.counts[:],
+		"owners": store.owners[:],
+		"previous": store.previous[:],
+		"following": store.following[:],
+		"heads": store.heads[:],
+		"lengths": store.lengths[:],
+		"lastSeconds": store.lastSeconds[:],
+		"blockedList": database.blockedList.ToList(),
+		"approvedList": database.approvedList.ToList(),
+		"subdomainAlerts": dict(database.subdomainAlerts),
+		"tiers": [ring.Capture() for ring in database.timeIndex.tiers],
+		"windows": database.timeIndex.windows.Capture()
+	}
+
+
+def Encode(state):
+	"""
+	Encodes a captured state into the sections of a snapshot.
+
+	The window columns and the per-domain columns are stored as fixed-width
+	little endian integers, domain names once in a string table, and every
+	time index bucket as an array of domain numbers followed by an array of
+	counts(or an array of window indices), listed in a bucket directory of
+	(ring, bucketNumber, offset, length) records. The committed offsets of
+	the logs files followed at once are stored as a string table of their
+	names and an array of their offsets.
+
+	Parameters
+	----------
+	state : dict
+		A dictionary returned by Capture.
+
+	Returns
+	-------
+	lst
+		A list of (section id, bytes) tuples.
+	"""
+
+	domains = state["domains"]
+	numbers = {domain: number for number, domain in enumerate(domains) if domain != None}
+	flags = bytearray(len(domains))
+	domainCounts = array('q', [0]) * len(domains)
+
+	for number, domain in enumerate(domains):
+		if domain != None:
+			flags[number] = PRESENT | (SUSPICIOUS if state["suspicious"][number] else 0)
+			domainCounts[number] = state["countForDomains"].get(domain, 0)
+
+	directory = array('q')
+	buckets = bytearray()
+
+	for index, captured in enumerate(state["tiers"] + [state["windows"]]):
+		isWindows = index == len(state["tiers"])
+		for bucketNumber, value in captured:
+			if not isinstance(value, (dict, array)):
+				value = value.loader()
+			if isWindows:
+				data = ToBytes(value)
+			else:
+				data = ToBytes(array('i', [numbers[domain] for domain in value])) + ToBytes(array('q', value.values()))
+			directory.extend((index, bucketNumber, len(buckets), len(data)))
+			buckets += data
+
+	return [
+		(DOMAINS, JoinStrings("" if domain == None else domain for domain in domains)),
+		(FLAGS, bytes(flags)),
+		(DOMAIN_COUNTS, ToBytes(domainCounts)),
+		(STARTS, ToBytes(state["starts"])),
+		(COUNTS, ToBytes(state["counts"])),
+		(OWNERS, ToBytes(state["owners"])),
+		(PREVIOUS, ToBytes(state["previous"])),
+		(FOLLOWING, ToBytes(state["following"])),
+		(HEADS, ToBytes(state["heads"])),
+		(LENGTHS, ToBytes(state["lengths"])),
+		(LAST_SECONDS, ToBytes(state["lastSeconds"])),
+		(BLOCKED, JoinStrings(state["blockedList"])),
+		(APPROVED, JoinStrings(state["approvedList"])),
+		(BUCKET_DIRECTORY, ToBytes(directory)),
+		(BUCKETS, bytes(buckets)),
+		(SOURCE_NAMES, JoinStrings(state["sourceOffsets"])),
+		(SOURCE_OFFSETS, ToBytes(array('q', state["sourceOffsets"].values()))),
+		(ALERT_NAMES, JoinStrings(state["subdomainAlerts"])),
+		(ALERT_SECONDS, ToBytes(array('q', state["subdomainAlerts"].values())))
+	]
+
+
+def Write(state, fileName):
+	"""
+	Writes a captured state into a snapshot file. The file is replaced
+	atomically, so a crash while writing leaves the previous snapshot intact.
+
+	Parameters
+	----------
+	state : dict
+		A dictionary returned by Capture.
+	fileName : str
+		A string representing the snapshot file name.
+	"""
+
+	sections = Encode(state)
+	offset = HEADER.size + SECTION.size * len(sections)
+	temporaryPath = fileName + ".tmp"
+
+	with open(temporaryPath, "wb") as fh:
+		fh.write(HEADER.pack(MAGIC, VERSION, state["numberOfLogs"], state["offsetInLogFile"], state["chosenDateSpan"], len(sections)))
+		for section, data in sections:
+			fh.write(SECTION.pack(section, offset, len(data)))
+			offset += len(data)
+		for section, data in sections:
+			fh.write(data)
+		fh.flush()
+		os.fsync(fh.fileno())
+	os.replace(temporaryPath, fileName)
+
+
+def Save(database, fileName, background = True):
+	"""
+	Saves a database into a snapshot file. The state is copied between
+	two batches by the aggregator of the database's pipeline, if it is
+	running, otherwise on the calling thread, so the copy isn't torn by
+	logs being added meanwhile. It is then encoded and written, by default
+	on a background thread.
+
+	Parameters
+	----------
+	database : DATABASE
+		A DATABASE instance.
+	fileName : str
+		A string representing the snapshot file name.
+	background : bool
+		A boolean flag indicating whether to write the file on a background thread(default is True).
+
+	Returns
+	-------
+	Thread
+		The thread writing the file, or None if it was written already.
+	"""
+
+	if database.pipeline != None:
+		state = database.pipeline.Call(Capture, database)
+	else:
+		state = Capture(database)
+
+	if not background:
+		Write(state, fileName)
+		return None
+
+	thread = threading.Thread(target = Write, args = (state, fileName), daemon = False)
+	thread.start()
+
+	return thread
+
+
+def LoadBucket(view, domains, offset, length):
+	"""
+	Loads the per-domain counts of a time index bucket from a snapshot.
+	"""
+
+	numbers = FromBytes('i', view[offset:offset + length // 3])
+	counts = FromBytes('q', view[offset + length // 3:offset + length])
+
+	return dict(zip(map(domains.__getitem__, numbers), counts))
+
+
+def LoadWindowBucket(view, offset, length):
+	"""
+	Loads the window indices of a time index bucket from a snapshot.
+	"""
+
+	return FromBytes('q', view[offset:offset + length])
+
+
+def Load(database, fileName):
+	"""
+	Restores a database from a snapshot file. The file is mapped into
+	memory: the columns are copied into the LogStore at once, without
+	creating a LOG instance per window, and the time index buckets are
+	only loaded from the mapping the first time they are accessed.
+
+	Parameters
+	----------
+	database : DATABASE
+		A DATABASE instance.
+	fileName : str
+		A string representing the snapshot file name.
+	"""
+
+	with open(fileName, "rb") as fh:
+		mapping = mmap.mmap(fh.fileno(), 0, access = mmap.ACCESS_READ)
+	view = memoryview(mapping)
+
+	magic, version, numberOfLogs, offsetInLogFile, chosenDateSpan, numberOfSections = HEADER.unpack_from(view)
+	if magic != MAGIC:
+		raise ValueError(fileName + " is not a snapshot file")
+	if version > VERSION:
+		raise ValueError(fileName + " was written by a newer version(%d)" % version)
+
+	sections = {}
+	for index in range(numberOfSections):
+		section, offset, length = SECTION.unpack_from(view, HEADER.size + index * SECTION.size)
+		sections[section] = view[offset:offset + length]
+
+	flags = bytes(sections[FLAGS])
+	domains = SplitStrings(sections[DOMAINS], len(flags))
+	for number, flag in enumerate(flags):
+		if not flag & PRESENT:
+			domains[number] = None
+
+	store = LogStore()
+	store.domains = domains
+	store.suspicious = bytearray(1 if flag & SUSPICIOUS else 0 for flag in flags)
+	store.starts = FromBytes('q', sections[STARTS])
+	store.counts = FromBytes('i', sections[COUNTS])
+	store.owners = FromBytes('i', sections[OWNERS])
+	store.previous = FromBytes('i', sections[PREVIOUS])
+	if FOLLOWING in sections:
+		store.following = FromBytes('i', sections[FOLLOWING])
+	store.heads = FromBytes('i', sections[HEADS])
+	store.lengths = FromBytes('i', sections[LENGTHS])
+	if LAST_SECONDS in sections:
+		store.lastSeconds = FromBytes('q', sections[LAST_SECONDS])
+	store.Reindex()
+
+	numbers = [number for number, domain in enumerate(domains) if domain != None]
+	present = [domains[number] for number in numbers]
+	domainCounts = FromBytes('q', sections[DOMAIN_COUNTS])
+
+	database.logs = store
+	database.numberOfLogs = numberOfLogs
+	database.numbersOfDomains = dict(zip(present, numbers))
+	database.countForDomains = dict(zip(present, map(domainCounts.__getitem__, numbers)))
+	database.offsetInLogFile = offsetInLogFile
+	if SOURCE_OFFSETS in sections:
+		offsets = FromBytes('q', sections[SOURCE_OFFSETS])
+		database.sourceOffsets = dict(zip(SplitStrings(sections[SOURCE_NAMES], len(offsets)), offsets))
+	database.chosenDateSpan = chosenDateSpan
+	database.blockedList = DomainList(SplitStrings(sections[BLOCKED]))
+	database.approvedList = DomainList(SplitStrings(sections[APPROVED]))
+	if ALERT_SECONDS in sections:
+		seconds = FromBytes('q', sections[ALERT_SECONDS])
+		database.subdomainAlerts = dict(zip(SplitStrings(sections[ALERT_NAMES], len(seconds)), seconds))
+
+	timeIndex = TimeBucketIndex()
+	rings = timeIndex.tiers + [timeIndex.windows]
+	directory = FromBytes('q', sections[BUCKET_DIRECTORY])
+	buckets = sections[BUCKETS]
+
+	for index in range(0, len(directory), 4):
+		ring, bucketNumber, offset, length = directory[index:index + 4]
+		if rings[ring] is timeIndex.windows:
+			loader = partial(LoadWindowBucket, buckets, offset, length)
+		else:
+			loader = partial(LoadBucket, buckets, domains, offset, length)
+		rings[ring].Restore(bucketNumber, loader, length // 12)
+
+	database.timeIndex = timeIndex
+
+
+def SnapshotPath(directory, generation):
+	"""
+	Returns the path of the snapshot folding the journal segments older than a generation.
+	"""
+
+	return os.path.join(directory, SNAPSHOT_PREFIX + "%08d" % generation + SNAPSHOT_EXTENSION)
+
+
+def Generations(directory, prefix, suffix = ""):
+	"""
+	Returns the sorted generations of the files of a directory named prefix, generation, suffix.
+	"""
+
+	generations = []
+
+	for name in os.listdir(directory):
+		if name.startswith(prefix) and name.endswith(suffix):
+			number = name[len(prefix):len(name) - len(suffix)]
+			if number.isdigit():
+				generations.append(int(number))
+
+	return sorted(generations)
+
+
+def RemoveStale(directory, generation):
+	"""
+	Removes the snapshots and the journal segments older than a generation.
+	"""
+
+	for older in Generations(directory, SNAPSHOT_PREFIX, SNAPSHOT_EXTENSION):
+		if older < generation:
+			os.remove(SnapshotPath(directory, older))
+	for older in Generations(directory, SEGMENT_PREFIX):
+		if older < generation:
+			os.remove(SegmentPath(directory, older))
+
+
+def Replay(database, batch, names):
+	"""
+	Applies a batch read back from a journal to a database, the way it was
+	parsed: the queries go through AddToDatabase again, with their queried
+	names and the weights of their record types, so the windows, the time
+	index, the live top K, the rate detector and the subdomain counter end
+	up as they were, and the list changes are made at the point of the
+	batch they were made.
+
+	Parameters
+	----------
+	database : DATABASE
+		A DATABASE instance, without a journal attribute.
+	batch : Batch
+		A Batch instance.
+	names : dict
+		A dictionary mapping the domain numbers of the journal to (domain, isSuspiciousDomain)
+		tuples, updated with the domains first seen in the batch.
+	"""
+
+	for number, domain, isSuspiciousDomain in batch.domains:
+		names[number] = (domain, isSuspiciousDomain)
+	changes = iter(batch.changes + [(len(batch.runs), None, None)])
+	position, change, domain = next(changes)
+
+	for index, (number, second, count, queried, weight) in enumerate(batch.runs):
+		while position <= index and change != None:
+			getattr(database, LIST_CHANGES[change])(domain)
+			position, change, domain = next(changes)
+		name, isSuspiciousDomain = names[number]
+		date = EPOCH + timedelta(seconds = second)
+		for i in range(count):
+			database.AddToDatabase(LOG(date, name, isSuspiciousDomain, name = queried, weight = weight))
+
+	while change != None:
+		getattr(database, LIST_CHANGES[change])(domain)
+		position, change, domain = next(changes)
+
+	database.offsetInLogFile = batch.offset
+	database.sourceOffsets.update(batch.sources)
+
+
+def Compact(database):
+	"""
+	Folds the journal of a database into a snapshot. A new journal segment
+	is started at once, and the snapshot of the state at this point is
+	written on a background thread, after which the older snapshots and
+	segments are removed. Until then, a restart still finds the previous
+	snapshot and every segment written since.
+
+	Parameters
+	----------
+	database : DATABASE
+		A DATABASE instance whose journal attribute was set by Resume.
+	"""
+
+	journal = database.journal
+
+	if journal.compaction != None and journal.compaction.is_alive():
+		return
+
+	generation = journal.generation + 1
+	state = Capture(database)
+	journal.Rotate(generation)
+	journal.compaction = threading.Thread(target = WriteCompaction, args = (state, journal.directory, generation))
+	journal.compaction.start()
+
+
+def WriteCompaction(state, directory, generation):
+	"""
+	Writes the snapshot of a compaction, then removes the files it replaces.
+	"""
+
+	Write(state, SnapshotPath(directory, generation))
+	RemoveStale(directory, generation)
+
+
+def Resume(database, directory, fsyncInterval = FSYNC_INTERVAL, compactBytes = COMPACT_BYTES):
+	"""
+	Restores a database from the last snapshot of a directory and replays
+	the journal segments written since, then attaches a journal to the
+	database so it keeps recording its changes there. The offsetInLogFile
+	and sourceOffsets attributes are restored to the bytes right after the
+	last batch journaled, so Parse continues exactly where the previous
+	process stopped, in every logs file it followed. A record torn by a
+	crash is cut off the end of the last segment, and a last segment of an
+	older journal version is compacted at once, since records of the
+	current version can't be appended to it.
+
+	Parameters
+	----------
+	database : DATABASE
+		An empty DATABASE instance.
+	directory : str
+		A string representing the directory of the snapshots and journal segments, created if needed.
+	fsyncInterval : float
+		A float representing the maximal number of seconds between fsyncs of the journal(default is FSYNC_INTERVAL).
+	compactBytes : int
+		An integer representing the size of a journal segment triggering a compaction(default is COMPACT_BYTES).
+
+	Returns
+	-------
+	Journal
+		The Journal instance attached to the database.
+	"""
+
+	os.makedirs(directory, exist_ok = True)
+	snapshots = Generations(directory, SNAPSHOT_PREFIX, SNAPSHOT_EXTENSION)
+	generation = snapshots[-1] if snapshots else 0
+
+	if snapshots:
+		Load(database, SnapshotPath(directory, generation))
+
+	database.journal = None
+	store = database.logs
+	names = {number: (domain, store.suspicious[number] == 1) for number, domain in enumerate(store.domains) if domain != None}
+	for segment in Generations(directory, SEGMENT_PREFIX):
+		if segment < generation:
+			continue
+		batches, valid = ReadSegment(SegmentPath(directory, segment))
+		for batch in batches:
+			Replay(database, batch, names)
+		os.truncate(SegmentPath(directory, segment), valid)
+		generation = segment
+
+	RemoveStale(directory, snapshots[-1] if snapshots else 0)
+	journal = Journal(directory, generation, database.offsetInLogFile, fsyncInterval, compactBytes)
+	journal.sources = dict(database.sourceOffsets)
+	journal.compact = partial(Compact, database)
+	database.journal = journal
+	if SegmentVersion(SegmentPath(directory, generation)) < JOURNAL_VERSION:
+		Compact(database)
+
+	return journal
+
+
+def main():
+
+	if len(sys.argv) < 3:
+		print("usage: python snapshot.py <input json or snapshot> <output json or snapshot>")
+		return
+
+	database = DATABASE()
+
+	if sys.argv[1].endswith(SNAPSHOT_EXTENSION):
+		Load(database, sys.argv[1])
+	else:
+		with open(sys.argv[1]) as fh:
+			database.MyConverter(json.load(fh))
+
+	if sys.argv[2].endswith(SNAPSHOT_EXTENSION):
+		Save(database, sys.argv[2], background = False)
+	else:
+		with open(sys.argv[2], "w") as fh:
+			json.dump(database.__dict__, fh, cls = MyEncoder)
+
+
+if __name__ == "__main__":
+	main()
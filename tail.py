@@ -0,0 +1,300 @@
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import time
+
+IN_MODIFY = 0x00000002
+IN_ATTRIB = 0x00000004
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+WATCH_MASK = IN_MODIFY | IN_ATTRIB | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+
+EVENT_HEADER = struct.Struct("iIII")
+CHUNK_SIZE = 1 << 20
+POLL_INTERVAL = 0.025
+
+
+def OpenInotify(directory):
+	"""
+	Creates a non blocking inotify instance watching a directory.
+
+	Parameters
+	----------
+	directory : str
+		A string representing the path of the directory to watch.
+
+	Returns
+	-------
+	int
+		The file descriptor of the inotify instance, or None if inotify isn't available.
+	"""
+
+	try:
+		libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno = True)
+		fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+	except (OSError, AttributeError):
+		return None
+
+	if fd < 0:
+		return None
+	if libc.inotify_add_watch(fd, os.fsencode(directory), WATCH_MASK) < 0:
+		os.close(fd)
+		return None
+
+	return fd
+
+
+class LogFollower:
+	"""
+	A class used to follow a growing logs file, like tail -F.
+	The file is read in binary chunks and only complete lines are returned,
+	so offset always points right after the last line returned. Rotation
+	(the path now names a new file) and truncation are detected when the
+	current file is drained, and the file is reopened from its start.
+	On Linux, Wait blocks on inotify events of the file's directory,
+	elsewhere it falls back to polling.
+
+	Attributes
+	----------
+	fileName : str
+		A string representing the logs file name.
+	offset : int
+		An integer representing the file position right after the last line returned.
+	chunkSize : int
+		An integer representing the maximal number of bytes read at once(default is CHUNK_SIZE).
+	pollInterval : float
+		A float representing the number of seconds between polls without inotify(default is POLL_INTERVAL).
+	partial : bytes
+		The bytes of an incomplete last line, read but not returned yet.
+	rotations : int
+		An integer representing the number of rotations and truncations handled(default is 0).
+
+	Methods
+	-------
+	ReadChunk()
+		Returns the bytes of the complete lines available, up to chunkSize bytes.
+	ReadLines()
+		Returns the complete lines available, up to chunkSize bytes.
+	Wait(timeout)
+		Blocks until the file may have changed, or timeout seconds passed.
+	Close()
+		Closes the file and the inotify instance.
+	"""
+
+	def __init__(self, fileName, offset = 0, chunkSize = CHUNK_SIZE, pollInterval = POLL_INTERVAL, useInotify = True):
+		"""
+		Parameters
+		----------
+		fileName : str
+			A string representing the logs file name.
+		offset : int
+			An integer representing the file position to start from(default is 0).
+		chunkSize : int
+			An integer representing the maximal number of bytes read at once(default is CHUNK_SIZE).
+		pollInterval : float
+			A float representing the number of seconds between polls without inotify(default is POLL_INTERVAL).
+		useInotify : bool
+			A boolean flag indicating whether to use inotify when available(default is True).
+		"""
+
+		self.fileName = fileName
+		self.chunkSize = chunkSize
+		self.pollInterval = pollInterval
+		self.partial = b""
+		self.rotations = 0
+		self.file = open(fileName, "rb")
+		self.inotify = OpenInotify(os.path.dirname(os.path.abspath(fileName))) if useInotify else None
+
+		if offset > os.fstat(self.file.fileno()).st_size:
+			offset = 0
+		self.file.seek(offset)
+		self.offset = offset
+
+
+	def Split(self, data):
+		"""
+		Cuts data after its last complete line, keeping an incomplete last line in the partial attribute.
+
+		Parameters
+		----------
+		data : bytes
+			The bytes read from the file.
+
+		Returns
+		-------
+		bytes
+			The bytes of the complete lines, without the line ending of the last one.
+		"""
+
+		data = self.partial + data
+		end = data.rfind(b"\n")
+
+		if end == -1:
+			self.partial = data
+			return b""
+
+		self.partial = data[end + 1:]
+		self.offset += end + 1
+
+		return data[:end]
+
+
+	def ReadChunk(self):
+		"""
+		Returns the bytes of the complete lines available, up to chunkSize
+		bytes, without decoding them. An incomplete last line is kept until
+		the rest of it is written. When the file is drained, checks whether
+		it was rotated or truncated, and if so returns its remaining
+		incomplete line as well and reopens it.
+
+		Returns
+		-------
+		bytes
+			The bytes of the lines, separated by line feeds, without the line ending of the last one.
+		"""
+
+		data = self.file.read(self.chunkSize)
+
+		if data:
+			return self.Split(data)
+
+		remaining = self.Reopen()
+		if remaining == None:
+			return b""
+
+		parts = [self.Split(remaining), self.partial]
+		self.partial = b""
+		self.offset = 0
+		parts.append(self.Split(self.file.read(self.chunkSize)))
+
+		return b"\n".join(part for part in parts if part)
+
+
+	def ReadLines(self):
+		"""
+		Returns the complete lines available, up to chunkSize bytes, see ReadChunk.
+
+		Returns
+		-------
+		lst
+			A list of lines, without their line endings.
+		"""
+
+		chunk = self.ReadChunk()
+
+		if not chunk:
+			return []
+
+		return chunk.decode("utf-8", "replace").split("\n")
+
+
+	def Reopen(self):
+		"""
+		Reopens the file if it was rotated or truncated. A rotated file
+		is drained before it is closed, since it may have been written
+		to after it was last read.
+
+		Returns
+		-------
+		bytes
+			The bytes left in the rotated file, or None if the file wasn't reopened.
+		"""
+
+		try:
+			status = os.stat(self.fileName)
+		except FileNotFoundError:
+			return None
+
+		if status.st_ino != os.fstat(self.file.fileno()).st_ino:
+			remaining = self.file.read()
+			self.file.close()
+			self.file = open(self.fileName, "rb")
+		elif status.st_size < self.offset + len(self.partial):
+			remaining = b""
+			self.file.seek(0)
+		else:
+			return None
+
+		self.rotations += 1
+
+		return remaining
+
+
+	def Wait(self, timeout):
+		"""
+		Blocks until the file may have changed, or timeout seconds passed.
+
+		Parameters
+		----------
+		timeout : float
+			A float representing the maximal number of seconds to block.
+		"""
+
+		if self.inotify == None:
+			time.sleep(min(self.pollInterval, timeout))
+			return
+
+		name = os.fsencode(os.path.basename(self.fileName))
+		deadline = time.monotonic() + timeout
+
+		while True:
+			remaining = deadline - time.monotonic()
+			if remaining <= 0 or not select.select([self.inotify], [], [], remaining)[0]:
+				return
+			try:
+				events = os.read(self.inotify, 65536)
+			except BlockingIOError:
+				continue
+			position = 0
+			while position < len(events):
+				watch, mask, cookie, length = EVENT_HEADER.unpack_from(events, position)
+				position += EVENT_HEADER.size
+				if events[position:position + length].rstrip(b"\0") == name:
+					return
+				position += length
+
+
+	def Close(self):
+		"""
+		Closes the file and the inotify instance.
+		"""
+
+		self.file.close()
+		if self.inotify != None:
+			os.close(self.inotify)
+			self.inotify = None
+
+
+def WaitForAny(followers, timeout):
+	"""
+	Blocks until the file of one of several LogFollower instances may
+	have changed, or timeout seconds passed. Events of the other files
+	of their directories wake it up as well.
+
+	Parameters
+	----------
+	followers : lst
+		A list of LogFollower instances.
+	timeout : float
+		A float representing the maximal number of seconds to block.
+	"""
+
+	if len(followers) == 1:
+		followers[0].Wait(timeout)
+		return
+
+	descriptors = [follower.inotify for follower in followers]
+	if None in descriptors:
+		time.sleep(min(min(follower.pollInterval for follower in followers), timeout))
+		return
+
+	ready = select.select(descriptors, [], [], timeout)[0]
+	for descriptor in ready:
+		try:
+			os.read(descriptor, 65536)
+		except BlockingIOError:
+			pass
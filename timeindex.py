@@ -0,0 +1,496 @@
+from array import array
+import copy
+from datetime import datetime
+from functools import partial
+
+EPOCH = datetime(1970, 1, 1)
+
+# (bucket width in seconds, number of buckets kept) for every tier, finest first.
+BUCKET_TIERS = [
+	(60, 2 * 24 * 60),
+	(60 * 60, 24 * 7 * 26),
+	(24 * 60 * 60, 2 * 366)
+]
+
+WINDOW_BUCKET_WIDTH = 60 * 60
+WINDOW_BUCKET_CAPACITY = 24 * 7 * 26
+
+
+def ToEpoch(date):
+	"""
+	Converts a naive datetime into integer seconds since the epoch.
+
+	Parameters
+	----------
+	date : datetime
+		A datetime instance.
+
+	Returns
+	-------
+	int
+		An integer representing the number of seconds since the epoch.
+	"""
+
+	delta = date - EPOCH
+
+	return delta.days * 86400 + delta.seconds
+
+
+class DeferredBucket:
+	"""
+	A class used to represent a bucket restored from a snapshot, whose
+	value is only loaded the first time the bucket is accessed.
+
+	Attributes
+	----------
+	loader : function
+		A function returning the value of the bucket.
+	size : int
+		An integer representing the number of entries of the value(default is 0).
+	"""
+
+	__slots__ = ("loader", "size")
+
+	def __init__(self, loader, size = 0):
+
+		self.loader = loader
+		self.size = size
+
+
+class BucketRing:
+	"""
+	A class used to represent a ring buffer of fixed-width time buckets.
+	Bucket number b lives in slot b % capacity, so a bucket is evicted as
+	soon as a bucket capacity widths newer is opened.
+
+	Attributes
+	----------
+	width : int
+		An integer representing the width of a bucket in seconds.
+	capacity : int
+		An integer representing the number of buckets kept.
+	factory : function
+		A function creating the value of a newly opened bucket.
+	bucketNumbers : lst
+		A list of the bucket numbers currently held by every slot.
+	values : lst
+		A list of the values currently held by every slot.
+	newest : int
+		An integer representing the newest bucket number opened(default is None).
+	entries : int
+		An integer representing the number of entries of the values held, kept up to date
+		by the users of the ring adding entries to the values(default is 0).
+
+	Methods
+	-------
+	Open(second)
+		Returns the value of the bucket containing second, opening it if needed.
+	Get(bucketNumber)
+		Returns the value of a bucket if it is still held.
+	Holds(bucketNumber)
+		Checks whether a bucket can still be answered by this ring.
+	Restore(bucketNumber, loader)
+		Puts back a bucket whose value is loaded on first access.
+	Capture()
+		Returns a copy of the buckets held, for a snapshot.
+	"""
+
+	def __init__(self, width, capacity, factory = dict):
+		"""
+		Parameters
+		----------
+		width : int
+			An integer representing the width of a bucket in seconds.
+		capacity : int
+			An integer representing the number of buckets kept.
+		factory : function
+			A function creating the value of a newly opened bucket(default is dict).
+		"""
+
+		self.width = width
+		self.capacity = capacity
+		self.factory = factory
+		self.bucketNumbers = [None] * capacity
+		self.values = [None] * capacity
+		self.newest = None
+		self.entries = 0
+
+
+	def Open(self, second):
+		"""
+		Returns the value of the bucket containing second, opening it if needed.
+
+		Parameters
+		----------
+		second : int
+			An integer representing seconds since the epoch.
+
+		Returns
+		-------
+		object
+			The value of the bucket, or None if the bucket was already evicted.
+		"""
+
+		bucketNumber = second // self.width
+		slot = bucketNumber % self.capacity
+		current = self.bucketNumbers[slot]
+
+		if current != bucketNumber:
+			if current != None and current > bucketNumber:
+				return None
+			if current != None:
+				self.entries -= self.Size(slot)
+			self.bucketNumbers[slot] = bucketNumber
+			self.values[slot] = self.factory()
+			if self.newest == None or bucketNumber > self.newest:
+				self.newest = bucketNumber
+
+		return self.Value(slot)
+
+
+	def Size(self, slot):
+		"""
+		Returns the number of entries of the value held by a slot, without loading it.
+
+		Parameters
+		----------
+		slot : int
+			An integer representing the slot.
+
+		Returns
+		-------
+		int
+			An integer representing the number of entries.
+		"""
+
+		value = self.values[slot]
+
+		if value.__class__ is DeferredBucket:
+			return value.size
+
+		return len(value)
+
+
+	def Value(self, slot):
+		"""
+		Returns the value held by a slot, loading it first if it was deferred.
+
+		Parameters
+		----------
+		slot : int
+			An integer representing the slot.
+
+		Returns
+		-------
+		object
+			The value held by the slot.
+		"""
+
+		value = self.values[slot]
+
+		if value.__class__ is DeferredBucket:
+			value = self.values[slot] = value.loader()
+
+		return value
+
+
+	def Get(self, bucketNumber):
+		"""
+		Returns the value of a bucket if it is still held.
+
+		Parameters
+		----------
+		bucketNumber : int
+			An integer representing the bucket number.
+
+		Returns
+		-------
+		object
+			The value of the bucket, or None if it is empty or evicted.
+		"""
+
+		slot = bucketNumber % self.capacity
+
+		if self.bucketNumbers[slot] != bucketNumber:
+			return None
+
+		return self.Value(slot)
+
+
+	def Holds(self, bucketNumber):
+		"""
+		Checks whether a bucket can still be answered by this ring.
+
+		Parameters
+		----------
+		bucketNumber : int
+			An integer representing the bucket number.
+
+		Returns
+		-------
+		bool
+			False if the bucket is older than the oldest bucket kept.
+		"""
+
+		return self.newest == None or bucketNumber > self.newest - self.capacity
+
+
+	def Restore(self, bucketNumber, loader, size = 0):
+		"""
+		Puts back a bucket whose value is loaded on first access.
+
+		Parameters
+		----------
+		bucketNumber : int
+			An integer representing the bucket number.
+		loader : function
+			A function returning the value of the bucket.
+		size : int
+			An integer representing the number of entries of the value(default is 0).
+		"""
+
+		slot = bucketNumber % self.capacity
+		if self.bucketNumbers[slot] != None:
+			self.entries -= self.Size(slot)
+		self.bucketNumbers[slot] = bucketNumber
+		self.values[slot] = DeferredBucket(loader, size)
+		self.entries += size
+		if self.newest == None or bucketNumber > self.newest:
+			self.newest = bucketNumber
+
+
+	def Capture(self):
+		"""
+		Returns a copy of the buckets held, for a snapshot. Deferred buckets
+		are returned as they are, since their value can't change until loaded.
+
+		Returns
+		-------
+		lst
+			A list of (bucketNumber, value) tuples, where value may be a DeferredBucket.
+		"""
+
+		return [(bucketNumber, value if value.__class__ is DeferredBucket else copy.copy(value)) for bucketNumber, value in zip(self.bucketNumbers, self.values) if bucketNumber != None and value]
+
+
+class TimeBucketIndex:
+	"""
+	A class used to index per-domain query counts by time.
+	Every query is counted in one bucket of every tier, so coarse tiers hold
+	the roll-up of the finer ones and keep it long after the fine buckets
+	were evicted. A range query only touches the buckets overlapping the
+	range, so its cost doesn't grow with the amount of history kept.
+
+	Attributes
+	----------
+	tiers : lst
+		A list of BucketRing instances mapping domain names to counts, finest first.
+	windows : BucketRing
+		A BucketRing instance holding the indices of the windows opened in every bucket.
+
+	Methods
+	-------
+	AddQuery(domain, second, count)
+		Counts queries of a domain at a given time.
+	AddWindow(window, second)
+		Indexes a window by its start time.
+	CountsInRange(start, end)
+		Returns per-domain query counts in the range [start, end).
+	WindowsInRange(start, end)
+		Returns the windows indexed in the buckets overlapping the range [start, end).
+	RemoveWindows(windows, starts)
+		Removes windows from the buckets they were indexed in.
+	Entries()
+		Returns the number of (domain, count) entries held by the tiers.
+	"""
+
+	def __init__(self, tiers = BUCKET_TIERS):
+		"""
+		Parameters
+		----------
+		tiers : lst
+			A list of (width, capacity) tuples, finest first(default is BUCKET_TIERS).
+		"""
+
+		self.tiers = [BucketRing(width, capacity) for width, capacity in tiers]
+		self.windows = BucketRing(WINDOW_BUCKET_WIDTH, WINDOW_BUCKET_CAPACITY, partial(array, 'q'))
+
+
+	def AddQuery(self, domain, second, count = 1):
+		"""
+		Counts queries of a domain at a given time.
+
+		Parameters
+		----------
+		domain : str
+			A string representing the domain name.
+		second : int
+			An integer representing the time of the queries in seconds since the epoch.
+		count : int
+			An integer representing the number of queries(default is 1).
+		"""
+
+		for ring in self.tiers:
+			bucket = ring.Open(second)
+			if bucket != None:
+				previous = bucket.get(domain)
+				if previous == None:
+					bucket[domain] = count
+					ring.entries += 1
+				else:
+					bucket[domain] = previous + count
+
+
+	def AddWindow(self, window, second):
+		"""
+		Indexes a window by its start time.
+
+		Parameters
+		----------
+		window : int
+			An integer representing the index of a 10 minutes window in a LogStore.
+		second : int
+			An integer representing the start of the window in seconds since the epoch.
+		"""
+
+		bucket = self.windows.Open(second)
+
+		if bucket != None:
+			bucket.append(window)
+
+
+	def Decompose(self, start, end):
+		"""
+		Splits the range [start, end) into the fewest buckets still held,
+		using the coarsest tier that is aligned at every step. Edges older
+		than a tier's horizon are rounded out to the next coarser bucket.
+
+		Parameters
+		----------
+		start : int
+			An integer representing the start of the range in seconds since the epoch.
+		end : int
+			An integer representing the end of the range in seconds since the epoch.
+
+		Returns
+		-------
+		lst
+			A list of (BucketRing, bucketNumber) tuples.
+		"""
+
+		spans = []
+		finest = self.tiers[0].width
+		cursor = start - start % finest
+
+		while cursor < end:
+			chosen = None
+			for index in range(len(self.tiers) - 1, -1, -1):
+				ring = self.tiers[index]
+				if cursor % ring.width == 0 and cursor + ring.width <= end:
+					chosen = index
+					break
+			if chosen == None:
+				chosen = 0
+			while chosen < len(self.tiers) - 1 and not self.tiers[chosen].Holds(cursor // self.tiers[chosen].width):
+				chosen += 1
+			ring = self.tiers[chosen]
+			bucketNumber = cursor // ring.width
+			spans.append((ring, bucketNumber))
+			cursor = (bucketNumber + 1) * ring.width
+
+		return spans
+
+
+	def CountsInRange(self, start, end):
+		"""
+		Returns per-domain query counts in the range [start, end).
+
+		Parameters
+		----------
+		start : int
+			An integer representing the start of the range in seconds since the epoch.
+		end : int
+			An integer representing the end of the range in seconds since the epoch.
+
+		Returns
+		-------
+		dict
+			A dictionary mapping domain names to query counts.
+		"""
+
+		counts = {}
+
+		for ring, bucketNumber in self.Decompose(start, end):
+			bucket = ring.Get(bucketNumber)
+			if bucket:
+				for domain, count in bucket.items():
+					counts[domain] = counts.get(domain, 0) + count
+
+		return counts
+
+
+	def WindowsInRange(self, start, end):
+		"""
+		Returns the windows indexed in the buckets overlapping the range
+		[start, end). Windows at the edges of the range may start outside
+		of it, so the caller checks their start time.
+
+		Parameters
+		----------
+		start : int
+			An integer representing the start of the range in seconds since the epoch.
+		end : int
+			An integer representing the end of the range in seconds since the epoch.
+
+		Returns
+		-------
+		lst
+			A list of window indices.
+		"""
+
+		windows = []
+		width = self.windows.width
+
+		for bucketNumber in range(start // width, (end - 1) // width + 1):
+			bucket = self.windows.Get(bucketNumber)
+			if bucket:
+				windows.extend(bucket)
+
+		return windows
+
+
+	def RemoveWindows(self, windows, starts):
+		"""
+		Removes windows from the buckets they were indexed in, so their
+		indices can be reused.
+
+		Parameters
+		----------
+		windows : lst
+			A list of window indices.
+		starts : array
+			An array of the start times of the windows by their index, in seconds since the epoch.
+		"""
+
+		removed = {}
+
+		for window in windows:
+			removed.setdefault(starts[window] // self.windows.width, set()).add(window)
+
+		for bucketNumber, indices in removed.items():
+			bucket = self.windows.Get(bucketNumber)
+			if bucket:
+				bucket[:] = array('q', [window for window in bucket if window not in indices])
+
+
+	def Entries(self):
+		"""
+		Returns the number of (domain, count) entries held by the tiers.
+
+		Returns
+		-------
+		int
+			An integer representing the number of entries.
+		"""
+
+		return sum(ring.entries for ring in self.tiers)
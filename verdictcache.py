@@ -0,0 +1,162 @@
+from collections import OrderedDict
+
+VERDICT_CACHE_SIZE = 1 << 16
+
+
+class VerdictCache:
+	"""
+	A class used to remember the verdicts of the most recently queried
+	names: whether a name is suspicious and the domain its queries are
+	counted under. Legitimate traffic repeats the same few thousand names,
+	so most lines skip the lexical checks. Once size names are held, the
+	least recently used one is evicted. The verdicts depend on the lexical
+	thresholds and the blocked and approved lists, so the cache is cleared
+	whenever the state passed to Validate changes.
+
+	Attributes
+	----------
+	size : int
+		An integer representing the maximal number of names held(default is VERDICT_CACHE_SIZE).
+	verdicts : OrderedDict
+		An OrderedDict mapping names to (isSuspiciousDomain, domain) tuples, least recently used first.
+	state : tuple
+		A tuple representing the state the verdicts were made in(default is None).
+	hits : int
+		An integer representing the number of lookups that found a verdict(default is 0).
+	misses : int
+		An integer representing the number of lookups that found none(default is 0).
+	evictions : int
+		An integer representing the number of verdicts evicted(default is 0).
+	invalidations : int
+		An integer representing the number of times the cache was cleared(default is 0).
+
+	Methods
+	-------
+	Get(name)
+		Returns the verdict of a name, or None.
+	Put(name, verdict)
+		Remembers the verdict of a name.
+	Validate(state)
+		Clears the cache if the state changed.
+	Clear()
+		Forgets all the verdicts.
+	Counters()
+		Returns the counters of the cache.
+	"""
+
+	def __init__(self, size = VERDICT_CACHE_SIZE):
+		"""
+		Parameters
+		----------
+		size : int
+			An integer representing the maximal number of names held, 0 disables the cache(default is VERDICT_CACHE_SIZE).
+		"""
+
+		self.size = size
+		self.verdicts = OrderedDict()
+		self.state = None
+		self.hits = 0
+		self.misses = 0
+		self.evictions = 0
+		self.invalidations = 0
+
+
+	def __len__(self):
+
+		return len(self.verdicts)
+
+
+	def Get(self, name):
+		"""
+		Returns the verdict of a name, and marks it as the most recently used.
+
+		Parameters
+		----------
+		name : str
+			A string representing the queried name.
+
+		Returns
+		-------
+		tuple
+			An (isSuspiciousDomain, domain) tuple, or None if the name isn't held.
+		"""
+
+		verdict = self.verdicts.get(name)
+
+		if verdict == None:
+			self.misses += 1
+			return None
+
+		self.verdicts.move_to_end(name)
+		self.hits += 1
+
+		return verdict
+
+
+	def Put(self, name, verdict):
+		"""
+		Remembers the verdict of a name, evicting the least recently used one if full.
+
+		Parameters
+		----------
+		name : str
+			A string representing the queried name.
+		verdict : tuple
+			An (isSuspiciousDomain, domain) tuple.
+		"""
+
+		if self.size <= 0:
+			return
+
+		self.verdicts[name] = verdict
+		self.verdicts.move_to_end(name)
+		if len(self.verdicts) > self.size:
+			self.verdicts.popitem(last = False)
+			self.evictions += 1
+
+
+	def Validate(self, state):
+		"""
+		Clears the cache if the state the verdicts depend on changed since the last call.
+
+		Parameters
+		----------
+		state : tuple
+			A tuple representing the thresholds and the versions of the lists.
+		"""
+
+		if state != self.state:
+			if self.verdicts:
+				self.Clear()
+			self.state = state
+
+
+	def Clear(self):
+		"""
+		Forgets all the verdicts.
+		"""
+
+		self.verdicts.clear()
+		self.invalidations += 1
+
+
+	def Counters(self):
+		"""
+		Returns the counters of the cache.
+
+		Returns
+		-------
+		dict
+			A dictionary mapping counter names to their values.
+		"""
+
+		lookups = self.hits + self.misses
+
+		return {
+			"hits": self.hits,
+			"misses": self.misses,
+			"hitRate": self.hits / lookups if lookups else 0.0,
+			"evictions": self.evictions,
+			"invalidations": self.invalidations,
+			"size": len(self.verdicts)
+		}